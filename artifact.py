@@ -0,0 +1,129 @@
+"""
+预编译程序文件（.pseudoc）- 保存经过优化和类型检查的程序，运行时跳过词法分析和语法分析
+
+文件格式:
+    头部   'PSPC' + 格式版本、PARSER_VERSION、BYTECODE_VERSION（各2字节）+ 是否优化（1字节）
+           + 源文件的SHA-256（32字节）+ 源文件路径（2字节长度 + UTF-8，相对于.pseudoc所在目录）
+    内容   pickle序列化的(AST, 类型检查诊断信息, 字节码代码对象)
+
+装载时先只读头部：版本与当前解释器不同、源文件内容已改变或内容已损坏时（源文件存在的情况下）自动从源文件
+重新编译并覆盖.pseudoc；源文件不存在时直接使用.pseudoc中的程序（版本不同或内容损坏时报错）。
+"""
+import hashlib
+import os
+import pickle
+from typing import List, Optional
+
+from ast_nodes import PARSER_VERSION, Program
+import bytecode as bc
+
+
+# 预编译文件的扩展名
+ARTIFACT_SUFFIX = '.pseudoc'
+
+# 文件头部
+ARTIFACT_MAGIC = b'PSPC'
+
+# 文件格式版本 - 头部或内容的结构改变时递增
+ARTIFACT_VERSION = 1
+
+# 头部中固定长度部分的字节数（magic、三个版本号、优化标志、SHA-256、路径长度）
+HEADER_SIZE = 4 + 2 * 3 + 1 + 32 + 2
+
+
+class CompiledProgram:
+    """装载的预编译程序"""
+    __slots__ = ('ast', 'diagnostics', 'code', 'rebuilt')
+
+    def __init__(self, ast: Program, diagnostics: List[str], code: bc.CodeObject, rebuilt: bool = False):
+        self.ast = ast                  # 优化和类型检查之后的AST
+        self.diagnostics = diagnostics  # 类型检查的诊断信息
+        self.code = code                # 字节码虚拟机的代码对象
+        self.rebuilt = rebuilt          # 是否因为源文件改变或版本不同而重新编译
+
+
+def artifact_path(source_path: str) -> str:
+    """源文件对应的预编译文件路径（foo.pseudo -> foo.pseudoc）"""
+    root, _ = os.path.splitext(source_path)
+    return root + ARTIFACT_SUFFIX
+
+
+def current_versions() -> tuple:
+    """当前解释器的(格式版本, PARSER_VERSION, BYTECODE_VERSION)"""
+    return ARTIFACT_VERSION, PARSER_VERSION, bc.BYTECODE_VERSION
+
+
+def compile_program(source_path: str, output_path: Optional[str] = None, optimize: bool = True) -> CompiledProgram:
+    """编译源文件并写入预编译文件（默认与源文件同名，扩展名为.pseudoc）；有语法错误时抛出SyntaxError"""
+    # 只有编译时才需要前端和临时文件，装载预编译程序时不导入
+    import tempfile
+    from ast_cache import compile_front_end
+
+    with open(source_path, 'rb') as f:
+        source = f.read()
+    front_end = compile_front_end(source.decode('utf-8'), optimize)
+    code = bc.BytecodeCompiler().compile_program(front_end.ast)
+
+    output_path = output_path or artifact_path(source_path)
+    relative = os.path.relpath(os.path.abspath(source_path), os.path.dirname(os.path.abspath(output_path)))
+    path_bytes = relative.encode('utf-8')
+    header = b''.join([
+        ARTIFACT_MAGIC,
+        *(version.to_bytes(2, 'little') for version in current_versions()),
+        bytes([int(optimize)]),
+        hashlib.sha256(source).digest(),
+        len(path_bytes).to_bytes(2, 'little'),
+        path_bytes,
+    ])
+    payload = pickle.dumps((front_end.ast, front_end.diagnostics, code), protocol=pickle.HIGHEST_PROTOCOL)
+
+    # 先写临时文件再改名，并发运行的其他进程不会读到写了一半的文件
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header + payload)
+        os.replace(temporary, output_path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return CompiledProgram(front_end.ast, front_end.diagnostics, code)
+
+
+def load_program(path: str) -> CompiledProgram:
+    """装载预编译文件；源文件已改变或版本不同时从源文件重新编译（并覆盖预编译文件）"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER_SIZE or data[:4] != ARTIFACT_MAGIC:
+        raise ValueError(f"'{path}' is not a compiled pseudocode program")
+
+    versions = tuple(int.from_bytes(data[position:position + 2], 'little') for position in (4, 6, 8))
+    optimize = bool(data[10])
+    digest = data[11:43]
+    path_length = int.from_bytes(data[43:45], 'little')
+    payload_start = HEADER_SIZE + path_length
+    relative = data[HEADER_SIZE:payload_start].decode('utf-8')
+    source_path = os.path.join(os.path.dirname(os.path.abspath(path)), relative)
+
+    try:
+        with open(source_path, 'rb') as f:
+            source_digest = hashlib.sha256(f.read()).digest()
+    except OSError:
+        source_digest = None  # 只分发了预编译文件
+
+    if versions != current_versions():
+        if source_digest is None:
+            raise ValueError(f"'{path}' was compiled by an incompatible interpreter version "
+                             f"and its source '{relative}' is missing")
+    elif source_digest is None or source_digest == digest:
+        try:
+            ast, diagnostics, code = pickle.loads(data[payload_start:])
+            return CompiledProgram(ast, diagnostics, code)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            # 头部完好但内容已损坏：与版本不同时一样从源文件重新编译
+            if source_digest is None:
+                raise ValueError(f"'{path}' is corrupt and its source '{relative}' is missing")
+
+    program = compile_program(source_path, path, optimize)
+    program.rebuilt = True
+    return program
@@ -0,0 +1,174 @@
+"""
+语法树缓存 - 相同的源代码只做一次前端处理（词法分析、语法分析、链接、优化和类型检查）
+
+缓存键为源代码和PARSER_VERSION（以及是否优化）的SHA-256。缓存的是优化和类型检查之后的AST，
+命中时直接交给执行引擎；各执行引擎只读取AST，不修改节点，同一棵AST可以被多次（包括同时）执行。
+
+内存中按最近使用（LRU）保留有限个条目，并统计命中和未命中次数；指定目录时还把条目序列化
+保存到磁盘（每个键一个文件），供命令行的多次运行共享。
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from ast_nodes import Program
+from lexer import Lexer
+from linker import link_program
+from memoization import analyze_purity
+from optimizer import optimize_program
+from parser import Parser, PARSER_VERSION
+from typechecker import check_program
+
+
+# 磁盘缓存文件的头部（之后为2字节的PARSER_VERSION）
+AST_CACHE_MAGIC = b'PSAC'
+
+# 磁盘缓存文件的扩展名
+AST_CACHE_SUFFIX = '.ast'
+
+
+class FrontEndResult:
+    """前端处理的结果：AST以及优化和类型检查的输出"""
+    __slots__ = ('ast', 'changes', 'summary', 'diagnostics', 'proven', 'total')
+
+    def __init__(self, ast: Program, changes: Optional[List[str]], summary: Optional[str],
+                 diagnostics: List[str], proven: int, total: int):
+        self.ast = ast                  # 优化和类型检查之后的AST
+        self.changes = changes          # 优化的改写记录（未优化时为None）
+        self.summary = summary          # 优化结果摘要（未优化时为None）
+        self.diagnostics = diagnostics  # 类型检查的诊断信息
+        self.proven = proven            # 省略的运行时类型检查数
+        self.total = total              # 运行时类型检查总数
+
+
+def compile_front_end(code: str, optimize: bool = True) -> FrontEndResult:
+    """对源代码做词法分析、语法分析、链接、纯度分析、优化和类型检查"""
+    ast = analyze_purity(link_program(Parser(Lexer().tokenize(code)).parse()))
+    optimization = optimize_program(ast) if optimize else None
+    type_check = check_program(ast)
+    return FrontEndResult(
+        ast,
+        optimization.changes if optimization is not None else None,
+        optimization.summary() if optimization is not None else None,
+        type_check.diagnostics, type_check.proven, type_check.total)
+
+
+def cache_key(code: str, optimize: bool = True) -> str:
+    """源代码的缓存键"""
+    digest = hashlib.sha256(f"{PARSER_VERSION}:{int(optimize)}:".encode())
+    digest.update(code.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+class ASTCache:
+    """前端处理结果的缓存 - 内存中的LRU，可选的磁盘存储"""
+
+    def __init__(self, capacity: int = 128, directory: Optional[str] = None):
+        self.capacity = capacity     # 内存中最多保留的条目数
+        self.directory = directory   # 磁盘缓存目录（None表示不使用磁盘）
+        self.entries = OrderedDict()  # {键: FrontEndResult}，最近使用的在最后
+        self.lock = threading.Lock()
+        self.hits = 0                # 内存命中次数
+        self.disk_hits = 0           # 内存未命中、磁盘命中的次数
+        self.misses = 0              # 需要做前端处理的次数
+
+    def get(self, code: str, optimize: bool = True) -> FrontEndResult:
+        """返回源代码的前端处理结果，未命中时处理并缓存；有语法错误时抛出SyntaxError（不缓存）"""
+        key = cache_key(code, optimize)
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self.load(key)
+        if result is not None:
+            with self.lock:
+                self.disk_hits += 1
+        else:
+            result = compile_front_end(code, optimize)
+            with self.lock:
+                self.misses += 1
+            self.save(key, result)
+
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """清空内存中的条目和统计（不删除磁盘缓存）"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+            }
+
+    # ==================== 磁盘存储 ====================
+
+    def path(self, key: str) -> str:
+        """键对应的磁盘缓存文件"""
+        return os.path.join(self.directory, key + AST_CACHE_SUFFIX)
+
+    def load(self, key: str) -> Optional[FrontEndResult]:
+        """从磁盘读取条目；没有、版本不符或已损坏时返回None"""
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), 'rb') as f:
+                return loads(f.read())
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, RecursionError):
+            return None
+
+    def save(self, key: str, result: FrontEndResult):
+        """把条目写入磁盘（先写临时文件再改名，其他进程不会读到写了一半的文件）；失败时忽略"""
+        if self.directory is None:
+            return
+        try:
+            data = dumps(result)
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temporary, self.path(key))
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        except (OSError, pickle.PicklingError, RecursionError):
+            pass
+
+
+def dumps(result: FrontEndResult) -> bytes:
+    """序列化前端处理结果"""
+    header = AST_CACHE_MAGIC + PARSER_VERSION.to_bytes(2, 'little')
+    return header + pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data: bytes) -> FrontEndResult:
+    """反序列化前端处理结果，格式或版本不符时抛出ValueError"""
+    if data[:4] != AST_CACHE_MAGIC:
+        raise ValueError("Not a pseudocode AST cache file")
+    version = int.from_bytes(data[4:6], 'little')
+    if version != PARSER_VERSION:
+        raise ValueError(f"AST cache version {version} is not supported (expected {PARSER_VERSION})")
+    result = pickle.loads(data[6:])
+    if not isinstance(result, FrontEndResult):
+        raise ValueError("AST cache file does not contain a front end result")
+    return result
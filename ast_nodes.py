@@ -1,12 +1,28 @@
 """
 AST节点类定义
 每个节点对应一种语法结构
+名称解析器（resolver.py）在解析后为变量引用填写depth/slot/by_ref，
+链接器（linker.py）为函数和过程调用填写builtin/definition，
+类型检查器（typechecker.py）为已证明类型安全的语句填写type_safe，
+优化器（optimizer.py）为边界全部是常量的数组类型填写bounds，为CASE填写table，为循环填写invariants，
+并把循环不变量和公共子表达式包装为CachedExpr
+所有节点都是slots数据类（Python 3.10+），实例不带__dict__，大程序的AST更省内存
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, List, Optional
 
 
-@dataclass
+# 前端输出格式版本 - 词法分析、语法分析、名称解析、链接、纯度分析、优化或类型检查的结果（AST及其标注）改变时递增，
+# 使ast_cache中缓存的AST和预编译程序失效
+PARSER_VERSION = 5
+
+
+def resolved():
+    """分析阶段（名称解析、类型检查、优化）填写的字段（不参与repr和比较）"""
+    return field(default=None, repr=False, compare=False)
+
+
+@dataclass(slots=True)
 class ASTNode:
     """AST节点基类"""
     pass
@@ -14,26 +30,28 @@ class ASTNode:
 
 # ==================== 程序结构 ====================
 
-@dataclass
+@dataclass(slots=True)
 class Program(ASTNode):
     statements: List[ASTNode]
 
 
 # ==================== 声明语句 ====================
 
-@dataclass
+@dataclass(slots=True)
 class DeclareStmt(ASTNode):
     identifier: str
     type_spec: Any
+    depth: Optional[int] = resolved()  # 词法作用域层数
+    slot: Optional[int] = resolved()   # 帧内槽位（None为按名称查找）
 
 
-@dataclass
+@dataclass(slots=True)
 class ConstantStmt(ASTNode):
     identifier: str
     value: Any
 
 
-@dataclass
+@dataclass(slots=True)
 class TypeDefStmt(ASTNode):
     name: str
     fields: List['DeclareStmt']
@@ -41,73 +59,83 @@ class TypeDefStmt(ASTNode):
 
 # ==================== 类型 ====================
 
-@dataclass
+@dataclass(slots=True)
 class SimpleType(ASTNode):
     type_name: str  # INTEGER, REAL, STRING, CHAR, BOOLEAN, DATE
 
 
-@dataclass
+@dataclass(slots=True)
 class ArrayType(ASTNode):
     dimensions: List[tuple]  # [(lower, upper), ...]
     element_type: Any
+    bounds: Optional[tuple] = resolved()  # 预先求值的各维边界((lower, upper), ...)
 
 
-@dataclass
+@dataclass(slots=True)
 class CustomType(ASTNode):
     type_name: str
 
 
 # ==================== 赋值和访问 ====================
 
-@dataclass
+@dataclass(slots=True)
 class AssignStmt(ASTNode):
     target: 'IdentifierAccess'
     value: Any
+    type_safe: Optional[bool] = resolved()  # 运行时类型检查可以省略
 
 
-@dataclass
+@dataclass(slots=True)
 class IdentifierAccess(ASTNode):
     name: str
     index1: Optional[Any] = None  # 数组索引
     index2: Optional[Any] = None  # 二维数组第二索引
     field: Optional[str] = None   # 记录字段
+    more_indices: tuple = ()      # 三维及以上数组的第三个及以后的索引
+    depth: Optional[int] = resolved()  # 词法作用域层数
+    slot: Optional[int] = resolved()   # 帧内槽位（None为按名称查找）
+    by_ref: Optional[bool] = resolved()  # 槽位存放BYREF引用，读写经由引用
 
 
 # ==================== 输入输出 ====================
 
-@dataclass
+@dataclass(slots=True)
 class InputStmt(ASTNode):
     target: IdentifierAccess
 
 
-@dataclass
+@dataclass(slots=True)
 class OutputStmt(ASTNode):
     items: List[Any]
 
 
 # ==================== 控制结构 ====================
 
-@dataclass
+@dataclass(slots=True)
 class IfStmt(ASTNode):
     condition: Any
     then_block: List[ASTNode]
     else_block: Optional[List[ASTNode]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CaseStmt(ASTNode):
     identifier: str
     branches: List['CaseBranch']
     otherwise: Optional[ASTNode] = None
+    depth: Optional[int] = resolved()  # 词法作用域层数
+    slot: Optional[int] = resolved()   # 帧内槽位（None为按名称查找）
+    by_ref: Optional[bool] = resolved()  # 槽位存放BYREF引用，读写经由引用
+    table: Any = resolved()  # 开头的常量分支的跳转表（interpreter.CaseTable）
 
 
-@dataclass
+@dataclass(slots=True)
 class CaseBranch(ASTNode):
     condition: Any  # 可以是单值或范围
     statement: ASTNode
 
 
-@dataclass
+@dataclass(slots=True)
 class RangeCondition(ASTNode):
     start: Any
     end: Any
@@ -115,123 +143,149 @@ class RangeCondition(ASTNode):
 
 # ==================== 循环结构 ====================
 
-@dataclass
+@dataclass(slots=True)
 class ForStmt(ASTNode):
     variable: str
     start: Any
     end: Any
     step: Optional[Any]
     body: List[ASTNode]
+    depth: Optional[int] = resolved()  # 词法作用域层数
+    slot: Optional[int] = resolved()   # 帧内槽位（None为按名称查找）
+    type_safe: Optional[bool] = resolved()  # 运行时类型检查可以省略
+    invariants: Optional[tuple] = resolved()  # 进入循环时清空的缓存槽位
 
 
-@dataclass
+@dataclass(slots=True)
 class WhileStmt(ASTNode):
     condition: Any
     body: List[ASTNode]
+    type_safe: Optional[bool] = resolved()  # 运行时类型检查可以省略
+    invariants: Optional[tuple] = resolved()  # 进入循环时清空的缓存槽位
 
 
-@dataclass
+@dataclass(slots=True)
 class RepeatStmt(ASTNode):
     body: List[ASTNode]
     condition: Any
+    type_safe: Optional[bool] = resolved()  # 运行时类型检查可以省略
+    invariants: Optional[tuple] = resolved()  # 进入循环时清空的缓存槽位
 
 
 # ==================== 过程和函数 ====================
 
-@dataclass
+@dataclass(slots=True)
 class ProcedureDef(ASTNode):
     name: str
     parameters: List['Parameter']
     body: List[ASTNode]
+    scope: Any = resolved()  # 子程序作用域（名称 -> 槽位）
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionDef(ASTNode):
     name: str
     parameters: List['Parameter']
     return_type: Any
     body: List[ASTNode]
+    scope: Any = resolved()  # 子程序作用域（名称 -> 槽位）
+    pure: Optional[bool] = resolved()  # 纯函数（结果只取决于参数值，可以记忆化）
 
 
-@dataclass
+@dataclass(slots=True)
 class Parameter(ASTNode):
     name: str
     type_spec: Any
     by_ref: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcedureCall(ASTNode):
     name: str
     arguments: List[Any]
+    definition: Any = resolved()  # 链接到的过程定义（None为运行时按名称查找）
 
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStmt(ASTNode):
     value: Any
 
 
 # ==================== 文件操作 ====================
 
-@dataclass
+@dataclass(slots=True)
 class FileOpenStmt(ASTNode):
     file_id: str
     mode: str  # READ, WRITE, APPEND
 
 
-@dataclass
+@dataclass(slots=True)
 class FileReadStmt(ASTNode):
     file_id: str
     target: IdentifierAccess
 
 
-@dataclass
+@dataclass(slots=True)
 class FileWriteStmt(ASTNode):
     file_id: str
     value: Any
 
 
-@dataclass
+@dataclass(slots=True)
 class FileCloseStmt(ASTNode):
     file_id: str
 
 
 # ==================== 表达式 ====================
 
-@dataclass
+@dataclass(slots=True)
 class BinaryOp(ASTNode):
     operator: str
     left: Any
     right: Any
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryOp(ASTNode):
     operator: str
     operand: Any
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCall(ASTNode):
     name: str
     arguments: List[Any]
+    builtin: Any = resolved()     # 链接到的内置函数
+    definition: Any = resolved()  # 链接到的函数定义（两者都为None时运行时按名称查找）
+
+
+@dataclass(slots=True)
+class CachedExpr(ASTNode):
+    """优化器插入的缓存表达式：槽位为空时求值并存入槽位，否则直接使用缓存的值
+    refresh为True时总是求值并覆盖槽位（公共子表达式在语句中的第一次出现）"""
+    expr: Any
+    slot: int
+    refresh: bool = False
 
 
 # ==================== 字面量 ====================
 
-@dataclass
+@dataclass(slots=True)
 class Literal(ASTNode):
     value: Any
     type_hint: str  # INTEGER, REAL, STRING, CHAR, BOOLEAN
 
 
-@dataclass
+@dataclass(slots=True)
 class Identifier(ASTNode):
     name: str
+    depth: Optional[int] = resolved()  # 词法作用域层数
+    slot: Optional[int] = resolved()   # 帧内槽位（None为按名称查找）
+    by_ref: Optional[bool] = resolved()  # 槽位存放BYREF引用，读写经由引用
 
 
 # ==================== 注释 ====================
 
-@dataclass
+@dataclass(slots=True)
 class Comment(ASTNode):
     text: str
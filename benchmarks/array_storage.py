@@ -0,0 +1,84 @@
+"""
+数组存储对比 - 列表存储（ArrayType）与类型化存储（create_array选择的TypedArrayType子类）
+
+对INTEGER、REAL、BOOLEAN、CHAR数组分别测量：
+  声明（默认值初始化）所需的时间
+  每个元素都赋值之后的总内存（tracemalloc，包括元素对象）
+  逐个读取全部元素所需的时间
+
+用法: python3 benchmarks/array_storage.py [--size N]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pseudocode_types as pt
+
+# 元素类型 -> 第i个元素的值
+ELEMENT_VALUES = {
+    'INTEGER': lambda i: pt.IntegerType(i * 7),
+    'REAL': lambda i: pt.RealType(i / 3),
+    'BOOLEAN': lambda i: pt.TRUE if i % 3 else pt.FALSE,
+    'CHAR': lambda i: pt.CharType(chr(65 + i % 26)),
+}
+
+
+def fill(array, element_type, size):
+    """为每个元素赋值（快速路径不接受时走通用的set，与解释器的写入方式一致）"""
+    make_value = ELEMENT_VALUES[element_type]
+    for i in range(1, size + 1):
+        value = make_value(i)
+        if not array.set1(i, value):
+            array.set(i, value)
+
+
+def read_all(array, size):
+    for i in range(1, size + 1):
+        array.get1(i)
+
+
+def measure(make_array, element_type, size):
+    """返回(声明秒数, 赋值后的字节数, 读取秒数)"""
+    start = time.perf_counter()
+    array = make_array([(1, size)], element_type)
+    declare_time = time.perf_counter() - start
+    del array
+
+    tracemalloc.start()
+    try:
+        array = make_array([(1, size)], element_type)
+        fill(array, element_type, size)
+        used = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    start = time.perf_counter()
+    read_all(array, size)
+    read_time = time.perf_counter() - start
+    return declare_time, used, read_time
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='对比列表存储和类型化存储的数组')
+    arg_parser.add_argument('--size', type=int, default=1_000_000, help='元素个数（默认1000000）')
+    args = arg_parser.parse_args()
+    size = args.size
+
+    header = f"{'':<10}{'storage':<10}{'declare':>10}{'bytes/elem':>12}{'read':>10}"
+    print(f"ARRAY[1:{size}]")
+    print(header)
+    print('-' * len(header))
+    for element_type in ELEMENT_VALUES:
+        for label, make_array in (('list', pt.ArrayType), ('typed', pt.create_array)):
+            declare_time, used, read_time = measure(make_array, element_type, size)
+            print(f"{element_type:<10}{label:<10}{declare_time * 1000:>8.1f}ms"
+                  f"{used / size:>12.1f}{read_time * 1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+BYREF参数 - 比较各执行引擎运行以BYREF过程交换元素的冒泡排序和直接交换的冒泡排序的耗时
+
+两个程序对同一组逆序的数据排序（默认300个元素，交换约45000次），差值即BYREF调用的开销：
+建立调用帧、为两个数组元素建立引用，以及经由引用读写实参。
+
+用法: python3 benchmarks/byref_swap.py [--size N] [--engines E,E,...] [--repeat R]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_cache import compile_front_end
+from engines import create_interpreter
+
+SETUP = '''DECLARE Items : ARRAY[1:{size}] OF INTEGER
+FOR i <- 1 TO {size}
+    Items[i] <- {size} - i
+NEXT i
+'''
+
+PROGRAMS = {
+    'BYREF交换': SETUP + '''
+PROCEDURE Swap(BYREF X : INTEGER, BYREF Y : INTEGER)
+    DECLARE Temp : INTEGER
+    Temp <- X
+    X <- Y
+    Y <- Temp
+ENDPROCEDURE
+
+FOR Pass <- 1 TO {size} - 1
+    FOR j <- 1 TO {size} - Pass
+        IF Items[j] > Items[j + 1] THEN
+            CALL Swap(Items[j], Items[j + 1])
+        ENDIF
+    NEXT j
+NEXT Pass
+OUTPUT Items[1], Items[{size}]
+''',
+    '直接交换': SETUP + '''
+DECLARE Temp : INTEGER
+FOR Pass <- 1 TO {size} - 1
+    FOR j <- 1 TO {size} - Pass
+        IF Items[j] > Items[j + 1] THEN
+            Temp <- Items[j]
+            Items[j] <- Items[j + 1]
+            Items[j + 1] <- Temp
+        ENDIF
+    NEXT j
+NEXT Pass
+OUTPUT Items[1], Items[{size}]
+''',
+}
+
+
+def run(ast, engine: str, repeat: int):
+    """运行repeat次，返回(最快一次的秒数, 输出)"""
+    best, output = None, None
+    for _ in range(repeat):
+        interpreter = create_interpreter(engine)
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(buffer):
+            interpreter.interpret(ast)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = buffer.getvalue()
+    return best, output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较BYREF交换与直接交换的冒泡排序耗时')
+    arg_parser.add_argument('--size', type=int, default=300, help='元素个数（默认300）')
+    arg_parser.add_argument('--engines', default='tree,closure,vm', help='比较的引擎（逗号分隔）')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次（默认3）')
+    args = arg_parser.parse_args()
+
+    asts = {name: compile_front_end(template.format(size=args.size)).ast
+            for name, template in PROGRAMS.items()}
+    for engine in args.engines.split(','):
+        results = []
+        outputs = set()
+        for name, ast in asts.items():
+            elapsed, output = run(ast, engine, args.repeat)
+            outputs.add(output)
+            results.append(f"{name} {elapsed * 1000:9.1f}ms")
+        if len(outputs) != 1:
+            raise SystemExit(f"{engine}: outputs differ")
+        print(f"{engine:8} " + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main()
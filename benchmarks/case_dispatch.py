@@ -0,0 +1,83 @@
+"""
+CASE跳转表 - 比较各执行引擎运行有20个分支的CASE状态机在开启和关闭优化器时的耗时
+
+状态机每一步用CASE按当前状态（0~19）选择下一个状态，分支条件都是字面量，状态均匀地分布在各分支上
+（默认20000步）。开启优化器时CASE查跳转表，关闭时（--no-optimize）按分支顺序逐个比较；
+其余优化对这个程序没有作用。
+
+用法: python3 benchmarks/case_dispatch.py [--steps N] [--engines E,E,...] [--repeat R]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_cache import compile_front_end
+from engines import create_interpreter
+
+BRANCHES = 20
+
+
+def program(steps: int) -> str:
+    """状态机程序：状态s的下一个状态为(s * 7 + 3) MOD 20"""
+    branches = '\n'.join(f'        {state} : State <- {(state * 7 + 3) % BRANCHES}'
+                         for state in range(BRANCHES))
+    return f'''DECLARE State : INTEGER
+DECLARE Total : INTEGER
+State <- 0
+Total <- 0
+FOR Count <- 1 TO {steps}
+    CASE OF State
+{branches}
+        OTHERWISE : State <- 0
+    ENDCASE
+    Total <- Total + State
+NEXT Count
+OUTPUT State, Total
+'''
+
+
+def run(ast, engine: str, repeat: int):
+    """运行repeat次，返回(最快一次的秒数, 输出)"""
+    best, output = None, None
+    for _ in range(repeat):
+        interpreter = create_interpreter(engine)
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(buffer):
+            interpreter.interpret(ast)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = buffer.getvalue()
+    return best, output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较CASE跳转表与逐个比较分支的耗时')
+    arg_parser.add_argument('--steps', type=int, default=20000, help='状态机步数（默认20000）')
+    arg_parser.add_argument('--engines', default='tree,closure,unboxed,vm,python', help='比较的引擎（逗号分隔）')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次（默认3）')
+    args = arg_parser.parse_args()
+
+    code = program(args.steps)
+    asts = {'跳转表': compile_front_end(code).ast,
+            '逐个比较': compile_front_end(code, optimize=False).ast}
+    for engine in args.engines.split(','):
+        results = []
+        outputs = set()
+        for name, ast in asts.items():
+            elapsed, output = run(ast, engine, args.repeat)
+            outputs.add(output)
+            results.append(f"{name} {elapsed * 1000:9.1f}ms")
+        if len(outputs) != 1:
+            raise SystemExit(f"{engine}: outputs differ")
+        print(f"{engine:8} " + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main()
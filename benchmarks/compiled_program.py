@@ -0,0 +1,59 @@
+"""
+预编译程序的启动时间 - 比较 main.py foo.pseudo 与 main.py foo.pseudoc 的整个进程耗时
+
+对生成的程序（默认2000行，与lexer_speed.py相同）先用 main.py compile 生成.pseudoc，
+再分别多次启动解释器运行源文件和预编译文件，取中位数（包括Python启动、导入模块和执行）。
+
+用法: python3 benchmarks/compiled_program.py [--lines N] [--runs R]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer_speed import generate_program
+
+MAIN = os.path.join(ROOT, 'main.py')
+
+
+def run_time(arguments: list, runs: int) -> float:
+    """启动runs次 main.py，返回耗时的中位数（秒）"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN] + arguments, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较运行源文件和预编译文件的启动时间')
+    arg_parser.add_argument('--lines', type=int, default=2000, help='生成程序的行数（默认2000）')
+    arg_parser.add_argument('--runs', type=int, default=10, help='每种方式启动的次数（默认10）')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'program.pseudo')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(generate_program(args.lines))
+        compiled = os.path.join(directory, 'program.pseudoc')
+        subprocess.run([sys.executable, MAIN, 'compile', source], check=True, stdout=subprocess.DEVNULL)
+
+        source_time = run_time([source], args.runs)
+        compiled_time = run_time([compiled], args.runs)
+        size = os.path.getsize(compiled)
+
+    print(f"{args.lines} 行, .pseudoc {size:,} 字节")
+    print(f"main.py program.pseudo:  {source_time * 1000:8.1f}ms")
+    print(f"main.py program.pseudoc: {compiled_time * 1000:8.1f}ms  ({source_time / compiled_time:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+深度递归 - 比较各执行引擎运行深度递归程序的耗时，以及是否超出Python的递归深度限制
+
+程序（深度默认20000）：
+  链表：用数组表示的链表，递归求长度和元素和（非尾递归，每层一个调用帧）
+  二叉树：按递增顺序建立的二叉搜索树（退化为一条链），递归插入一个键后递归求高度
+  尾递归：累加器形式的求和，以及过程体最后的CALL（vm引擎复用调用帧）
+
+vm引擎的调用帧在堆上，不受Python递归深度限制；其余引擎超出限制时记为 RecursionError。
+
+用法: python3 benchmarks/deep_recursion.py [--depth N] [--engines E,E,...] [--repeat R]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_cache import compile_front_end
+from engines import create_interpreter
+
+PROGRAMS = {
+    '链表': '''DECLARE NextNode : ARRAY[0:{depth}] OF INTEGER
+DECLARE Value : ARRAY[0:{depth}] OF INTEGER
+FOR i <- 1 TO {depth}
+    Value[i] <- MOD(i * 7, 100)
+    NextNode[i] <- i + 1
+NEXT i
+NextNode[{depth}] <- 0
+
+FUNCTION ListLength(Node : INTEGER) RETURNS INTEGER
+    IF Node = 0 THEN
+        RETURN 0
+    ENDIF
+    RETURN 1 + ListLength(NextNode[Node])
+ENDFUNCTION
+
+FUNCTION ListSum(Node : INTEGER) RETURNS INTEGER
+    IF Node = 0 THEN
+        RETURN 0
+    ENDIF
+    RETURN Value[Node] + ListSum(NextNode[Node])
+ENDFUNCTION
+
+OUTPUT ListLength(1), ListSum(1)
+''',
+    '二叉树': '''DECLARE LeftChild : ARRAY[0:{depth}] OF INTEGER
+DECLARE RightChild : ARRAY[0:{depth}] OF INTEGER
+DECLARE Key : ARRAY[0:{depth}] OF INTEGER
+DECLARE Nodes : INTEGER
+Nodes <- 0
+
+FUNCTION Insert(Root : INTEGER, NewKey : INTEGER) RETURNS INTEGER
+    IF Root = 0 THEN
+        Nodes <- Nodes + 1
+        Key[Nodes] <- NewKey
+        RETURN Nodes
+    ENDIF
+    IF NewKey < Key[Root] THEN
+        LeftChild[Root] <- Insert(LeftChild[Root], NewKey)
+    ELSE
+        RightChild[Root] <- Insert(RightChild[Root], NewKey)
+    ENDIF
+    RETURN Root
+ENDFUNCTION
+
+FUNCTION Height(Root : INTEGER) RETURNS INTEGER
+    DECLARE LeftHeight : INTEGER
+    DECLARE RightHeight : INTEGER
+    IF Root = 0 THEN
+        RETURN 0
+    ENDIF
+    LeftHeight <- Height(LeftChild[Root])
+    RightHeight <- Height(RightChild[Root])
+    IF LeftHeight > RightHeight THEN
+        RETURN LeftHeight + 1
+    ENDIF
+    RETURN RightHeight + 1
+ENDFUNCTION
+
+FOR i <- 1 TO {depth} - 1
+    Key[i] <- i
+    RightChild[i] <- i + 1
+NEXT i
+Key[{depth} - 1] <- {depth} - 1
+RightChild[{depth} - 1] <- 0
+Nodes <- {depth} - 1
+DECLARE Root : INTEGER
+Root <- Insert(1, {depth})
+OUTPUT Height(Root)
+''',
+    '尾递归': '''FUNCTION SumAcc(n : INTEGER, Acc : INTEGER) RETURNS INTEGER
+    IF n = 0 THEN
+        RETURN Acc
+    ENDIF
+    RETURN SumAcc(n - 1, Acc + n)
+ENDFUNCTION
+
+DECLARE Steps : INTEGER
+Steps <- 0
+
+PROCEDURE CountDown(n : INTEGER)
+    Steps <- Steps + 1
+    IF n > 0 THEN
+        CALL CountDown(n - 1)
+    ENDIF
+ENDPROCEDURE
+
+OUTPUT SumAcc({depth}, 0)
+CALL CountDown({depth})
+OUTPUT Steps
+''',
+}
+
+
+def run(ast, engine: str, repeat: int):
+    """运行repeat次，返回最快一次的秒数（超出递归深度限制时返回None）"""
+    best = None
+    for _ in range(repeat):
+        interpreter = create_interpreter(engine)
+        start = time.perf_counter()
+        try:
+            with redirect_stdout(io.StringIO()):
+                interpreter.interpret(ast)
+        except RecursionError:
+            return None
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较各执行引擎运行深度递归程序的耗时')
+    arg_parser.add_argument('--depth', type=int, default=20000, help='递归深度（默认20000）')
+    arg_parser.add_argument('--engines', default='vm,tree,closure,python', help='比较的引擎（逗号分隔）')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次（默认3）')
+    args = arg_parser.parse_args()
+
+    engines = args.engines.split(',')
+    print(f"深度 {args.depth}")
+    for name, template in PROGRAMS.items():
+        code = template.format(depth=args.depth)
+        ast = compile_front_end(code).ast
+        results = []
+        for engine in engines:
+            elapsed = run(ast, engine, args.repeat)
+            results.append(f"{engine} {'RecursionError':>14}" if elapsed is None
+                           else f"{engine} {elapsed * 1000:12.1f}ms")
+        print(f"{name:6}  " + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+语法树缓存 - 比较完整的前端处理（词法分析、语法分析、优化和类型检查）与缓存命中的耗时
+
+对生成的程序（默认2000行，与lexer_speed.py相同）分别测量：
+  前端处理：compile_front_end
+  内存命中：同一个ASTCache再次get（只计算SHA-256并查表）
+  磁盘命中：新的ASTCache从磁盘目录读取（命令行 --cache-dir 的情形）
+
+用法: python3 benchmarks/front_end_cache.py [--lines N] [--repeat R]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_cache import ASTCache, compile_front_end
+from lexer_speed import generate_program
+
+
+def best_time(function, repeat: int) -> float:
+    """重复执行function，返回最快一次的秒数"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较前端处理与语法树缓存命中的耗时')
+    arg_parser.add_argument('--lines', type=int, default=2000, help='生成程序的行数（默认2000）')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快的一次（默认5）')
+    args = arg_parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    code = generate_program(args.lines)
+    line_count = code.count('\n') + 1
+
+    front_end_time = best_time(lambda: compile_front_end(code), args.repeat)
+
+    memory_cache = ASTCache()
+    memory_cache.get(code)
+    memory_time = best_time(lambda: memory_cache.get(code), args.repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        ASTCache(directory=directory).get(code)
+        disk_time = best_time(lambda: ASTCache(directory=directory).get(code), args.repeat)
+
+    print(f"{line_count} 行")
+    print(f"前端处理: {front_end_time * 1000:9.2f}ms")
+    print(f"内存命中: {memory_time * 1000:9.2f}ms  ({front_end_time / memory_time:,.0f}x)")
+    print(f"磁盘命中: {disk_time * 1000:9.2f}ms  ({front_end_time / disk_time:,.1f}x)")
+    print(f"统计: {memory_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
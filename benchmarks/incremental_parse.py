@@ -0,0 +1,72 @@
+"""
+增量语法分析速度 - 对生成的大程序（默认50000行，与lexer_speed.py相同）比较完整分析和一次修改后的增量分析
+
+模拟在程序中间的一条赋值语句末尾逐个输入字符，分别测量：
+  update(code)：传入修改后的整个源代码（Web接口 /api/check 的用法），需要找出修改的范围
+  edit(start, end, text)：直接给出修改的范围
+以及对应的完整分析（Lexer.tokenize + Parser.parse）
+
+用法: python3 benchmarks/incremental_parse.py [--lines N] [--edits K]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer import Lexer
+from parser import Parser
+from incremental import IncrementalParser
+from lexer_speed import generate_program
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较完整分析和增量分析的速度')
+    arg_parser.add_argument('--lines', type=int, default=50_000, help='生成程序的行数（默认50000）')
+    arg_parser.add_argument('--edits', type=int, default=50, help='输入的字符数（默认50）')
+    args = arg_parser.parse_args()
+
+    code = generate_program(args.lines)
+    line_count = code.count('\n') + 1
+    block = len(code) // (2 * len(generate_program(1)))  # 程序中间的一段
+    anchor = f'total{block} <- 0'
+    position = code.index(anchor) + len(anchor)
+
+    start = time.perf_counter()
+    Parser(Lexer().tokenize(code)).parse()
+    full_time = time.perf_counter() - start
+
+    document = IncrementalParser()
+    start = time.perf_counter()
+    document.update(code)
+    initial_time = time.perf_counter() - start
+
+    # 在"totalN <- 0"之后逐个输入" + 1"、"1"、"1"……，每一步都是合法的程序
+    typed = ' + '
+    update_times = []
+    for _ in range(args.edits):
+        typed += '1'
+        new_code = code[:position] + typed + code[position:]
+        start = time.perf_counter()
+        document.update(new_code)
+        update_times.append(time.perf_counter() - start)
+
+    edit_times = []
+    for _ in range(args.edits):
+        start = time.perf_counter()
+        document.edit(position + len(typed), position + len(typed), '1')
+        edit_times.append(time.perf_counter() - start)
+        typed += '1'
+
+    print(f"{line_count} 行, {len(code)} 字符, {len(document.blocks)} 段")
+    print(f"完整分析:      {full_time * 1000:8.1f}ms")
+    print(f"增量首次分析:  {initial_time * 1000:8.1f}ms")
+    print(f"update (中位数): {statistics.median(update_times) * 1000:6.3f}ms  重新分析 {document.reparsed_lines} 行")
+    print(f"edit   (中位数): {statistics.median(edit_times) * 1000:6.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+词法分析速度 - 对生成的大程序（默认50000行）测量Lexer.tokenize的耗时
+
+生成的程序包含声明、赋值、嵌套的IF/FOR/WHILE、函数、字符串、注释和空行，
+覆盖所有常见的token种类以及缩进变化。
+
+用法: python3 benchmarks/lexer_speed.py [--lines N] [--repeat R]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer import Lexer
+
+# 重复使用的程序片段（每段以{n}区分名称），约25行
+BLOCK = '''// block {n}
+DECLARE total{n} : INTEGER
+DECLARE ratio{n} : REAL
+DECLARE name{n} : STRING
+DECLARE grid{n} : ARRAY[1:10, 1:10] OF INTEGER
+
+FUNCTION Scale{n}(x : INTEGER, factor : REAL) RETURNS REAL
+    RETURN x * factor + 0.5
+ENDFUNCTION
+
+total{n} <- 0
+name{n} <- "block " & "{n}"
+FOR i <- 1 TO 10
+    FOR j <- 1 TO 10 STEP 1
+        grid{n}[i, j] <- MOD(i * j, 7) - 3
+        IF grid{n}[i, j] >= 0 AND NOT (i = j) OR j <> 2
+        THEN
+            total{n} <- total{n} + grid{n}[i, j]  // 累加
+        ELSE
+            ratio{n} <- Scale{n}(total{n}, 1.25) / 2
+        ENDIF
+    NEXT j
+NEXT i
+WHILE total{n} > 100
+    total{n} <- total{n} - LENGTH(name{n})
+ENDWHILE
+OUTPUT name{n}, ": ", total{n}, ' ', ratio{n} ^ 2
+'''
+
+
+def generate_program(lines: int) -> str:
+    """生成至少lines行的程序"""
+    block_lines = BLOCK.count('\n')
+    blocks = [BLOCK.format(n=n) for n in range((lines + block_lines - 1) // block_lines)]
+    return '\n'.join(blocks)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量词法分析的速度')
+    arg_parser.add_argument('--lines', type=int, default=50_000, help='生成程序的行数（默认50000）')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快的一次（默认5）')
+    args = arg_parser.parse_args()
+
+    code = generate_program(args.lines)
+    line_count = code.count('\n') + 1
+    lexer = Lexer()
+
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        tokens = lexer.tokenize(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{line_count} 行, {len(code)} 字符, {len(tokens)} 个token")
+    print(f"tokenize: {best * 1000:.1f}ms  ({line_count / best:,.0f} 行/秒, {len(tokens) / best:,.0f} token/秒)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+纯函数记忆化 - 比较各执行引擎在开启和不开启记忆化时运行递归程序的耗时
+
+程序为朴素递归的 Fib(n) 和 Binomial(2k, k)（重复子问题多），以及一个参数各不相同、
+缓存从不命中的循环（衡量查缓存的额外开销）。输出不开启、开启两种情况的耗时和缓存统计。
+
+用法: python3 benchmarks/memoization.py [--fib N] [--engines E,E,...] [--repeat R]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_cache import compile_front_end
+from engines import create_interpreter
+
+PROGRAM = '''FUNCTION Fib(n : INTEGER) RETURNS INTEGER
+    IF n < 2 THEN
+        RETURN n
+    ENDIF
+    RETURN Fib(n - 1) + Fib(n - 2)
+ENDFUNCTION
+
+FUNCTION Binomial(n : INTEGER, k : INTEGER) RETURNS INTEGER
+    IF k = 0 OR k = n THEN
+        RETURN 1
+    ENDIF
+    RETURN Binomial(n - 1, k - 1) + Binomial(n - 1, k)
+ENDFUNCTION
+
+FUNCTION Square(n : INTEGER) RETURNS INTEGER
+    RETURN n * n
+ENDFUNCTION
+
+OUTPUT Fib({fib})
+OUTPUT Binomial({binomial_n}, {binomial_k})
+DECLARE Total : INTEGER
+Total <- 0
+FOR i <- 1 TO 20000
+    Total <- Total + Square(i)
+NEXT i
+OUTPUT Total
+'''
+
+
+def run(ast, engine: str, memoize: bool, repeat: int):
+    """运行repeat次，返回(最快一次的秒数, 输出, 缓存统计)"""
+    best, output, stats = None, None, None
+    for _ in range(repeat):
+        interpreter = create_interpreter(engine, memoize=memoize)
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(buffer):
+            interpreter.interpret(ast)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = buffer.getvalue()
+        stats = interpreter.memo.stats() if interpreter.memo is not None else None
+    return best, output, stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较开启和不开启记忆化时递归程序的耗时')
+    arg_parser.add_argument('--fib', type=int, default=20, help='Fib的参数（默认20）')
+    arg_parser.add_argument('--engines', default='tree,closure,vm,python', help='比较的引擎（逗号分隔）')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次（默认3）')
+    args = arg_parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    code = PROGRAM.format(fib=args.fib, binomial_n=args.fib - 2, binomial_k=(args.fib - 2) // 2)
+    ast = compile_front_end(code).ast
+
+    for engine in args.engines.split(','):
+        plain_time, plain_output, _ = run(ast, engine, False, args.repeat)
+        memo_time, memo_output, stats = run(ast, engine, True, args.repeat)
+        if memo_output != plain_output:
+            raise SystemExit(f"{engine}: output differs with memoization")
+        print(f"{engine:8} 不开启 {plain_time * 1000:9.1f}ms  开启 {memo_time * 1000:9.1f}ms  "
+              f"({plain_time / memo_time:.1f}x)  {stats}")
+
+
+if __name__ == '__main__':
+    main()
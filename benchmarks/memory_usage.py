@@ -0,0 +1,166 @@
+"""
+内存占用测量 - 对比AST节点、Token和运行时值在两种实例布局下的字节数
+
+before: 普通类（实例带__dict__），即改用__slots__之前的布局
+after:  当前的__slots__布局
+
+对tests/下的每个程序统计Token、AST节点和字面量值的平均每实例字节数，
+最后再测量一个大型INTEGER数组的每元素字节数。
+
+用法: python3 benchmarks/memory_usage.py [程序文件...] [--array-size N]
+"""
+import argparse
+import copy
+import dataclasses
+import glob
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_nodes import ASTNode, Literal
+from interpreter import Interpreter
+from lexer import Lexer
+from parser import Parser
+import pseudocode_types as pt
+
+
+# ==================== 布局 ====================
+
+def attribute_names(cls):
+    """实例属性名（按定义顺序）"""
+    if dataclasses.is_dataclass(cls):
+        return [f.name for f in dataclasses.fields(cls)]
+    names = []
+    for klass in reversed(cls.__mro__):
+        for name in klass.__dict__.get('__slots__', ()):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+_dict_classes = {}
+
+
+def dict_class(cls):
+    """与cls同名、实例带__dict__的普通类"""
+    mirror = _dict_classes.get(cls)
+    if mirror is None:
+        mirror = _dict_classes[cls] = type(cls.__name__, (), {})
+    return mirror
+
+
+def dict_layout_copy(obj):
+    """用同名的普通类（带__dict__）复制对象，按定义顺序逐个设置属性"""
+    cls = type(obj)
+    instance = _dict_classes[cls]()
+    for name in attribute_names(cls):
+        setattr(instance, name, getattr(obj, name))
+    return instance
+
+
+def slots_layout_copy(obj):
+    """按当前（__slots__）布局复制对象"""
+    return copy.copy(obj)
+
+
+def bytes_per_instance(objects, make_copy) -> float:
+    """复制一组对象，返回每个副本新增的字节数（属性值本身是共享的，不计入）"""
+    if not objects:
+        return 0.0
+    copies = [None] * len(objects)
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for i, obj in enumerate(objects):
+            copies[i] = make_copy(obj)
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return used / len(objects)
+
+
+# ==================== 收集对象 ====================
+
+def collect_nodes(node, nodes):
+    """收集AST中的全部节点"""
+    if isinstance(node, ASTNode):
+        nodes.append(node)
+        for f in dataclasses.fields(node):
+            if f.compare:  # 跳过名称解析器填写的字段
+                collect_nodes(getattr(node, f.name), nodes)
+    elif isinstance(node, (list, tuple)):
+        for item in node:
+            collect_nodes(item, nodes)
+    return nodes
+
+
+def load_program(path):
+    """词法分析和语法分析，返回(tokens, nodes, values)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        code = f.read()
+    tokens = Lexer().tokenize(code)
+    program = Parser(tokens).parse()
+    nodes = collect_nodes(program, [])
+    interpreter = Interpreter()
+    values = [interpreter.evaluate_literal(node) for node in nodes if isinstance(node, Literal)]
+    values = [value for value in values if isinstance(value, pt.PseudocodeType)]
+    return tokens, nodes, values
+
+
+# ==================== 报告 ====================
+
+def measure(objects):
+    """返回(数量, before字节/个, after字节/个)"""
+    for cls in {type(obj) for obj in objects}:
+        dict_class(cls)  # 在测量之前创建类，避免计入类对象本身
+    return (len(objects),
+            bytes_per_instance(objects, dict_layout_copy),
+            bytes_per_instance(objects, slots_layout_copy))
+
+
+def format_row(label, count, before, after):
+    saved = (1 - after / before) * 100 if before else 0.0
+    return f"{label:<38}{count:>8}{before:>10.1f}{after:>10.1f}{saved:>8.1f}%"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量AST节点、Token和运行时值的内存占用')
+    arg_parser.add_argument('files', nargs='*', help='伪代码程序（默认tests/*.pseudo）')
+    arg_parser.add_argument('--array-size', type=int, default=200_000,
+                            help='INTEGER数组的元素个数（默认200000）')
+    args = arg_parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(ROOT, 'tests', '*.pseudo')))
+    header = f"{'':<38}{'count':>8}{'before':>10}{'after':>10}{'saved':>9}"
+    print("每实例字节数（before: 带__dict__的实例，after: __slots__实例）")
+    print(header)
+    print('-' * len(header))
+
+    all_tokens, all_nodes, all_values = [], [], []
+    for path in files:
+        name = os.path.basename(path)
+        try:
+            tokens, nodes, values = load_program(path)
+        except Exception as e:
+            print(f"{name:<38}跳过: {e}")
+            continue
+        all_tokens.extend(tokens)
+        all_nodes.extend(nodes)
+        all_values.extend(values)
+        print(format_row(f"{name} (nodes)", *measure(nodes)))
+
+    print('-' * len(header))
+    print(format_row('Token', *measure(all_tokens)))
+    print(format_row('AST node', *measure(all_nodes)))
+    print(format_row('literal value', *measure(all_values)))
+
+    size = args.array_size
+    elements = [pt.IntegerType(i) for i in range(size)]
+    print(format_row(f"INTEGER array element (n={size})", *measure(elements)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+语法分析速度 - 对生成的大程序（默认50000行，与lexer_speed.py相同）测量Parser.parse的耗时
+
+只计语法分析（包括其中的名称解析），token流预先生成。
+
+用法: python3 benchmarks/parser_speed.py [--lines N] [--repeat R]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer import Lexer
+from parser import Parser
+from lexer_speed import generate_program
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量语法分析的速度')
+    arg_parser.add_argument('--lines', type=int, default=50_000, help='生成程序的行数（默认50000）')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快的一次（默认5）')
+    args = arg_parser.parse_args()
+
+    code = generate_program(args.lines)
+    line_count = code.count('\n') + 1
+    tokens = Lexer().tokenize(code)
+
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        program = Parser(tokens).parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{line_count} 行, {len(tokens)} 个token, {len(program.statements)} 条顶层语句")
+    print(f"parse: {best * 1000:.1f}ms  ({line_count / best:,.0f} 行/秒, {len(tokens) / best:,.0f} token/秒)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+短路求值 - 比较各执行引擎运行带组合条件的线性查找的耗时
+
+程序在数组（默认2000个元素）中反复查找不存在的值，循环条件为 i <= n AND Items[i] <> Target，
+每次查找都走到数组末尾后由左操作数结束循环；另一个程序把同样的查找写成嵌套的IF，作为对照。
+两者的差值即AND条件本身的开销（按值求布尔对象并判断真假，或融合的比较跳转）。
+
+用法: python3 benchmarks/short_circuit.py [--size N] [--rounds N] [--engines E,E,...] [--repeat R]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_cache import compile_front_end
+from engines import create_interpreter
+
+SETUP = '''DECLARE Items : ARRAY[1:{size}] OF INTEGER
+FOR i <- 1 TO {size}
+    Items[i] <- i * 2
+NEXT i
+DECLARE Position : INTEGER
+DECLARE Searching : BOOLEAN
+DECLARE Misses : INTEGER
+Misses <- 0
+'''
+
+PROGRAMS = {
+    'AND条件': SETUP + '''
+FOR Round <- 1 TO {rounds}
+    Position <- 1
+    WHILE Position <= {size} AND Items[Position] <> Round * 2 + 1
+        Position <- Position + 1
+    ENDWHILE
+    IF Position > {size} THEN
+        Misses <- Misses + 1
+    ENDIF
+NEXT Round
+OUTPUT Misses
+''',
+    '嵌套IF': SETUP + '''
+FOR Round <- 1 TO {rounds}
+    Position <- 1
+    Searching <- TRUE
+    WHILE Searching
+        IF Position > {size} THEN
+            Searching <- FALSE
+        ELSE
+            IF Items[Position] = Round * 2 + 1 THEN
+                Searching <- FALSE
+            ELSE
+                Position <- Position + 1
+            ENDIF
+        ENDIF
+    ENDWHILE
+    IF Position > {size} THEN
+        Misses <- Misses + 1
+    ENDIF
+NEXT Round
+OUTPUT Misses
+''',
+}
+
+
+def run(ast, engine: str, repeat: int):
+    """运行repeat次，返回(最快一次的秒数, 输出)"""
+    best, output = None, None
+    for _ in range(repeat):
+        interpreter = create_interpreter(engine)
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(buffer):
+            interpreter.interpret(ast)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = buffer.getvalue()
+    return best, output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较带AND条件的线性查找与嵌套IF写法的耗时')
+    arg_parser.add_argument('--size', type=int, default=2000, help='数组元素个数（默认2000）')
+    arg_parser.add_argument('--rounds', type=int, default=30, help='查找次数（默认30）')
+    arg_parser.add_argument('--engines', default='tree,closure,unboxed,vm,python', help='比较的引擎（逗号分隔）')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次（默认3）')
+    args = arg_parser.parse_args()
+
+    asts = {name: compile_front_end(template.format(size=args.size, rounds=args.rounds)).ast
+            for name, template in PROGRAMS.items()}
+    for engine in args.engines.split(','):
+        results = []
+        outputs = set()
+        for name, ast in asts.items():
+            elapsed, output = run(ast, engine, args.repeat)
+            outputs.add(output)
+            results.append(f"{name} {elapsed * 1000:9.1f}ms")
+        if len(outputs) != 1:
+            raise SystemExit(f"{engine}: outputs differ")
+        print(f"{engine:8} " + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+大数组存储对比 - 整块分配（扁平存储）与分页存储（超过SPARSE_THRESHOLD个元素时使用）
+
+对声明了很大边界、只写入少数元素的INTEGER、REAL、STRING数组分别测量：
+  声明所需的时间
+  写入若干个分散的元素之后存储占用的字节数（tracemalloc）
+  读取全部写入元素和同样多个未写入元素所需的时间
+以及内存账（MemoryAccount）记录的峰值
+
+用法: python3 benchmarks/sparse_arrays.py [--size N] [--writes K]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pseudocode_types as pt
+
+# 元素类型 -> 第i个写入的值
+ELEMENT_VALUES = {
+    'INTEGER': lambda i: pt.IntegerType(i * 7),
+    'REAL': lambda i: pt.RealType(i / 3),
+    'STRING': lambda i: pt.StringType(str(i)),
+}
+
+
+def measure(element_type, size, writes, threshold):
+    """返回(声明秒数, 写入后的字节数, 读取秒数, 内存账峰值)"""
+    saved_threshold = pt.SPARSE_THRESHOLD
+    pt.SPARSE_THRESHOLD = threshold
+    try:
+        memory = pt.start_memory_account()
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            array = pt.create_array([(1, size)], element_type)
+            declare_time = time.perf_counter() - start
+            make_value = ELEMENT_VALUES[element_type]
+            step = size // writes
+            for i in range(writes):
+                array.set(1 + i * step, make_value(i))
+            used = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        start = time.perf_counter()
+        for i in range(writes):
+            array.get1(1 + i * step)
+            array.get1(2 + i * step)
+        read_time = time.perf_counter() - start
+        return declare_time, used, read_time, memory.peak
+    finally:
+        pt.SPARSE_THRESHOLD = saved_threshold
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='对比整块分配和分页存储的大数组')
+    arg_parser.add_argument('--size', type=int, default=20_000_000, help='元素个数（默认20000000）')
+    arg_parser.add_argument('--writes', type=int, default=1000, help='写入的元素个数（默认1000）')
+    args = arg_parser.parse_args()
+
+    header = f"{'':<10}{'storage':<10}{'declare':>10}{'bytes':>14}{'read':>10}{'account':>14}"
+    print(f"ARRAY[1:{args.size}]，写入 {args.writes} 个元素")
+    print(header)
+    print('-' * len(header))
+    for element_type in ELEMENT_VALUES:
+        for label, threshold in (('flat', args.size), ('paged', 0)):
+            declare_time, used, read_time, peak = measure(element_type, args.size, args.writes, threshold)
+            print(f"{element_type:<10}{label:<10}{declare_time * 1000:>8.1f}ms"
+                  f"{used:>14}{read_time * 1000:>8.1f}ms{peak:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+启动时间 - 用 python -X importtime 测量 main.py 运行一个小程序时导入模块的耗时，超出预算时失败
+
+分别运行源文件（.pseudo）和预编译文件（.pseudoc），每种方式启动多次，取导入耗时（顶层模块的
+累计时间之和）和整个进程耗时的中位数，并列出耗时最多的模块。以下两种情况返回非零退出码，
+可在修改后运行以发现启动时间的退步：
+  - 导入耗时的中位数超过 --budget（毫秒）
+  - 导入了应当按需导入的模块（日期、临时文件、调试输出、缓存等，见LAZY_MODULES）
+
+用法: python3 benchmarks/startup_time.py [--runs R] [--budget MS] [--top N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, 'main.py')
+
+# 运行的小程序（不使用日期和文件）
+PROGRAM = '''DECLARE total : INTEGER
+total <- 0
+FOR i <- 1 TO 10
+    total <- total + i
+NEXT i
+OUTPUT total
+'''
+
+# 各种运行方式不应导入的模块
+LAZY_MODULES = {
+    'program.pseudo': {'datetime', 'tempfile', 'traceback', 'pickle', 'artifact', 'ast_cache'},
+    'program.pseudoc': {'datetime', 'tempfile', 'traceback', 'ast_cache',
+                        'lexer', 'parser', 'resolver', 'linker', 'memoization', 'optimizer',
+                        'typechecker'},
+}
+
+
+def parse_importtime(output: str) -> dict:
+    """解析 -X importtime 的输出，返回{顶层模块: 累计微秒}"""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line.split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # 表头
+        name = fields[2][1:]
+        if not name.startswith(' '):
+            modules[name] = int(fields[1])
+    return modules
+
+
+def imported_modules(output: str) -> set:
+    """-X importtime 输出中的所有模块名"""
+    return {line.split('|')[2].strip() for line in output.splitlines()
+            if line.startswith('import time:') and line.count('|') == 2}
+
+
+def measure(path: str, runs: int):
+    """启动runs次，返回(导入耗时中位数ms, 进程耗时中位数ms, {模块: 耗时中位数ms}, 导入的模块)"""
+    totals, walls, samples, modules = [], [], {}, set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', MAIN, path], check=True,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        walls.append((time.perf_counter() - start) * 1000)
+        times = parse_importtime(result.stderr)
+        totals.append(sum(times.values()) / 1000)
+        for name, microseconds in times.items():
+            samples.setdefault(name, []).append(microseconds / 1000)
+        modules |= imported_modules(result.stderr)
+    per_module = {name: statistics.median(values) for name, values in samples.items()}
+    return statistics.median(totals), statistics.median(walls), per_module, modules
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量main.py的导入耗时，超出预算时失败')
+    arg_parser.add_argument('--runs', type=int, default=10, help='每种方式启动的次数（默认10）')
+    arg_parser.add_argument('--budget', type=float, default=150.0, help='导入耗时的预算（毫秒，默认150）')
+    arg_parser.add_argument('--top', type=int, default=8, help='列出耗时最多的模块数（默认8）')
+    args = arg_parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'program.pseudo')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(PROGRAM)
+        subprocess.run([sys.executable, MAIN, 'compile', source], check=True, stdout=subprocess.DEVNULL)
+
+        for name, lazy in LAZY_MODULES.items():
+            total, wall, per_module, modules = measure(os.path.join(directory, name), args.runs)
+            status = 'OK' if total <= args.budget else 'OVER BUDGET'
+            print(f"main.py {name}: 导入 {total:7.1f}ms / 预算 {args.budget:.0f}ms  进程 {wall:7.1f}ms  {status}")
+            for module, milliseconds in sorted(per_module.items(), key=lambda item: -item[1])[:args.top]:
+                print(f"    {milliseconds:7.1f}ms  {module}")
+            if total > args.budget:
+                failures.append(f"{name}: import time {total:.1f}ms exceeds budget {args.budget:.0f}ms")
+            eager = sorted(lazy & modules)
+            if eager:
+                failures.append(f"{name}: should not import {', '.join(eager)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+字符串连接 - 比较各执行引擎在不同输入长度下运行反复连接字符串的程序的耗时
+
+程序（输入为由CHR生成的小写字母串）：
+  凯撒密码：逐个字符移位后连接到结果末尾（s <- s & c）
+  反转：逐个字符连接到结果开头（s <- c & s）
+  游程编码：每一段连接计数和字符（s <- s & NUM_TO_STR(n) & c）
+
+长字符串的连接结果由片段列表表示（pseudocode_types.StringBuilder），耗时随长度线性增长；
+每次连接都复制整个字符串时，复制的字节数随长度平方增长，长度达到十万字符以上时成为主要开销。
+
+用法: python3 benchmarks/string_concat.py [--lengths N,N,...] [--engines E,E,...] [--repeat R]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ast_cache import compile_front_end
+from engines import create_interpreter
+
+SETUP = '''DECLARE Source : STRING
+DECLARE Result : STRING
+DECLARE Size : INTEGER
+Source <- ""
+FOR i <- 1 TO {length}
+    Source <- Source & CHR(97 + MOD(DIV(i, 3) * 7, 26))
+NEXT i
+Size <- LENGTH(Source) + 0
+Result <- ""
+'''
+
+PROGRAMS = {
+    '凯撒密码': SETUP + '''
+FOR i <- 1 TO Size
+    Result <- Result & CHR(97 + MOD(ASC(MID(Source, i, 1)) - 94, 26))
+NEXT i
+OUTPUT LENGTH(Result), RIGHT(Result, 5)
+''',
+    '反转': SETUP + '''
+FOR i <- 1 TO Size
+    Result <- MID(Source, i, 1) & Result
+NEXT i
+OUTPUT LENGTH(Result), LEFT(Result, 5)
+''',
+    '游程编码': SETUP + '''
+DECLARE Count : INTEGER
+Count <- 1
+FOR i <- 2 TO Size + 1
+    IF i <= Size AND MID(Source, i, 1) = MID(Source, i - 1, 1) THEN
+        Count <- Count + 1
+    ELSE
+        Result <- Result & NUM_TO_STR(Count) & MID(Source, i - 1, 1)
+        Count <- 1
+    ENDIF
+NEXT i
+OUTPUT LENGTH(Result), RIGHT(Result, 6)
+''',
+}
+
+
+def run(ast, engine: str, repeat: int) -> float:
+    """运行repeat次，返回最快一次的秒数"""
+    best = None
+    for _ in range(repeat):
+        interpreter = create_interpreter(engine)
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            interpreter.interpret(ast)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='比较反复连接字符串的程序在不同输入长度下的耗时')
+    arg_parser.add_argument('--lengths', default='100000,200000,400000', help='输入长度（逗号分隔，默认100000,200000,400000）')
+    arg_parser.add_argument('--engines', default='closure,vm,python', help='比较的引擎（逗号分隔）')
+    arg_parser.add_argument('--repeat', type=int, default=1, help='重复次数，取最快的一次（默认1）')
+    args = arg_parser.parse_args()
+
+    lengths = [int(length) for length in args.lengths.split(',')]
+    for name, template in PROGRAMS.items():
+        print(name)
+        asts = [compile_front_end(template.format(length=length)).ast for length in lengths]
+        for engine in args.engines.split(','):
+            results = [f"{length} {run(ast, engine, args.repeat) * 1000:9.1f}ms"
+                       for length, ast in zip(lengths, asts)]
+            print(f"  {engine:8} " + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,6 @@
 支持扩展自定义函数
 """
 import math
-from datetime import datetime
 from pseudocode_types import *
 from typing import Any
 
@@ -355,8 +354,7 @@ def builtin_rand(upper: Any) -> float:
 
 def builtin_today() -> 'DateType':
     """TODAY() - 返回当前日期"""
-    from types import DateType
-    return DateType(datetime.now())
+    return DateType()
 
 
 def builtin_day(date: Any) -> int:
@@ -532,6 +530,35 @@ def is_builtin_function(name: str) -> bool:
     return name.upper() in BUILTIN_FUNCTIONS
 
 
+# 结果不只取决于参数的内置函数（随机数、当前日期、文件状态），不能缓存或合并调用
+IMPURE_BUILTINS = {'RAND', 'RANDOM', 'RANDOMINT', 'TODAY', 'EOF'}
+
+
+def is_pure_builtin(name: str) -> bool:
+    """检查是否为结果只取决于参数的内置函数"""
+    name_upper = name.upper()
+    return name_upper in BUILTIN_FUNCTIONS and name_upper not in IMPURE_BUILTINS
+
+
+# 第一个参数是执行引擎的文件管理器的内置函数（由call_builtin_function传入，链接时不直接绑定）
+FILE_BUILTINS = {'EOF'}
+
+
+def builtin_arity(name: str) -> tuple:
+    """内置函数在伪代码中接受的参数个数(最少, 最多)，不计执行引擎传入的文件管理器"""
+    name_upper = name.upper()
+    func = BUILTIN_FUNCTIONS[name_upper]
+    count = func.__code__.co_argcount
+    if name_upper in FILE_BUILTINS:
+        count -= 1
+    return count - len(func.__defaults__ or ()), count
+
+
+def builtin_call_error(name: str, error: TypeError) -> RuntimeError:
+    """内置函数拒绝参数时报告的运行时错误"""
+    return RuntimeError(f"Error calling builtin function '{name}': {error}")
+
+
 def call_builtin_function(name: str, args: list, file_manager=None) -> Any:
     """调用内置函数"""
     name_upper = name.upper()
@@ -548,4 +575,4 @@ def call_builtin_function(name: str, args: list, file_manager=None) -> Any:
     try:
         return func(*args)
     except TypeError as e:
-        raise RuntimeError(f"Error calling builtin function '{name}': {e}")
+        raise builtin_call_error(name, e)
@@ -0,0 +1,655 @@
+"""
+字节码编译器 - 将AST降级为线性指令流
+控制结构（IF/CASE/WHILE/REPEAT/FOR）全部变为跳转指令，供vm.py中的栈式虚拟机执行。
+指令流由(操作码名称, 参数)元组组成，可序列化后缓存
+"""
+from typing import Any, List, Optional, Tuple
+from ast_nodes import *
+import pseudocode_types as pt
+
+
+# 字节码格式版本 - 指令集或序列化格式改变时递增
+BYTECODE_VERSION = 11
+
+# 序列化头部
+BYTECODE_MAGIC = b'PSBC'
+
+
+# ==================== 操作码 ====================
+
+# 栈操作
+LOAD_CONST = 'LOAD_CONST'            # 参数: 值                  压入常量
+LOAD_VAR = 'LOAD_VAR'                # 参数: 变量名              压入变量值
+LOAD_INDEX = 'LOAD_INDEX'            # 参数: 维数                弹出数组和索引，压入元素
+LOAD_FIELD = 'LOAD_FIELD'            # 参数: 字段名              弹出记录，压入字段值
+STORE_VAR = 'STORE_VAR'              # 参数: 变量名              弹出值并赋给变量
+LOAD_SLOT = 'LOAD_SLOT'              # 参数: (变量名, 层数, 槽位) 压入子程序帧中的局部变量
+STORE_SLOT = 'STORE_SLOT'            # 参数: (变量名, 层数, 槽位) 弹出值并赋给局部变量
+STORE_VAR_UNCHECKED = 'STORE_VAR_UNCHECKED'    # 参数: 变量名    同STORE_VAR，类型检查器已证明类型一致
+STORE_SLOT_UNCHECKED = 'STORE_SLOT_UNCHECKED'  # 参数: (变量名, 层数, 槽位)  同STORE_SLOT，省略类型检查
+LOAD_REF = 'LOAD_REF'                # 参数: (变量名, 层数, 槽位) 压入BYREF参数引用的实参的值
+STORE_REF = 'STORE_REF'              # 参数: (变量名, 层数, 槽位) 弹出值，经由BYREF参数的引用写入实参
+REF_VAR = 'REF_VAR'                  # 参数: 变量名              压入指向按名称查找的变量的引用
+REF_SLOT = 'REF_SLOT'                # 参数: (变量名, 层数, 槽位) 压入指向局部变量的引用
+REF_PARAM = 'REF_PARAM'              # 参数: (变量名, 层数, 槽位) 压入BYREF参数槽位中的引用（继续传递）
+REF_INDEX = 'REF_INDEX'              # 参数: 维数                弹出数组和索引，压入指向元素的引用
+REF_FIELD = 'REF_FIELD'              # 参数: 字段名              弹出记录，压入指向字段的引用
+STORE_INDEX = 'STORE_INDEX'          # 参数: (变量名, 维数)      弹出值、数组和索引，写入元素
+STORE_FIELD = 'STORE_FIELD'          # 参数: (变量名, 字段名)    弹出值和记录，写入字段
+DUP = 'DUP'                          # 复制栈顶
+POP = 'POP'                          # 丢弃栈顶
+
+# 运算
+BINARY_OP = 'BINARY_OP'              # 参数: 运算符
+UNARY_OP = 'UNARY_OP'                # 参数: 运算符
+TO_BOOLEAN = 'TO_BOOLEAN'            # 栈顶替换为它的真值（AND/OR的右操作数）
+
+# 跳转
+JUMP = 'JUMP'                        # 参数: 目标地址
+POP_JUMP_IF_FALSE = 'POP_JUMP_IF_FALSE'  # 参数: 目标地址（IF条件，按真值判断）
+WHILE_TEST = 'WHILE_TEST'            # 参数: 循环出口（条件必须为BOOLEAN）
+UNTIL_TEST = 'UNTIL_TEST'            # 参数: 循环起点（条件必须为BOOLEAN）
+POP_JUMP_IF_FALSE_VALUE = 'POP_JUMP_IF_FALSE_VALUE'  # 参数: 目标地址（已证明为BOOLEAN的循环条件）
+FOR_INIT = 'FOR_INIT'                # 参数: (循环变量名, 槽位, 省略类型检查)  弹出起始/结束/步长，压入循环状态
+FOR_TEST = 'FOR_TEST'                # 参数: 循环出口            检查循环条件，结束时弹出循环状态
+FOR_STEP = 'FOR_STEP'                # 参数: 循环测试地址        计数器递增并写回循环变量
+CASE_EQ = 'CASE_EQ'                  # 弹出CASE值副本和分支值，压入比较结果（Python bool）
+CASE_RANGE = 'CASE_RANGE'            # 弹出CASE值副本和范围上下界，压入比较结果（Python bool）
+CASE_TABLE = 'CASE_TABLE'            # 参数: (跳转表, 各常量分支地址)  查表命中时弹出CASE值并跳转，否则保留CASE值
+POP_JUMP_IF_NOT = 'POP_JUMP_IF_NOT'  # 参数: 目标地址（弹出Python bool）
+POP_JUMP_IF_TRUE = 'POP_JUMP_IF_TRUE'  # 参数: 目标地址（按真值判断）
+JUMP_IF_FALSE_OR_POP = 'JUMP_IF_FALSE_OR_POP'  # 参数: 目标地址  栈顶为假时替换为FALSE并跳转，否则弹出（AND短路）
+JUMP_IF_TRUE_OR_POP = 'JUMP_IF_TRUE_OR_POP'    # 参数: 目标地址  栈顶为真时替换为TRUE并跳转，否则弹出（OR短路）
+COMPARE_JUMP_IF_FALSE = 'COMPARE_JUMP_IF_FALSE'  # 参数: (运算符, 目标地址)  弹出两个操作数，比较结果为假时跳转
+COMPARE_JUMP_IF_TRUE = 'COMPARE_JUMP_IF_TRUE'    # 参数: (运算符, 目标地址)  弹出两个操作数，比较结果为真时跳转
+
+# 缓存（循环不变量和公共子表达式）
+LOAD_CACHED = 'LOAD_CACHED'          # 参数: (槽位, 目标地址)  槽位非空时压入缓存的值并跳转
+STORE_CACHED = 'STORE_CACHED'        # 参数: 槽位                栈顶的值存入槽位（不弹出）
+CLEAR_CACHE = 'CLEAR_CACHE'          # 参数: 槽位元组            进入循环时清空循环不变量
+
+# 声明和定义
+DECLARE = 'DECLARE'                  # 参数: (变量名, 类型名)
+DECLARE_ARRAY = 'DECLARE_ARRAY'      # 参数: (变量名, 维数, 元素类型)  弹出各维上下界
+DECLARE_ARRAY_CONST = 'DECLARE_ARRAY_CONST'  # 参数: (变量名, 各维上下界, 元素类型)  边界已预先求值
+DECLARE_RECORD = 'DECLARE_RECORD'    # 参数: (变量名, 类型名)
+DEFINE_CONSTANT = 'DEFINE_CONSTANT'  # 参数: 常量名
+DEFINE_TYPE = 'DEFINE_TYPE'          # 参数: TypeDefStmt
+DEFINE_PROCEDURE = 'DEFINE_PROCEDURE'  # 参数: 子程序编号
+DEFINE_FUNCTION = 'DEFINE_FUNCTION'  # 参数: 子程序编号
+
+# 调用
+CALL_BUILTIN = 'CALL_BUILTIN'        # 参数: (函数名, 参数个数)
+CALL_LINKED_BUILTIN = 'CALL_LINKED_BUILTIN'  # 参数: (内置函数, 函数名, 参数个数)  链接时已绑定
+LOAD_FUNCTION = 'LOAD_FUNCTION'      # 参数: 函数名              压入(函数定义, 定义所在作用域)
+LOAD_LINKED_FUNCTION = 'LOAD_LINKED_FUNCTION'  # 参数: 函数定义  压入(函数定义, 全局作用域)
+CALL_FUNCTION = 'CALL_FUNCTION'      # 参数: 参数个数
+LOAD_PROCEDURE = 'LOAD_PROCEDURE'    # 参数: 过程名              压入(过程定义, 定义所在作用域)
+LOAD_LINKED_PROCEDURE = 'LOAD_LINKED_PROCEDURE'  # 参数: 过程定义  压入(过程定义, 全局作用域)
+CALL_PROCEDURE = 'CALL_PROCEDURE'    # 参数: 原始参数表达式列表（BYREF参数绑定为指向它们的引用）
+TAIL_CALL_FUNCTION = 'TAIL_CALL_FUNCTION'    # 参数: 参数个数    同CALL_FUNCTION，之后是RETURN_VALUE（尾调用）
+TAIL_CALL_PROCEDURE = 'TAIL_CALL_PROCEDURE'  # 参数: 原始参数表达式列表  同CALL_PROCEDURE，之后是END_ROUTINE（尾调用）
+RETURN_VALUE = 'RETURN_VALUE'        # 弹出返回值并返回
+END_ROUTINE = 'END_ROUTINE'          # 子程序体结束
+
+# 输入输出
+INPUT = 'INPUT'                      # 读取一行输入并压入解析后的值
+OUTPUT = 'OUTPUT'                    # 参数: 项数
+FILE_OPEN = 'FILE_OPEN'              # 参数: (文件名, 模式)
+FILE_READ = 'FILE_READ'              # 参数: 文件名              压入读取的行
+FILE_WRITE = 'FILE_WRITE'            # 参数: 文件名
+FILE_CLOSE = 'FILE_CLOSE'            # 参数: 文件名
+
+HALT = 'HALT'                        # 程序结束
+
+# 参数为跳转目标的操作码
+JUMP_OPCODES = {JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_NOT, POP_JUMP_IF_FALSE_VALUE, WHILE_TEST, UNTIL_TEST,
+                FOR_TEST, FOR_STEP, POP_JUMP_IF_TRUE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP}
+
+# 比较运算符
+COMPARISON_OPERATORS = ('=', '<>', '<', '>', '<=', '>=')
+
+
+def is_boolean_expression(expr) -> bool:
+    """表达式的结果是否必定为BOOLEAN（比较和逻辑运算）"""
+    if isinstance(expr, BinaryOp):
+        return expr.operator in COMPARISON_OPERATORS or expr.operator in ('AND', 'OR')
+    return isinstance(expr, UnaryOp) and expr.operator == 'NOT'
+
+
+class CodeObject:
+    """代码对象 - 一段线性指令流"""
+
+    def __init__(self, name: str, instructions: List[Tuple[str, Any]],
+                 routines: Optional[List[Tuple[Any, 'CodeObject']]] = None):
+        self.name = name
+        self.instructions = instructions
+        # 子程序表 [(ProcedureDef/FunctionDef, CodeObject), ...]，仅顶层代码对象持有
+        self.routines = routines if routines is not None else []
+
+    def __repr__(self):
+        return f"CodeObject({self.name}, {len(self.instructions)} instructions)"
+
+
+class Label:
+    """跳转标签 - 编译完成后回填为指令地址"""
+
+    def __init__(self):
+        self.address = None
+
+
+class BytecodeCompiler:
+    """字节码编译器 - AST到线性指令流"""
+
+    def __init__(self):
+        self.routines: List[Tuple[Any, CodeObject]] = []
+        self.instructions: List[List[Any]] = []
+
+    def compile_program(self, program: Program) -> CodeObject:
+        """编译整个程序"""
+        return self.compile_statements('<program>', program.statements, HALT)
+
+    def compile_statements(self, name: str, statements: List[ASTNode], terminator: str) -> CodeObject:
+        """编译一段独立的语句序列为代码对象"""
+        saved = self.instructions
+        self.instructions = []
+        try:
+            for stmt in statements:
+                self.compile_statement(stmt)
+            self.emit(terminator)
+            instructions = self.resolve_labels(self.instructions)
+            if terminator == END_ROUTINE:
+                self.mark_tail_calls(instructions)
+        finally:
+            self.instructions = saved
+        return CodeObject(name, instructions, self.routines)
+
+    def emit(self, opcode: str, arg: Any = None):
+        """追加一条指令"""
+        self.instructions.append([opcode, arg])
+
+    def mark(self, label: Label):
+        """将标签绑定到下一条指令的地址"""
+        label.address = len(self.instructions)
+
+    def resolve_labels(self, instructions: List[List[Any]]) -> List[Tuple[str, Any]]:
+        """回填跳转目标（参数本身，LOAD_CACHED、COMPARE_JUMP_*参数元组中的标签，或CASE_TABLE的各分支标签）"""
+        resolved = []
+        for opcode, arg in instructions:
+            if isinstance(arg, Label):
+                arg = arg.address
+            elif opcode in (LOAD_CACHED, COMPARE_JUMP_IF_FALSE, COMPARE_JUMP_IF_TRUE):
+                arg = (arg[0], arg[1].address)
+            elif opcode == CASE_TABLE:
+                arg = (arg[0], tuple(label.address for label in arg[1]))
+            resolved.append((opcode, arg))
+        return resolved
+
+    def mark_tail_calls(self, instructions: List[Tuple[str, Any]]):
+        """把子程序体中处于尾部位置的调用改为尾调用指令：函数调用之后紧接RETURN_VALUE，
+        或过程调用之后（经过若干JUMP）到达END_ROUTINE"""
+        for address, (opcode, arg) in enumerate(instructions):
+            if opcode == CALL_FUNCTION:
+                if instructions[address + 1][0] == RETURN_VALUE:
+                    instructions[address] = (TAIL_CALL_FUNCTION, arg)
+            elif opcode == CALL_PROCEDURE:
+                target = address + 1
+                while instructions[target][0] == JUMP:
+                    target = instructions[target][1]
+                if instructions[target][0] == END_ROUTINE:
+                    instructions[address] = (TAIL_CALL_PROCEDURE, arg)
+
+    # ==================== 语句 ====================
+
+    def compile_block(self, statements: List[ASTNode]):
+        """编译语句块"""
+        for stmt in statements:
+            self.compile_statement(stmt)
+
+    def compile_statement(self, stmt: ASTNode):
+        """编译语句"""
+        if isinstance(stmt, DeclareStmt):
+            self.compile_declare(stmt)
+        elif isinstance(stmt, ConstantStmt):
+            self.compile_expression(stmt.value)
+            self.emit(DEFINE_CONSTANT, stmt.identifier)
+        elif isinstance(stmt, TypeDefStmt):
+            self.emit(DEFINE_TYPE, stmt)
+        elif isinstance(stmt, AssignStmt):
+            self.compile_expression(stmt.value)
+            self.compile_store(stmt.target, checked=not stmt.type_safe)
+        elif isinstance(stmt, InputStmt):
+            self.emit(INPUT)
+            self.compile_store(stmt.target)
+        elif isinstance(stmt, OutputStmt):
+            for item in stmt.items:
+                self.compile_expression(item)
+            self.emit(OUTPUT, len(stmt.items))
+        elif isinstance(stmt, IfStmt):
+            self.compile_if(stmt)
+        elif isinstance(stmt, CaseStmt):
+            self.compile_case(stmt)
+        elif isinstance(stmt, ForStmt):
+            self.compile_for(stmt)
+        elif isinstance(stmt, WhileStmt):
+            self.compile_while(stmt)
+        elif isinstance(stmt, RepeatStmt):
+            self.compile_repeat(stmt)
+        elif isinstance(stmt, ProcedureDef):
+            self.emit(DEFINE_PROCEDURE, self.compile_routine(stmt))
+        elif isinstance(stmt, FunctionDef):
+            self.emit(DEFINE_FUNCTION, self.compile_routine(stmt))
+        elif isinstance(stmt, ProcedureCall):
+            if stmt.definition is not None:
+                self.emit(LOAD_LINKED_PROCEDURE, stmt.definition)
+            else:
+                self.emit(LOAD_PROCEDURE, stmt.name)
+            # 链接到的过程按引用绑定的参数：实参编译为引用（数组索引只求值一次）
+            ref_params = stmt.definition.scope.ref_params if stmt.definition is not None else ()
+            for position, arg in enumerate(stmt.arguments):
+                if position in ref_params and isinstance(arg, IdentifierAccess):
+                    self.compile_reference(arg)
+                else:
+                    self.compile_expression(arg)
+            self.emit(CALL_PROCEDURE, stmt.arguments)
+        elif isinstance(stmt, ReturnStmt):
+            self.compile_expression(stmt.value)
+            self.emit(RETURN_VALUE)
+        elif isinstance(stmt, FileOpenStmt):
+            self.emit(FILE_OPEN, (stmt.file_id, stmt.mode))
+        elif isinstance(stmt, FileReadStmt):
+            self.emit(FILE_READ, stmt.file_id)
+            self.compile_store(stmt.target)
+        elif isinstance(stmt, FileWriteStmt):
+            self.compile_expression(stmt.value)
+            self.emit(FILE_WRITE, stmt.file_id)
+        elif isinstance(stmt, FileCloseStmt):
+            self.emit(FILE_CLOSE, stmt.file_id)
+
+    def compile_declare(self, stmt: DeclareStmt):
+        """编译DECLARE"""
+        type_spec = stmt.type_spec
+        if isinstance(type_spec, SimpleType):
+            self.emit(DECLARE, (stmt.identifier, type_spec.type_name))
+        elif isinstance(type_spec, ArrayType):
+            if isinstance(type_spec.element_type, SimpleType):
+                element_type = type_spec.element_type.type_name
+            else:
+                element_type = None
+            if type_spec.bounds is not None:
+                self.emit(DECLARE_ARRAY_CONST, (stmt.identifier, type_spec.bounds, element_type))
+                return
+            for lower, upper in type_spec.dimensions:
+                self.compile_expression(lower)
+                self.compile_expression(upper)
+            self.emit(DECLARE_ARRAY, (stmt.identifier, len(type_spec.dimensions), element_type))
+        elif isinstance(type_spec, CustomType):
+            self.emit(DECLARE_RECORD, (stmt.identifier, type_spec.type_name))
+        else:
+            self.emit(DECLARE, (stmt.identifier, None))
+
+    def compile_store(self, target: IdentifierAccess, checked: bool = True):
+        """编译写入（新值已在栈顶）；checked为False时简单变量的写入省略类型检查"""
+        if target.index1 is not None:
+            self.compile_load(target)
+            self.compile_expression(target.index1)
+            dims = 1
+            if target.index2 is not None:
+                self.compile_expression(target.index2)
+                dims = 2
+            for index in target.more_indices:
+                self.compile_expression(index)
+                dims += 1
+            self.emit(STORE_INDEX, (target.name, dims))
+        elif target.field is not None:
+            self.compile_load(target)
+            self.emit(STORE_FIELD, (target.name, target.field))
+        elif target.by_ref:
+            self.emit(STORE_REF, (target.name, target.depth, target.slot))
+        elif target.slot is not None:
+            self.emit(STORE_SLOT if checked else STORE_SLOT_UNCHECKED, (target.name, target.depth, target.slot))
+        else:
+            self.emit(STORE_VAR if checked else STORE_VAR_UNCHECKED, target.name)
+
+    def compile_reference(self, target: IdentifierAccess):
+        """编译BYREF实参：压入指向变量、数组元素或记录字段的引用"""
+        if target.index1 is not None:
+            self.compile_load(target)
+            self.compile_expression(target.index1)
+            dims = 1
+            if target.index2 is not None:
+                self.compile_expression(target.index2)
+                dims = 2
+            for index in target.more_indices:
+                self.compile_expression(index)
+                dims += 1
+            self.emit(REF_INDEX, dims)
+        elif target.field is not None:
+            self.compile_load(target)
+            self.emit(REF_FIELD, target.field)
+        elif target.by_ref:
+            self.emit(REF_PARAM, (target.name, target.depth, target.slot))
+        elif target.slot is not None:
+            self.emit(REF_SLOT, (target.name, target.depth, target.slot))
+        else:
+            self.emit(REF_VAR, target.name)
+
+    def compile_load(self, node, name: str = None):
+        """编译变量读取（已解析的局部变量按槽位读取）"""
+        if name is None:
+            name = node.name
+        if node.by_ref:
+            self.emit(LOAD_REF, (name, node.depth, node.slot))
+        elif node.slot is not None:
+            self.emit(LOAD_SLOT, (name, node.depth, node.slot))
+        else:
+            self.emit(LOAD_VAR, name)
+
+    def compile_if(self, stmt: IfStmt):
+        """编译IF"""
+        else_label = Label()
+        end_label = Label()
+
+        self.compile_jump_if_false(stmt.condition, else_label)
+        self.compile_block(stmt.then_block)
+        if stmt.else_block:
+            self.emit(JUMP, end_label)
+            self.mark(else_label)
+            self.compile_block(stmt.else_block)
+        else:
+            self.mark(else_label)
+        self.mark(end_label)
+
+    def compile_case(self, stmt: CaseStmt):
+        """编译CASE - CASE值保留在栈上，常量分支查跳转表，其余分支依次比较"""
+        end_label = Label()
+
+        self.compile_load(stmt, stmt.identifier)
+        table = stmt.table
+        table_labels = []
+        branches = stmt.branches
+        if table is not None:
+            table_labels = [Label() for _ in range(table.size)]
+            self.emit(CASE_TABLE, (table, table_labels))
+            branches = branches[table.size:]
+
+        for branch in branches:
+            next_label = Label()
+            self.emit(DUP)
+            if isinstance(branch.condition, RangeCondition):
+                self.compile_expression(branch.condition.start)
+                self.compile_expression(branch.condition.end)
+                self.emit(CASE_RANGE)
+            else:
+                self.compile_expression(branch.condition)
+                self.emit(CASE_EQ)
+            self.emit(POP_JUMP_IF_NOT, next_label)
+            self.emit(POP)
+            self.compile_statement(branch.statement)
+            self.emit(JUMP, end_label)
+            self.mark(next_label)
+
+        self.emit(POP)
+        if stmt.otherwise:
+            self.compile_statement(stmt.otherwise)
+
+        # 跳转表命中的分支（CASE值已弹出）
+        for label, branch in zip(table_labels, stmt.branches):
+            self.emit(JUMP, end_label)
+            self.mark(label)
+            self.compile_statement(branch.statement)
+        self.mark(end_label)
+
+    def compile_for(self, stmt: ForStmt):
+        """编译FOR循环"""
+        test_label = Label()
+        exit_label = Label()
+
+        self.compile_cache_reset(stmt)
+        self.compile_expression(stmt.start)
+        self.compile_expression(stmt.end)
+        if stmt.step:
+            self.compile_expression(stmt.step)
+        else:
+            self.emit(LOAD_CONST, pt.IntegerType(1))
+        self.emit(FOR_INIT, (stmt.variable, stmt.slot, bool(stmt.type_safe)))
+        self.mark(test_label)
+        self.emit(FOR_TEST, exit_label)
+        self.compile_block(stmt.body)
+        self.emit(FOR_STEP, test_label)
+        self.mark(exit_label)
+
+    def compile_while(self, stmt: WhileStmt):
+        """编译WHILE循环"""
+        test_label = Label()
+        exit_label = Label()
+
+        self.compile_cache_reset(stmt)
+        self.mark(test_label)
+        if is_boolean_expression(stmt.condition):
+            # 比较和逻辑运算的结果必定为BOOLEAN，直接按真值跳转
+            self.compile_jump_if_false(stmt.condition, exit_label)
+        else:
+            self.compile_expression(stmt.condition)
+            self.emit(POP_JUMP_IF_FALSE_VALUE if stmt.type_safe else WHILE_TEST, exit_label)
+        self.compile_block(stmt.body)
+        self.emit(JUMP, test_label)
+        self.mark(exit_label)
+
+    def compile_repeat(self, stmt: RepeatStmt):
+        """编译REPEAT循环"""
+        start_label = Label()
+
+        self.compile_cache_reset(stmt)
+        self.mark(start_label)
+        self.compile_block(stmt.body)
+        if is_boolean_expression(stmt.condition):
+            self.compile_jump_if_false(stmt.condition, start_label)
+        else:
+            self.compile_expression(stmt.condition)
+            self.emit(POP_JUMP_IF_FALSE_VALUE if stmt.type_safe else UNTIL_TEST, start_label)
+
+    def compile_jump_if_false(self, condition, target: Label):
+        """编译条件跳转：条件为假时跳转到target
+        AND/OR/NOT展开为对操作数的跳转（短路求值），比较与跳转合并为一条指令"""
+        if isinstance(condition, BinaryOp):
+            if condition.operator == 'AND':
+                self.compile_jump_if_false(condition.left, target)
+                self.compile_jump_if_false(condition.right, target)
+                return
+            if condition.operator == 'OR':
+                true_label = Label()
+                self.compile_jump_if_true(condition.left, true_label)
+                self.compile_jump_if_false(condition.right, target)
+                self.mark(true_label)
+                return
+            if condition.operator in COMPARISON_OPERATORS:
+                self.compile_expression(condition.left)
+                self.compile_expression(condition.right)
+                self.emit(COMPARE_JUMP_IF_FALSE, (condition.operator, target))
+                return
+        elif isinstance(condition, UnaryOp) and condition.operator == 'NOT':
+            self.compile_jump_if_true(condition.operand, target)
+            return
+        self.compile_expression(condition)
+        self.emit(POP_JUMP_IF_FALSE, target)
+
+    def compile_jump_if_true(self, condition, target: Label):
+        """编译条件跳转：条件为真时跳转到target"""
+        if isinstance(condition, BinaryOp):
+            if condition.operator == 'OR':
+                self.compile_jump_if_true(condition.left, target)
+                self.compile_jump_if_true(condition.right, target)
+                return
+            if condition.operator == 'AND':
+                false_label = Label()
+                self.compile_jump_if_false(condition.left, false_label)
+                self.compile_jump_if_true(condition.right, target)
+                self.mark(false_label)
+                return
+            if condition.operator in COMPARISON_OPERATORS:
+                self.compile_expression(condition.left)
+                self.compile_expression(condition.right)
+                self.emit(COMPARE_JUMP_IF_TRUE, (condition.operator, target))
+                return
+        elif isinstance(condition, UnaryOp) and condition.operator == 'NOT':
+            self.compile_jump_if_false(condition.operand, target)
+            return
+        self.compile_expression(condition)
+        self.emit(POP_JUMP_IF_TRUE, target)
+
+    def compile_cache_reset(self, stmt):
+        """进入循环时清空循环不变量的缓存"""
+        if stmt.invariants:
+            self.emit(CLEAR_CACHE, stmt.invariants)
+
+    def compile_routine(self, definition) -> int:
+        """编译过程/函数体，返回子程序编号"""
+        index = len(self.routines)
+        # 先占位，允许子程序体内再定义子程序
+        self.routines.append(None)
+        code = self.compile_statements(definition.name, definition.body, END_ROUTINE)
+        code.routines = []
+        self.routines[index] = (definition, code)
+        return index
+
+    # ==================== 表达式 ====================
+
+    def compile_expression(self, expr):
+        """编译表达式（结果压栈）"""
+        if isinstance(expr, Literal):
+            self.emit(LOAD_CONST, self.literal_value(expr))
+        elif isinstance(expr, Identifier):
+            self.compile_load(expr)
+        elif isinstance(expr, IdentifierAccess):
+            self.compile_load(expr)
+            if expr.index1 is not None:
+                self.compile_expression(expr.index1)
+                dims = 1
+                if expr.index2 is not None:
+                    self.compile_expression(expr.index2)
+                    dims = 2
+                for index in expr.more_indices:
+                    self.compile_expression(index)
+                    dims += 1
+                self.emit(LOAD_INDEX, dims)
+            elif expr.field is not None:
+                self.emit(LOAD_FIELD, expr.field)
+        elif isinstance(expr, BinaryOp):
+            if expr.operator in ('AND', 'OR'):
+                self.compile_logical(expr)
+                return
+            self.compile_expression(expr.left)
+            self.compile_expression(expr.right)
+            self.emit(BINARY_OP, expr.operator)
+        elif isinstance(expr, UnaryOp):
+            self.compile_expression(expr.operand)
+            self.emit(UNARY_OP, expr.operator)
+        elif isinstance(expr, FunctionCall):
+            self.compile_function_call(expr)
+        elif isinstance(expr, CachedExpr):
+            self.compile_cached(expr)
+        else:
+            raise RuntimeError(f"Unknown expression type: {type(expr)}")
+
+    def compile_logical(self, expr: BinaryOp):
+        """编译作为值的AND/OR：左操作数已决定结果时跳过右操作数"""
+        end_label = Label()
+        self.compile_expression(expr.left)
+        self.emit(JUMP_IF_FALSE_OR_POP if expr.operator == 'AND' else JUMP_IF_TRUE_OR_POP, end_label)
+        self.compile_expression(expr.right)
+        if not is_boolean_expression(expr.right):
+            self.emit(TO_BOOLEAN)
+        self.mark(end_label)
+
+    def compile_cached(self, expr: CachedExpr):
+        """编译缓存表达式：槽位非空时跳过表达式的求值"""
+        if expr.refresh:
+            self.compile_expression(expr.expr)
+            self.emit(STORE_CACHED, expr.slot)
+            return
+        end_label = Label()
+        self.emit(LOAD_CACHED, (expr.slot, end_label))
+        self.compile_expression(expr.expr)
+        self.emit(STORE_CACHED, expr.slot)
+        self.mark(end_label)
+
+    def literal_value(self, literal: Literal):
+        """字面量在编译期构造（伪代码值不可变，可安全共享）"""
+        if literal.type_hint == 'INTEGER':
+            return pt.IntegerType(literal.value)
+        elif literal.type_hint == 'REAL':
+            return pt.RealType(literal.value)
+        elif literal.type_hint == 'STRING':
+            return pt.StringType(literal.value)
+        elif literal.type_hint == 'CHAR':
+            return pt.CharType(literal.value)
+        elif literal.type_hint == 'BOOLEAN':
+            return pt.BooleanType(literal.value)
+        return literal.value
+
+    def compile_function_call(self, call: FunctionCall):
+        """编译函数调用"""
+        from builtin_functions import is_builtin_function
+
+        if call.builtin is not None:
+            for arg in call.arguments:
+                self.compile_expression(arg)
+            self.emit(CALL_LINKED_BUILTIN, (call.builtin, call.name, len(call.arguments)))
+        elif is_builtin_function(call.name):
+            for arg in call.arguments:
+                self.compile_expression(arg)
+            self.emit(CALL_BUILTIN, (call.name, len(call.arguments)))
+        else:
+            if call.definition is not None:
+                self.emit(LOAD_LINKED_FUNCTION, call.definition)
+            else:
+                self.emit(LOAD_FUNCTION, call.name)
+            for arg in call.arguments:
+                self.compile_expression(arg)
+            self.emit(CALL_FUNCTION, len(call.arguments))
+
+
+# ==================== 序列化 ====================
+
+def dumps(code: CodeObject) -> bytes:
+    """序列化代码对象"""
+    import pickle  # 只有缓存字节码时才需要，运行源文件时不导入
+    header = BYTECODE_MAGIC + BYTECODE_VERSION.to_bytes(2, 'little')
+    return header + pickle.dumps(code, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data: bytes) -> CodeObject:
+    """反序列化代码对象，格式或版本不符时抛出ValueError"""
+    if data[:4] != BYTECODE_MAGIC:
+        raise ValueError("Not a pseudocode bytecode stream")
+    version = int.from_bytes(data[4:6], 'little')
+    if version != BYTECODE_VERSION:
+        raise ValueError(f"Bytecode version {version} is not supported (expected {BYTECODE_VERSION})")
+    import pickle
+    code = pickle.loads(data[6:])
+    if not isinstance(code, CodeObject):
+        raise ValueError("Bytecode stream does not contain a code object")
+    return code
+
+
+def disassemble(code: CodeObject) -> str:
+    """反汇编为可读文本（调试用）"""
+    lines = []
+
+    def dump(obj: CodeObject):
+        lines.append(f"== {obj.name} ==")
+        for address, (opcode, arg) in enumerate(obj.instructions):
+            if arg is None:
+                lines.append(f"{address:5d}  {opcode}")
+            elif opcode == CALL_LINKED_BUILTIN:
+                lines.append(f"{address:5d}  {opcode:<18} {arg[1:]!r}")
+            elif isinstance(arg, (ASTNode, list)):
+                lines.append(f"{address:5d}  {opcode:<18} <{type(arg).__name__}>")
+            else:
+                lines.append(f"{address:5d}  {opcode:<18} {arg!r}")
+
+    dump(code)
+    for definition, routine in code.routines:
+        dump(routine)
+    return '\n'.join(lines)
@@ -0,0 +1,1241 @@
+"""
+闭包编译执行引擎
+将AST一次性编译为嵌套的Python闭包（每个节点一个），运行时直接调用闭包，
+避免解释器在每次执行时的isinstance分派链
+"""
+import operator as _operator
+from typing import Any, Callable, Dict, List
+from ast_nodes import *
+from interpreter import Interpreter, ReturnValue, UNCACHED, COMPARISON_FUNCTIONS
+from environment import UNBOUND, NameReference, SlotReference, ElementReference, FieldReference
+import pseudocode_types as pt
+from builtin_functions import BUILTIN_FUNCTIONS, call_builtin_function, builtin_call_error
+
+
+class ClosureCompiler:
+    """闭包编译器 - 将AST节点编译为可调用的闭包"""
+
+    def __init__(self, interpreter: 'ClosureInterpreter'):
+        self.interp = interpreter
+        # 过程/函数体的编译结果 {id(定义节点): (定义节点, 闭包元组)}
+        self.bodies: Dict[int, tuple] = {}
+
+    # ==================== 程序和语句块 ====================
+
+    def compile_program(self, program: Program) -> Callable[[], None]:
+        """编译整个程序"""
+        return self.compile_block(program.statements)
+
+    def compile_block(self, statements: List[ASTNode]) -> Callable[[], None]:
+        """编译语句块"""
+        steps = tuple(self.compile_statement(s) for s in statements)
+
+        if len(steps) == 0:
+            def run_block():
+                pass
+        elif len(steps) == 1:
+            run_block = steps[0]
+        elif len(steps) == 2:
+            first, second = steps
+
+            def run_block():
+                first()
+                second()
+        else:
+            def run_block():
+                for step in steps:
+                    step()
+
+        return run_block
+
+    def compile_body(self, definition) -> Callable[[], None]:
+        """编译过程/函数体（按定义节点缓存）"""
+        entry = self.bodies.get(id(definition))
+        if entry is None or entry[0] is not definition:
+            entry = (definition, self.compile_block(definition.body))
+            self.bodies[id(definition)] = entry
+        return entry[1]
+
+    # ==================== 语句 ====================
+
+    def compile_statement(self, stmt: ASTNode) -> Callable[[], None]:
+        """编译语句"""
+        method = self.STATEMENT_COMPILERS.get(type(stmt))
+        if method is None:
+            # 与解释器一致：未知语句什么都不做
+            def run_nothing():
+                pass
+            return run_nothing
+        run = method(self, stmt)
+        if isinstance(stmt, (ForStmt, WhileStmt, RepeatStmt)) and stmt.invariants:
+            return self.compile_cache_reset(stmt.invariants, run)
+        return run
+
+    def compile_cache_reset(self, slots: tuple, run_loop: Callable[[], None]) -> Callable[[], None]:
+        """进入循环时先清空循环不变量的缓存"""
+        cache = self.interp.cache
+
+        def run_with_reset():
+            for slot in slots:
+                cache.pop(slot, None)
+            run_loop()
+
+        return run_with_reset
+
+    def compile_declare(self, stmt: DeclareStmt):
+        """编译DECLARE"""
+        interp = self.interp
+        name = stmt.identifier
+        make_instance = self.compile_type_instance(stmt.type_spec)
+
+        if stmt.slot is not None:
+            slot = stmt.slot
+
+            def run_declare_local():
+                interp.current_env.slots[slot] = make_instance()
+
+            return run_declare_local
+
+        def run_declare():
+            value = make_instance()
+            interp.current_env.define_variable(name, value)
+
+        return run_declare
+
+    def compile_type_instance(self, type_spec) -> Callable[[], Any]:
+        """编译类型实例的构造过程"""
+        interp = self.interp
+
+        if isinstance(type_spec, SimpleType):
+            type_name = type_spec.type_name
+            if type_name == 'INTEGER':
+                return lambda: pt.IntegerType(0)
+            elif type_name == 'REAL':
+                return lambda: pt.RealType(0.0)
+            elif type_name == 'STRING':
+                return lambda: pt.StringType("")
+            elif type_name == 'CHAR':
+                return lambda: pt.CharType(' ')
+            elif type_name == 'BOOLEAN':
+                return lambda: pt.BooleanType(False)
+            elif type_name == 'DATE':
+                return lambda: pt.DateType()
+            return lambda: None
+
+        elif isinstance(type_spec, ArrayType):
+            if isinstance(type_spec.element_type, SimpleType):
+                element_type = type_spec.element_type.type_name
+            else:
+                element_type = None
+
+            if type_spec.bounds is not None:
+                # 优化器已预先求值边界
+                constant_bounds = type_spec.bounds
+                return lambda: pt.create_array(list(constant_bounds), element_type)
+
+            bounds = [(self.compile_value(lower), self.compile_value(upper))
+                      for lower, upper in type_spec.dimensions]
+
+            def make_array():
+                dimensions = []
+                for lower_fn, upper_fn in bounds:
+                    lower = lower_fn()
+                    upper = upper_fn()
+                    # 转换为整数
+                    if isinstance(lower, pt.IntegerType):
+                        lower = lower.value
+                    if isinstance(upper, pt.IntegerType):
+                        upper = upper.value
+                    dimensions.append((int(lower), int(upper)))
+                return pt.create_array(dimensions, element_type)
+
+            return make_array
+
+        elif isinstance(type_spec, CustomType):
+            type_name = type_spec.type_name
+
+            def make_record():
+                type_def = interp.current_env.get_type(type_name)
+                return interp.create_record_instance(type_def)
+
+            return make_record
+
+        return lambda: None
+
+    def compile_constant(self, stmt: ConstantStmt):
+        """编译CONSTANT"""
+        interp = self.interp
+        name = stmt.identifier
+        value_fn = self.compile_value(stmt.value)
+
+        def run_constant():
+            interp.current_env.define_constant(name, value_fn())
+
+        return run_constant
+
+    def compile_type_def(self, stmt: TypeDefStmt):
+        """编译TYPE定义"""
+        interp = self.interp
+
+        def run_type_def():
+            interp.current_env.define_type(stmt.name, stmt)
+
+        return run_type_def
+
+    def compile_assign(self, stmt: AssignStmt):
+        """编译赋值"""
+        value_fn = self.compile_value(stmt.value)
+        target = stmt.target
+        if stmt.type_safe and target.index1 is None and target.field is None:
+            # 类型检查器已证明类型一致：写入时不再检查
+            store = self.compile_unchecked_store(target)
+        else:
+            store = self.compile_store(target)
+
+        def run_assign():
+            store(value_fn())
+
+        return run_assign
+
+    def compile_store(self, target: IdentifierAccess) -> Callable[[Any], None]:
+        """编译对标识符的写入，返回接收新值的闭包"""
+        interp = self.interp
+        check = self.compile_type_check()
+        name = target.name
+        load_container = self.compile_variable_load(target)
+        IntegerType = pt.IntegerType
+        ArrayType = pt.ArrayType
+
+        if target.index1 is not None:
+            index1_fn = self.compile_value(target.index1)
+
+            if target.more_indices:
+                rest_fn = self.compile_more_indices(target.more_indices)
+                index2_fn = self.compile_value(target.index2)
+
+                def store_nd(value):
+                    array = load_container()
+                    index1 = index1_fn()
+                    if not isinstance(index1, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+                    index2 = index2_fn()
+                    if not isinstance(index2, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
+                    indices = (index1.value, index2.value, *rest_fn())
+                    existing_value = array.get(*indices)
+                    if existing_value is not None:
+                        check(existing_value, value, name, *indices)
+                    array.set(*indices, value)
+
+                return store_nd
+
+            if target.index2 is not None:
+                index2_fn = self.compile_value(target.index2)
+
+                def store_2d(value):
+                    array = load_container()
+                    index1 = index1_fn()
+                    if not isinstance(index1, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+                    index1 = index1.value
+                    index2 = index2_fn()
+                    if not isinstance(index2, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
+                    index2 = index2.value
+                    if isinstance(array, ArrayType) and array.set2(index1, index2, value):
+                        return
+                    existing_value = array.get(index1, index2)
+                    if existing_value is not None:
+                        check(existing_value, value, name, index1, index2)
+                    array.set(index1, index2, value)
+
+                return store_2d
+
+            def store_1d(value):
+                array = load_container()
+                index1 = index1_fn()
+                if not isinstance(index1, IntegerType):
+                    raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+                index1 = index1.value
+                if isinstance(array, ArrayType) and array.set1(index1, value):
+                    # 快速路径：无需类型检查即可存入
+                    return
+                existing_value = array.get(index1)
+                if existing_value is not None:
+                    check(existing_value, value, name, index1)
+                array.set(index1, value)
+
+            return store_1d
+
+        elif target.field is not None:
+            field = target.field
+
+            def store_field(value):
+                record = load_container()
+                existing_value = record.get_field(field)
+                if existing_value is not None:
+                    check(existing_value, value, f"{name}.{field}")
+                record.set_field(field, value)
+
+            return store_field
+
+        if target.by_ref:
+            return self.compile_reference_store(target)
+        if target.slot is not None:
+            return self.compile_local_store(target)
+
+        key = name.upper()
+
+        def store_variable(value):
+            # 沿作用域链查找已有变量（与Environment.get_variable的查找顺序一致）
+            env = interp.current_env
+            while env is not None:
+                if key in env.constants:
+                    check(env.constants[key], value, name)
+                    break
+                variables = env.variables
+                if key in variables:
+                    check(variables[key], value, name)
+                    variables[key] = value
+                    return
+                env = env.parent
+            # 常量或未定义变量走通用路径（报错或隐式声明）
+            interp.current_env.set_variable(name, value)
+
+        return store_variable
+
+    def compile_local_store(self, target: IdentifierAccess):
+        """编译对槽位变量的写入"""
+        interp = self.interp
+        check = self.compile_type_check()
+        name = target.name
+        depth = target.depth
+        slot = target.slot
+
+        def store_local(value):
+            frame = interp.current_env if depth == 0 else interp.frame_at(depth)
+            slots = frame.slots
+            existing_value = slots[slot]
+            if existing_value is UNBOUND:
+                # 尚未在本帧定义：按名称走通用路径（外层变量、常量或隐式声明）
+                try:
+                    check(frame.get_slot(slot, name), value, name)
+                except RuntimeError:
+                    pass
+                frame.set_slot(slot, name, value)
+                return
+            check(existing_value, value, name)
+            slots[slot] = value
+
+        return store_local
+
+    def compile_reference_store(self, target: IdentifierAccess):
+        """编译对BYREF参数的写入：经由槽位中的引用写入实参（总是检查类型）"""
+        interp = self.interp
+        check = self.compile_type_check()
+        name = target.name
+        depth = target.depth
+        slot = target.slot
+
+        def store_reference(value):
+            frame = interp.current_env if depth == 0 else interp.frame_at(depth)
+            reference = frame.slots[slot]
+            existing_value = reference.get()
+            if existing_value is not None:
+                check(existing_value, value, name)
+            reference.set(value)
+
+        return store_reference
+
+    def compile_unchecked_store(self, target: IdentifierAccess) -> Callable[[Any], None]:
+        """编译对简单变量的写入（省略类型检查）"""
+        interp = self.interp
+        name = target.name
+
+        if target.by_ref:
+            return self.compile_reference_store(target)
+        if target.slot is not None:
+            depth = target.depth
+            slot = target.slot
+
+            def store_local(value):
+                frame = interp.current_env if depth == 0 else interp.frame_at(depth)
+                slots = frame.slots
+                if slots[slot] is UNBOUND:
+                    frame.set_slot(slot, name, value)
+                else:
+                    slots[slot] = value
+
+            return store_local
+
+        key = name.upper()
+
+        def store_variable(value):
+            env = interp.current_env
+            while env is not None:
+                if key in env.constants:
+                    break
+                variables = env.variables
+                if key in variables:
+                    variables[key] = value
+                    return
+                env = env.parent
+            interp.current_env.set_variable(name, value)
+
+        return store_variable
+
+    def compile_more_indices(self, expressions) -> Callable[[], list]:
+        """编译三维及以上数组第三个及以后的索引，返回产生Python整数列表的闭包"""
+        index_fns = [self.compile_value(expr) for expr in expressions]
+        IntegerType = pt.IntegerType
+
+        def indices():
+            result = []
+            for index_fn in index_fns:
+                index = index_fn()
+                if not isinstance(index, IntegerType):
+                    raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index).__name__}")
+                result.append(index.value)
+            return result
+
+        return indices
+
+    def compile_type_check(self) -> Callable[..., None]:
+        """返回赋值类型检查闭包（同类型的非字符串值直接通过，出错时才拼接变量名）"""
+        check_type_compatibility = self.interp.check_type_compatibility
+
+        def check(declared_value, new_value, var_name, *indices):
+            value_type = type(new_value)
+            # Python原生str按长度区分STRING/CHAR，必须走完整检查
+            if type(declared_value) is value_type and value_type is not str:
+                return
+            if indices:
+                var_name = f"{var_name}[{', '.join(str(i) for i in indices)}]"
+            check_type_compatibility(declared_value, new_value, var_name)
+
+        return check
+
+    def compile_input(self, stmt: InputStmt):
+        """编译INPUT"""
+        interp = self.interp
+        store = self.compile_store(stmt.target)
+
+        def run_input():
+            try:
+                user_input = input()
+                value = interp.parse_input_value(user_input)
+                store(value)
+            except EOFError:
+                raise RuntimeError("Unexpected end of input")
+
+        return run_input
+
+    def compile_output(self, stmt: OutputStmt):
+        """编译OUTPUT"""
+        to_output_string = self.interp.to_output_string
+        item_fns = tuple(self.compile_value(item) for item in stmt.items)
+
+        if len(item_fns) == 1:
+            item_fn = item_fns[0]
+
+            def run_output_single():
+                print(to_output_string(item_fn()))
+
+            return run_output_single
+
+        def run_output():
+            print(' '.join([to_output_string(fn()) for fn in item_fns]))
+
+        return run_output
+
+    def compile_if(self, stmt: IfStmt):
+        """编译IF"""
+        condition = self.compile_condition(stmt.condition)
+        then_block = self.compile_block(stmt.then_block)
+
+        if stmt.else_block:
+            else_block = self.compile_block(stmt.else_block)
+
+            def run_if_else():
+                if condition():
+                    then_block()
+                else:
+                    else_block()
+
+            return run_if_else
+
+        def run_if():
+            if condition():
+                then_block()
+
+        return run_if
+
+    def compile_case(self, stmt: CaseStmt):
+        """编译CASE"""
+        interp = self.interp
+        compare = interp.compare_values
+        load_subject = self.compile_variable_load(stmt, stmt.identifier)
+
+        branches = []
+        for branch in stmt.branches:
+            statement = self.compile_statement(branch.statement)
+            if isinstance(branch.condition, RangeCondition):
+                start_fn = self.compile_value(branch.condition.start)
+                end_fn = self.compile_value(branch.condition.end)
+                branches.append((True, start_fn, end_fn, statement))
+            else:
+                value_fn = self.compile_value(branch.condition)
+                branches.append((False, value_fn, None, statement))
+        otherwise = self.compile_statement(stmt.otherwise) if stmt.otherwise else None
+
+        table = stmt.table
+        if table is not None:
+            # 常量分支查跳转表，其余分支依次比较
+            lookup = table.lookup
+            size = table.size
+            statements = tuple(statement for _, _, _, statement in branches[:size])
+            rest = tuple(branches[size:])
+
+            def run_case_table():
+                value = load_subject()
+                index = lookup(value, compare)
+                if index < size:
+                    statements[index]()
+                    return
+                for is_range, first_fn, end_fn, statement in rest:
+                    if is_range:
+                        start = first_fn()
+                        end = end_fn()
+                        matched = compare(value, start, '>=') and compare(value, end, '<=')
+                    else:
+                        matched = compare(value, first_fn(), '=')
+                    if matched:
+                        statement()
+                        return
+                if otherwise is not None:
+                    otherwise()
+
+            return run_case_table
+
+        branches = tuple(branches)
+
+        def run_case():
+            value = load_subject()
+            for is_range, first_fn, end_fn, statement in branches:
+                if is_range:
+                    start = first_fn()
+                    end = end_fn()
+                    matched = compare(value, start, '>=') and compare(value, end, '<=')
+                else:
+                    matched = compare(value, first_fn(), '=')
+                if matched:
+                    statement()
+                    return
+            if otherwise is not None:
+                otherwise()
+
+        return run_case
+
+    def compile_for(self, stmt: ForStmt):
+        """编译FOR循环"""
+        interp = self.interp
+        variable = stmt.variable
+        slot = stmt.slot
+        key = variable.upper() if slot is None else slot
+        start_fn = self.compile_value(stmt.start)
+        end_fn = self.compile_value(stmt.end)
+        step_fn = self.compile_value(stmt.step) if stmt.step else None
+        body = self.compile_block(stmt.body)
+        IntegerType = pt.IntegerType
+        type_safe = stmt.type_safe
+
+        def run_for():
+            start = start_fn()
+            end = end_fn()
+            step = step_fn() if step_fn is not None else IntegerType(1)
+
+            # 类型检查：FOR循环只接受INTEGER类型（类型检查器已证明时省略）
+            if not type_safe:
+                if not isinstance(start, IntegerType):
+                    raise TypeError(f"FOR循环的起始值必须是INTEGER类型，而不是{type(start).__name__}")
+                if not isinstance(end, IntegerType):
+                    raise TypeError(f"FOR循环的结束值必须是INTEGER类型，而不是{type(end).__name__}")
+                if not isinstance(step, IntegerType):
+                    raise TypeError(f"FOR循环的步长必须是INTEGER类型，而不是{type(step).__name__}")
+
+            counter = start.value
+            end = end.value
+            step = step.value
+
+            env = interp.current_env
+            if slot is not None:
+                # 循环变量位于子程序帧的槽位中
+                variables = env.slots
+                variables[slot] = IntegerType(counter)
+            else:
+                env.define_variable(variable, IntegerType(counter))
+                # define_variable之后循环变量必定位于当前作用域的variables中
+                variables = env.variables
+
+            if step > 0:
+                while counter <= end:
+                    body()
+                    counter += step
+                    variables[key] = IntegerType(counter)
+            else:
+                while counter >= end:
+                    body()
+                    counter += step
+                    variables[key] = IntegerType(counter)
+
+        return run_for
+
+    def compile_while(self, stmt: WhileStmt):
+        """编译WHILE循环"""
+        if self.is_boolean_expression(stmt.condition):
+            # 比较和逻辑运算的结果必定为BOOLEAN，直接求真值
+            condition = self.compile_condition(stmt.condition)
+            body = self.compile_block(stmt.body)
+
+            def run_while_condition():
+                while condition():
+                    body()
+
+            return run_while_condition
+
+        condition_fn = self.compile_value(stmt.condition)
+        body = self.compile_block(stmt.body)
+        BooleanType = pt.BooleanType
+
+        if stmt.type_safe:
+            # 类型检查器已证明条件为BOOLEAN
+            def run_while_safe():
+                while condition_fn().value:
+                    body()
+
+            return run_while_safe
+
+        def run_while():
+            while True:
+                condition = condition_fn()
+                # 类型检查：WHILE条件必须是BOOLEAN类型
+                if not isinstance(condition, BooleanType):
+                    raise TypeError(f"WHILE循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
+                if not condition.value:
+                    break
+                body()
+
+        return run_while
+
+    def compile_repeat(self, stmt: RepeatStmt):
+        """编译REPEAT循环"""
+        if self.is_boolean_expression(stmt.condition):
+            # 比较和逻辑运算的结果必定为BOOLEAN，直接求真值
+            body = self.compile_block(stmt.body)
+            condition = self.compile_condition(stmt.condition)
+
+            def run_repeat_condition():
+                while True:
+                    body()
+                    if condition():
+                        break
+
+            return run_repeat_condition
+
+        condition_fn = self.compile_value(stmt.condition)
+        body = self.compile_block(stmt.body)
+        BooleanType = pt.BooleanType
+
+        if stmt.type_safe:
+            # 类型检查器已证明条件为BOOLEAN
+            def run_repeat_safe():
+                while True:
+                    body()
+                    if condition_fn().value:
+                        break
+
+            return run_repeat_safe
+
+        def run_repeat():
+            while True:
+                body()
+                condition = condition_fn()
+                # 类型检查：REPEAT-UNTIL条件必须是BOOLEAN类型
+                if not isinstance(condition, BooleanType):
+                    raise TypeError(f"REPEAT-UNTIL循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
+                if condition.value:
+                    break
+
+        return run_repeat
+
+    def compile_procedure_def(self, stmt: ProcedureDef):
+        """编译PROCEDURE定义"""
+        interp = self.interp
+        self.compile_body(stmt)
+
+        def run_procedure_def():
+            interp.current_env.define_procedure(stmt.name, stmt)
+
+        return run_procedure_def
+
+    def compile_reference(self, target: IdentifierAccess) -> Callable[[], Any]:
+        """编译BYREF实参：返回建立指向变量、数组元素或记录字段的引用的闭包"""
+        interp = self.interp
+        name = target.name
+
+        if target.index1 is not None:
+            load_container = self.compile_variable_load(target)
+            expressions = (target.index1,) if target.index2 is None else (target.index1, target.index2)
+            indices = self.compile_more_indices(expressions + tuple(target.more_indices))
+
+            def reference_element():
+                array = load_container()
+                return ElementReference(array, tuple(indices()))
+
+            return reference_element
+
+        if target.field is not None:
+            load_container = self.compile_variable_load(target)
+            field = target.field
+            return lambda: FieldReference(load_container(), field)
+
+        if target.slot is None:
+            return lambda: NameReference(interp.current_env, name)
+
+        depth = target.depth
+        slot = target.slot
+        if target.by_ref:
+            def pass_reference():
+                frame = interp.current_env if depth == 0 else interp.frame_at(depth)
+                return frame.slots[slot]
+
+            return pass_reference
+
+        def reference_local():
+            frame = interp.current_env if depth == 0 else interp.frame_at(depth)
+            return SlotReference(frame, slot, name)
+
+        return reference_local
+
+    def compile_function_def(self, stmt: FunctionDef):
+        """编译FUNCTION定义"""
+        interp = self.interp
+        self.compile_body(stmt)
+
+        def run_function_def():
+            interp.current_env.define_function(stmt.name, stmt)
+
+        return run_function_def
+
+    def compile_procedure_call(self, stmt: ProcedureCall):
+        """编译CALL"""
+        interp = self.interp
+        name = stmt.name
+        arguments = stmt.arguments
+        proc_def = stmt.definition
+        # 链接到的过程按引用绑定的参数：实参编译为建立引用的闭包（数组索引只求值一次）
+        ref_params = proc_def.scope.ref_params if proc_def is not None else ()
+        arg_fns = tuple(self.compile_reference(arg) if position in ref_params and isinstance(arg, IdentifierAccess)
+                        else self.compile_value(arg)
+                        for position, arg in enumerate(arguments))
+
+        if proc_def is not None:
+            # 链接时已绑定的顶层过程
+            global_env = interp.global_env
+            call_procedure = interp.call_procedure
+
+            def run_linked_procedure_call():
+                call_procedure(proc_def, arguments, [fn() for fn in arg_fns], global_env)
+
+            return run_linked_procedure_call
+
+        def run_procedure_call():
+            proc_def, defining_env = interp.current_env.resolve_procedure(name)
+            arg_values = [fn() for fn in arg_fns]
+            interp.call_procedure(proc_def, arguments, arg_values, defining_env)
+
+        return run_procedure_call
+
+    def compile_return(self, stmt: ReturnStmt):
+        """编译RETURN"""
+        value_fn = self.compile_value(stmt.value)
+
+        def run_return():
+            raise ReturnValue(value_fn())
+
+        return run_return
+
+    def compile_file_open(self, stmt: FileOpenStmt):
+        """编译OPENFILE"""
+        file_manager = self.interp.file_manager
+        return lambda: file_manager.open_file(stmt.file_id, stmt.mode)
+
+    def compile_file_read(self, stmt: FileReadStmt):
+        """编译READFILE"""
+        file_manager = self.interp.file_manager
+        store = self.compile_store(stmt.target)
+        file_id = stmt.file_id
+
+        def run_file_read():
+            content = file_manager.read_file(file_id)
+            store(pt.StringType(content))
+
+        return run_file_read
+
+    def compile_file_write(self, stmt: FileWriteStmt):
+        """编译WRITEFILE"""
+        interp = self.interp
+        file_manager = interp.file_manager
+        value_fn = self.compile_value(stmt.value)
+        file_id = stmt.file_id
+
+        def run_file_write():
+            content = interp.to_output_string(value_fn())
+            file_manager.write_file(file_id, content)
+
+        return run_file_write
+
+    def compile_file_close(self, stmt: FileCloseStmt):
+        """编译CLOSEFILE"""
+        file_manager = self.interp.file_manager
+        return lambda: file_manager.close_file(stmt.file_id)
+
+    STATEMENT_COMPILERS = {
+        DeclareStmt: compile_declare,
+        ConstantStmt: compile_constant,
+        TypeDefStmt: compile_type_def,
+        AssignStmt: compile_assign,
+        InputStmt: compile_input,
+        OutputStmt: compile_output,
+        IfStmt: compile_if,
+        CaseStmt: compile_case,
+        ForStmt: compile_for,
+        WhileStmt: compile_while,
+        RepeatStmt: compile_repeat,
+        ProcedureDef: compile_procedure_def,
+        FunctionDef: compile_function_def,
+        ProcedureCall: compile_procedure_call,
+        ReturnStmt: compile_return,
+        FileOpenStmt: compile_file_open,
+        FileReadStmt: compile_file_read,
+        FileWriteStmt: compile_file_write,
+        FileCloseStmt: compile_file_close,
+    }
+
+    # ==================== 表达式 ====================
+
+    def compile_value(self, expr) -> Callable[[], Any]:
+        """编译语句边界处（赋值、条件、参数、输出等）使用的表达式，闭包返回伪代码类型的值"""
+        return self.compile_expression(expr)
+
+    @staticmethod
+    def is_boolean_expression(expr) -> bool:
+        """表达式的结果是否必定为BOOLEAN（比较和逻辑运算）"""
+        if isinstance(expr, BinaryOp):
+            return expr.operator in ('=', '<>', '<', '>', '<=', '>=', 'AND', 'OR')
+        return isinstance(expr, UnaryOp) and expr.operator == 'NOT'
+
+    def compile_condition(self, expr) -> Callable[[], bool]:
+        """编译条件，返回产生Python bool的闭包
+        AND/OR/NOT直接组合操作数的真值（短路求值），比较不构造中间的BOOLEAN值"""
+        if isinstance(expr, BinaryOp):
+            operator = expr.operator
+            if operator == 'AND':
+                left = self.compile_condition(expr.left)
+                right = self.compile_condition(expr.right)
+                return lambda: left() and right()
+            if operator == 'OR':
+                left = self.compile_condition(expr.left)
+                right = self.compile_condition(expr.right)
+                return lambda: left() or right()
+            function = COMPARISON_FUNCTIONS.get(operator)
+            if function is not None:
+                return self.compile_comparison(expr, function)
+        elif isinstance(expr, UnaryOp) and expr.operator == 'NOT':
+            operand = self.compile_condition(expr.operand)
+            return lambda: not operand()
+
+        is_truthy = self.interp.is_truthy
+        value_fn = self.compile_value(expr)
+        return lambda: is_truthy(value_fn())
+
+    def compile_comparison(self, op: BinaryOp, function) -> Callable[[], bool]:
+        """编译作为条件的比较：INTEGER与INTEGER、STRING与STRING直接比较"""
+        left_fn = self.compile_value(op.left)
+        right_fn = self.compile_value(op.right)
+        operator = op.operator
+        compare = self.interp.compare_values
+        IntegerType = pt.IntegerType
+        StringType = pt.StringType
+
+        def run_comparison():
+            left = left_fn()
+            right = right_fn()
+            left_type = type(left)
+            if left_type is type(right) and (left_type is IntegerType or left_type is StringType):
+                return function(left.value, right.value)
+            return compare(left, right, operator)
+
+        return run_comparison
+
+    def compile_expression(self, expr) -> Callable[[], Any]:
+        """编译表达式，返回无参求值闭包"""
+        method = self.EXPRESSION_COMPILERS.get(type(expr))
+        if method is None:
+            def run_unknown():
+                raise RuntimeError(f"Unknown expression type: {type(expr)}")
+            return run_unknown
+        return method(self, expr)
+
+    def compile_literal(self, literal: Literal):
+        """编译字面量（值在编译期构造一次，运行时直接返回缓存的对象）"""
+        value = self.interp.evaluate_literal(literal)
+        return lambda: value
+
+    def compile_variable_load(self, node, name: str = None) -> Callable[[], Any]:
+        """编译变量读取（已解析的局部变量按槽位读取，其余预先转换大写，直接遍历作用域链）"""
+        interp = self.interp
+        if name is None:
+            name = node.name
+
+        if node.slot is not None:
+            depth = node.depth
+            slot = node.slot
+            if node.by_ref:
+                def load_reference():
+                    frame = interp.current_env if depth == 0 else interp.frame_at(depth)
+                    return frame.slots[slot].get()
+
+                return load_reference
+
+            if depth == 0:
+                def load_local():
+                    frame = interp.current_env
+                    value = frame.slots[slot]
+                    if value is UNBOUND:
+                        return frame.parent.get_variable(name)
+                    return value
+
+                return load_local
+
+            def load_outer():
+                return interp.frame_at(depth).get_slot(slot, name)
+
+            return load_outer
+
+        key = name.upper()
+
+        def load_variable():
+            env = interp.current_env
+            while env is not None:
+                constants = env.constants
+                if key in constants:
+                    return constants[key]
+                variables = env.variables
+                if key in variables:
+                    return variables[key]
+                env = env.parent
+            raise RuntimeError(f"Undefined variable '{name}'")
+
+        return load_variable
+
+    def compile_identifier(self, expr: Identifier):
+        """编译标识符"""
+        return self.compile_variable_load(expr)
+
+    def compile_identifier_access(self, access: IdentifierAccess):
+        """编译标识符访问"""
+        load_container = self.compile_variable_load(access)
+        IntegerType = pt.IntegerType
+        ArrayType = pt.ArrayType
+
+        if access.index1 is not None:
+            index1_fn = self.compile_expression(access.index1)
+
+            if access.more_indices:
+                rest_fn = self.compile_more_indices(access.more_indices)
+                index2_fn = self.compile_expression(access.index2)
+
+                def load_nd():
+                    array = load_container()
+                    index1 = index1_fn()
+                    if not isinstance(index1, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+                    index2 = index2_fn()
+                    if not isinstance(index2, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
+                    return array.get(index1.value, index2.value, *rest_fn())
+
+                return load_nd
+
+            if access.index2 is not None:
+                index2_fn = self.compile_expression(access.index2)
+
+                def load_2d():
+                    array = load_container()
+                    index1 = index1_fn()
+                    if not isinstance(index1, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+                    index2 = index2_fn()
+                    if not isinstance(index2, IntegerType):
+                        raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
+                    if isinstance(array, ArrayType):
+                        return array.get2(index1.value, index2.value)
+                    return array.get(index1.value, index2.value)
+
+                return load_2d
+
+            def load_1d():
+                array = load_container()
+                index1 = index1_fn()
+                if not isinstance(index1, IntegerType):
+                    raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+                index1 = index1.value
+                if isinstance(array, ArrayType):
+                    return array.get1(index1)
+                return array.get(index1)
+
+            return load_1d
+
+        elif access.field is not None:
+            field = access.field
+
+            def load_field():
+                return load_container().get_field(field)
+
+            return load_field
+
+        return load_container
+
+    def compile_binary_op(self, op: BinaryOp):
+        """编译二元运算（运算符在编译期分派）"""
+        interp = self.interp
+        left_fn = self.compile_expression(op.left)
+        right_fn = self.compile_expression(op.right)
+        operator = op.operator
+        BooleanType = pt.BooleanType
+
+        IntegerType = pt.IntegerType
+        RealType = pt.RealType
+        StringType = pt.StringType
+
+        fast_arithmetic = {
+            '+': _operator.add,
+            '-': _operator.sub,
+            '*': _operator.mul,
+        }.get(operator)
+
+        if fast_arithmetic is not None:
+            slow_arithmetic = {
+                '+': interp.add_values,
+                '-': interp.subtract_values,
+                '*': interp.multiply_values,
+            }[operator]
+
+            def run_arithmetic():
+                left = left_fn()
+                right = right_fn()
+                # 快速路径：同为INTEGER或同为REAL
+                left_type = type(left)
+                if left_type is type(right):
+                    if left_type is IntegerType:
+                        return IntegerType(fast_arithmetic(left.value, right.value))
+                    if left_type is RealType:
+                        return RealType(fast_arithmetic(left.value, right.value))
+                return slow_arithmetic(left, right)
+
+            return run_arithmetic
+
+        arithmetic = {
+            '/': interp.divide_values,
+            '^': interp.power_values,
+            '&': interp.concat_values,
+        }.get(operator)
+
+        if arithmetic is not None:
+            return lambda: arithmetic(left_fn(), right_fn())
+
+        fast_compare = {
+            '=': _operator.eq,
+            '<>': _operator.ne,
+            '<': _operator.lt,
+            '>': _operator.gt,
+            '<=': _operator.le,
+            '>=': _operator.ge,
+        }.get(operator)
+
+        if fast_compare is not None:
+            compare = interp.compare_values
+
+            def run_compare():
+                left = left_fn()
+                right = right_fn()
+                # 快速路径：INTEGER与INTEGER、STRING与STRING直接比较
+                left_type = type(left)
+                if left_type is type(right) and (left_type is IntegerType or left_type is StringType):
+                    return BooleanType(fast_compare(left.value, right.value))
+                return BooleanType(compare(left, right, operator))
+
+            return run_compare
+
+        # 逻辑运算：短路求值，左操作数已决定结果时不求值右操作数
+        is_truthy = interp.is_truthy
+        if operator == 'AND':
+            def run_and():
+                if not is_truthy(left_fn()):
+                    return BooleanType(False)
+                return BooleanType(is_truthy(right_fn()))
+            return run_and
+        elif operator == 'OR':
+            def run_or():
+                if is_truthy(left_fn()):
+                    return BooleanType(True)
+                return BooleanType(is_truthy(right_fn()))
+            return run_or
+
+        def run_unknown():
+            left_fn()
+            right_fn()
+            raise RuntimeError(f"Unknown operator: {operator}")
+
+        return run_unknown
+
+    def compile_unary_op(self, op: UnaryOp):
+        """编译一元运算"""
+        interp = self.interp
+        operand_fn = self.compile_expression(op.operand)
+        operator = op.operator
+
+        if operator == '-':
+            def run_negate():
+                operand = operand_fn()
+                if isinstance(operand, pt.IntegerType):
+                    return pt.IntegerType(-operand.value)
+                elif isinstance(operand, pt.RealType):
+                    return pt.RealType(-operand.value)
+                raise RuntimeError(f"Unknown unary operator: {operator}")
+            return run_negate
+        elif operator == '+':
+            return operand_fn
+        elif operator == 'NOT':
+            is_truthy = interp.is_truthy
+            return lambda: pt.BooleanType(not is_truthy(operand_fn()))
+
+        def run_unknown():
+            operand_fn()
+            raise RuntimeError(f"Unknown unary operator: {operator}")
+
+        return run_unknown
+
+    def compile_function_call(self, call: FunctionCall):
+        """编译函数调用"""
+        interp = self.interp
+        name = call.name
+        arg_fns = tuple(self.compile_value(arg) for arg in call.arguments)
+
+        builtin = call.builtin
+        if builtin is not None:
+            # 链接时已绑定的内置函数
+            if len(arg_fns) == 1:
+                arg_fn = arg_fns[0]
+
+                def run_linked_builtin_single():
+                    arg_value = arg_fn()
+                    try:
+                        return builtin(arg_value)
+                    except TypeError as e:
+                        raise builtin_call_error(name, e)
+
+                return run_linked_builtin_single
+
+            def run_linked_builtin():
+                arg_values = [fn() for fn in arg_fns]
+                try:
+                    return builtin(*arg_values)
+                except TypeError as e:
+                    raise builtin_call_error(name, e)
+
+            return run_linked_builtin
+
+        func_def = call.definition
+        if func_def is not None:
+            # 链接时已绑定的顶层函数
+            global_env = interp.global_env
+            call_function = interp.call_function
+
+            def run_linked_function():
+                return call_function(name, func_def, [fn() for fn in arg_fns], global_env)
+
+            return run_linked_function
+
+        if name.upper() in BUILTIN_FUNCTIONS:
+            file_manager = interp.file_manager
+
+            def run_builtin():
+                arg_values = [fn() for fn in arg_fns]
+                return call_builtin_function(name, arg_values, file_manager)
+
+            return run_builtin
+
+        def run_user_function():
+            func_def, defining_env = interp.current_env.resolve_function(name)
+            arg_values = [fn() for fn in arg_fns]
+            return interp.call_function(name, func_def, arg_values, defining_env)
+
+        return run_user_function
+
+    def compile_cached(self, expr: CachedExpr):
+        """编译缓存表达式（循环不变量和公共子表达式）"""
+        cache = self.interp.cache
+        slot = expr.slot
+        value_fn = self.compile_expression(expr.expr)
+
+        if expr.refresh:
+            def run_refresh():
+                value = cache[slot] = value_fn()
+                return value
+
+            return run_refresh
+
+        def run_cached():
+            value = cache.get(slot, UNCACHED)
+            if value is UNCACHED:
+                value = cache[slot] = value_fn()
+            return value
+
+        return run_cached
+
+    EXPRESSION_COMPILERS = {
+        Literal: compile_literal,
+        Identifier: compile_identifier,
+        IdentifierAccess: compile_identifier_access,
+        BinaryOp: compile_binary_op,
+        UnaryOp: compile_unary_op,
+        FunctionCall: compile_function_call,
+        CachedExpr: compile_cached,
+    }
+
+
+class ClosureInterpreter(Interpreter):
+    """闭包编译执行引擎 - 先编译整个程序，再运行闭包"""
+
+    def __init__(self, strict_mode: bool = False):
+        super().__init__(strict_mode=strict_mode)
+        self.compiler = ClosureCompiler(self)
+
+    def interpret(self, program: Program):
+        """编译并执行程序"""
+        run_program = self.compiler.compile_program(program)
+        try:
+            run_program()
+        finally:
+            # 确保所有文件被关闭
+            self.file_manager.close_all()
+
+    def execute_statement(self, stmt: ASTNode):
+        """编译并执行单条语句（供REPL使用）"""
+        self.compiler.compile_statement(stmt)()
+
+    def execute_body(self, definition):
+        """执行过程或函数体的编译结果"""
+        self.compiler.compile_body(definition)()
@@ -0,0 +1,36 @@
+"""
+执行引擎注册表 - 按名称选择执行AST的引擎
+各引擎所在的模块在第一次创建该引擎时才导入，只用一种引擎的进程不必导入其余引擎
+"""
+from importlib import import_module
+
+
+# 引擎名称 -> (模块, 解释器类)
+ENGINES = {
+    'tree': ('interpreter', 'Interpreter'),                # 树遍历解释器（参考实现）
+    'closure': ('closure_compiler', 'ClosureInterpreter'),  # 闭包编译执行引擎
+    'unboxed': ('unboxed', 'UnboxedInterpreter'),          # 闭包编译，表达式内部使用原生值（不装箱）
+    'vm': ('vm', 'VirtualMachine'),                        # 字节码栈式虚拟机
+    'python': ('transpiler', 'PythonInterpreter'),         # 转译为Python代码执行（不支持时回退到树遍历）
+}
+
+DEFAULT_ENGINE = 'vm'
+
+
+def engine_class(engine: str = DEFAULT_ENGINE) -> type:
+    """根据引擎名称返回解释器类（导入其所在的模块）"""
+    engine_name = (engine or DEFAULT_ENGINE).lower()
+    if engine_name not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Available engines: {', '.join(ENGINES)}")
+    module_name, class_name = ENGINES[engine_name]
+    return getattr(import_module(module_name), class_name)
+
+
+def create_interpreter(engine: str = DEFAULT_ENGINE, strict_mode: bool = False,
+                       memoize: bool = False, memo_size: int = None) -> 'Interpreter':
+    """根据引擎名称创建解释器实例（memoize为True时缓存纯函数的结果，最多保留memo_size个）"""
+    interpreter = engine_class(engine)(strict_mode=strict_mode)
+    if memoize:
+        from memoization import MemoCache, DEFAULT_CAPACITY
+        interpreter.memo = MemoCache(DEFAULT_CAPACITY if memo_size is None else memo_size)
+    return interpreter
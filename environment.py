@@ -129,6 +129,28 @@ class Environment:
 
         raise RuntimeError(f"Undefined function '{name}'")
 
+    def resolve_procedure(self, name: str):
+        """获取过程定义及其所在（定义时）的作用域"""
+        name_upper = name.upper()
+        env = self
+        while env is not None:
+            if name_upper in env.procedures:
+                return env.procedures[name_upper], env
+            env = env.parent
+
+        raise RuntimeError(f"Undefined procedure '{name}'")
+
+    def resolve_function(self, name: str):
+        """获取函数定义及其所在（定义时）的作用域"""
+        name_upper = name.upper()
+        env = self
+        while env is not None:
+            if name_upper in env.functions:
+                return env.functions[name_upper], env
+            env = env.parent
+
+        raise RuntimeError(f"Undefined function '{name}'")
+
     def has_variable(self, name: str) -> bool:
         """检查变量是否存在"""
         name_upper = name.upper()
@@ -146,6 +168,183 @@ class Environment:
         return f"Environment(vars={list(self.variables.keys())}, consts={list(self.constants.keys())})"
 
 
+# 槽位尚未绑定（DECLARE之前），此时按名称在外层作用域查找
+UNBOUND = object()
+
+
+class Frame(Environment):
+    """子程序调用帧 - 局部变量存放在按槽位索引的数组中
+    父作用域是子程序定义时所在的作用域（词法作用域），而不是调用者"""
+
+    def __init__(self, parent: Environment, scope):
+        super().__init__(parent=parent, strict_mode=parent.strict_mode)
+        self.scope = scope
+        self.slots = [UNBOUND] * len(scope.names)
+
+    def get_slot(self, slot: int, name: str) -> Any:
+        """按槽位读取变量"""
+        value = self.slots[slot]
+        if value is UNBOUND:
+            return self.parent.get_variable(name)
+        return value
+
+    def set_slot(self, slot: int, name: str, value: Any):
+        """按槽位写入变量"""
+        if self.slots[slot] is UNBOUND:
+            self.set_variable(name, value)
+        else:
+            self.slots[slot] = value
+
+    def define_variable(self, name: str, value: Any):
+        """定义变量"""
+        name_upper = name.upper()
+        if name_upper in self.constants:
+            raise RuntimeError(f"Cannot redefine constant '{name}'")
+        slot = self.scope.slots.get(name_upper)
+        if slot is not None:
+            self.slots[slot] = value
+        else:
+            self.variables[name_upper] = value
+
+    def define_constant(self, name: str, value: Any):
+        """定义常量"""
+        slot = self.scope.slots.get(name.upper())
+        if slot is not None and self.slots[slot] is not UNBOUND:
+            raise RuntimeError(f"Cannot define constant '{name}': variable with same name exists")
+        super().define_constant(name, value)
+
+    def get_variable(self, name: str) -> Any:
+        """获取变量值"""
+        name_upper = name.upper()
+        if name_upper in self.constants:
+            return self.constants[name_upper]
+        slot = self.scope.slots.get(name_upper)
+        if slot is not None and self.slots[slot] is not UNBOUND:
+            value = self.slots[slot]
+            if isinstance(value, Reference):
+                return value.get()
+            return value
+        if name_upper in self.variables:
+            return self.variables[name_upper]
+        return self.parent.get_variable(name)
+
+    def set_variable(self, name: str, value: Any):
+        """设置变量值"""
+        name_upper = name.upper()
+
+        # 不能修改常量
+        if name_upper in self.constants:
+            raise RuntimeError(f"Cannot modify constant '{name}'")
+
+        slot = self.scope.slots.get(name_upper)
+        if slot is not None and self.slots[slot] is not UNBOUND:
+            if isinstance(self.slots[slot], Reference):
+                self.slots[slot].set(value)
+            else:
+                self.slots[slot] = value
+            return
+        if name_upper in self.variables:
+            self.variables[name_upper] = value
+            return
+
+        # 向父作用域查找
+        try:
+            self.parent.set_variable(name, value)
+            return
+        except RuntimeError:
+            pass
+
+        # 严格模式：变量未声明则报错
+        if self.strict_mode:
+            raise RuntimeError(f"Variable '{name}' used before declaration. Use DECLARE to declare variables first.")
+
+        # 非严格模式：在当前帧创建（隐式声明）
+        self.define_variable(name, value)
+
+    def has_variable(self, name: str) -> bool:
+        """检查变量是否存在"""
+        slot = self.scope.slots.get(name.upper())
+        if slot is not None and self.slots[slot] is not UNBOUND:
+            return True
+        return super().has_variable(name)
+
+    def __repr__(self):
+        bound = [name for name, value in zip(self.scope.names, self.slots) if value is not UNBOUND]
+        return f"Frame({self.scope.name}, slots={bound}, vars={list(self.variables.keys())})"
+
+
+class Reference:
+    """BYREF参数的引用 - 存放在过程参数的槽位中，读写都直接作用于调用者的变量、数组元素或记录字段"""
+    __slots__ = ()
+
+    def get(self) -> Any:
+        raise NotImplementedError
+
+    def set(self, value: Any):
+        raise NotImplementedError
+
+
+class SlotReference(Reference):
+    """指向调用帧槽位中的变量"""
+    __slots__ = ('frame', 'slot', 'name')
+
+    def __init__(self, frame: Frame, slot: int, name: str):
+        self.frame = frame
+        self.slot = slot
+        self.name = name
+
+    def get(self) -> Any:
+        return self.frame.get_slot(self.slot, self.name)
+
+    def set(self, value: Any):
+        self.frame.set_slot(self.slot, self.name, value)
+
+
+class NameReference(Reference):
+    """指向按名称查找的变量（全局变量等）"""
+    __slots__ = ('env', 'name')
+
+    def __init__(self, env: Environment, name: str):
+        self.env = env
+        self.name = name
+
+    def get(self) -> Any:
+        return self.env.get_variable(self.name)
+
+    def set(self, value: Any):
+        self.env.set_variable(self.name, value)
+
+
+class ElementReference(Reference):
+    """指向数组元素（数组和索引在调用时确定）"""
+    __slots__ = ('array', 'indices')
+
+    def __init__(self, array: Any, indices: tuple):
+        self.array = array
+        self.indices = indices
+
+    def get(self) -> Any:
+        return self.array.get(*self.indices)
+
+    def set(self, value: Any):
+        self.array.set(*self.indices, value)
+
+
+class FieldReference(Reference):
+    """指向记录字段（记录在调用时确定）"""
+    __slots__ = ('record', 'field')
+
+    def __init__(self, record: Any, field: str):
+        self.record = record
+        self.field = field
+
+    def get(self) -> Any:
+        return self.record.get_field(self.field)
+
+    def set(self, value: Any):
+        self.record.set_field(self.field, value)
+
+
 class FileHandle:
     """文件句柄类 - 管理文件操作状态"""
 
@@ -0,0 +1,354 @@
+"""
+增量语法分析 - 编辑器每次修改后只重新分析受影响的顶层语句
+
+源代码按行划分为若干段（block），每段是一条顶层语句所在的行（第一段还包括程序开头的空行和
+注释，每段包括其后的空行和注释）。段的边界处缩进为0、语法分析器处于顶层，因此一段可以单独
+做词法分析和语法分析，结果与完整分析中对应的部分相同；名称解析中全局名称按名称查找，
+顶层语句之间也互不影响。
+
+修改后只对与修改范围相交的段重新分析：重新分析的结果依赖于之后的token时（语句在段的末尾
+仍未结束，或错误出现在段末尾补上的DEDENT/EOF上），把下一段并入后重试，直到结果只取决于
+段内的token。出错的段保存错误信息，整个程序的结果与完整分析一样：有词法错误时为第一个
+词法错误，否则为第一个语法错误。
+
+各段按固定大小分组保存，每组记录字符数、行数和顶层语句，定位修改和拼接结果只需遍历各组，
+大文件中一次修改的耗时与文件长度基本无关。
+
+用法:
+    document = IncrementalParser()
+    program = document.update(code)      # 第一次为完整分析，之后只分析修改过的部分
+    program = document.update(new_code)  # 与 Parser(Lexer().tokenize(new_code)).parse() 相同
+    program = document.edit(start, end, text)  # 已知修改范围时不必比较整个源代码
+
+返回的AST节点在多次分析之间共享，会改写AST的步骤（如optimizer）应在完整分析的结果上运行。
+"""
+from bisect import bisect_right
+from itertools import accumulate, chain
+from typing import List, Optional
+
+from ast_nodes import Program
+from lexer import Lexer
+from parser import Parser
+from resolver import Resolver
+
+# 每组的段数（拆分后的组不超过它的两倍）
+GROUP_SIZE = 64
+
+# 查找相同前缀和后缀时每次比较的最大字符数
+COMPARE_CHUNK = 4096
+
+
+class Block:
+    """一段源代码（若干完整的行）及其分析结果"""
+    __slots__ = ('text', 'lines', 'statements', 'error', 'lex_error', 'first_line')
+
+    def __init__(self, text: str, lines: int, statements: list,
+                 error: Optional[SyntaxError] = None, lex_error: bool = False, first_line: int = 0):
+        self.text = text              # 源代码（不是最后一段时以换行符结束）
+        self.lines = lines            # 行数
+        self.statements = statements  # 已完成名称解析的顶层语句
+        self.error = error            # 分析这一段时的错误
+        self.lex_error = lex_error    # error是否为词法错误
+        self.first_line = first_line  # 出错时这一段的起始行（错误信息中的行号依赖于它）
+
+    def __repr__(self):
+        return f"Block(lines={self.lines}, statements={len(self.statements)}, error={self.error!r})"
+
+
+class BlockList:
+    """按组保存的段列表 - 按序号或字符位置定位段，替换连续的若干段"""
+
+    def __init__(self, blocks: List[Block]):
+        self.groups: List[List[Block]] = []
+        self.chars: List[int] = []       # 各组的字符数
+        self.lines: List[int] = []       # 各组的行数
+        self.counts: List[int] = []      # 各组的顶层语句数
+        self.statements: list = []       # 所有段的顶层语句（按顺序）
+        self.count = 0
+        self.replace(0, -1, blocks)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index: int) -> Block:
+        group, offset = self.locate(index)
+        return self.groups[group][offset]
+
+    def __iter__(self):
+        return chain.from_iterable(self.groups)
+
+    def locate(self, index: int):
+        """第index段所在的组和组内序号（index == len(self)时为最后一组之后）"""
+        ends = list(accumulate(map(len, self.groups)))
+        group = bisect_right(ends, index)
+        return group, index - (ends[group - 1] if group else 0)
+
+    def start(self, index: int):
+        """第index段之前的(字符数, 行数)"""
+        group, offset = self.locate(index)
+        chars = sum(self.chars[:group])
+        lines = sum(self.lines[:group])
+        for block in self.groups[group][:offset]:
+            chars += len(block.text)
+            lines += block.lines
+        return chars, lines
+
+    def find(self, position: int) -> int:
+        """包含第position个字符的段的序号（在末尾或超出末尾时为最后一段）"""
+        ends = list(accumulate(self.chars))
+        group = bisect_right(ends, position)
+        if group == len(ends):
+            return self.count - 1
+        position -= ends[group - 1] if group else 0
+        index = sum(map(len, self.groups[:group]))
+        for block in self.groups[group]:
+            position -= len(block.text)
+            if position < 0:
+                break
+            index += 1
+        return index
+
+    def index(self, block: Block) -> int:
+        """段的序号"""
+        index = 0
+        for blocks in self.groups:
+            for offset, other in enumerate(blocks):
+                if other is block:
+                    return index + offset
+            index += len(blocks)
+        raise ValueError(f"{block!r} is not in the block list")
+
+    def replace(self, first: int, last: int, new_blocks: List[Block]):
+        """把第first到第last段替换为new_blocks，重新分组并统计涉及的组"""
+        first_group, first_offset = self.locate(first)
+        if first_group < len(self.groups):
+            last_group, last_offset = self.locate(last)
+            old = self.groups[first_group:last_group + 1]
+            blocks = old[0][:first_offset] + new_blocks + old[-1][last_offset + 1:]
+            statement_start = sum(self.counts[:first_group])
+            statement_end = statement_start + sum(self.counts[first_group:last_group + 1])
+        else:
+            last_group = first_group - 1  # 追加在最后
+            blocks = list(new_blocks)
+            statement_start = statement_end = len(self.statements)
+        self.count += len(new_blocks) - (last - first + 1)
+
+        groups = [blocks[start:start + GROUP_SIZE] for start in range(0, len(blocks), GROUP_SIZE)]
+        if len(groups) > 1 and len(groups[-1]) < GROUP_SIZE // 2:
+            groups[-2].extend(groups.pop())  # 避免很小的组
+        span = slice(first_group, last_group + 1)
+        self.groups[span] = groups
+        self.chars[span] = [sum(len(block.text) for block in group) for group in groups]
+        self.lines[span] = [sum(block.lines for block in group) for group in groups]
+        self.counts[span] = [sum(len(block.statements) for block in group) for group in groups]
+        self.statements[statement_start:statement_end] = [
+            stmt for group in groups for block in group for stmt in block.statements]
+
+
+class IncrementalParser:
+    """增量语法分析器 - 保存各段的源代码和分析结果"""
+
+    def __init__(self):
+        self.lexer = Lexer()
+        self.blocks: Optional[BlockList] = None  # 各段（还没有分析过时为None）
+        self.source: Optional[str] = None   # 上一次update的源代码（edit之后为None，需要时再拼接）
+        self.failed: List[Block] = []       # 出错的段
+        self.reparsed_lines = 0             # 上一次修改重新分析的行数
+
+    def update(self, code: str) -> Program:
+        """分析新的源代码，返回与完整分析相同的Program；有错误时抛出与完整分析相同的SyntaxError"""
+        try:
+            if self.blocks is None:
+                self.failed = []
+                self.blocks = BlockList([Block(code, code.count('\n') + 1, [])])
+                self.reparse(0, 0, code)
+            else:
+                old = self.text()
+                if code == old:
+                    self.reparsed_lines = 0
+                else:
+                    prefix = common_prefix_length(old, code)
+                    suffix = common_suffix_length(old, code, min(len(old), len(code)) - prefix)
+                    self.apply_change(prefix, len(old) - suffix, code[prefix:len(code) - suffix])
+            self.source = code
+            return self.result()
+        except SyntaxError:
+            raise
+        except BaseException:
+            self.discard()
+            raise
+
+    def edit(self, start: int, end: int, text: str) -> Program:
+        """把当前源代码中[start, end)的字符替换为text，返回新的分析结果（不需要比较整个源代码）"""
+        if self.blocks is None:
+            raise ValueError("edit() requires a previous update()")
+        try:
+            self.apply_change(start, end, text)
+            self.source = None
+            return self.result()
+        except SyntaxError:
+            raise
+        except BaseException:
+            self.discard()
+            raise
+
+    def discard(self):
+        """丢弃保存的分析结果（分析中出现SyntaxError以外的异常时各段可能只更新了一部分），
+        下一次update重新完整分析"""
+        self.blocks = None
+        self.source = None
+        self.failed = []
+
+    def text(self) -> str:
+        """当前的源代码"""
+        if self.source is None:
+            self.source = ''.join(block.text for block in self.blocks)
+        return self.source
+
+    def apply_change(self, start: int, end: int, text: str):
+        """把[start, end)的字符替换为text，重新分析与修改范围相交的段"""
+        blocks = self.blocks
+        # 修改范围所在的第一段和最后一段（修改到达某段开头时也包括该段，合并行时需要它）
+        first = blocks.find(start)
+        last = blocks.find(end)
+        offset = blocks.start(first)[0]
+        region = ''.join(blocks[index].text for index in range(first, last + 1))
+        self.reparse(first, last, region[:start - offset] + text + region[end - offset:])
+
+    # ==================== 重新分析 ====================
+
+    def reparse(self, first: int, last: int, region: str):
+        """用region（修改后的源代码）重新分析第first到第last段"""
+        blocks = self.blocks
+        # 出错的段结束时的缩进未知，相邻的出错段一起分析，使每段开始时的缩进都为0
+        while first > 0 and blocks[first - 1].error is not None:
+            first -= 1
+            region = blocks[first].text + region
+        while last + 1 < len(blocks) and blocks[last + 1].error is not None:
+            last += 1
+            region += blocks[last].text
+        first_line = blocks.start(first)[1]
+
+        while True:
+            at_end = last == len(blocks) - 1
+            new_blocks = self.parse_region(region, first_line, at_end)
+            if new_blocks is not None:
+                break
+            # 结果依赖于之后的token：并入下一段
+            last += 1
+            region += blocks[last].text
+
+        self.reparsed_lines = sum(block.lines for block in new_blocks)
+        for index in range(first, last + 1):
+            block = blocks[index]
+            if block.error is not None:
+                self.failed.remove(block)
+        self.failed.extend(block for block in new_blocks if block.error is not None)
+        blocks.replace(first, last, new_blocks)
+
+    def parse_region(self, region: str, first_line: int, at_end: bool) -> Optional[List[Block]]:
+        """对一段源代码做词法和语法分析，返回分成的段；结果依赖于之后的token时返回None"""
+        # 不是最后一段时region以换行符结束
+        lines = region.count('\n') + (1 if at_end else 0)
+        try:
+            tokens = self.lexer.tokenize(region, first_line + 1)
+        except SyntaxError as error:
+            # 词法错误只取决于出错行及之前的行
+            return [Block(region, lines, [], error, True, first_line)]
+
+        # 段末尾补上的DEDENT和EOF在完整的token流中并不在这里。下一段从缩进0开始，
+        # 没有DEDENT时末尾的NEWLINE与完整token流中的相同；有DEDENT时完整token流中
+        # DEDENT在NEWLINE之前，NEWLINE也不算
+        tail = len(tokens) - 1
+        while tail > 0 and tokens[tail - 1].type == 'DEDENT':
+            tail -= 1
+        if tail < len(tokens) - 1 and tokens[tail - 1].type == 'NEWLINE':
+            tail -= 1
+
+        parser = Parser(tokens)
+        try:
+            parsed = parser.parse_top_level()
+        except SyntaxError as error:
+            if parser.pos >= tail and not at_end:
+                return None
+            return [Block(region, lines, [], error, False, first_line)]
+
+        return split_region(region, first_line, parsed, at_end)
+
+    # ==================== 结果 ====================
+
+    def result(self) -> Program:
+        """汇总各段的结果：有错误时抛出第一个词法错误（没有时为第一个语法错误）"""
+        while self.failed:
+            blocks = self.blocks
+            positions = sorted(blocks.index(block) for block in self.failed)
+            lexical = [index for index in positions if blocks[index].lex_error]
+            index = lexical[0] if lexical else positions[0]
+            block = blocks[index]
+            if block.first_line != blocks.start(index)[1]:
+                # 之前插入或删除了行，错误信息中的行号已过时：重新分析这一段
+                self.reparse(index, index, block.text)
+                continue
+            raise block.error
+        return Program(list(self.blocks.statements))
+
+
+def split_region(region: str, first_line: int, parsed: list, at_end: bool) -> List[Block]:
+    """按顶层语句的起始行把分析过的一段源代码分成多段，并对语句做名称解析"""
+    # 每段从一条从行首开始的语句的起始行开始（第一段从整个范围的开头开始，包括之前的空行和
+    # 注释）；与前一条语句在同一行开始的语句属于前一段
+    line_starts = [0]
+    groups = [[]]
+    line = first_line + 1
+    position = 0
+    for index, (statement_line, stmt) in enumerate(parsed):
+        if index and statement_line is not None:
+            while line < statement_line:
+                position = region.index('\n', position) + 1
+                line += 1
+            line_starts.append(position)
+            groups.append([])
+        groups[-1].append(stmt)
+    line_starts.append(len(region))
+
+    resolver = Resolver()
+    blocks = []
+    for statements, start, end in zip(groups, line_starts, line_starts[1:]):
+        resolver.resolve_block(statements)
+        text = region[start:end]
+        lines = text.count('\n')
+        if at_end and end == len(region):
+            lines += 1  # 程序的最后一行没有换行符
+        blocks.append(Block(text, lines, statements))
+    return blocks
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """a和b相同前缀的长度（比较的长度相同时逐次加倍，不同时逐次减半）"""
+    limit = min(len(a), len(b))
+    position = 0
+    size = COMPARE_CHUNK
+    while position + size <= limit and a[position:position + size] == b[position:position + size]:
+        position += size
+        size *= 2
+    while size > 1:
+        size //= 2
+        if position + size <= limit and a[position:position + size] == b[position:position + size]:
+            position += size
+    return position
+
+
+def common_suffix_length(a: str, b: str, limit: int) -> int:
+    """a和b相同后缀的长度（不超过limit，避免与相同前缀重叠）"""
+    end_a = len(a)
+    end_b = len(b)
+    length = 0
+    size = COMPARE_CHUNK
+    while length + size <= limit and a[end_a - length - size:end_a - length] == b[end_b - length - size:end_b - length]:
+        length += size
+        size *= 2
+    while size > 1:
+        size //= 2
+        if length + size <= limit and a[end_a - length - size:end_a - length] == b[end_b - length - size:end_b - length]:
+            length += size
+    return length
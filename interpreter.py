@@ -2,20 +2,145 @@
 解释器核心 - 执行AST
 采用访问者模式遍历和执行AST节点
 """
-from typing import Any, List
+import operator as _operator
+from bisect import bisect_left
+from typing import Any, Dict, List
 from ast_nodes import *
-from environment import Environment, FileManager
+from environment import (Environment, Frame, FileManager, Reference, SlotReference, NameReference,
+                         ElementReference, FieldReference)
 import pseudocode_types as pt
-from builtin_functions import is_builtin_function, call_builtin_function
+from builtin_functions import is_builtin_function, call_builtin_function, builtin_call_error
 import sys
 
 
+# 缓存槽位为空的标记
+UNCACHED = object()
+
+
 class ReturnValue(Exception):
     """用于函数返回值的特殊异常"""
     def __init__(self, value):
         self.value = value
 
 
+# 比较运算符 -> Python比较函数
+COMPARISON_FUNCTIONS = {
+    '=': _operator.eq, '<>': _operator.ne, '<': _operator.lt,
+    '>': _operator.gt, '<=': _operator.le, '>=': _operator.ge,
+}
+
+
+def numeric_value(value):
+    """INTEGER/REAL（或Python数值）的数值，其他值返回None"""
+    if isinstance(value, (pt.IntegerType, pt.RealType)):
+        return value.value
+    if isinstance(value, (int, float)):
+        return value
+    return None
+
+
+class CaseTable:
+    """CASE跳转表 - 覆盖开头若干个条件为常量的分支（optimizer.py填写到CaseStmt.table）
+    表中的常量同为数值（INTEGER/REAL）或同为字符串（STRING/CHAR）。CASE值与之同类时，单值分支
+    查散列表，范围分支在排序后的端点上二分查找；其余情况逐个比较，结果与按分支顺序比较一致"""
+    __slots__ = ('conditions', 'numeric', 'size', 'values', 'points', 'targets')
+
+    def __init__(self, conditions: List[tuple], numeric: bool):
+        # conditions: 各分支的(值, None)或(下界, 上界)，均为运行时值
+        self.conditions = tuple(conditions)
+        self.numeric = numeric
+        self.size = len(conditions)
+
+        # 单值：键 -> 第一个匹配的分支序号
+        self.values = {}
+        ranges = []
+        for index, (start, end) in enumerate(self.conditions):
+            if end is None:
+                self.values.setdefault(self.key(start), index)
+            else:
+                ranges.append((self.key(start), self.key(end), index))
+
+        # 范围：端点把数轴分为端点本身和端点之间的开区间（第2i+1段为points[i]，第2i段在它之前），
+        # 每段记录覆盖它的第一个分支
+        self.points = sorted({point for low, high, _ in ranges for point in (low, high)})
+        targets = [self.size] * (2 * len(self.points) + 1)
+        position = {point: i for i, point in enumerate(self.points)}
+        for low, high, index in ranges:
+            if low > high:
+                continue
+            for piece in range(2 * position[low] + 1, 2 * position[high] + 2):
+                targets[piece] = min(targets[piece], index)
+        self.targets = tuple(targets)
+
+    def key(self, value):
+        """值在表中的键；与表中的常量不同类时返回None"""
+        value_type = type(value)
+        if self.numeric:
+            if value_type is pt.IntegerType or value_type is pt.RealType:
+                return value.value
+        elif value_type is pt.StringType or value_type is pt.CharType:
+            return str(value.value)
+        return None
+
+    def lookup(self, value, compare) -> int:
+        """第一个匹配的分支序号；表中的分支都不匹配时返回size（由调用者继续比较之后的分支）"""
+        key = self.key(value)
+        if key is None:
+            for index, (start, end) in enumerate(self.conditions):
+                if end is None:
+                    if compare(value, start, '='):
+                        return index
+                elif compare(value, start, '>=') and compare(value, end, '<='):
+                    return index
+            return self.size
+
+        index = self.values.get(key, self.size)
+        points = self.points
+        if points:
+            i = bisect_left(points, key)
+            piece = 2 * i + 1 if i < len(points) and points[i] == key else 2 * i
+            if self.targets[piece] < index:
+                index = self.targets[piece]
+        return index
+
+    def __repr__(self):
+        return f"CaseTable({list(self.conditions)!r})"
+
+
+# 伪代码类型 -> 标准类型名称
+TYPE_NAMES = {
+    pt.IntegerType: 'INTEGER',
+    pt.RealType: 'REAL',
+    pt.StringType: 'STRING',
+    pt.StringBuilder: 'STRING',
+    pt.CharType: 'CHAR',
+    pt.BooleanType: 'BOOLEAN',
+    pt.DateType: 'DATE',
+    pt.ArrayType: 'ARRAY',
+    pt.RecordType: 'RECORD',
+    bool: 'BOOLEAN',
+    int: 'INTEGER',
+    float: 'REAL',
+}
+
+
+def normalize_type(value) -> str:
+    """将值规范化为标准类型名称（Python原生类型映射到对应的伪代码类型）"""
+    value_type = type(value)
+    type_name = TYPE_NAMES.get(value_type)
+    if type_name is not None:
+        return type_name
+    if value_type is str:
+        return 'STRING' if len(value) != 1 else 'CHAR'
+    # 子类按继承关系查找 - 注意bool是int的子类，要先检查bool
+    for base, type_name in TYPE_NAMES.items():
+        if isinstance(value, base):
+            return type_name
+    if isinstance(value, str):
+        return 'STRING' if len(value) != 1 else 'CHAR'
+    return value_type.__name__
+
+
 class Interpreter:
     """解释器 - 执行AST"""
 
@@ -24,6 +149,19 @@ class Interpreter:
         self.global_env = Environment(strict_mode=strict_mode)
         self.current_env = self.global_env
         self.file_manager = FileManager()
+        self.cache: Dict[int, Any] = {}  # CachedExpr的缓存槽位 -> 值
+        self.memo = None  # 纯函数的记忆化缓存（MemoCache，None为不记忆化）
+        # 二元运算符 -> 运算函数（AND和OR短路求值，不在此列）
+        self.binary_operators = {
+            '+': self.add_values,
+            '-': self.subtract_values,
+            '*': self.multiply_values,
+            '/': self.divide_values,
+            '^': self.power_values,
+            '&': self.concat_values,
+        }
+        for operator in COMPARISON_FUNCTIONS:
+            self.binary_operators[operator] = self.make_comparison(operator)
 
     def interpret(self, program: Program):
         """执行程序"""
@@ -80,7 +218,7 @@ class Interpreter:
         """执行声明"""
         # 创建类型实例
         value = self.create_type_instance(stmt.type_spec)
-        self.current_env.define_variable(stmt.identifier, value)
+        self.define_variable(stmt, stmt.identifier, value)
 
     def create_type_instance(self, type_spec):
         """根据类型规格创建实例"""
@@ -99,17 +237,11 @@ class Interpreter:
             elif type_name == 'DATE':
                 return pt.DateType()
         elif isinstance(type_spec, ArrayType):
-            # 计算维度边界
-            dimensions = []
-            for lower_expr, upper_expr in type_spec.dimensions:
-                lower = self.evaluate_expression(lower_expr)
-                upper = self.evaluate_expression(upper_expr)
-                # 转换为整数
-                if isinstance(lower, pt.IntegerType):
-                    lower = lower.value
-                if isinstance(upper, pt.IntegerType):
-                    upper = upper.value
-                dimensions.append((int(lower), int(upper)))
+            # 计算维度边界（优化器已预先求值时直接使用）
+            if type_spec.bounds is not None:
+                dimensions = list(type_spec.bounds)
+            else:
+                dimensions = self.evaluate_array_bounds(type_spec)
 
             # 获取元素类型名称
             if isinstance(type_spec.element_type, SimpleType):
@@ -117,7 +249,7 @@ class Interpreter:
             else:
                 element_type = None
 
-            return pt.ArrayType(dimensions, element_type)
+            return pt.create_array(dimensions, element_type)
         elif isinstance(type_spec, CustomType):
             # 自定义类型
             type_def = self.current_env.get_type(type_spec.type_name)
@@ -125,6 +257,20 @@ class Interpreter:
 
         return None
 
+    def evaluate_array_bounds(self, type_spec: ArrayType) -> list:
+        """求值数组各维的上下界"""
+        dimensions = []
+        for lower_expr, upper_expr in type_spec.dimensions:
+            lower = self.evaluate_expression(lower_expr)
+            upper = self.evaluate_expression(upper_expr)
+            # 转换为整数
+            if isinstance(lower, pt.IntegerType):
+                lower = lower.value
+            if isinstance(upper, pt.IntegerType):
+                upper = upper.value
+            dimensions.append((int(lower), int(upper)))
+        return dimensions
+
     def create_record_instance(self, type_def: TypeDefStmt) -> pt.RecordType:
         """创建记录类型实例"""
         fields = {}
@@ -152,41 +298,15 @@ class Interpreter:
     def execute_assign(self, stmt: AssignStmt):
         """执行赋值"""
         value = self.evaluate_expression(stmt.value)
-        self.set_identifier_value(stmt.target, value)
+        target = stmt.target
+        if stmt.type_safe and target.index1 is None and target.field is None:
+            # 类型检查器已证明类型一致：直接写入简单变量
+            self.store_variable(target, target.name, value)
+            return
+        self.set_identifier_value(target, value)
 
     def check_type_compatibility(self, declared_value, new_value, var_name: str):
         """检查赋值类型兼容性"""
-        # 处理Python原生类型和伪代码类型的映射
-        def normalize_type(value):
-            """将值规范化为标准类型名称"""
-            if isinstance(value, pt.IntegerType):
-                return 'INTEGER'
-            elif isinstance(value, pt.RealType):
-                return 'REAL'
-            elif isinstance(value, pt.StringType):
-                return 'STRING'
-            elif isinstance(value, pt.CharType):
-                return 'CHAR'
-            elif isinstance(value, pt.BooleanType):
-                return 'BOOLEAN'
-            elif isinstance(value, pt.DateType):
-                return 'DATE'
-            elif isinstance(value, pt.ArrayType):
-                return 'ARRAY'
-            elif isinstance(value, pt.RecordType):
-                return 'RECORD'
-            # Python原生类型 - 注意bool是int的子类，要先检查bool
-            elif isinstance(value, bool):
-                return 'BOOLEAN'
-            elif isinstance(value, int):
-                return 'INTEGER'
-            elif isinstance(value, float):
-                return 'REAL'
-            elif isinstance(value, str):
-                return 'STRING' if len(value) != 1 else 'CHAR'
-            else:
-                return type(value).__name__
-
         declared_type = normalize_type(declared_value)
         new_type = normalize_type(new_value)
 
@@ -205,7 +325,7 @@ class Interpreter:
         """设置标识符的值"""
         if target.index1 is not None:
             # 数组赋值
-            array = self.current_env.get_variable(target.name)
+            array = self.load_variable(target)
             index1 = self.evaluate_expression(target.index1)
             # 类型检查：数组索引必须是INTEGER类型
             if not isinstance(index1, pt.IntegerType):
@@ -219,11 +339,13 @@ class Interpreter:
                 if not isinstance(index2, pt.IntegerType):
                     raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
                 index2 = index2.value
+                indices = (index1, index2, *self.evaluate_indices(target.more_indices))
                 # 类型检查：数组元素类型
-                existing_value = array.get(index1, index2)
+                existing_value = array.get(*indices)
                 if existing_value is not None:
-                    self.check_type_compatibility(existing_value, value, f"{target.name}[{index1}, {index2}]")
-                array.set(index1, index2, value)
+                    self.check_type_compatibility(existing_value, value,
+                                                  f"{target.name}[{', '.join(map(str, indices))}]")
+                array.set(*indices, value)
             else:
                 # 一维数组
                 # 类型检查：数组元素类型
@@ -234,7 +356,7 @@ class Interpreter:
 
         elif target.field is not None:
             # 记录字段赋值
-            record = self.current_env.get_variable(target.name)
+            record = self.load_variable(target)
             # 类型检查：记录字段类型
             existing_value = record.get_field(target.field)
             if existing_value is not None:
@@ -244,12 +366,12 @@ class Interpreter:
             # 简单变量赋值
             # 类型检查：只有在变量已存在时才检查类型
             try:
-                existing_value = self.current_env.get_variable(target.name)
+                existing_value = self.load_variable(target)
                 self.check_type_compatibility(existing_value, value, target.name)
             except RuntimeError:
                 # 变量不存在，允许在非严格模式下创建
                 pass
-            self.current_env.set_variable(target.name, value)
+            self.store_variable(target, target.name, value)
 
     def execute_input(self, stmt: InputStmt):
         """执行输入"""
@@ -311,10 +433,18 @@ class Interpreter:
 
     def execute_case(self, stmt: CaseStmt):
         """执行CASE语句"""
-        identifier_value = self.current_env.get_variable(stmt.identifier)
-
-        # 遍历分支
-        for branch in stmt.branches:
+        identifier_value = self.load_variable(stmt, stmt.identifier)
+        branches = stmt.branches
+
+        # 常量分支查跳转表，其余分支依次比较
+        first = 0
+        if stmt.table is not None:
+            first = stmt.table.lookup(identifier_value, self.compare_values)
+            if first < stmt.table.size:
+                self.execute_statement(branches[first].statement)
+                return
+        for index in range(first, len(branches)):
+            branch = branches[index]
             if self.match_case_condition(identifier_value, branch.condition):
                 self.execute_statement(branch.statement)
                 return
@@ -337,6 +467,8 @@ class Interpreter:
 
     def execute_for(self, stmt: ForStmt):
         """执行FOR循环"""
+        if stmt.invariants:
+            self.clear_cache(stmt.invariants)
         start = self.evaluate_expression(stmt.start)
         end = self.evaluate_expression(stmt.end)
 
@@ -345,13 +477,14 @@ class Interpreter:
         else:
             step = pt.IntegerType(1)
 
-        # 类型检查：FOR循环只接受INTEGER类型
-        if not isinstance(start, pt.IntegerType):
-            raise TypeError(f"FOR循环的起始值必须是INTEGER类型，而不是{type(start).__name__}")
-        if not isinstance(end, pt.IntegerType):
-            raise TypeError(f"FOR循环的结束值必须是INTEGER类型，而不是{type(end).__name__}")
-        if not isinstance(step, pt.IntegerType):
-            raise TypeError(f"FOR循环的步长必须是INTEGER类型，而不是{type(step).__name__}")
+        # 类型检查：FOR循环只接受INTEGER类型（类型检查器已证明时省略）
+        if not stmt.type_safe:
+            if not isinstance(start, pt.IntegerType):
+                raise TypeError(f"FOR循环的起始值必须是INTEGER类型，而不是{type(start).__name__}")
+            if not isinstance(end, pt.IntegerType):
+                raise TypeError(f"FOR循环的结束值必须是INTEGER类型，而不是{type(end).__name__}")
+            if not isinstance(step, pt.IntegerType):
+                raise TypeError(f"FOR循环的步长必须是INTEGER类型，而不是{type(step).__name__}")
 
         # 提取整数值
         start = start.value
@@ -360,27 +493,29 @@ class Interpreter:
 
         # 执行循环
         counter = start
-        self.current_env.define_variable(stmt.variable, pt.IntegerType(counter))
+        self.define_variable(stmt, stmt.variable, pt.IntegerType(counter))
 
         if step > 0:
             while counter <= end:
                 for s in stmt.body:
                     self.execute_statement(s)
                 counter += step
-                self.current_env.set_variable(stmt.variable, pt.IntegerType(counter))
+                self.store_variable(stmt, stmt.variable, pt.IntegerType(counter))
         else:
             while counter >= end:
                 for s in stmt.body:
                     self.execute_statement(s)
                 counter += step
-                self.current_env.set_variable(stmt.variable, pt.IntegerType(counter))
+                self.store_variable(stmt, stmt.variable, pt.IntegerType(counter))
 
     def execute_while(self, stmt: WhileStmt):
         """执行WHILE循环"""
+        if stmt.invariants:
+            self.clear_cache(stmt.invariants)
         while True:
             condition = self.evaluate_expression(stmt.condition)
             # 类型检查：WHILE条件必须是BOOLEAN类型
-            if not isinstance(condition, pt.BooleanType):
+            if not stmt.type_safe and not isinstance(condition, pt.BooleanType):
                 raise TypeError(f"WHILE循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
             if not self.is_truthy(condition):
                 break
@@ -390,17 +525,25 @@ class Interpreter:
 
     def execute_repeat(self, stmt: RepeatStmt):
         """执行REPEAT循环"""
+        if stmt.invariants:
+            self.clear_cache(stmt.invariants)
         while True:
             for s in stmt.body:
                 self.execute_statement(s)
 
             condition = self.evaluate_expression(stmt.condition)
             # 类型检查：REPEAT-UNTIL条件必须是BOOLEAN类型
-            if not isinstance(condition, pt.BooleanType):
+            if not stmt.type_safe and not isinstance(condition, pt.BooleanType):
                 raise TypeError(f"REPEAT-UNTIL循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
             if self.is_truthy(condition):
                 break
 
+    def clear_cache(self, slots: tuple):
+        """进入循环时清空循环不变量的缓存"""
+        cache = self.cache
+        for slot in slots:
+            cache.pop(slot, None)
+
     def execute_procedure_def(self, stmt: ProcedureDef):
         """执行过程定义"""
         self.current_env.define_procedure(stmt.name, stmt)
@@ -411,50 +554,88 @@ class Interpreter:
 
     def execute_procedure_call(self, stmt: ProcedureCall):
         """执行过程调用"""
-        proc_def = self.current_env.get_procedure(stmt.name)
+        if stmt.definition is not None:
+            # 链接时已绑定的顶层过程（定义在全局作用域）
+            arg_values = self.evaluate_procedure_arguments(stmt.definition, stmt.arguments)
+            self.call_procedure(stmt.definition, stmt.arguments, arg_values, self.global_env)
+            return
+
+        proc_def, defining_env = self.current_env.resolve_procedure(stmt.name)
 
         # 计算参数值
-        arg_values = [self.evaluate_expression(arg) for arg in stmt.arguments]
+        arg_values = self.evaluate_procedure_arguments(proc_def, stmt.arguments)
 
-        # 创建新的作用域
-        old_env = self.current_env
-        self.current_env = self.current_env.create_child()
+        self.call_procedure(proc_def, stmt.arguments, arg_values, defining_env)
 
-        # 绑定参数
-        for i, param in enumerate(proc_def.parameters):
-            if i < len(arg_values):
-                if param.by_ref:
-                    # BYREF参数 - 传引用
-                    # 这里需要特殊处理，直接引用原变量
-                    arg_expr = stmt.arguments[i]
-                    if isinstance(arg_expr, IdentifierAccess):
-                        # 创建引用（简化实现）
-                        self.current_env.define_variable(param.name, arg_values[i])
-                    else:
-                        raise RuntimeError(f"BYREF parameter must be a variable")
-                else:
-                    # 传值
-                    self.current_env.define_variable(param.name, arg_values[i])
-
-        # 执行过程体
-        try:
-            for s in proc_def.body:
-                self.execute_statement(s)
+    def evaluate_procedure_arguments(self, proc_def: ProcedureDef, arguments: List[Any]) -> List[Any]:
+        """求值过程调用的实参：按引用绑定的参数的实参求值为引用（数组索引只求值一次）"""
+        ref_params = proc_def.scope.ref_params
+        return [self.make_reference(arg) if i in ref_params and isinstance(arg, IdentifierAccess)
+                else self.evaluate_expression(arg)
+                for i, arg in enumerate(arguments)]
 
-            # BYREF参数需要写回
-            for i, param in enumerate(proc_def.parameters):
-                if param.by_ref and i < len(arg_values):
-                    arg_expr = stmt.arguments[i]
-                    if isinstance(arg_expr, IdentifierAccess):
-                        new_value = self.current_env.get_variable(param.name)
-                        self.current_env = old_env
-                        self.set_identifier_value(arg_expr, new_value)
-                        self.current_env = self.current_env.create_child()
+    def call_procedure(self, proc_def: ProcedureDef, arguments: List[Any], arg_values: List[Any],
+                       defining_env: Environment):
+        """以已求值的参数调用过程（arguments为原始参数表达式，BYREF参数绑定为指向它们的引用）"""
+        # 创建新的调用帧，父作用域为过程定义时所在的作用域；参数在调用者作用域中绑定
+        frame = Frame(defining_env, proc_def.scope)
+        self.bind_procedure_parameters(frame, proc_def, arguments, arg_values)
 
+        old_env = self.current_env
+        self.current_env = frame
+        try:
+            # 执行过程体（对BYREF参数的读写直接作用于实参，结束时不需要写回）
+            self.execute_body(proc_def)
         finally:
             # 恢复作用域
             self.current_env = old_env
 
+    def bind_procedure_parameters(self, frame: Frame, proc_def: ProcedureDef, arguments: List[Any],
+                                  arg_values: List[Any]):
+        """在新的调用帧中绑定过程参数（当前作用域为调用者）
+        传值参数的槽位存放实参的值，BYREF参数的槽位存放指向实参的引用
+        （调用者已把实参求值为引用时直接使用，否则按原始参数表达式建立）"""
+        ref_params = proc_def.scope.ref_params
+        for i, param in enumerate(proc_def.parameters):
+            if i >= len(arg_values):
+                if i in ref_params:
+                    # 缺少实参：按名称在定义所在的作用域查找（与未绑定的槽位一致）
+                    frame.slots[i] = NameReference(frame.parent, param.name)
+                continue
+            if param.by_ref:
+                arg_expr = arguments[i]
+                if not isinstance(arg_expr, IdentifierAccess):
+                    raise RuntimeError(f"BYREF parameter must be a variable")
+                if i in ref_params:
+                    value = arg_values[i]
+                    frame.slots[i] = value if isinstance(value, Reference) else self.make_reference(arg_expr)
+                    continue
+            frame.define_variable(param.name, arg_values[i])
+
+    def make_reference(self, target: IdentifierAccess) -> Reference:
+        """为BYREF实参建立引用（当前作用域为调用者）：数组元素和记录字段在调用时确定，
+        实参本身是BYREF参数时直接传递它的引用"""
+        if target.index1 is not None:
+            array = self.load_variable(target)
+            if target.index2 is not None:
+                indices = self.evaluate_indices((target.index1, target.index2, *target.more_indices))
+            else:
+                indices = self.evaluate_indices((target.index1,))
+            return ElementReference(array, tuple(indices))
+        if target.field is not None:
+            return FieldReference(self.load_variable(target), target.field)
+        if target.slot is None:
+            return NameReference(self.current_env, target.name)
+        frame = self.frame_at(target.depth)
+        if target.by_ref:
+            return frame.slots[target.slot]
+        return SlotReference(frame, target.slot, target.name)
+
+    def execute_body(self, definition):
+        """执行过程或函数体"""
+        for s in definition.body:
+            self.execute_statement(s)
+
     def execute_file_open(self, stmt: FileOpenStmt):
         """执行文件打开"""
         self.file_manager.open_file(stmt.file_id, stmt.mode)
@@ -482,7 +663,7 @@ class Interpreter:
         if isinstance(expr, Literal):
             return self.evaluate_literal(expr)
         elif isinstance(expr, Identifier):
-            return self.current_env.get_variable(expr.name)
+            return self.load_variable(expr)
         elif isinstance(expr, IdentifierAccess):
             return self.evaluate_identifier_access(expr)
         elif isinstance(expr, BinaryOp):
@@ -491,6 +672,8 @@ class Interpreter:
             return self.evaluate_unary_op(expr)
         elif isinstance(expr, FunctionCall):
             return self.evaluate_function_call(expr)
+        elif isinstance(expr, CachedExpr):
+            return self.evaluate_cached(expr)
         else:
             raise RuntimeError(f"Unknown expression type: {type(expr)}")
 
@@ -509,11 +692,30 @@ class Interpreter:
         else:
             return literal.value
 
+    def evaluate_cached(self, expr: CachedExpr):
+        """求值缓存表达式（循环不变量和公共子表达式）"""
+        if not expr.refresh:
+            value = self.cache.get(expr.slot, UNCACHED)
+            if value is not UNCACHED:
+                return value
+        value = self.cache[expr.slot] = self.evaluate_expression(expr.expr)
+        return value
+
+    def evaluate_indices(self, expressions) -> list:
+        """求值数组索引（必须是INTEGER类型），返回Python整数"""
+        indices = []
+        for expr in expressions:
+            index = self.evaluate_expression(expr)
+            if not isinstance(index, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index).__name__}")
+            indices.append(index.value)
+        return indices
+
     def evaluate_identifier_access(self, access: IdentifierAccess):
         """求值标识符访问"""
         if access.index1 is not None:
             # 数组访问
-            array = self.current_env.get_variable(access.name)
+            array = self.load_variable(access)
             index1 = self.evaluate_expression(access.index1)
             # 类型检查：数组索引必须是INTEGER类型
             if not isinstance(index1, pt.IntegerType):
@@ -527,6 +729,9 @@ class Interpreter:
                 if not isinstance(index2, pt.IntegerType):
                     raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
                 index2 = index2.value
+                if access.more_indices:
+                    # 三维及以上数组
+                    return array.get(index1, index2, *self.evaluate_indices(access.more_indices))
                 return array.get(index1, index2)
             else:
                 # 一维数组
@@ -534,45 +739,49 @@ class Interpreter:
 
         elif access.field is not None:
             # 记录字段访问
-            record = self.current_env.get_variable(access.name)
+            record = self.load_variable(access)
             return record.get_field(access.field)
         else:
             # 简单变量
-            return self.current_env.get_variable(access.name)
+            return self.load_variable(access)
 
     def evaluate_binary_op(self, op: BinaryOp):
         """求值二元运算"""
+        operator = op.operator
+
+        # 逻辑运算：短路求值，左操作数已决定结果时不求值右操作数
+        if operator == 'AND':
+            if not self.is_truthy(self.evaluate_expression(op.left)):
+                return pt.BooleanType(False)
+            return pt.BooleanType(self.is_truthy(self.evaluate_expression(op.right)))
+        if operator == 'OR':
+            if self.is_truthy(self.evaluate_expression(op.left)):
+                return pt.BooleanType(True)
+            return pt.BooleanType(self.is_truthy(self.evaluate_expression(op.right)))
+
+        # 算术、字符串连接和比较运算
+        function = self.binary_operators.get(operator)
         left = self.evaluate_expression(op.left)
         right = self.evaluate_expression(op.right)
-
-        # 算术运算
-        if op.operator == '+':
-            return self.add_values(left, right)
-        elif op.operator == '-':
-            return self.subtract_values(left, right)
-        elif op.operator == '*':
-            return self.multiply_values(left, right)
-        elif op.operator == '/':
-            return self.divide_values(left, right)
-        elif op.operator == '^':
-            return self.power_values(left, right)
-
-        # 字符串连接
-        elif op.operator == '&':
-            return self.concat_values(left, right)
-
-        # 比较运算
-        elif op.operator in ['=', '<>', '<', '>', '<=', '>=']:
-            return pt.BooleanType(self.compare_values(left, right, op.operator))
-
-        # 逻辑运算
-        elif op.operator == 'AND':
-            return pt.BooleanType(self.is_truthy(left) and self.is_truthy(right))
-        elif op.operator == 'OR':
-            return pt.BooleanType(self.is_truthy(left) or self.is_truthy(right))
-
-        else:
-            raise RuntimeError(f"Unknown operator: {op.operator}")
+        if function is None:
+            raise RuntimeError(f"Unknown operator: {operator}")
+        return function(left, right)
+
+    def make_comparison(self, operator: str):
+        """构造比较运算函数：INTEGER与INTEGER、STRING与STRING直接比较，其余经由compare_values"""
+        function = COMPARISON_FUNCTIONS[operator]
+        compare = self.compare_values
+        IntegerType = pt.IntegerType
+        StringType = pt.StringType
+        BooleanType = pt.BooleanType
+
+        def comparison(left, right):
+            left_type = type(left)
+            if left_type is type(right) and (left_type is IntegerType or left_type is StringType):
+                return BooleanType(function(left.value, right.value))
+            return BooleanType(compare(left, right, operator))
+
+        return comparison
 
     def evaluate_unary_op(self, op: UnaryOp):
         """求值一元运算"""
@@ -592,40 +801,103 @@ class Interpreter:
 
     def evaluate_function_call(self, call: FunctionCall):
         """求值函数调用"""
-        # 检查是否为内置函数
+        builtin = call.builtin
+        if builtin is not None:
+            # 链接时已绑定的内置函数
+            arg_values = [self.evaluate_expression(arg) for arg in call.arguments]
+            try:
+                return builtin(*arg_values)
+            except TypeError as e:
+                raise builtin_call_error(call.name, e)
+
+        if call.definition is not None:
+            # 链接时已绑定的顶层函数（定义在全局作用域）
+            arg_values = [self.evaluate_expression(arg) for arg in call.arguments]
+            return self.call_function(call.name, call.definition, arg_values, self.global_env)
+
+        # 未链接的调用（REPL）或无法静态确定定义的调用：按名称查找
         if is_builtin_function(call.name):
             arg_values = [self.evaluate_expression(arg) for arg in call.arguments]
             return call_builtin_function(call.name, arg_values, self.file_manager)
 
         # 用户定义的函数
-        func_def = self.current_env.get_function(call.name)
+        func_def, defining_env = self.current_env.resolve_function(call.name)
 
         # 计算参数值
         arg_values = [self.evaluate_expression(arg) for arg in call.arguments]
 
-        # 创建新的作用域
+        return self.call_function(call.name, func_def, arg_values, defining_env)
+
+    def call_function(self, name: str, func_def: FunctionDef, arg_values: List[Any], defining_env: Environment):
+        """以已求值的参数调用用户函数（开启记忆化时纯函数的结果从缓存中取）"""
+        memo = self.memo
+        if memo is not None and func_def.pure:
+            key = memo.key(func_def, arg_values)
+            if key is not None:
+                value = memo.get(key, UNCACHED)
+                if value is UNCACHED:
+                    value = self.invoke_function(name, func_def, arg_values, defining_env)
+                    memo.put(key, value)
+                return value
+        return self.invoke_function(name, func_def, arg_values, defining_env)
+
+    def invoke_function(self, name: str, func_def: FunctionDef, arg_values: List[Any], defining_env: Environment):
+        """执行用户函数的函数体"""
+        # 创建新的调用帧，父作用域为函数定义时所在的作用域
         old_env = self.current_env
-        self.current_env = self.current_env.create_child()
+        frame = Frame(defining_env, func_def.scope)
+        self.current_env = frame
 
-        # 绑定参数
-        for i, param in enumerate(func_def.parameters):
-            if i < len(arg_values):
-                self.current_env.define_variable(param.name, arg_values[i])
+        # 绑定参数（参数占据前面的槽位）
+        for i in range(min(len(func_def.parameters), len(arg_values))):
+            frame.slots[i] = arg_values[i]
 
         # 执行函数体
         try:
-            for s in func_def.body:
-                self.execute_statement(s)
+            self.execute_body(func_def)
         except ReturnValue as ret:
             return ret.value
         finally:
             # 恢复作用域
             self.current_env = old_env
 
-        raise RuntimeError(f"Function '{call.name}' did not return a value")
+        raise RuntimeError(f"Function '{name}' did not return a value")
 
     # ==================== 辅助方法 ====================
 
+    def frame_at(self, depth: int) -> Frame:
+        """沿词法作用域向外depth层的调用帧"""
+        env = self.current_env
+        for _ in range(depth):
+            env = env.parent
+        return env
+
+    def load_variable(self, node, name: str = None):
+        """读取已解析的变量引用（slot为None时按名称查找）"""
+        if name is None:
+            name = node.name
+        if node.slot is None:
+            return self.current_env.get_variable(name)
+        if node.by_ref:
+            return self.frame_at(node.depth).slots[node.slot].get()
+        return self.frame_at(node.depth).get_slot(node.slot, name)
+
+    def store_variable(self, node, name: str, value):
+        """写入已解析的变量引用"""
+        if node.slot is None:
+            self.current_env.set_variable(name, value)
+        elif isinstance(node, IdentifierAccess) and node.by_ref:
+            self.frame_at(node.depth).slots[node.slot].set(value)
+        else:
+            self.frame_at(node.depth).set_slot(node.slot, name, value)
+
+    def define_variable(self, node, name: str, value):
+        """在已解析的位置定义变量（DECLARE和FOR循环变量）"""
+        if node.slot is None:
+            self.current_env.define_variable(name, value)
+        else:
+            self.frame_at(node.depth).slots[node.slot] = value
+
     def is_truthy(self, value) -> bool:
         """判断值是否为真"""
         if isinstance(value, pt.BooleanType):
@@ -692,51 +964,38 @@ class Interpreter:
             return pt.IntegerType(int(result))
 
     def concat_values(self, left, right):
-        """字符串连接"""
+        """字符串连接；结果较长时为StringBuilder，之后在它的末尾或开头连接不再复制已有内容"""
+        if type(left) is pt.StringBuilder:
+            return left.append(self.to_string(right))
+        if type(right) is pt.StringBuilder:
+            return right.prepend(self.to_string(left))
         left_str = self.to_string(left)
         right_str = self.to_string(right)
-        return pt.StringType(left_str + right_str)
+        if len(left_str) + len(right_str) < pt.STRING_BUILDER_THRESHOLD:
+            return pt.StringType(left_str + right_str)
+        return pt.StringBuilder([], [left_str, right_str], 0, 2)
 
     def compare_values(self, left, right, operator: str) -> bool:
-        """比较值"""
-        # 尝试数值比较
-        try:
-            left_val = self.to_number(left)
-            right_val = self.to_number(right)
-
-            if operator == '=':
-                return left_val == right_val
-            elif operator == '<>':
-                return left_val != right_val
-            elif operator == '<':
-                return left_val < right_val
-            elif operator == '>':
-                return left_val > right_val
-            elif operator == '<=':
-                return left_val <= right_val
-            elif operator == '>=':
-                return left_val >= right_val
-        except:
-            pass
+        """比较值：两边都是数值时按数值比较，否则按字符串比较"""
+        function = COMPARISON_FUNCTIONS.get(operator)
+        if function is None:
+            return False
+
+        # 同类型的INTEGER、REAL或STRING直接比较
+        left_type = type(left)
+        if left_type is type(right) and (left_type is pt.IntegerType or left_type is pt.StringType
+                                         or left_type is pt.RealType):
+            return function(left.value, right.value)
+
+        # 数值比较（INTEGER与REAL混合）
+        left_number = numeric_value(left)
+        if left_number is not None:
+            right_number = numeric_value(right)
+            if right_number is not None:
+                return function(left_number, right_number)
 
         # 字符串比较
-        left_str = self.to_string(left)
-        right_str = self.to_string(right)
-
-        if operator == '=':
-            return left_str == right_str
-        elif operator == '<>':
-            return left_str != right_str
-        elif operator == '<':
-            return left_str < right_str
-        elif operator == '>':
-            return left_str > right_str
-        elif operator == '<=':
-            return left_str <= right_str
-        elif operator == '>=':
-            return left_str >= right_str
-
-        return False
+        return function(self.to_string(left), self.to_string(right))
 
     def to_number(self, value):
         """转换为数字"""
@@ -8,6 +8,8 @@ from typing import List, Tuple
 
 class Token:
     """Token类"""
+    __slots__ = ('type', 'value', 'line', 'column')
+
     def __init__(self, type: str, value: str, line: int, column: int):
         self.type = type
         self.value = value
@@ -38,13 +40,13 @@ class Lexer:
         'AND', 'OR', 'NOT',
     }
 
-    # Token类型
+    # Token类型（按顺序尝试，先列出的优先）
     TOKEN_PATTERNS = [
         ('COMMENT', r'//[^\n]*'),
         ('REAL', r'\d+\.\d+'),
         ('INTEGER', r'\d+'),
-        ('STRING', r'"([^"\\]|\\.)*"'),
-        ('CHAR', r"'([^'\\]|\\.)'"),
+        ('STRING', r'"(?:[^"\\\n]|\\.)*"'),
+        ('CHAR', r"'(?:[^'\\\n]|\\.)'"),
         ('ARROW', r'<-'),
         ('LE', r'<='),
         ('GE', r'>='),
@@ -67,120 +69,101 @@ class Lexer:
         ('POWER', r'\^'),
         ('AMPERSAND', r'&'),
         ('NAME', r'[a-zA-Z][a-zA-Z0-9_]*'),
-        ('NEWLINE', r'\n'),
-        ('WHITESPACE', r'[ \t]+'),
+        # 行内的空格和制表符，以及行尾的任意空白
+        ('WHITESPACE', r'[ \t]+|[^\S\n]+(?=\n|\Z)'),
     ]
 
+    # 行首：文本开头或上一行的换行符，之后的空行和纯注释行，以及本行的缩进
+    LINE_PATTERN = r'(?:\A|\n)(?:[^\S\n]*(?://[^\n]*)?(?:\n|\Z))*(?P<INDENT>[ \t]*)'
+
     def __init__(self):
-        self.compiled_patterns = [
-            (name, re.compile(pattern))
-            for name, pattern in self.TOKEN_PATTERNS
-        ]
-
-    def tokenize(self, code: str) -> List[Token]:
-        """将代码转换为token流"""
-        lines = code.split('\n')
+        # 所有token模式合并为一个带命名分组的正则表达式：行首最先尝试，其余token连同之前的
+        # 空格一起匹配（减少单独的空白匹配），无法匹配的字符最后匹配
+        self.master_pattern = re.compile(
+            f'(?P<LINE>{self.LINE_PATTERN})|[ \t]*(?:'
+            + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in self.TOKEN_PATTERNS)
+            + '|(?P<MISMATCH>.))'
+        )
+
+    def tokenize(self, code: str, first_line: int = 1) -> List[Token]:
+        """将代码转换为token流
+        用总正则表达式的finditer单遍扫描整个源代码，在行首同时处理INDENT/DEDENT，
+        并跳过空行、纯注释行和行尾空白（无需先调用preprocess_pseudocode，行号即源代码的行号）
+        first_line: 第一行的行号（增量解析只对源代码的一段做词法分析时使用）"""
         tokens = []
+        append = tokens.append
         indent_stack = [0]  # 缩进栈
+        keywords = self.KEYWORDS
+        name_types = {}  # 名称 -> token类型，同一写法只做一次大小写转换和关键字查找
+        length = len(code)
+        line_num = first_line
+        line_start = 0
+
+        for match in self.master_pattern.finditer(code):
+            kind = match.lastgroup
+
+            if kind == 'LINE':
+                line_num += match.group().count('\n')
+                line_start = match.start('INDENT')
+                if match.end() == length:
+                    break  # 之后只有空行
+
+                # 计算当前行的缩进（tab = 4个空格）
+                indent_text = match.group('INDENT')
+                indent = len(indent_text) + 3 * indent_text.count('\t')
+
+                # 处理缩进变化
+                if indent > indent_stack[-1]:
+                    append(Token('INDENT', '<INDENT>', line_num, indent))
+                    indent_stack.append(indent)
+                elif indent < indent_stack[-1]:
+                    while indent_stack and indent < indent_stack[-1]:
+                        append(Token('DEDENT', '<DEDENT>', line_num, indent))
+                        indent_stack.pop()
+                    if not indent_stack or indent != indent_stack[-1]:
+                        raise SyntaxError(f"Indentation error at line {line_num}")
+
+                # 行首添加NEWLINE（用于分隔语句）
+                if tokens and tokens[-1].type != 'NEWLINE':
+                    append(Token('NEWLINE', '\\n', line_num, 0))
+                continue
 
-        for line_num, line in enumerate(lines, 1):
-            # 跳过空行
-            if not line.strip():
+            if kind == 'WHITESPACE' or kind == 'COMMENT':
                 continue
 
-            # 计算当前行的缩进
-            indent = self._count_indent(line)
-            stripped_line = line.strip()
+            value = match.group(kind)
+            column = match.start(kind) - line_start
+            if kind == 'NAME':
+                # 处理关键字（大小写不敏感）
+                kind = name_types.get(value)
+                if kind is None:
+                    upper = value.upper()
+                    kind = name_types[value] = upper if upper in keywords else 'NAME'
+            elif kind == 'MISMATCH':
+                raise SyntaxError(f"Unexpected character '{value}' at line {line_num}, column {column}")
 
-            # 跳过注释行
-            if stripped_line.startswith('//'):
-                continue
+            append(Token(kind, value, line_num, column))
 
-            # 处理缩进变化
-            if indent > indent_stack[-1]:
-                # INDENT
-                tokens.append(Token('INDENT', '<INDENT>', line_num, indent))
-                indent_stack.append(indent)
-            elif indent < indent_stack[-1]:
-                # DEDENT
-                while indent_stack and indent < indent_stack[-1]:
-                    tokens.append(Token('DEDENT', '<DEDENT>', line_num, indent))
-                    indent_stack.pop()
-                if not indent_stack or indent != indent_stack[-1]:
-                    raise SyntaxError(f"Indentation error at line {line_num}")
-
-            # 行首添加NEWLINE（用于分隔语句）
-            if tokens and tokens[-1].type != 'NEWLINE':
-                tokens.append(Token('NEWLINE', '\\n', line_num, 0))
-
-            # 分析该行的token
-            col = 0
-            while col < len(line):
-                # 跳过空格
-                if line[col] in ' \t':
-                    col += 1
-                    continue
-
-                # 匹配token
-                matched = False
-                for token_name, pattern in self.compiled_patterns:
-                    match = pattern.match(line, col)
-                    if match:
-                        value = match.group(0)
-
-                        # 跳过空白
-                        if token_name == 'WHITESPACE':
-                            col = match.end()
-                            matched = True
-                            break
-
-                        # 跳过注释
-                        if token_name == 'COMMENT':
-                            col = len(line)
-                            matched = True
-                            break
-
-                        # 处理关键字
-                        if token_name == 'NAME' and value.upper() in self.KEYWORDS:
-                            token_name = value.upper()
-
-                        tokens.append(Token(token_name, value, line_num, col))
-                        col = match.end()
-                        matched = True
-                        break
-
-                if not matched:
-                    raise SyntaxError(f"Unexpected character '{line[col]}' at line {line_num}, column {col}")
+        last_line = first_line + code.count('\n')
 
         # 行尾添加NEWLINE
         if tokens and tokens[-1].type != 'NEWLINE':
-            tokens.append(Token('NEWLINE', '\\n', len(lines), 0))
+            append(Token('NEWLINE', '\\n', last_line, 0))
 
         # 处理剩余的DEDENT
         while len(indent_stack) > 1:
-            tokens.append(Token('DEDENT', '<DEDENT>', len(lines), 0))
+            append(Token('DEDENT', '<DEDENT>', last_line, 0))
             indent_stack.pop()
 
         # 添加EOF
-        tokens.append(Token('EOF', '<EOF>', len(lines), 0))
+        append(Token('EOF', '<EOF>', last_line, 0))
 
         return tokens
 
-    def _count_indent(self, line: str) -> int:
-        """计算行首缩进（空格数）"""
-        indent = 0
-        for ch in line:
-            if ch == ' ':
-                indent += 1
-            elif ch == '\t':
-                indent += 4  # tab = 4个空格
-            else:
-                break
-        return indent
-
 
 def preprocess_pseudocode(code: str) -> str:
-    """预处理伪代码 - 规范化格式"""
+    """预处理伪代码 - 规范化格式（去掉行尾空白和空行）
+    Lexer.tokenize在扫描时已做同样的处理，词法分析之前无需调用"""
     lines = code.split('\n')
     processed_lines = []
 
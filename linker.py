@@ -0,0 +1,152 @@
+"""
+链接器 - 在执行前把每个函数调用和过程调用绑定到内置函数或子程序定义，并检查参数个数
+
+绑定的结果填写在FunctionCall.builtin和FunctionCall/ProcedureCall.definition中，执行引擎据此直接调用，
+不再在每次调用时按名称查找内置函数表、沿作用域链查找子程序：
+  - 内置函数绑定到builtin_functions中的函数（EOF需要执行引擎的文件管理器，仍按名称调用）
+  - 只定义一次并且定义在程序顶层的子程序，在调用执行时定义语句必定已经执行的情况下绑定到其定义
+    （定义之前的顶层语句都不调用子程序，或者调用出现在定义之后的顶层语句中），定义所在的作用域就是全局作用域
+其余调用（重复定义、嵌套定义、可能在定义语句之前执行）仍在运行时按名称查找，行为与未链接时相同。
+
+调用未定义的子程序或参数个数与所有同名定义都不符时抛出SyntaxError，程序不会开始执行。
+REPL逐行执行的语句不经过链接，全部按名称查找。
+"""
+from typing import Dict, List
+from ast_nodes import *
+from builtin_functions import BUILTIN_FUNCTIONS, FILE_BUILTINS, builtin_arity
+
+
+def iter_nodes(node):
+    """深度优先遍历节点及其所有子节点（不含分析阶段填写的字段）"""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif isinstance(node, ASTNode):
+            yield node
+            fields = node.__dataclass_fields__
+            stack.extend(getattr(node, name) for name in fields if fields[name].compare)
+
+
+def calls_routine(stmt: ASTNode) -> bool:
+    """语句执行时是否可能调用用户子程序（不进入其中的子程序定义）"""
+    stack = [stmt]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif isinstance(node, ASTNode) and not isinstance(node, (ProcedureDef, FunctionDef)):
+            if isinstance(node, ProcedureCall):
+                return True
+            if isinstance(node, FunctionCall) and node.name.upper() not in BUILTIN_FUNCTIONS:
+                return True
+            fields = node.__dataclass_fields__
+            stack.extend(getattr(node, name) for name in fields if fields[name].compare)
+    return False
+
+
+def describe_counts(counts) -> str:
+    """参数个数的描述（"1 argument"、"2 or 3 arguments"）"""
+    counts = sorted(set(counts))
+    text = ' or '.join(str(count) for count in counts)
+    return f"{text} argument{'' if counts == [1] else 's'}"
+
+
+class Linker:
+    """链接器"""
+
+    def __init__(self):
+        self.functions: Dict[str, List[FunctionDef]] = {}    # 大写名称 -> 所有同名FUNCTION定义
+        self.procedures: Dict[str, List[ProcedureDef]] = {}  # 大写名称 -> 所有同名PROCEDURE定义
+        self.positions: Dict[int, int] = {}  # 顶层定义（id） -> 在顶层语句中的位置
+        self.first_call = 0    # 第一条可能调用子程序的顶层语句的位置
+        self.position = None   # 正在链接的顶层语句的位置（子程序体内为None）
+
+    def link(self, program: Program) -> Program:
+        """链接整个程序（原地填写调用节点）"""
+        self.collect_definitions(program)
+        for position, stmt in enumerate(program.statements):
+            self.position = position
+            self.link_nodes(stmt)
+        return program
+
+    def collect_definitions(self, program: Program):
+        """登记所有子程序定义以及顶层定义的位置"""
+        for node in iter_nodes(program):
+            if isinstance(node, FunctionDef):
+                self.functions.setdefault(node.name.upper(), []).append(node)
+            elif isinstance(node, ProcedureDef):
+                self.procedures.setdefault(node.name.upper(), []).append(node)
+
+        statements = program.statements
+        for position, stmt in enumerate(statements):
+            if isinstance(stmt, (ProcedureDef, FunctionDef)):
+                self.positions[id(stmt)] = position
+        self.first_call = next((position for position, stmt in enumerate(statements)
+                                if not isinstance(stmt, (ProcedureDef, FunctionDef)) and calls_routine(stmt)),
+                               len(statements))
+
+    def link_nodes(self, node):
+        """链接节点中的所有调用；进入子程序定义时记为在子程序体内"""
+        if isinstance(node, (ProcedureDef, FunctionDef)):
+            position, self.position = self.position, None
+            try:
+                for child in iter_nodes(node.body):
+                    self.link_node(child)
+            finally:
+                self.position = position
+            return
+        for child in iter_nodes(node):
+            self.link_node(child)
+
+    def link_node(self, node):
+        """链接单个调用节点"""
+        if isinstance(node, FunctionCall):
+            self.link_function_call(node)
+        elif isinstance(node, ProcedureCall):
+            self.link_procedure_call(node)
+
+    def link_function_call(self, call: FunctionCall):
+        """绑定函数调用"""
+        key = call.name.upper()
+        call.builtin = call.definition = None
+        if key in BUILTIN_FUNCTIONS:
+            # 内置函数优先于同名的用户函数
+            lowest, highest = builtin_arity(key)
+            if not lowest <= len(call.arguments) <= highest:
+                raise SyntaxError(f"Builtin function '{call.name}' expects "
+                                  f"{describe_counts(range(lowest, highest + 1))}, got {len(call.arguments)}")
+            if key not in FILE_BUILTINS:
+                call.builtin = BUILTIN_FUNCTIONS[key]
+            return
+        call.definition = self.find_definition('Function', call, self.functions.get(key))
+
+    def link_procedure_call(self, call: ProcedureCall):
+        """绑定过程调用"""
+        call.definition = self.find_definition('Procedure', call, self.procedures.get(call.name.upper()))
+
+    def find_definition(self, kind: str, call, definitions):
+        """检查调用的参数个数，返回可以直接绑定的定义（没有时为None）"""
+        if not definitions:
+            raise SyntaxError(f"Undefined {kind.lower()} '{call.name}'")
+        counts = [len(definition.parameters) for definition in definitions]
+        if len(call.arguments) not in counts:
+            raise SyntaxError(f"{kind} '{call.name}' expects {describe_counts(counts)}, "
+                              f"got {len(call.arguments)}")
+        if len(definitions) == 1 and self.is_defined_before(definitions[0]):
+            return definitions[0]
+        return None
+
+    def is_defined_before(self, definition) -> bool:
+        """调用执行时定义语句是否必定已经执行：定义在顶层，并且在第一条可能调用子程序的顶层语句之前，
+        或者调用本身在定义之后的顶层语句中（不在子程序体内）"""
+        position = self.positions.get(id(definition))
+        if position is None:
+            return False
+        return position < self.first_call or (self.position is not None and self.position > position)
+
+
+def link_program(program: Program) -> Program:
+    """对程序执行链接"""
+    return Linker().link(program)
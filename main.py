@@ -5,48 +5,102 @@ A-level CS 伪代码解释器
 """
 import sys
 import argparse
-from lexer import Lexer, preprocess_pseudocode
-from parser import Parser
-from interpreter import Interpreter
+from engines import ENGINES, DEFAULT_ENGINE, create_interpreter
+import pseudocode_types as pt
 
+# 前端（词法分析、语法分析、链接、优化、类型检查）、语法树缓存、预编译文件和各执行引擎只在用到时导入：
+# 运行.pseudoc时不导入前端，每次只导入所选的一种引擎，调试输出所需的模块也在调试时才导入
 
-def run_file(filename: str, debug: bool = False, strict: bool = False):
-    """运行伪代码文件"""
-    try:
-        # 读取文件
-        with open(filename, 'r', encoding='utf-8') as f:
-            code = f.read()
-
-        # 预处理
-        code = preprocess_pseudocode(code)
-
-        if debug:
-            print("=== Preprocessed Code ===")
-            print(code)
-            print("=" * 50)
+# 预编译文件的扩展名（与artifact.ARTIFACT_SUFFIX相同）
+ARTIFACT_SUFFIX = '.pseudoc'
 
-        # 词法分析
-        lexer = Lexer()
-        tokens = lexer.tokenize(code)
 
-        if debug:
-            print("=== Tokens ===")
-            for token in tokens:
-                print(token)
-            print("=" * 50)
-
-        # 语法分析
-        parser = Parser(tokens)
-        ast = parser.parse()
+def run_file(filename: str, debug: bool = False, strict: bool = False, engine: str = DEFAULT_ENGINE,
+             profile: bool = False, optimize: bool = True, cache_dir: str = None,
+             memoize: bool = False, memo_size: int = None):
+    """运行伪代码文件（指定cache_dir时使用磁盘上的语法树缓存，调试模式除外）
+    扩展名为.pseudoc的预编译文件直接装载其中的程序，不做词法分析和语法分析
+    memoize为True时缓存纯函数的结果（最多memo_size个）"""
+    try:
+        bytecode = None
+        if filename.endswith(ARTIFACT_SUFFIX):
+            # 预编译程序（源文件已修改时自动重新编译）
+            from artifact import load_program
+            try:
+                program = load_program(filename)
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            ast = program.ast
+            diagnostics = program.diagnostics
+            bytecode = program.code
+            if debug:
+                print("=== Compiled Program ===")
+                print(f"{filename}{' (rebuilt from source)' if program.rebuilt else ''}")
+                print("=" * 50)
+        else:
+            # 读取文件
+            with open(filename, 'r', encoding='utf-8') as f:
+                code = f.read()
+
+            if debug:
+                print("=== Source Code ===")
+                print(code)
+                print("=" * 50)
+
+            if cache_dir is not None and not debug:
+                # 前端处理结果缓存在磁盘上：源代码不变时跳过词法分析、语法分析、优化和类型检查
+                from ast_cache import ASTCache
+                front_end = ASTCache(directory=cache_dir).get(code, optimize)
+                ast = front_end.ast
+                diagnostics = front_end.diagnostics
+            else:
+                ast, diagnostics = run_front_end(code, debug, optimize)
+
+        # 类型检查的诊断输出到stderr
+        for message in diagnostics:
+            print(f"Type Warning: {message}", file=sys.stderr)
+
+        # 解释执行（数组存储记入新的内存账）
+        memory = pt.start_memory_account()
+        interpreter = create_interpreter(engine, strict_mode=strict, memoize=memoize, memo_size=memo_size)
+        if engine == 'vm':
+            if bytecode is None:
+                bytecode = interpreter.compile(ast)
+            if debug:
+                from bytecode import disassemble
+                print("=== Bytecode ===")
+                print(disassemble(bytecode))
+                print("=" * 50)
+            interpreter.profile = profile
+            try:
+                interpreter.run_code(bytecode)
+            finally:
+                if profile:
+                    print_instruction_profile(interpreter)
+        elif engine == 'python':
+            interpreter.transpile(ast)
+            if debug:
+                print("=== Python ===")
+                if interpreter.source is not None:
+                    print(interpreter.source)
+                else:
+                    print(f"(fallback to tree interpreter: {interpreter.fallback_reason})")
+                print("=" * 50)
+            interpreter.interpret(ast)
+        else:
+            interpreter.interpret(ast)
 
         if debug:
-            print("=== AST ===")
-            print(ast)
+            print("=== Array Memory ===")
+            print(f"{memory.peak} bytes peak, {memory.used} bytes in use")
             print("=" * 50)
-
-        # 解释执行
-        interpreter = Interpreter(strict_mode=strict)
-        interpreter.interpret(ast)
+            if interpreter.memo is not None:
+                stats = interpreter.memo.stats()
+                print("=== Memoization ===")
+                print(f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+                      f"{stats['entries']}/{stats['capacity']} entries")
+                print("=" * 50)
 
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found")
@@ -54,6 +108,11 @@ def run_file(filename: str, debug: bool = False, strict: bool = False):
     except SyntaxError as e:
         print(f"Syntax Error: {e}")
         sys.exit(1)
+    except RecursionError as e:
+        # 树遍历、闭包和Python转译引擎的调用占用Python调用栈；虚拟机的调用帧在堆上，没有这一限制
+        hint = '' if engine == 'vm' else ' (use --engine vm for deep recursion)'
+        print(f"Runtime Error: {e}{hint}")
+        sys.exit(1)
     except RuntimeError as e:
         print(f"Runtime Error: {e}")
         sys.exit(1)
@@ -64,14 +123,98 @@ def run_file(filename: str, debug: bool = False, strict: bool = False):
         sys.exit(1)
 
 
-def run_repl():
+def compile_file(filename: str, output: str = None, optimize: bool = True):
+    """把源文件编译为预编译文件（.pseudoc）"""
+    from artifact import artifact_path, compile_program
+    output = output or artifact_path(filename)
+    try:
+        program = compile_program(filename, output, optimize)
+        for message in program.diagnostics:
+            print(f"Type Warning: {message}", file=sys.stderr)
+        print(f"Compiled {filename} -> {output}")
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found")
+        sys.exit(1)
+    except SyntaxError as e:
+        print(f"Syntax Error: {e}")
+        sys.exit(1)
+
+
+def run_front_end(code: str, debug: bool = False, optimize: bool = True):
+    """词法分析、语法分析、链接、纯度分析、优化和类型检查，返回(AST, 类型检查的诊断信息)"""
+    from lexer import Lexer
+    from parser import Parser
+    from linker import link_program
+    from memoization import analyze_purity
+    from optimizer import optimize_program
+    from typechecker import check_program
+
+    # 词法分析
+    lexer = Lexer()
+    tokens = lexer.tokenize(code)
+
+    if debug:
+        print("=== Tokens ===")
+        for token in tokens:
+            print(token)
+        print("=" * 50)
+
+    # 语法分析
+    parser = Parser(tokens)
+    ast = parser.parse()
+
+    if debug:
+        print("=== AST ===")
+        print(ast)
+        print("=" * 50)
+
+    # 链接：把调用绑定到内置函数或子程序定义，检查参数个数
+    link_program(ast)
+
+    # 纯度分析：标出可以记忆化的函数
+    analyze_purity(ast)
+
+    # 常量折叠、常量传播、循环不变量外提和公共子表达式消除
+    if optimize:
+        optimization = optimize_program(ast)
+        if debug:
+            print("=== Optimizations ===")
+            for change in optimization.changes:
+                print(change)
+            print(optimization.summary())
+            print("=" * 50)
+
+    # 静态类型检查：已证明安全的语句省略运行时检查
+    type_check = check_program(ast)
+
+    if debug:
+        print("=== Type Check ===")
+        print(f"{type_check.proven}/{type_check.total} runtime type checks proven safe")
+        print("=" * 50)
+
+    return ast, type_check.diagnostics
+
+
+def print_instruction_profile(vm: 'VirtualMachine'):
+    """打印虚拟机指令执行计数（输出到stderr，不影响程序输出）"""
+    total = sum(vm.instruction_counts.values())
+    print("=== Instruction Profile ===", file=sys.stderr)
+    for name, count in sorted(vm.instruction_counts.items(), key=lambda item: -item[1]):
+        print(f"{name:<22} {count:>12} {count * 100.0 / total:6.2f}%", file=sys.stderr)
+    print(f"{'TOTAL':<22} {total:>12}", file=sys.stderr)
+
+
+def run_repl(engine: str = DEFAULT_ENGINE):
     """运行交互式REPL"""
+    from lexer import Lexer
+    from parser import Parser
+
     print("A-level CS Pseudocode Interpreter")
     print("Type 'exit' or 'quit' to exit")
     print("Type 'help' for help")
     print("-" * 50)
 
-    interpreter = Interpreter()
+    interpreter = create_interpreter(engine)
     lexer = Lexer()
 
     while True:
@@ -91,11 +234,8 @@ def run_repl():
             if not line.strip():
                 continue
 
-            # 预处理
-            code = preprocess_pseudocode(line)
-
             # 词法分析
-            tokens = lexer.tokenize(code)
+            tokens = lexer.tokenize(line)
 
             # 语法分析
             parser = Parser(tokens)
@@ -151,6 +291,17 @@ Commands:
     print(help_text)
 
 
+def positive_int(text: str) -> int:
+    """argparse的参数类型：至少为1的整数"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{text}'")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -160,6 +311,13 @@ def main():
 Examples:
   %(prog)s program.pseudo          Run a pseudocode file
   %(prog)s --debug program.pseudo  Run with debug output
+  %(prog)s --engine closure program.pseudo  Run with the closure compiler engine
+  %(prog)s --engine vm --profile program.pseudo  Run on the bytecode VM with an instruction profile
+  %(prog)s --no-optimize program.pseudo  Run without optimizations
+  %(prog)s --memoize program.pseudo  Cache the results of pure functions
+  %(prog)s --cache-dir .pseudo_cache program.pseudo  Reuse the parsed program on later runs
+  %(prog)s compile program.pseudo  Write the checked program to program.pseudoc
+  %(prog)s program.pseudoc         Run a compiled program (rebuilt if the source changed)
   %(prog)s                         Start interactive mode (REPL)
         """
     )
@@ -167,7 +325,19 @@ Examples:
     parser.add_argument(
         'file',
         nargs='?',
-        help='Pseudocode file to execute'
+        help='Pseudocode file (.pseudo) or compiled program (.pseudoc) to execute, or "compile"'
+    )
+
+    parser.add_argument(
+        'source',
+        nargs='?',
+        help='Pseudocode file to compile (with the compile command)'
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        metavar='FILE',
+        help='Output file for the compile command (default: the source name with .pseudoc)'
     )
 
     parser.add_argument(
@@ -182,6 +352,45 @@ Examples:
         help='Enable strict mode (require variable declarations)'
     )
 
+    parser.add_argument(
+        '-e', '--engine',
+        choices=sorted(ENGINES),
+        default=DEFAULT_ENGINE,
+        help=f'Execution engine (default: {DEFAULT_ENGINE})'
+    )
+
+    parser.add_argument(
+        '-p', '--profile',
+        action='store_true',
+        help='Print per-instruction execution counts (vm engine only)'
+    )
+
+    parser.add_argument(
+        '--no-optimize',
+        dest='optimize',
+        action='store_false',
+        help='Disable constant folding, constant propagation and loop optimizations'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help='Cache parsed and checked programs in DIR and reuse them while the source is unchanged'
+    )
+
+    parser.add_argument(
+        '--memoize',
+        action='store_true',
+        help='Cache the results of pure functions by argument values'
+    )
+
+    parser.add_argument(
+        '--memo-size',
+        type=positive_int,
+        metavar='N',
+        help='Maximum number of cached function results with --memoize (default: 10000)'
+    )
+
     parser.add_argument(
         '-v', '--version',
         action='version',
@@ -190,12 +399,20 @@ Examples:
 
     args = parser.parse_args()
 
-    if args.file:
+    if args.file == 'compile':
+        # 编译为预编译文件
+        if not args.source:
+            parser.error('the compile command requires a source file')
+        compile_file(args.source, args.output, args.optimize)
+    elif args.source:
+        parser.error(f'unexpected argument: {args.source}')
+    elif args.file:
         # 运行文件
-        run_file(args.file, args.debug, args.strict)
+        run_file(args.file, args.debug, args.strict, args.engine, args.profile, args.optimize, args.cache_dir,
+                 args.memoize, args.memo_size)
     else:
         # 交互模式
-        run_repl()
+        run_repl(args.engine)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,293 @@
+"""
+纯函数记忆化 - 找出结果只取决于参数值的FUNCTION，运行时按参数值缓存其结果（需显式开启）
+
+纯度分析（前端，为每个FunctionDef填写pure）：函数是纯函数当且仅当
+  - 参数都是传值的简单类型（INTEGER、REAL、STRING、CHAR、BOOLEAN、DATE），返回值也是简单类型
+  - 函数体不做输入输出和文件操作，不调用过程（CALL），不定义子程序或类型
+  - 只读写参数、函数体内声明（DECLARE、CONSTANT、FOR循环变量）之后的局部变量，以及只定义为
+    CONSTANT的全局常量：不写全局变量，也不读可能改变的全局变量
+  - 只调用纯内置函数（不含RAND、RANDOM、RANDOMINT、TODAY、EOF）和其他纯函数（允许递归）
+
+记忆化缓存（执行引擎）：以(函数, 各参数的类型和值)为键，按最近使用（LRU）保留有限个结果，
+统计命中、未命中和淘汰次数。参数中有数组或记录时不缓存。默认不开启：命令行用 --memoize，
+Web接口 /api/run 用 memoize 字段，以免改变按朴素递归评分的练习的行为（如输出调用次数）。
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from ast_nodes import *
+import pseudocode_types as pt
+from builtin_functions import BUILTIN_FUNCTIONS, is_pure_builtin
+
+
+# 缓存默认保留的结果数
+DEFAULT_CAPACITY = 10_000
+
+# 可以作为纯函数参数和返回值的类型
+SCALAR_TYPES = {'INTEGER', 'REAL', 'STRING', 'CHAR', 'BOOLEAN', 'DATE'}
+
+# 可以作为缓存键的参数值（伪代码值不可变，按类型和值比较）
+SCALAR_VALUES = (pt.IntegerType, pt.RealType, pt.StringType, pt.CharType, pt.BooleanType, pt.DateType)
+NATIVE_VALUES = (int, float, str, bool)
+
+_MISSING = object()
+
+
+# ==================== 纯度分析 ====================
+
+def is_scalar_type(type_spec) -> bool:
+    """类型说明是否为简单类型"""
+    return isinstance(type_spec, SimpleType) and type_spec.type_name in SCALAR_TYPES
+
+
+class PurityAnalyzer:
+    """纯度分析"""
+
+    def __init__(self):
+        self.functions: Dict[str, List[FunctionDef]] = {}  # 大写名称 -> 所有同名FUNCTION定义
+        self.constants = set()      # 只定义为CONSTANT的全局名称
+        self.calls: Dict[int, set] = {}  # 候选纯函数（id） -> 调用的用户函数名称
+
+    def analyze(self, program: Program) -> Program:
+        """分析整个程序（原地填写FunctionDef.pure）"""
+        definitions = self.collect(program)
+        candidates = {}
+        for definition in definitions:
+            definition.pure = False
+            calls = set()
+            if (all(not param.by_ref and is_scalar_type(param.type_spec) for param in definition.parameters)
+                    and is_scalar_type(definition.return_type)
+                    and self.check_block(definition.body, {param.name.upper() for param in definition.parameters},
+                                         calls)):
+                candidates[id(definition)] = (definition, calls)
+
+        # 不动点：调用了非纯函数的候选不是纯函数（互相递归的候选保留）
+        changed = True
+        while changed:
+            changed = False
+            for key, (definition, calls) in list(candidates.items()):
+                for name in calls:
+                    callees = self.functions.get(name, [])
+                    if len(callees) != 1 or id(callees[0]) not in candidates:
+                        del candidates[key]
+                        changed = True
+                        break
+
+        for definition, _ in candidates.values():
+            definition.pure = True
+        return program
+
+    def collect(self, program: Program) -> List[FunctionDef]:
+        """登记所有函数定义和全局常量"""
+        definitions = []
+        constant_counts: Dict[str, int] = {}
+        bound = set()   # 以其他方式定义或赋值的名称
+        stack = [(program.statements, False)]
+        while stack:
+            statements, in_routine = stack.pop()
+            for stmt in statements:
+                if isinstance(stmt, FunctionDef):
+                    definitions.append(stmt)
+                    self.functions.setdefault(stmt.name.upper(), []).append(stmt)
+                    stack.append((stmt.body, True))
+                elif isinstance(stmt, ProcedureDef):
+                    stack.append((stmt.body, True))
+                elif isinstance(stmt, ConstantStmt) and not in_routine:
+                    key = stmt.identifier.upper()
+                    constant_counts[key] = constant_counts.get(key, 0) + 1
+                elif isinstance(stmt, (DeclareStmt, ConstantStmt)):
+                    bound.add(stmt.identifier.upper())
+                elif isinstance(stmt, (AssignStmt, InputStmt, FileReadStmt)):
+                    bound.add(stmt.target.name.upper())
+                elif isinstance(stmt, ForStmt):
+                    bound.add(stmt.variable.upper())
+                for block in nested_blocks(stmt):
+                    stack.append((block, in_routine))
+        self.constants = {name for name, count in constant_counts.items() if count == 1 and name not in bound}
+        return definitions
+
+    def check_block(self, statements: List[ASTNode], declared: set, calls: set) -> bool:
+        """检查语句块；declared为已声明的局部名称（块内的声明只在块内及之后有效）"""
+        declared = set(declared)
+        for stmt in statements:
+            if isinstance(stmt, DeclareStmt):
+                if isinstance(stmt.type_spec, ArrayType):
+                    for lower, upper in stmt.type_spec.dimensions:
+                        if not (self.check_expression(lower, declared, calls)
+                                and self.check_expression(upper, declared, calls)):
+                            return False
+                declared.add(stmt.identifier.upper())
+            elif isinstance(stmt, ConstantStmt):
+                if not self.check_expression(stmt.value, declared, calls):
+                    return False
+                declared.add(stmt.identifier.upper())
+            elif isinstance(stmt, AssignStmt):
+                if not (self.check_expression(stmt.value, declared, calls)
+                        and stmt.target.name.upper() in declared
+                        and self.check_expression(stmt.target, declared, calls)):
+                    return False
+            elif isinstance(stmt, ReturnStmt):
+                if not self.check_expression(stmt.value, declared, calls):
+                    return False
+            elif isinstance(stmt, IfStmt):
+                if not (self.check_expression(stmt.condition, declared, calls)
+                        and self.check_block(stmt.then_block, declared, calls)
+                        and self.check_block(stmt.else_block or [], declared, calls)):
+                    return False
+            elif isinstance(stmt, CaseStmt):
+                if not self.is_readable(stmt.identifier, declared):
+                    return False
+                for branch in stmt.branches:
+                    condition = branch.condition
+                    if isinstance(condition, RangeCondition):
+                        expressions = (condition.start, condition.end)
+                    else:
+                        expressions = (condition,)
+                    if not (all(self.check_expression(expr, declared, calls) for expr in expressions)
+                            and self.check_block([branch.statement], declared, calls)):
+                        return False
+                if stmt.otherwise and not self.check_block([stmt.otherwise], declared, calls):
+                    return False
+            elif isinstance(stmt, ForStmt):
+                if not all(self.check_expression(expr, declared, calls)
+                           for expr in (stmt.start, stmt.end, stmt.step) if expr is not None):
+                    return False
+                declared.add(stmt.variable.upper())
+                if not self.check_block(stmt.body, declared, calls):
+                    return False
+            elif isinstance(stmt, WhileStmt):
+                if not (self.check_expression(stmt.condition, declared, calls)
+                        and self.check_block(stmt.body, declared, calls)):
+                    return False
+            elif isinstance(stmt, RepeatStmt):
+                # 条件在循环体之后求值，但循环体内的声明不一定执行过
+                if not (self.check_block(stmt.body, declared, calls)
+                        and self.check_expression(stmt.condition, declared, calls)):
+                    return False
+            else:
+                # 输入输出、文件操作、CALL、子程序和类型定义
+                return False
+        return True
+
+    def check_expression(self, expr, declared: set, calls: set) -> bool:
+        """检查表达式只读取局部名称和全局常量，只调用纯函数"""
+        if isinstance(expr, Literal):
+            return True
+        if isinstance(expr, Identifier):
+            return self.is_readable(expr.name, declared)
+        if isinstance(expr, IdentifierAccess):
+            indices = [index for index in (expr.index1, expr.index2) if index is not None]
+            return (self.is_readable(expr.name, declared)
+                    and all(self.check_expression(index, declared, calls)
+                            for index in indices + list(expr.more_indices)))
+        if isinstance(expr, BinaryOp):
+            return (self.check_expression(expr.left, declared, calls)
+                    and self.check_expression(expr.right, declared, calls))
+        if isinstance(expr, UnaryOp):
+            return self.check_expression(expr.operand, declared, calls)
+        if isinstance(expr, CachedExpr):
+            return self.check_expression(expr.expr, declared, calls)
+        if isinstance(expr, FunctionCall):
+            if not all(self.check_expression(arg, declared, calls) for arg in expr.arguments):
+                return False
+            if expr.name.upper() in BUILTIN_FUNCTIONS:
+                return is_pure_builtin(expr.name)
+            calls.add(expr.name.upper())
+            return True
+        return False
+
+    def is_readable(self, name: str, declared: set) -> bool:
+        """名称是已声明的局部名称或全局常量"""
+        key = name.upper()
+        return key in declared or key in self.constants
+
+
+def nested_blocks(stmt) -> List[List[ASTNode]]:
+    """语句中嵌套的语句块（不含子程序体）"""
+    if isinstance(stmt, IfStmt):
+        return [stmt.then_block, stmt.else_block or []]
+    if isinstance(stmt, CaseStmt):
+        return [[branch.statement for branch in stmt.branches], [stmt.otherwise] if stmt.otherwise else []]
+    if isinstance(stmt, (ForStmt, WhileStmt, RepeatStmt)):
+        return [stmt.body]
+    return []
+
+
+def analyze_purity(program: Program) -> Program:
+    """对程序执行纯度分析"""
+    return PurityAnalyzer().analyze(program)
+
+
+# ==================== 记忆化缓存 ====================
+
+def memo_arguments(arg_values) -> Optional[tuple]:
+    """参数值的缓存键；有不能作为键的参数（数组、记录）时返回None"""
+    key = []
+    for value in arg_values:
+        if isinstance(value, SCALAR_VALUES):
+            key.append((type(value), value.value))
+        elif isinstance(value, NATIVE_VALUES):
+            key.append((type(value), value))
+        else:
+            return None
+    return tuple(key)
+
+
+class MemoCache:
+    """纯函数结果的缓存 - 有界LRU，统计命中次数"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity      # 最多保留的结果数
+        self.entries = OrderedDict()  # {(id(函数), 参数键): 结果}，最近使用的在最后
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, function, arg_values) -> Optional[tuple]:
+        """调用的缓存键；参数不能作为键时返回None（不缓存）"""
+        arguments = memo_arguments(arg_values)
+        if arguments is None:
+            return None
+        return id(function), arguments
+
+    def get(self, key: tuple, default=None):
+        """取出缓存的结果，没有时返回default（计入命中或未命中）"""
+        entries = self.entries
+        value = entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value):
+        """保存结果，超出容量时淘汰最久未使用的结果"""
+        entries = self.entries
+        entries[key] = value
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def wrap(self, function):
+        """包装Python转译后端生成的纯函数"""
+        def memoized(*arg_values):
+            key = self.key(function, arg_values)
+            if key is None:
+                return function(*arg_values)
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = function(*arg_values)
+                self.put(key, value)
+            return value
+
+        return memoized
+
+    def stats(self) -> dict:
+        """命中统计"""
+        return {
+            'entries': len(self.entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
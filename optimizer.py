@@ -0,0 +1,694 @@
+"""
+AST优化器 - 在语法分析之后、执行之前改写AST
+1. 常量折叠：操作数都是字面量的BinaryOp/UnaryOp在编译期求值为字面量
+2. 常量传播：值为字面量的全局CONSTANT，把之后对它的引用替换为字面量，循环中不再沿作用域链查找
+3. 数组边界预求值：边界全部为INTEGER字面量的ARRAY类型填写bounds，创建数组时不再求值边界表达式
+4. 循环不变量外提：循环中不依赖循环内写入的纯表达式包装为CachedExpr，每次执行循环只求值一次
+5. 公共子表达式消除：同一表达式中重复出现的纯子表达式只求值一次
+6. CASE跳转表：开头连续的、条件为同类字面量（或字面量范围）的分支建立跳转表，填写CaseStmt.table
+
+折叠使用Interpreter的运算方法，结果与运行时求值完全一致；求值出错（如除以零）的表达式保持原样，
+错误仍在运行时按原来的顺序报告。CONSTANT语句本身保留，未被替换的引用照常按名称查找。
+循环不变量在第一次用到时才求值（而不是在循环之前），所以不会在原本不执行的分支中引发错误
+"""
+import math
+from typing import Dict, List, Optional
+from ast_nodes import *
+from interpreter import Interpreter, CaseTable
+from typechecker import iter_children, scan_statement
+from builtin_functions import is_builtin_function, is_pure_builtin
+import pseudocode_types as pt
+
+
+# 可以表示为字面量的运行时值类型
+LITERAL_TYPES = {
+    pt.IntegerType: 'INTEGER',
+    pt.RealType: 'REAL',
+    pt.StringType: 'STRING',
+    pt.StringBuilder: 'STRING',
+    pt.CharType: 'CHAR',
+    pt.BooleanType: 'BOOLEAN',
+}
+
+# 整数幂运算折叠时允许的最大指数（避免编译期生成巨大的整数）
+MAX_FOLDED_EXPONENT = 64
+
+# 建立CASE跳转表所需的最少常量分支数（更少的分支逐个比较并不更慢）
+MIN_CASE_TABLE_BRANCHES = 3
+
+# 字面量类型 -> CASE跳转表的键类别（同一张表中的常量必须同类）
+CASE_KEY_KINDS = {'INTEGER': 'numeric', 'REAL': 'numeric', 'STRING': 'string', 'CHAR': 'string'}
+
+
+def describe(expr) -> str:
+    """表达式的伪代码文本（用于--debug报告）"""
+    if isinstance(expr, Literal):
+        if expr.type_hint == 'STRING':
+            return f'"{expr.value}"'
+        if expr.type_hint == 'CHAR':
+            return f"'{expr.value}'"
+        if expr.type_hint == 'BOOLEAN':
+            return 'TRUE' if expr.value else 'FALSE'
+        return str(expr.value)
+    if isinstance(expr, Identifier):
+        return expr.name
+    if isinstance(expr, IdentifierAccess):
+        if expr.index1 is not None:
+            indices = describe(expr.index1)
+            if expr.index2 is not None:
+                indices += f', {describe(expr.index2)}'
+            for index in expr.more_indices:
+                indices += f', {describe(index)}'
+            return f'{expr.name}[{indices}]'
+        if expr.field is not None:
+            return f'{expr.name}.{expr.field}'
+        return expr.name
+    if isinstance(expr, BinaryOp):
+        return f'{describe_operand(expr.left)} {expr.operator} {describe_operand(expr.right)}'
+    if isinstance(expr, UnaryOp):
+        separator = ' ' if expr.operator == 'NOT' else ''
+        return f'{expr.operator}{separator}{describe_operand(expr.operand)}'
+    if isinstance(expr, FunctionCall):
+        return f"{expr.name}({', '.join(describe(arg) for arg in expr.arguments)})"
+    if isinstance(expr, CachedExpr):
+        return describe(expr.expr)
+    return type(expr).__name__
+
+
+def describe_operand(expr) -> str:
+    """运算的操作数（嵌套运算加括号）"""
+    if isinstance(expr, BinaryOp):
+        return f'({describe(expr)})'
+    return describe(expr)
+
+
+def is_name_reference(expr) -> bool:
+    """是否为简单的变量名引用（不含索引和字段）"""
+    if isinstance(expr, Identifier):
+        return True
+    return isinstance(expr, IdentifierAccess) and expr.index1 is None and expr.field is None
+
+
+def expression_key(expr):
+    """表达式的结构键：结构相同的表达式键相同"""
+    if expr is None:
+        return None
+    if isinstance(expr, Literal):
+        return ('L', expr.type_hint, repr(expr.value))
+    if is_name_reference(expr):
+        return ('V', expr.name.upper())
+    if isinstance(expr, IdentifierAccess):
+        return ('A', expr.name.upper(), expression_key(expr.index1), expression_key(expr.index2),
+                tuple(expression_key(index) for index in expr.more_indices), expr.field)
+    if isinstance(expr, BinaryOp):
+        return ('B', expr.operator, expression_key(expr.left), expression_key(expr.right))
+    if isinstance(expr, UnaryOp):
+        return ('U', expr.operator, expression_key(expr.operand))
+    if isinstance(expr, FunctionCall):
+        return ('C', expr.name.upper(), tuple(expression_key(arg) for arg in expr.arguments))
+    if isinstance(expr, CachedExpr):
+        return ('K', expr.slot)
+    return ('?', id(expr))
+
+
+def expression_facts(expr, names: set) -> tuple:
+    """收集表达式读取的变量名（大写），返回(是否为纯表达式, 是否读取数组元素或记录字段)
+    纯表达式只含运算、变量读取和结果只取决于参数的内置函数；已缓存的表达式视为纯的叶子"""
+    if isinstance(expr, (Literal, CachedExpr)) or expr is None:
+        return True, False
+    if isinstance(expr, Identifier):
+        names.add(expr.name.upper())
+        return True, False
+    if isinstance(expr, IdentifierAccess):
+        names.add(expr.name.upper())
+        pure = True
+        for index in (expr.index1, expr.index2, *expr.more_indices):
+            if index is not None:
+                pure &= expression_facts(index, names)[0]
+        return pure, expr.index1 is not None or expr.field is not None
+    if isinstance(expr, BinaryOp):
+        left_pure, left_elements = expression_facts(expr.left, names)
+        right_pure, right_elements = expression_facts(expr.right, names)
+        return left_pure and right_pure, left_elements or right_elements
+    if isinstance(expr, UnaryOp):
+        return expression_facts(expr.operand, names)
+    if isinstance(expr, FunctionCall):
+        pure, elements = is_pure_builtin(expr.name), False
+        for arg in expr.arguments:
+            arg_pure, arg_elements = expression_facts(arg, names)
+            pure &= arg_pure
+            elements |= arg_elements
+        return pure, elements
+    return False, False
+
+
+def is_compound(expr) -> bool:
+    """是否为值得缓存的表达式（运算、函数调用、数组元素或记录字段）"""
+    if isinstance(expr, (BinaryOp, UnaryOp, FunctionCall)):
+        return True
+    return isinstance(expr, IdentifierAccess) and not is_name_reference(expr)
+
+
+def map_children(expr, rewrite):
+    """用rewrite替换表达式的直接子表达式（原地修改）"""
+    if isinstance(expr, IdentifierAccess):
+        if expr.index1 is not None:
+            expr.index1 = rewrite(expr.index1)
+        if expr.index2 is not None:
+            expr.index2 = rewrite(expr.index2)
+        if expr.more_indices:
+            expr.more_indices = tuple(rewrite(index) for index in expr.more_indices)
+    elif isinstance(expr, BinaryOp):
+        expr.left = rewrite(expr.left)
+        expr.right = rewrite(expr.right)
+    elif isinstance(expr, UnaryOp):
+        expr.operand = rewrite(expr.operand)
+    elif isinstance(expr, FunctionCall):
+        expr.arguments = [rewrite(arg) for arg in expr.arguments]
+    return expr
+
+
+def rewrite_expressions(stmt, rewrite):
+    """用rewrite替换语句自身的各个表达式（不进入嵌套的语句块）"""
+    if isinstance(stmt, (AssignStmt, InputStmt, FileReadStmt)):
+        if isinstance(stmt, AssignStmt):
+            stmt.value = rewrite(stmt.value)
+        map_children(stmt.target, rewrite)
+    elif isinstance(stmt, (ConstantStmt, ReturnStmt, FileWriteStmt)):
+        stmt.value = rewrite(stmt.value)
+    elif isinstance(stmt, OutputStmt):
+        stmt.items = [rewrite(item) for item in stmt.items]
+    elif isinstance(stmt, (IfStmt, WhileStmt, RepeatStmt)):
+        stmt.condition = rewrite(stmt.condition)
+    elif isinstance(stmt, CaseStmt):
+        for branch in stmt.branches:
+            if isinstance(branch.condition, RangeCondition):
+                branch.condition.start = rewrite(branch.condition.start)
+                branch.condition.end = rewrite(branch.condition.end)
+            else:
+                branch.condition = rewrite(branch.condition)
+    elif isinstance(stmt, ForStmt):
+        stmt.start = rewrite(stmt.start)
+        stmt.end = rewrite(stmt.end)
+        if stmt.step:
+            stmt.step = rewrite(stmt.step)
+    elif isinstance(stmt, ProcedureCall):
+        stmt.arguments = [rewrite(arg) for arg in stmt.arguments]
+
+
+def nested_blocks(stmt) -> List[List[ASTNode]]:
+    """语句中嵌套的语句块"""
+    if isinstance(stmt, IfStmt):
+        return [stmt.then_block, stmt.else_block or []]
+    if isinstance(stmt, CaseStmt):
+        return [[branch.statement for branch in stmt.branches], [stmt.otherwise] if stmt.otherwise else []]
+    if isinstance(stmt, (ForStmt, WhileStmt, RepeatStmt, ProcedureDef, FunctionDef)):
+        return [stmt.body]
+    return []
+
+
+def iter_statements(statements: List[ASTNode]):
+    """深度优先遍历语句（包括子程序体）"""
+    for stmt in statements:
+        yield stmt
+        for block in nested_blocks(stmt):
+            yield from iter_statements(block)
+
+
+class ConstantFolder:
+    """常量折叠和常量传播"""
+
+    def __init__(self):
+        self.evaluator = Interpreter()
+        self.changes: List[str] = []
+        self.folded = 0         # 折叠的运算数
+        self.propagated = 0     # 替换为字面量的常量引用数
+        self.array_bounds = 0   # 预先求值边界的数组类型数
+        self.case_tables = 0    # 建立跳转表的CASE语句数
+        self.constants: Dict[str, Literal] = {}   # 当前位置可传播的常量（大写名称 -> 字面量）
+        self.candidates: set = set()              # 可以传播的常量名称
+        self.byref_positions: Dict[str, set] = {}  # 过程名 -> BYREF参数位置
+
+    # ==================== 入口 ====================
+
+    def optimize(self, program: Program) -> 'ConstantFolder':
+        """优化整个程序（原地改写AST）"""
+        self.collect_names(program)
+        routine_constants = self.collect_routine_constants(program)
+
+        # 顶层语句按执行顺序处理：只有已经执行过的CONSTANT才能传播
+        visible: Dict[str, Literal] = {}
+        for stmt in program.statements:
+            if isinstance(stmt, (ProcedureDef, FunctionDef)):
+                self.constants = routine_constants
+                self.optimize_statement(stmt)
+            else:
+                # TYPE中的数组边界在创建记录时求值，此时TYPE之前的常量都已定义
+                self.constants = visible
+                self.optimize_statement(stmt)
+                self.bind_constant(stmt, visible)
+        return self
+
+    def summary(self) -> str:
+        """优化结果摘要"""
+        return (f"{self.folded} operations folded, {self.propagated} constant uses propagated, "
+                f"{self.array_bounds} array bounds pre-evaluated, {self.case_tables} CASE jump tables")
+
+    # ==================== 收集名称 ====================
+
+    def collect_names(self, program: Program):
+        """找出可以传播的常量：在顶层只定义一次，且名称没有被用作变量、参数或循环变量"""
+        constant_counts: Dict[str, int] = {}
+        bound = set()
+        stack = list(program.statements)
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, ASTNode):
+                continue
+            if isinstance(node, ConstantStmt):
+                key = node.identifier.upper()
+                constant_counts[key] = constant_counts.get(key, 0) + 1
+            elif isinstance(node, DeclareStmt):
+                bound.add(node.identifier.upper())
+            elif isinstance(node, (AssignStmt, InputStmt, FileReadStmt)):
+                bound.add(node.target.name.upper())
+            elif isinstance(node, ForStmt):
+                bound.add(node.variable.upper())
+            elif isinstance(node, (ProcedureDef, FunctionDef)):
+                bound.add(node.name.upper())
+                for position, param in enumerate(node.parameters):
+                    bound.add(param.name.upper())
+                    if param.by_ref and isinstance(node, ProcedureDef):
+                        self.byref_positions.setdefault(node.name.upper(), set()).add(position)
+            stack.extend(iter_children(node))
+
+        top_level = {stmt.identifier.upper() for stmt in program.statements if isinstance(stmt, ConstantStmt)}
+        self.candidates = {name for name in top_level
+                           if constant_counts[name] == 1 and name not in bound}
+
+    def collect_routine_constants(self, program: Program) -> Dict[str, Literal]:
+        """子程序体中可以传播的常量：在第一条可能调用用户子程序的顶层语句之前定义的常量
+        （子程序只会在这之后被调用，此时这些常量都已定义）"""
+        constants: Dict[str, Literal] = {}
+        self.constants = constants
+        for stmt in program.statements:
+            if isinstance(stmt, (ProcedureDef, FunctionDef, TypeDefStmt, Comment)):
+                continue
+            if scan_statement(stmt, set()):
+                break
+            if isinstance(stmt, ConstantStmt):
+                stmt.value = self.optimize_expression(stmt.value)
+                self.bind_constant(stmt, constants)
+        return dict(constants)
+
+    def bind_constant(self, stmt, constants: Dict[str, Literal]):
+        """值已折叠为字面量的候选常量登记为可传播"""
+        if isinstance(stmt, ConstantStmt) and isinstance(stmt.value, Literal):
+            name = stmt.identifier.upper()
+            if name in self.candidates:
+                constants[name] = stmt.value
+
+    # ==================== 语句 ====================
+
+    def optimize_block(self, statements: List[ASTNode]):
+        """优化语句块"""
+        for stmt in statements:
+            self.optimize_statement(stmt)
+
+    def optimize_statement(self, stmt: ASTNode):
+        """优化语句（原地替换其中的表达式）"""
+        if isinstance(stmt, DeclareStmt):
+            self.optimize_type_spec(stmt.type_spec, stmt.identifier)
+        elif isinstance(stmt, ConstantStmt):
+            stmt.value = self.optimize_expression(stmt.value)
+        elif isinstance(stmt, TypeDefStmt):
+            for field in stmt.fields:
+                self.optimize_type_spec(field.type_spec, f'{stmt.name}.{field.identifier}')
+        elif isinstance(stmt, AssignStmt):
+            stmt.value = self.optimize_expression(stmt.value)
+            self.optimize_target(stmt.target)
+        elif isinstance(stmt, (InputStmt, FileReadStmt)):
+            self.optimize_target(stmt.target)
+        elif isinstance(stmt, OutputStmt):
+            stmt.items = [self.optimize_expression(item) for item in stmt.items]
+        elif isinstance(stmt, IfStmt):
+            stmt.condition = self.optimize_expression(stmt.condition)
+            self.optimize_block(stmt.then_block)
+            if stmt.else_block:
+                self.optimize_block(stmt.else_block)
+        elif isinstance(stmt, CaseStmt):
+            for branch in stmt.branches:
+                condition = branch.condition
+                if isinstance(condition, RangeCondition):
+                    condition.start = self.optimize_expression(condition.start)
+                    condition.end = self.optimize_expression(condition.end)
+                else:
+                    branch.condition = self.optimize_expression(condition)
+                self.optimize_statement(branch.statement)
+            if stmt.otherwise:
+                self.optimize_statement(stmt.otherwise)
+            self.build_case_table(stmt)
+        elif isinstance(stmt, ForStmt):
+            stmt.start = self.optimize_expression(stmt.start)
+            stmt.end = self.optimize_expression(stmt.end)
+            if stmt.step:
+                stmt.step = self.optimize_expression(stmt.step)
+            self.optimize_block(stmt.body)
+        elif isinstance(stmt, WhileStmt):
+            stmt.condition = self.optimize_expression(stmt.condition)
+            self.optimize_block(stmt.body)
+        elif isinstance(stmt, RepeatStmt):
+            self.optimize_block(stmt.body)
+            stmt.condition = self.optimize_expression(stmt.condition)
+        elif isinstance(stmt, (ProcedureDef, FunctionDef)):
+            self.optimize_block(stmt.body)
+        elif isinstance(stmt, ProcedureCall):
+            byref = self.byref_positions.get(stmt.name.upper(), ())
+            # BYREF实参必须保持为变量引用
+            stmt.arguments = [arg if position in byref and is_name_reference(arg)
+                              else self.optimize_expression(arg)
+                              for position, arg in enumerate(stmt.arguments)]
+        elif isinstance(stmt, (ReturnStmt, FileWriteStmt)):
+            stmt.value = self.optimize_expression(stmt.value)
+
+    def optimize_target(self, target: IdentifierAccess):
+        """优化赋值目标中的数组索引（目标本身不替换）"""
+        if target.index1 is not None:
+            target.index1 = self.optimize_expression(target.index1)
+        if target.index2 is not None:
+            target.index2 = self.optimize_expression(target.index2)
+        if target.more_indices:
+            target.more_indices = tuple(self.optimize_expression(index) for index in target.more_indices)
+
+    def optimize_type_spec(self, type_spec, name: str):
+        """优化数组边界；边界全部为INTEGER字面量时预先求值"""
+        if not isinstance(type_spec, ArrayType):
+            return
+        type_spec.dimensions = [(self.optimize_expression(lower), self.optimize_expression(upper))
+                                for lower, upper in type_spec.dimensions]
+        bounds = []
+        for lower, upper in type_spec.dimensions:
+            if not (isinstance(lower, Literal) and lower.type_hint == 'INTEGER'
+                    and isinstance(upper, Literal) and upper.type_hint == 'INTEGER'):
+                return
+            bounds.append((lower.value, upper.value))
+        type_spec.bounds = tuple(bounds)
+        self.array_bounds += 1
+        text = ', '.join(f'{lower}:{upper}' for lower, upper in bounds)
+        self.changes.append(f"ARRAY bounds of {name}: [{text}]")
+
+    def build_case_table(self, stmt: CaseStmt):
+        """为开头连续的常量分支建立跳转表：条件是同类字面量（数值或字符串）或两端都是这类字面量的范围"""
+        conditions = []
+        kind = None
+        for branch in stmt.branches:
+            condition = branch.condition
+            if isinstance(condition, RangeCondition):
+                literals = (condition.start, condition.end)
+            else:
+                literals = (condition,)
+            if not all(isinstance(literal, Literal) for literal in literals):
+                break
+            kinds = {CASE_KEY_KINDS.get(literal.type_hint) for literal in literals}
+            if len(kinds) != 1 or None in kinds or (kind is not None and kinds != {kind}):
+                break
+            kind = kinds.pop()
+            values = [self.evaluator.evaluate_expression(literal) for literal in literals]
+            conditions.append((values[0], values[1] if len(values) == 2 else None))
+
+        if len(conditions) < MIN_CASE_TABLE_BRANCHES:
+            return
+        stmt.table = CaseTable(conditions, kind == 'numeric')
+        self.case_tables += 1
+        self.changes.append(f"CASE OF {stmt.identifier}: jump table for {len(conditions)} "
+                            f"of {len(stmt.branches)} branches")
+
+    # ==================== 表达式 ====================
+
+    def optimize_expression(self, expr):
+        """优化一个完整的表达式，有改动时记录到changes"""
+        if expr is None or isinstance(expr, Literal):
+            return expr
+        before = (self.folded, self.propagated)
+        text = describe(expr)
+        result = self.fold(expr)
+        if (self.folded, self.propagated) != before:
+            self.changes.append(f"{text} -> {describe(result)}")
+        return result
+
+    def fold(self, expr):
+        """自底向上折叠表达式，返回新的表达式"""
+        if isinstance(expr, Identifier):
+            return self.propagate(expr)
+        if isinstance(expr, IdentifierAccess):
+            if expr.index1 is None and expr.field is None:
+                return self.propagate(expr)
+            expr.index1 = self.fold(expr.index1)
+            if expr.index2 is not None:
+                expr.index2 = self.fold(expr.index2)
+            if expr.more_indices:
+                expr.more_indices = tuple(self.fold(index) for index in expr.more_indices)
+            return expr
+        if isinstance(expr, BinaryOp):
+            expr.left = self.fold(expr.left)
+            expr.right = self.fold(expr.right)
+            if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+                return self.evaluate(expr)
+            return expr
+        if isinstance(expr, UnaryOp):
+            expr.operand = self.fold(expr.operand)
+            if isinstance(expr.operand, Literal):
+                return self.evaluate(expr)
+            return expr
+        if isinstance(expr, FunctionCall):
+            expr.arguments = [self.fold(arg) for arg in expr.arguments]
+            return expr
+        return expr
+
+    def propagate(self, reference):
+        """常量引用替换为字面量"""
+        literal = self.constants.get(reference.name.upper())
+        if literal is None:
+            return reference
+        self.propagated += 1
+        return Literal(literal.value, literal.type_hint)
+
+    def evaluate(self, expr):
+        """用解释器求值操作数都是字面量的运算；无法表示为字面量或求值出错时保持原样"""
+        if (isinstance(expr, BinaryOp) and expr.operator == '^'
+                and isinstance(expr.right.value, int) and abs(expr.right.value) > MAX_FOLDED_EXPONENT):
+            return expr
+        try:
+            if isinstance(expr, BinaryOp):
+                value = self.evaluator.evaluate_binary_op(expr)
+            else:
+                value = self.evaluator.evaluate_unary_op(expr)
+        except Exception:
+            return expr
+        type_hint = LITERAL_TYPES.get(type(value))
+        if type_hint is None:
+            return expr
+        if type_hint == 'REAL' and not math.isfinite(value.value):
+            return expr
+        self.folded += 1
+        return Literal(value.value, type_hint)
+
+
+class LoopOptimizer:
+    """循环不变量外提和语句内公共子表达式消除"""
+
+    def __init__(self):
+        self.changes: List[str] = []
+        self.hoisted = 0      # 外提的循环不变量数
+        self.reused = 0       # 复用公共子表达式的次数
+        self.slot_count = 0   # 已分配的缓存槽位数
+
+    def optimize(self, program: Program) -> 'LoopOptimizer':
+        """优化整个程序（原地改写AST）"""
+        for stmt in iter_statements(program.statements):
+            if isinstance(stmt, (ForStmt, WhileStmt, RepeatStmt)):
+                self.hoist_invariants(stmt)
+        for stmt in iter_statements(program.statements):
+            self.eliminate_common_subexpressions(stmt)
+        return self
+
+    def summary(self) -> str:
+        """优化结果摘要"""
+        return f"{self.hoisted} loop invariants hoisted, {self.reused} common subexpressions reused"
+
+    def new_slot(self) -> int:
+        """分配缓存槽位"""
+        slot = self.slot_count
+        self.slot_count += 1
+        return slot
+
+    # ==================== 循环不变量 ====================
+
+    def scan_loop(self, loop) -> Optional[tuple]:
+        """收集循环中写入的变量名；循环中有用户子程序调用或定义，或读写BYREF参数时返回None
+        （被调用的子程序可能修改全局变量或BYREF实参，递归调用还会重入同一个循环；
+        BYREF参数与它引用的变量互为别名，按名称无法判断写入影响哪些读取）"""
+        writes = set()
+        element_writes = False
+        stack = [loop]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, ASTNode):
+                continue
+            if isinstance(node, (ProcedureCall, ProcedureDef, FunctionDef)):
+                return None
+            if isinstance(node, FunctionCall) and not is_builtin_function(node.name):
+                return None
+            if isinstance(node, (Identifier, IdentifierAccess, CaseStmt)) and node.by_ref:
+                return None
+            if isinstance(node, (AssignStmt, InputStmt, FileReadStmt)):
+                writes.add(node.target.name.upper())
+                if not is_name_reference(node.target):
+                    # 数组可能互为别名，写入任何元素都使所有元素读取失效
+                    element_writes = True
+            elif isinstance(node, ForStmt):
+                writes.add(node.variable.upper())
+            elif isinstance(node, (DeclareStmt, ConstantStmt)):
+                writes.add(node.identifier.upper())
+            stack.extend(iter_children(node))
+        return writes, element_writes
+
+    def hoist_invariants(self, loop):
+        """把循环中最大的不变纯子表达式包装为CachedExpr，进入循环时清空这些槽位"""
+        scan = self.scan_loop(loop)
+        if scan is None:
+            return
+        writes, element_writes = scan
+        slots: Dict[tuple, int] = {}
+
+        def hoist(expr):
+            if not is_compound(expr):
+                return expr
+            names = set()
+            pure, reads_elements = expression_facts(expr, names)
+            if pure and not (names & writes) and not (reads_elements and element_writes):
+                key = expression_key(expr)
+                if key not in slots:
+                    slots[key] = self.new_slot()
+                    self.hoisted += 1
+                    self.changes.append(f"loop invariant: {describe(expr)}")
+                return CachedExpr(expr, slots[key])
+            return map_children(expr, hoist)
+
+        # FOR的起始值、结束值和步长只在进入循环时求值一次，不在此列
+        if not isinstance(loop, ForStmt):
+            rewrite_expressions(loop, hoist)
+        for stmt in iter_statements(loop.body):
+            rewrite_expressions(stmt, hoist)
+        if slots:
+            loop.invariants = tuple(slots.values())
+
+    # ==================== 公共子表达式 ====================
+
+    def eliminate_common_subexpressions(self, stmt):
+        """语句的每个表达式中，重复出现的纯子表达式第一次求值后缓存，其余出现处直接使用
+        含用户函数调用的语句不处理：被调用的函数可能修改变量，也可能重入同一条语句"""
+        stack = []
+        rewrite_expressions(stmt, lambda expr: stack.append(expr) or expr)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, FunctionCall) and not is_builtin_function(node.name):
+                return
+            if isinstance(node, ASTNode):
+                stack.extend(iter_children(node))
+        rewrite_expressions(stmt, self.eliminate_in_region)
+
+    def eliminate_in_region(self, expr):
+        """在一个求值区域内消除公共子表达式
+        AND/OR的操作数各自作为独立区域，保证第一次出现总是先于其余出现被求值"""
+        counts: Dict[tuple, int] = {}
+
+        def count(node):
+            if isinstance(node, BinaryOp) and node.operator in ('AND', 'OR'):
+                node.left = self.eliminate_in_region(node.left)
+                node.right = self.eliminate_in_region(node.right)
+                return node
+            if is_compound(node) and expression_facts(node, set())[0]:
+                key = expression_key(node)
+                counts[key] = counts.get(key, 0) + 1
+            return map_children(node, count)
+
+        expr = count(expr)
+        if all(n < 2 for n in counts.values()):
+            return expr
+
+        # 按求值顺序（先左后右）标记：第一次出现刷新槽位，其余出现读取槽位
+        slots: Dict[tuple, int] = {}
+        reads: Dict[int, int] = {}
+
+        def mark(node):
+            if isinstance(node, BinaryOp) and node.operator in ('AND', 'OR'):
+                return node
+            if is_compound(node) and counts.get(expression_key(node), 0) >= 2:
+                key = expression_key(node)
+                if key in slots:
+                    reads[slots[key]] += 1
+                    return CachedExpr(node, slots[key])
+                slots[key] = slot = self.new_slot()
+                reads[slot] = 0
+                return CachedExpr(map_children(node, mark), slot, refresh=True)
+            return map_children(node, mark)
+
+        def unwrap(node):
+            # 其余出现都位于已缓存的更大表达式之中时，第一次出现无需缓存
+            if isinstance(node, CachedExpr) and node.slot in reads:
+                if node.refresh and reads[node.slot] == 0:
+                    return map_children(node.expr, unwrap)
+                if node.refresh:
+                    node.expr = map_children(node.expr, unwrap)
+                return node
+            if isinstance(node, BinaryOp) and node.operator in ('AND', 'OR'):
+                return node
+            return map_children(node, unwrap)
+
+        expr = unwrap(mark(expr))
+        for key, slot in slots.items():
+            if reads[slot]:
+                self.reused += reads[slot]
+        for node in self.cached_nodes(expr):
+            if node.refresh and reads.get(node.slot):
+                self.changes.append(f"common subexpression: {describe(node)} (reused {reads[node.slot]}x)")
+        return expr
+
+    @staticmethod
+    def cached_nodes(expr):
+        """表达式中的CachedExpr节点"""
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, CachedExpr):
+                yield node
+            if isinstance(node, ASTNode):
+                stack.extend(iter_children(node))
+
+
+class Optimizer:
+    """依次运行各个优化遍"""
+
+    def __init__(self):
+        self.passes = [ConstantFolder(), LoopOptimizer()]
+
+    def optimize(self, program: Program) -> 'Optimizer':
+        """优化整个程序（原地改写AST）"""
+        for optimization in self.passes:
+            optimization.optimize(program)
+        return self
+
+    @property
+    def changes(self) -> List[str]:
+        """各优化遍的改写记录"""
+        return [change for optimization in self.passes for change in optimization.changes]
+
+    def summary(self) -> str:
+        """优化结果摘要"""
+        return '; '.join(optimization.summary() for optimization in self.passes)
+
+
+def optimize_program(program: Program) -> Optimizer:
+    """对程序执行常量折叠、常量传播、循环不变量外提和公共子表达式消除"""
+    return Optimizer().optimize(program)
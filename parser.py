@@ -1,15 +1,32 @@
 """
-语法分析器 - 递归下降解析器
+语法分析器 - 递归下降解析器（表达式使用运算符优先级分析）
 将token流转换为AST
 """
 from typing import List, Optional
 from lexer import Token
 from ast_nodes import *
+from ast_nodes import PARSER_VERSION  # 前端输出格式版本（定义在ast_nodes中，装载预编译程序时不必导入语法分析器）
+from resolver import resolve_program
 
 
 class Parser:
     """递归下降语法分析器"""
 
+    # 二元运算符的token类型 -> (优先级, 右操作数的最低优先级)
+    # 右操作数的最低优先级比自身高一级为左结合，与自身相同为右结合（幂运算）
+    BINARY_OPERATORS = {
+        'OR': (1, 2),
+        'AND': (2, 3),
+        'EQ': (4, 5), 'NE': (4, 5), 'LT': (4, 5), 'GT': (4, 5), 'LE': (4, 5), 'GE': (4, 5),
+        'AMPERSAND': (5, 6),
+        'PLUS': (6, 7), 'MINUS': (6, 7),
+        'MULTIPLY': (7, 8), 'DIVIDE': (7, 8),
+        'POWER': (8, 8),
+    }
+
+    # NOT的优先级：只能出现在表达式开头或AND/OR之后，操作数包括比较运算
+    NOT_PRECEDENCE = 3
+
     def __init__(self, tokens: List[Token]):
         self.tokens = tokens
         self.pos = 0
@@ -55,16 +72,27 @@ class Parser:
 
     def parse(self) -> Program:
         """解析整个程序"""
+        statements = [stmt for _, stmt in self.parse_top_level()]
+
+        # 名称解析：为变量引用分配(depth, slot)
+        return resolve_program(Program(statements))
+
+    def parse_top_level(self) -> list:
+        """解析全部顶层语句（不做名称解析），返回[(语句第一个token的行号, 语句)]
+
+        语句不是从一行的开头开始时（与前一条语句在同一行）行号为None。
+        """
         statements = []
         self.skip_newlines()
 
         while not self.match('EOF'):
+            line = self.current.line if self.pos == 0 or self.tokens[self.pos - 1].type == 'NEWLINE' else None
             stmt = self.parse_statement()
             if stmt:
-                statements.append(stmt)
+                statements.append((line, stmt))
             self.skip_newlines()
 
-        return Program(statements)
+        return statements
 
     def parse_statement(self):
         """解析语句"""
@@ -179,8 +207,8 @@ class Parser:
         upper = self.parse_expression()
         dimensions.append((lower, upper))
 
-        # 第二个维度（可选）
-        if self.match('COMMA'):
+        # 其余维度（可选，维数不限）
+        while self.match('COMMA'):
             self.advance()
             lower = self.parse_expression()
             self.expect('COLON')
@@ -218,11 +246,15 @@ class Parser:
             index1 = self.parse_expression()
 
             if self.match('COMMA'):
-                # 二维数组
+                # 二维及以上数组
                 self.advance()
                 index2 = self.parse_expression()
+                more_indices = []
+                while self.match('COMMA'):
+                    self.advance()
+                    more_indices.append(self.parse_expression())
                 self.expect('RBRACKET')
-                return IdentifierAccess(name, index1, index2)
+                return IdentifierAccess(name, index1, index2, more_indices=tuple(more_indices))
             else:
                 # 一维数组
                 self.expect('RBRACKET')
@@ -569,156 +601,66 @@ class Parser:
 
     # ==================== 表达式解析 ====================
 
-    def parse_expression(self):
-        """解析表达式"""
-        return self.parse_logical_or()
-
-    def parse_logical_or(self):
-        """解析逻辑OR"""
-        left = self.parse_logical_and()
-
-        while self.match('OR'):
-            op = self.current.value
-            self.advance()
-            right = self.parse_logical_and()
-            left = BinaryOp(op, left, right)
-
-        return left
-
-    def parse_logical_and(self):
-        """解析逻辑AND"""
-        left = self.parse_logical_not()
-
-        while self.match('AND'):
-            op = self.current.value
-            self.advance()
-            right = self.parse_logical_not()
-            left = BinaryOp(op, left, right)
-
-        return left
-
-    def parse_logical_not(self):
-        """解析逻辑NOT"""
-        if self.match('NOT'):
-            op = self.current.value
-            self.advance()
-            operand = self.parse_logical_not()
-            return UnaryOp(op, operand)
-
-        return self.parse_comparison()
-
-    def parse_comparison(self):
-        """解析比较运算"""
-        left = self.parse_concat()
-
-        while self.match('EQ', 'NE', 'LT', 'GT', 'LE', 'GE'):
-            if self.current.type == 'EQ':
-                op = '='
-            elif self.current.type == 'NE':
-                op = '<>'
-            elif self.current.type == 'LT':
-                op = '<'
-            elif self.current.type == 'GT':
-                op = '>'
-            elif self.current.type == 'LE':
-                op = '<='
-            else:
-                op = '>='
-
-            self.advance()
-            right = self.parse_concat()
-            left = BinaryOp(op, left, right)
-
-        return left
-
-    def parse_concat(self):
-        """解析字符串连接"""
-        left = self.parse_add_sub()
-
-        while self.match('AMPERSAND'):
-            op = '&'
-            self.advance()
-            right = self.parse_add_sub()
-            left = BinaryOp(op, left, right)
-
-        return left
-
-    def parse_add_sub(self):
-        """解析加减"""
-        left = self.parse_mul_div()
-
-        while self.match('PLUS', 'MINUS'):
-            op = self.current.value
-            self.advance()
-            right = self.parse_mul_div()
-            left = BinaryOp(op, left, right)
-
-        return left
-
-    def parse_mul_div(self):
-        """解析乘除"""
-        left = self.parse_power()
-
-        while self.match('MULTIPLY', 'DIVIDE'):
-            op = self.current.value
+    def parse_expression(self, min_precedence: int = 1):
+        """解析表达式（运算符优先级分析）
+        先解析前缀部分（NOT、一元运算和基本表达式），再在一个循环中按BINARY_OPERATORS
+        结合所有优先级不低于min_precedence的二元运算符，右操作数递归解析"""
+        token = self.current
+        if token.type == 'NOT' and min_precedence <= self.NOT_PRECEDENCE:
             self.advance()
-            right = self.parse_power()
-            left = BinaryOp(op, left, right)
-
-        return left
-
-    def parse_power(self):
-        """解析幂运算"""
-        left = self.parse_unary()
-
-        if self.match('POWER'):
-            op = self.current.value
+            left = UnaryOp(token.value, self.parse_expression(self.NOT_PRECEDENCE))
+        else:
+            left = self.parse_unary()
+
+        operators = self.BINARY_OPERATORS
+        while True:
+            token = self.current
+            operator = operators.get(token.type)
+            if operator is None or operator[0] < min_precedence:
+                return left
             self.advance()
-            right = self.parse_power()  # 右结合
-            left = BinaryOp(op, left, right)
-
-        return left
+            left = BinaryOp(token.value, left, self.parse_expression(operator[1]))
 
     def parse_unary(self):
-        """解析一元运算"""
-        if self.match('MINUS', 'PLUS'):
-            op = self.current.value
+        """解析一元运算（操作数不含幂运算，-2 ^ 2 即 (-2) ^ 2）"""
+        token = self.current
+        if token.type == 'MINUS' or token.type == 'PLUS':
             self.advance()
-            operand = self.parse_unary()
-            return UnaryOp(op, operand)
+            return UnaryOp(token.value, self.parse_unary())
 
         return self.parse_primary()
 
     def parse_primary(self):
         """解析基本表达式"""
+        kind = self.current.type
         # 字面量
-        if self.match('INTEGER'):
+        if kind == 'INTEGER':
             value = int(self.current.value)
             self.advance()
             return Literal(value, 'INTEGER')
 
-        elif self.match('REAL'):
+        elif kind == 'REAL':
             value = float(self.current.value)
             self.advance()
             return Literal(value, 'REAL')
 
-        elif self.match('STRING'):
+        elif kind == 'STRING':
             value = self.current.value[1:-1]  # 去掉引号
             self.advance()
             return Literal(value, 'STRING')
 
-        elif self.match('CHAR'):
+        elif kind == 'CHAR':
             value = self.current.value[1:-1]  # 去掉引号
             self.advance()
             return Literal(value, 'CHAR')
 
-        elif self.match('TRUE', 'FALSE'):
-            value = self.current.type == 'TRUE'
+        elif kind == 'TRUE' or kind == 'FALSE':
+            value = kind == 'TRUE'
             self.advance()
             return Literal(value, 'BOOLEAN')
 
         # 标识符或函数调用
-        elif self.match('NAME'):
+        elif kind == 'NAME':
             name = self.current.value
             self.advance()
 
@@ -738,7 +680,7 @@ class Parser:
                 return self.parse_identifier_access_rest(name)
 
         # 括号表达式
-        elif self.match('LPAREN'):
+        elif kind == 'LPAREN':
             self.advance()
             expr = self.parse_expression()
             self.expect('RPAREN')
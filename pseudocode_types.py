@@ -1,13 +1,16 @@
 """
 类型系统 - 支持所有伪代码数据类型
 """
-from datetime import datetime, timedelta
+from array import array
+from contextvars import ContextVar
 from typing import Any, List, Dict, Optional
-import re
+import sys
 
 
 class PseudocodeType:
-    """类型基类"""
+    """类型基类（各子类均使用__slots__，实例不带__dict__）"""
+    __slots__ = ('value',)
+
     def __init__(self, value=None):
         self.value = value
 
@@ -17,7 +20,13 @@ class PseudocodeType:
 
 class IntegerType(PseudocodeType):
     """整数类型"""
+    __slots__ = ()
+
     def __init__(self, value=0):
+        if type(value) is int:
+            # 快速路径：已是整数时无需转换
+            self.value = value
+            return
         if isinstance(value, str):
             value = int(value)
         elif isinstance(value, float):
@@ -36,7 +45,13 @@ class IntegerType(PseudocodeType):
 
 class RealType(PseudocodeType):
     """实数类型"""
+    __slots__ = ()
+
     def __init__(self, value=0.0):
+        if type(value) is float:
+            # 快速路径：已是浮点数时无需转换
+            self.value = value
+            return
         if isinstance(value, str):
             value = float(value)
         super().__init__(float(value) if value is not None else 0.0)
@@ -53,6 +68,8 @@ class RealType(PseudocodeType):
 
 class StringType(PseudocodeType):
     """字符串类型"""
+    __slots__ = ()
+
     def __init__(self, value=""):
         if value is None:
             value = ""
@@ -68,9 +85,66 @@ class StringType(PseudocodeType):
         return self.value[index]
 
 
+# 连接结果达到这个长度时改用StringBuilder（更短的字符串直接复制更快）
+STRING_BUILDER_THRESHOLD = 256
+
+
+class StringBuilder(StringType):
+    """连接得到的长字符串 - 由片段列表表示，读取value时才拼接（并缓存）
+    片段列表在连接结果之间共享：列表没有被其他字符串延长过时，在末尾连接直接追加到back，在开头连接
+    追加到front（逆序），不复制已有内容，因此循环中的 s <- s & c 和 s <- c & s 都是线性时间。
+    LENGTH、MID、比较、OUTPUT等照常读取value；普通字符串的value仍是槽位，读取不受影响"""
+    __slots__ = ('front', 'back', 'front_count', 'back_count', 'text')
+
+    def __init__(self, front: List[str], back: List[str], front_count: int, back_count: int):
+        self.front = front                # 开头连接的片段（逆序）
+        self.back = back                  # 末尾连接的片段
+        self.front_count = front_count    # 本字符串包含的front片段数
+        self.back_count = back_count      # 本字符串包含的back片段数
+        self.text = None                  # 拼接后的字符串
+
+    @property
+    def value(self):
+        text = self.text
+        if text is None:
+            parts = self.front[:self.front_count]
+            parts.reverse()
+            parts += self.back[:self.back_count]
+            text = self.text = ''.join(parts)
+            # 之后的连接从拼接好的字符串重新开始，不再逐个拼接片段
+            self.front = self.back = None
+        return text
+
+    def append(self, text: str) -> 'StringBuilder':
+        """在末尾连接"""
+        back = self.back
+        if back is not None and len(back) == self.back_count:
+            back.append(text)
+            return StringBuilder(self.front, back, self.front_count, self.back_count + 1)
+        return StringBuilder([], [self.value, text], 0, 2)
+
+    def prepend(self, text: str) -> 'StringBuilder':
+        """在开头连接"""
+        front = self.front
+        if front is not None and len(front) == self.front_count:
+            front.append(text)
+            return StringBuilder(front, self.back, self.front_count + 1, self.back_count)
+        return StringBuilder([], [text, self.value], 0, 2)
+
+    def __reduce__(self):
+        """复制和pickle时得到内容相同的普通字符串"""
+        return (StringType, (self.value,))
+
+
 class CharType(PseudocodeType):
     """字符类型"""
+    __slots__ = ()
+
     def __init__(self, value=' '):
+        if type(value) is str and len(value) == 1:
+            # 快速路径：已是单个字符
+            self.value = value
+            return
         if value is None:
             value = ' '
         value_str = str(value)
@@ -84,6 +158,8 @@ class CharType(PseudocodeType):
 
 class BooleanType(PseudocodeType):
     """布尔类型"""
+    __slots__ = ()
+
     def __init__(self, value=False):
         if isinstance(value, str):
             value = value.upper() in ['TRUE', 'T', '1']
@@ -96,8 +172,14 @@ class BooleanType(PseudocodeType):
         return "TRUE" if self.value else "FALSE"
 
 
+# 共享的布尔值单例（伪代码值不会被原地修改，可安全共享）
+TRUE = BooleanType(True)
+FALSE = BooleanType(False)
+
+
 class DateType(PseudocodeType):
     """日期类型 - 支持扩展的日期操作"""
+    __slots__ = ()
 
     # 支持多种日期格式
     DATE_FORMATS = [
@@ -107,6 +189,7 @@ class DateType(PseudocodeType):
     ]
 
     def __init__(self, value=None):
+        from datetime import datetime  # 日期功能很少用到，用到时才导入datetime
         if value is None:
             self.value = datetime.now()
         elif isinstance(value, str):
@@ -139,6 +222,7 @@ class DateType(PseudocodeType):
         return self.value.weekday()
 
     def add_days(self, days):
+        from datetime import timedelta
         return DateType(self.value + timedelta(days=days))
 
     def add_months(self, months):
@@ -177,30 +261,65 @@ class DateType(PseudocodeType):
 
 
 class ArrayType(PseudocodeType):
-    """数组类型 - 支持自定义下界"""
+    """数组类型 - 支持自定义下界和任意维数
+    元素按行优先顺序存放在一块扁平存储中，索引通过预先计算的步长一次换算为偏移。
+    get1/set1、get2/set2是一维、二维数组的快速路径：set1/set2只在无需类型检查即可存入时
+    存入并返回True，否则返回False，由调用者检查类型后再调用通用的set"""
+    __slots__ = ('dimensions', 'element_type', 'lower_bounds', 'upper_bounds', 'strides', 'size', 'data',
+                 'low1', 'low2', 'length', 'rows', 'columns', 'account', 'charged')
+
     def __init__(self, dimensions, element_type, default_value=None):
         """
         dimensions: [(lower, upper), ...] 每个维度的下界和上界
         element_type: 元素类型
         """
+        self._init_shape(dimensions, element_type)
+        # 默认值都是不可变的（或由调用者指定的同一个对象），所有元素可共享
+        self.data = self._allocate(None, self._create_default(default_value))
+        super().__init__(self.data)
+
+    def _init_shape(self, dimensions, element_type):
+        """记录边界、行优先的步长，以及快速路径使用的下界和长度
+        （不适用的快速路径长度为0，总是回退到通用路径）"""
+        self.account = array_memory.get()
+        self.charged = 0
         self.dimensions = dimensions
         self.element_type = element_type
         self.lower_bounds = [d[0] for d in dimensions]
         self.upper_bounds = [d[1] for d in dimensions]
 
         # 计算实际存储大小
-        sizes = [upper - lower + 1 for lower, upper in dimensions]
-
-        # 创建多维数组
-        if len(dimensions) == 1:
-            self.data = [self._create_default(default_value) for _ in range(sizes[0])]
-        elif len(dimensions) == 2:
-            self.data = [[self._create_default(default_value) for _ in range(sizes[1])]
-                         for _ in range(sizes[0])]
-        else:
-            raise ValueError("Only 1D and 2D arrays are supported")
-
-        super().__init__(self.data)
+        sizes = [max(upper - lower + 1, 0) for lower, upper in dimensions]
+        strides = [1] * len(sizes)
+        for i in range(len(sizes) - 2, -1, -1):
+            strides[i] = strides[i + 1] * sizes[i + 1]
+        self.strides = strides
+        self.size = strides[0] * sizes[0] if sizes else 0
+
+        self.low1 = self.lower_bounds[0] if dimensions else 0
+        self.low2 = self.lower_bounds[1] if len(dimensions) > 1 else 0
+        self.length = sizes[0] if len(dimensions) == 1 else 0
+        self.rows, self.columns = (sizes[0], sizes[1]) if len(dimensions) == 2 else (0, 0)
+
+    def _allocate(self, typecode, default):
+        """分配size个元素的扁平存储（typecode为None时使用列表）并记入内存账；
+        超过SPARSE_THRESHOLD个元素时改用分页存储，页面在第一次写入时才分配"""
+        if self.size > SPARSE_THRESHOLD:
+            return PagedStorage(self.size, typecode, default, self._charge)
+        self._charge(self.size * item_size(typecode))
+        if typecode is None:
+            return [default] * self.size
+        return array(typecode, [default]) * self.size
+
+    def _charge(self, size):
+        """记入内存账（在分配之前调用，超出上限时不会分配）"""
+        self.account.charge(size)
+        self.charged += size
+
+    def __del__(self):
+        # 数组被回收时从内存账中扣除
+        if self.charged:
+            self.account.release(self.charged)
 
     def _create_default(self, default_value):
         """创建默认值"""
@@ -221,49 +340,439 @@ class ArrayType(PseudocodeType):
         else:
             return None
 
-    def get(self, *indices):
-        """获取数组元素"""
+    def _offset(self, indices) -> int:
+        """检查索引个数和边界，返回元素在扁平存储中的偏移"""
         if len(indices) != len(self.dimensions):
             raise IndexError(f"Array requires {len(self.dimensions)} indices, got {len(indices)}")
 
-        # 转换为实际索引
-        actual_indices = []
-        for i, idx in enumerate(indices):
-            if not (self.lower_bounds[i] <= idx <= self.upper_bounds[i]):
-                raise IndexError(f"Index {idx} out of bounds [{self.lower_bounds[i]}:{self.upper_bounds[i]}]")
-            actual_indices.append(idx - self.lower_bounds[i])
+        offset = 0
+        for idx, lower, upper, stride in zip(indices, self.lower_bounds, self.upper_bounds, self.strides):
+            if not (lower <= idx <= upper):
+                raise IndexError(f"Index {idx} out of bounds [{lower}:{upper}]")
+            offset += (idx - lower) * stride
+        return offset
 
-        if len(actual_indices) == 1:
-            return self.data[actual_indices[0]]
-        else:
-            return self.data[actual_indices[0]][actual_indices[1]]
+    def get(self, *indices):
+        """获取数组元素"""
+        return self.data[self._offset(indices)]
 
     def set(self, *args):
         """设置数组元素 - 最后一个参数是值"""
-        indices = args[:-1]
-        value = args[-1]
+        self.data[self._offset(args[:-1])] = args[-1]
+
+    def get1(self, index):
+        """一维数组读取的快速路径"""
+        offset = index - self.low1
+        if 0 <= offset < self.length:
+            return self.data[offset]
+        return self.get(index)
+
+    def get2(self, index1, index2):
+        """二维数组读取的快速路径"""
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return self.data[row * self.columns + column]
+        return self.get(index1, index2)
+
+    def set1(self, index, value) -> bool:
+        """与原有元素类型完全相同（CHAR/STRING除外）时直接存入"""
+        offset = index - self.low1
+        if 0 <= offset < self.length:
+            data = self.data
+            if type(data[offset]) is type(value) and type(value) is not str:
+                data[offset] = value
+                return True
+        return False
+
+    def set2(self, index1, index2, value) -> bool:
+        """二维版本的set1"""
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            offset = row * self.columns + column
+            data = self.data
+            if type(data[offset]) is type(value) and type(value) is not str:
+                data[offset] = value
+                return True
+        return False
+
+    def memory_size(self) -> int:
+        """元素存储占用的字节数（不含元素对象本身）"""
+        return sys.getsizeof(self.data)
 
-        if len(indices) != len(self.dimensions):
-            raise IndexError(f"Array requires {len(self.dimensions)} indices, got {len(indices)}")
+    def __repr__(self):
+        return f"ArrayType({self.dimensions}, {self.element_type})"
 
-        # 转换为实际索引
-        actual_indices = []
-        for i, idx in enumerate(indices):
-            if not (self.lower_bounds[i] <= idx <= self.upper_bounds[i]):
-                raise IndexError(f"Index {idx} out of bounds [{self.lower_bounds[i]}:{self.upper_bounds[i]}]")
-            actual_indices.append(idx - self.lower_bounds[i])
 
-        if len(actual_indices) == 1:
-            self.data[actual_indices[0]] = value
-        else:
-            self.data[actual_indices[0]][actual_indices[1]] = value
+class TypedArrayType(ArrayType):
+    """元素为INTEGER/REAL/BOOLEAN/CHAR的数组 - 原生值连续存放在array.array中，
+    声明时整块初始化，读取时装箱为伪代码类型。子类实现load/store和快速路径"""
+    __slots__ = ()
+    typecode = 'q'
+    zero: Any = 0
 
-    def __repr__(self):
-        return f"ArrayType({self.dimensions}, {self.element_type})"
+    def __init__(self, dimensions, element_type):
+        self._init_shape(dimensions, element_type)
+        self.data = self._allocate(self.typecode, self.zero)
+        PseudocodeType.__init__(self, self.data)
+
+    def get(self, *indices):
+        return self.load(self._offset(indices))
+
+    def set(self, *args):
+        self.store(self._offset(args[:-1]), args[-1])
+
+    def _promote(self):
+        """值超出array.array的表示范围时改用Python列表存放原生值"""
+        data = self.data
+        if type(data) is PagedStorage:
+            data.promote()
+        elif type(data) is array:
+            self._charge(len(data) * (POINTER_SIZE - data.itemsize))
+            self.data = self.value = data.tolist()
+
+
+class IntegerArrayType(TypedArrayType):
+    """INTEGER数组（64位有符号整数，溢出时改用列表）"""
+    __slots__ = ()
+    typecode = 'q'
+    zero = 0
+
+    def load(self, offset):
+        return IntegerType(self.data[offset])
+
+    def store(self, offset, value):
+        value = value.value if isinstance(value, PseudocodeType) else value
+        try:
+            self.data[offset] = value
+        except (OverflowError, TypeError):
+            self._promote()
+            self.data[offset] = value
+
+    def get1(self, index):
+        offset = index - self.low1
+        if 0 <= offset < self.length:
+            return IntegerType(self.data[offset])
+        return self.get(index)
+
+    def get2(self, index1, index2):
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return IntegerType(self.data[row * self.columns + column])
+        return self.get(index1, index2)
+
+    def set1(self, index, value) -> bool:
+        offset = index - self.low1
+        if 0 <= offset < self.length and type(value) is IntegerType:
+            try:
+                self.data[offset] = value.value
+                return True
+            except OverflowError:
+                pass
+        return False
+
+    def set2(self, index1, index2, value) -> bool:
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns and type(value) is IntegerType:
+            try:
+                self.data[row * self.columns + column] = value.value
+                return True
+            except OverflowError:
+                pass
+        return False
+
+
+class RealArrayType(TypedArrayType):
+    """REAL数组（双精度浮点数）
+    与变量一样，被赋予INTEGER值的元素保持INTEGER类型，由kinds中对应的标志记录"""
+    __slots__ = ('kinds',)
+    typecode = 'd'
+    zero = 0.0
+
+    def __init__(self, dimensions, element_type):
+        super().__init__(dimensions, element_type)
+        self.kinds = None   # 首次存入INTEGER时分配的字节存储，1表示该元素为INTEGER
+
+    def load(self, offset):
+        kinds = self.kinds
+        if kinds is not None and kinds[offset]:
+            return IntegerType(self.data[offset])
+        return RealType(self.data[offset])
+
+    def store(self, offset, value):
+        value = value.value if isinstance(value, PseudocodeType) else value
+        if isinstance(value, int):
+            if self.kinds is None:
+                self.kinds = self._allocate('B', 0)
+            self.kinds[offset] = 1
+            if abs(value) > MAX_EXACT_FLOAT_INT:
+                self._promote()
+        elif self.kinds is not None:
+            self.kinds[offset] = 0
+        self.data[offset] = value
+
+    def get1(self, index):
+        offset = index - self.low1
+        if 0 <= offset < self.length:
+            kinds = self.kinds
+            if kinds is None or not kinds[offset]:
+                return RealType(self.data[offset])
+            return IntegerType(self.data[offset])
+        return self.get(index)
+
+    def get2(self, index1, index2):
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return self.load(row * self.columns + column)
+        return self.get(index1, index2)
+
+    def set1(self, index, value) -> bool:
+        offset = index - self.low1
+        if 0 <= offset < self.length and type(value) is RealType:
+            kinds = self.kinds
+            if kinds is None or not kinds[offset]:
+                self.data[offset] = value.value
+                return True
+        return False
+
+    def set2(self, index1, index2, value) -> bool:
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns and type(value) is RealType:
+            offset = row * self.columns + column
+            kinds = self.kinds
+            if kinds is None or not kinds[offset]:
+                self.data[offset] = value.value
+                return True
+        return False
+
+    def memory_size(self) -> int:
+        return sys.getsizeof(self.data) + (sys.getsizeof(self.kinds) if self.kinds is not None else 0)
+
+
+class BooleanArrayType(TypedArrayType):
+    """BOOLEAN数组（每个元素一个字节）"""
+    __slots__ = ()
+    typecode = 'b'
+    zero = 0
+
+    def load(self, offset):
+        return TRUE if self.data[offset] else FALSE
+
+    def store(self, offset, value):
+        self.data[offset] = 1 if (value.value if isinstance(value, PseudocodeType) else value) else 0
+
+    def get1(self, index):
+        offset = index - self.low1
+        if 0 <= offset < self.length:
+            return TRUE if self.data[offset] else FALSE
+        return self.get(index)
+
+    def get2(self, index1, index2):
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return TRUE if self.data[row * self.columns + column] else FALSE
+        return self.get(index1, index2)
+
+    def set1(self, index, value) -> bool:
+        offset = index - self.low1
+        if 0 <= offset < self.length and type(value) is BooleanType:
+            self.data[offset] = value.value
+            return True
+        return False
+
+    def set2(self, index1, index2, value) -> bool:
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns and type(value) is BooleanType:
+            self.data[row * self.columns + column] = value.value
+            return True
+        return False
+
+
+class CharArrayType(TypedArrayType):
+    """CHAR数组（单字符字符串是解释器共享的对象，列表中每个元素只占一个指针）"""
+    __slots__ = ()
+    zero = ' '
+
+    def __init__(self, dimensions, element_type):
+        self._init_shape(dimensions, element_type)
+        self.data = self._allocate(None, ' ')
+        PseudocodeType.__init__(self, self.data)
+
+    def load(self, offset):
+        return CharType(self.data[offset])
+
+    def store(self, offset, value):
+        self.data[offset] = value.value if isinstance(value, PseudocodeType) else value
+
+    def get1(self, index):
+        offset = index - self.low1
+        if 0 <= offset < self.length:
+            return CharType(self.data[offset])
+        return self.get(index)
+
+    def get2(self, index1, index2):
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns:
+            return CharType(self.data[row * self.columns + column])
+        return self.get(index1, index2)
+
+    def set1(self, index, value) -> bool:
+        offset = index - self.low1
+        if 0 <= offset < self.length and type(value) is CharType:
+            self.data[offset] = value.value
+            return True
+        return False
+
+    def set2(self, index1, index2, value) -> bool:
+        row = index1 - self.low1
+        column = index2 - self.low2
+        if 0 <= row < self.rows and 0 <= column < self.columns and type(value) is CharType:
+            self.data[row * self.columns + column] = value.value
+            return True
+        return False
+
+
+# 元素个数超过该值的数组使用分页存储
+SPARSE_THRESHOLD = 1 << 22
+# 分页存储每页的元素个数
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+# 列表中每个元素（指针）的字节数
+POINTER_SIZE = sys.getsizeof([None]) - sys.getsizeof([])
+
+
+def item_size(typecode) -> int:
+    """存储中每个元素的字节数（typecode为None表示列表）"""
+    return array(typecode).itemsize if typecode is not None else POINTER_SIZE
+
+
+class PagedStorage:
+    """大数组的分页存储 - 每PAGE_SIZE个元素一页，页面在第一次写入时才分配，
+    读取未分配页面中的元素得到默认值。按偏移读写的用法与list/array.array相同，
+    typecode为None时页面是列表，否则是array.array"""
+    __slots__ = ('size', 'typecode', 'default', 'pages', 'charge')
+
+    def __init__(self, size, typecode, default, charge):
+        self.size = size
+        self.typecode = typecode
+        self.default = default
+        self.charge = charge
+        page_count = (size + PAGE_MASK) >> PAGE_SHIFT
+        charge(page_count * POINTER_SIZE)
+        self.pages = [None] * page_count
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, offset):
+        page = self.pages[offset >> PAGE_SHIFT]
+        if page is None:
+            return self.default
+        return page[offset & PAGE_MASK]
+
+    def __setitem__(self, offset, value):
+        index = offset >> PAGE_SHIFT
+        page = self.pages[index]
+        if page is None:
+            page = self.pages[index] = self._new_page()
+        page[offset & PAGE_MASK] = value
+
+    def _new_page(self):
+        typecode = self.typecode
+        self.charge(PAGE_SIZE * item_size(typecode))
+        if typecode is None:
+            return [self.default] * PAGE_SIZE
+        return array(typecode, [self.default]) * PAGE_SIZE
+
+    def promote(self):
+        """已分配和之后分配的页面都改用列表（值超出array.array的表示范围时）"""
+        if self.typecode is None:
+            return
+        growth = PAGE_SIZE * (POINTER_SIZE - item_size(self.typecode))
+        self.typecode = None
+        pages = self.pages
+        for index, page in enumerate(pages):
+            if page is not None:
+                self.charge(growth)
+                pages[index] = page.tolist()
+
+    def allocated_pages(self) -> int:
+        return sum(1 for page in self.pages if page is not None)
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + sys.getsizeof(self.pages)
+                + sum(sys.getsizeof(page) for page in self.pages if page is not None))
+
+
+class MemoryAccount:
+    """数组存储的内存记账（字节数，按元素个数和每个元素的字节数估算，不含元素对象本身）
+    数组声明、分页分配和改用列表时记入，数组被回收时扣除；设置了limit时，
+    超出上限的分配在分配之前抛出MemoryError"""
+    __slots__ = ('used', 'peak', 'limit')
+
+    def __init__(self, limit=None):
+        self.used = 0
+        self.peak = 0
+        self.limit = limit
+
+    def charge(self, size):
+        used = self.used + size
+        if self.limit is not None and size > 0 and used > self.limit:
+            raise MemoryError(f"Array storage exceeds memory limit of {self.limit} bytes")
+        self.used = used
+        if used > self.peak:
+            self.peak = used
+
+    def release(self, size):
+        self.used -= size
+
+
+# 当前的内存账，之后创建的数组都记入这里。
+# 放在ContextVar中，每个线程（Web服务器的每个请求）各用各的账，同时运行的程序互不记入
+array_memory: ContextVar[MemoryAccount] = ContextVar('array_memory', default=MemoryAccount())
+
+
+def start_memory_account(limit=None) -> MemoryAccount:
+    """在当前上下文中开始新的数组内存记账（每次运行程序之前调用），返回记账对象。
+    之前创建的数组仍在各自的账上扣除"""
+    account = MemoryAccount(limit)
+    array_memory.set(account)
+    return account
+
+
+# 元素类型 -> 类型化存储的数组类
+TYPED_ARRAY_TYPES = {
+    'INTEGER': IntegerArrayType,
+    'REAL': RealArrayType,
+    'BOOLEAN': BooleanArrayType,
+    'CHAR': CharArrayType,
+}
+
+# 双精度浮点数能精确表示的最大整数
+MAX_EXACT_FLOAT_INT = 2 ** 53
+
+
+def create_array(dimensions, element_type) -> ArrayType:
+    """创建数组：基本类型元素使用类型化存储，其他元素（STRING、记录等）使用列表"""
+    array_class = TYPED_ARRAY_TYPES.get(element_type)
+    if array_class is not None:
+        return array_class(dimensions, element_type)
+    return ArrayType(dimensions, element_type)
 
 
 class RecordType(PseudocodeType):
     """记录类型（结构体）"""
+    __slots__ = ('fields', 'values')
+
     def __init__(self, fields: Dict[str, Any]):
         """
         fields: {field_name: field_type}
@@ -335,7 +844,8 @@ def from_python_value(value, type_hint=None):
         if len(value) == 1:
             return CharType(value)
         return StringType(value)
-    elif isinstance(value, datetime):
+    elif 'datetime' in sys.modules and isinstance(value, sys.modules['datetime'].datetime):
+        # 没有导入过datetime模块时值不可能是datetime
         return DateType(value)
 
     return value
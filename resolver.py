@@ -0,0 +1,229 @@
+"""
+名称解析器 - 在解析后为每个变量引用分配词法作用域层数(depth)和槽位(slot)
+子程序的局部名称（参数、DECLARE、FOR循环变量、赋值目标）存放在数组帧的槽位中；
+全局作用域的名称仍按名称查找（slot为None），因为REPL和隐式声明会在运行时加入新名称
+过程的BYREF参数槽位存放指向实参的引用（environment.Reference），读写它的节点标记为by_ref
+"""
+from typing import Dict, List, Optional, Set
+from ast_nodes import *
+
+
+class Scope:
+    """子程序作用域 - 局部名称到槽位的映射"""
+
+    def __init__(self, name: str, parent: Optional['Scope'] = None):
+        self.name = name
+        self.parent = parent
+        self.slots: Dict[str, int] = {}  # 大写名称 -> 槽位
+        self.names: List[str] = []       # 槽位 -> 大写名称
+        self.refs: Set[int] = set()      # 存放BYREF引用的槽位
+        self.ref_params: Set[int] = set()  # 按引用绑定的参数位置
+
+    def add(self, name: str) -> int:
+        """登记局部名称，返回槽位"""
+        key = name.upper()
+        if key not in self.slots:
+            self.slots[key] = len(self.names)
+            self.names.append(key)
+        return self.slots[key]
+
+    def lookup(self, name: str):
+        """沿词法作用域查找名称，返回(depth, slot)；全局名称返回(None, None)"""
+        key = name.upper()
+        scope = self
+        depth = 0
+        while scope is not None:
+            slot = scope.slots.get(key)
+            if slot is not None:
+                return depth, slot
+            scope = scope.parent
+            depth += 1
+        return None, None
+
+    def holds_reference(self, depth: int, slot: int) -> bool:
+        """向外depth层的作用域中该槽位是否存放BYREF引用"""
+        scope = self
+        for _ in range(depth):
+            scope = scope.parent
+        return slot in scope.refs
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"Scope({self.name}, slots={self.names})"
+
+
+class Resolver:
+    """名称解析器"""
+
+    def __init__(self):
+        self.scope: Optional[Scope] = None  # None表示全局作用域
+
+    def resolve(self, program: Program) -> Program:
+        """解析整个程序（原地填写AST节点）"""
+        self.resolve_block(program.statements)
+        return program
+
+    def resolve_block(self, statements: List[ASTNode]):
+        """解析语句块"""
+        for stmt in statements:
+            self.resolve_statement(stmt)
+
+    def resolve_statement(self, stmt: ASTNode):
+        """解析语句"""
+        if isinstance(stmt, DeclareStmt):
+            self.resolve_type_spec(stmt.type_spec)
+            self.bind(stmt, stmt.identifier)
+        elif isinstance(stmt, ConstantStmt):
+            self.resolve_expression(stmt.value)
+        elif isinstance(stmt, AssignStmt):
+            self.resolve_expression(stmt.value)
+            self.resolve_expression(stmt.target)
+        elif isinstance(stmt, (InputStmt, FileReadStmt)):
+            self.resolve_expression(stmt.target)
+        elif isinstance(stmt, OutputStmt):
+            for item in stmt.items:
+                self.resolve_expression(item)
+        elif isinstance(stmt, IfStmt):
+            self.resolve_expression(stmt.condition)
+            self.resolve_block(stmt.then_block)
+            if stmt.else_block:
+                self.resolve_block(stmt.else_block)
+        elif isinstance(stmt, CaseStmt):
+            self.bind_reference(stmt, stmt.identifier)
+            for branch in stmt.branches:
+                if isinstance(branch.condition, RangeCondition):
+                    self.resolve_expression(branch.condition.start)
+                    self.resolve_expression(branch.condition.end)
+                else:
+                    self.resolve_expression(branch.condition)
+                self.resolve_statement(branch.statement)
+            if stmt.otherwise:
+                self.resolve_statement(stmt.otherwise)
+        elif isinstance(stmt, ForStmt):
+            self.resolve_expression(stmt.start)
+            self.resolve_expression(stmt.end)
+            if stmt.step:
+                self.resolve_expression(stmt.step)
+            self.bind(stmt, stmt.variable)
+            self.resolve_block(stmt.body)
+        elif isinstance(stmt, WhileStmt):
+            self.resolve_expression(stmt.condition)
+            self.resolve_block(stmt.body)
+        elif isinstance(stmt, RepeatStmt):
+            self.resolve_block(stmt.body)
+            self.resolve_expression(stmt.condition)
+        elif isinstance(stmt, (ProcedureDef, FunctionDef)):
+            self.resolve_routine(stmt)
+        elif isinstance(stmt, ProcedureCall):
+            for arg in stmt.arguments:
+                self.resolve_expression(arg)
+        elif isinstance(stmt, (ReturnStmt, FileWriteStmt)):
+            self.resolve_expression(stmt.value)
+
+    def resolve_routine(self, definition):
+        """为子程序建立作用域：参数占据前面的槽位，其后是体内的局部名称"""
+        scope = Scope(definition.name, self.scope)
+        for param in definition.parameters:
+            scope.add(param.name)
+        constants = set()
+        rebound = set()
+        collect_routine_locals(definition.body, scope, constants, rebound)
+        if isinstance(definition, ProcedureDef):
+            # 函数的BYREF参数仍按值传递；重名、体内重新DECLARE、作为FOR循环变量或同名CONSTANT的参数也按值绑定
+            names = [param.name.upper() for param in definition.parameters]
+            for position, param in enumerate(definition.parameters):
+                key = names[position]
+                if param.by_ref and names.count(key) == 1 and key not in constants and key not in rebound:
+                    scope.refs.add(scope.slots[key])
+                    scope.ref_params.add(position)
+        definition.scope = scope
+
+        enclosing = self.scope
+        self.scope = scope
+        try:
+            self.resolve_block(definition.body)
+        finally:
+            self.scope = enclosing
+
+    def resolve_type_spec(self, type_spec):
+        """解析数组边界表达式"""
+        if isinstance(type_spec, ArrayType):
+            for lower, upper in type_spec.dimensions:
+                self.resolve_expression(lower)
+                self.resolve_expression(upper)
+
+    def resolve_expression(self, expr):
+        """解析表达式"""
+        if isinstance(expr, Identifier):
+            self.bind_reference(expr, expr.name)
+        elif isinstance(expr, IdentifierAccess):
+            self.bind_reference(expr, expr.name)
+            if expr.index1 is not None:
+                self.resolve_expression(expr.index1)
+            if expr.index2 is not None:
+                self.resolve_expression(expr.index2)
+            for index in expr.more_indices:
+                self.resolve_expression(index)
+        elif isinstance(expr, BinaryOp):
+            self.resolve_expression(expr.left)
+            self.resolve_expression(expr.right)
+        elif isinstance(expr, UnaryOp):
+            self.resolve_expression(expr.operand)
+        elif isinstance(expr, FunctionCall):
+            for arg in expr.arguments:
+                self.resolve_expression(arg)
+
+    def bind(self, node, name: str):
+        """填写节点的(depth, slot)"""
+        if self.scope is None:
+            node.depth, node.slot = None, None
+        else:
+            node.depth, node.slot = self.scope.lookup(name)
+
+    def bind_reference(self, node, name: str):
+        """填写读写变量的节点的(depth, slot)，并标记是否经由BYREF引用访问"""
+        self.bind(node, name)
+        node.by_ref = node.slot is not None and self.scope.holds_reference(node.depth, node.slot)
+
+
+def collect_routine_locals(statements: List[ASTNode], scope: Scope, constants: set, rebound: set):
+    """收集子程序体中可能成为局部变量的名称（不进入嵌套子程序）
+    子程序内的CONSTANT仍按名称存放，不分配槽位；DECLARE和FOR循环变量的名称另外记入rebound"""
+    candidates = []
+
+    def visit(block):
+        for stmt in block:
+            if isinstance(stmt, DeclareStmt):
+                candidates.append(stmt.identifier)
+                rebound.add(stmt.identifier.upper())
+            elif isinstance(stmt, ConstantStmt):
+                constants.add(stmt.identifier.upper())
+            elif isinstance(stmt, (AssignStmt, InputStmt, FileReadStmt)):
+                target = stmt.target
+                if target.index1 is None and target.field is None:
+                    candidates.append(target.name)
+            elif isinstance(stmt, ForStmt):
+                candidates.append(stmt.variable)
+                rebound.add(stmt.variable.upper())
+                visit(stmt.body)
+            elif isinstance(stmt, (WhileStmt, RepeatStmt)):
+                visit(stmt.body)
+            elif isinstance(stmt, IfStmt):
+                visit(stmt.then_block)
+                visit(stmt.else_block or [])
+            elif isinstance(stmt, CaseStmt):
+                visit([branch.statement for branch in stmt.branches])
+                if stmt.otherwise:
+                    visit([stmt.otherwise])
+
+    visit(statements)
+    for name in candidates:
+        if name.upper() not in constants:
+            scope.add(name)
+
+
+def resolve_program(program: Program) -> Program:
+    """对程序执行名称解析"""
+    return Resolver().resolve(program)
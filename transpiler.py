@@ -0,0 +1,1062 @@
+"""
+Python转译后端 - 将AST生成为Python源代码，用compile()编译后执行
+FOR循环生成为range循环，FUNCTION/PROCEDURE生成为真正的def，
+由CPython自身的字节码完成主要工作。
+运行时语义（类型检查、数组越界、错误信息）与Interpreter保持一致；
+遇到无法静态确定语义的结构时抛出UnsupportedConstruct，由引擎回退到树遍历解释器
+"""
+import operator as _operator
+from typing import Any, Dict, List, Optional, Set
+from ast_nodes import *
+from interpreter import Interpreter, UNCACHED
+import pseudocode_types as pt
+from builtin_functions import BUILTIN_FUNCTIONS, call_builtin_function, builtin_call_error
+
+
+class UnsupportedConstruct(Exception):
+    """转译器不支持的结构（引擎应回退到树遍历解释器）"""
+    pass
+
+
+# ==================== 静态分析 ====================
+
+def collect_assigned_names(statements: List[ASTNode], names: Set[str]):
+    """收集语句中声明、赋值或作为循环变量的名称（大写）"""
+    for stmt in statements:
+        if isinstance(stmt, (DeclareStmt, ConstantStmt)):
+            names.add(stmt.identifier.upper())
+        elif isinstance(stmt, (AssignStmt, InputStmt, FileReadStmt)):
+            names.add(stmt.target.name.upper())
+        elif isinstance(stmt, ForStmt):
+            names.add(stmt.variable.upper())
+            collect_assigned_names(stmt.body, names)
+        elif isinstance(stmt, (WhileStmt, RepeatStmt)):
+            collect_assigned_names(stmt.body, names)
+        elif isinstance(stmt, IfStmt):
+            collect_assigned_names(stmt.then_block, names)
+            collect_assigned_names(stmt.else_block or [], names)
+        elif isinstance(stmt, CaseStmt):
+            collect_assigned_names([b.statement for b in stmt.branches], names)
+            if stmt.otherwise:
+                collect_assigned_names([stmt.otherwise], names)
+
+
+def collect_local_names(statements: List[ASTNode], names: Set[str]):
+    """收集子程序中在自身作用域定义的名称（DECLARE和FOR循环变量）"""
+    for stmt in statements:
+        if isinstance(stmt, DeclareStmt):
+            names.add(stmt.identifier.upper())
+        elif isinstance(stmt, ForStmt):
+            names.add(stmt.variable.upper())
+            collect_local_names(stmt.body, names)
+        elif isinstance(stmt, (WhileStmt, RepeatStmt)):
+            collect_local_names(stmt.body, names)
+        elif isinstance(stmt, IfStmt):
+            collect_local_names(stmt.then_block, names)
+            collect_local_names(stmt.else_block or [], names)
+        elif isinstance(stmt, CaseStmt):
+            collect_local_names([b.statement for b in stmt.branches], names)
+            if stmt.otherwise:
+                collect_local_names([stmt.otherwise], names)
+
+
+class RoutineScope:
+    """子程序的静态作用域信息"""
+
+    def __init__(self, definition, kind: str):
+        self.definition = definition
+        self.kind = kind  # 'function' / 'procedure'
+        self.name = definition.name
+        self.key = definition.name.upper()
+        self.params = [p.name.upper() for p in definition.parameters]
+        self.locals: Set[str] = set(self.params)
+        collect_local_names(definition.body, self.locals)
+        # 子程序中使用到的非局部名称
+        self.free_reads: Set[str] = set()
+        self.free_writes: Set[str] = set()
+
+    @property
+    def python_name(self) -> str:
+        prefix = 'f_' if self.kind == 'function' else 'p_'
+        return prefix + self.key
+
+
+# ==================== 代码生成 ====================
+
+class PythonTranspiler:
+    """Python代码生成器"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.indent = 0
+        self.temp_counter = 0
+        self.constants: List[Any] = []          # 字面量常量池
+        self.constant_index: Dict[tuple, int] = {}
+        self.global_names: Set[str] = set()
+        self.global_constants: Set[str] = set()
+        self.functions: Dict[str, RoutineScope] = {}
+        self.procedures: Dict[str, RoutineScope] = {}
+        self.scope: Optional[RoutineScope] = None   # 当前正在生成的子程序（None为顶层）
+        self.defined: Set[str] = set()             # 当前位置已确定定义的局部名称
+        # Python名称 -> (种类, 调用处写法)，用于把NameError转换为解释器的错误信息
+        self.routine_names: Dict[str, tuple] = {}
+
+    # ---------- 入口 ----------
+
+    def transpile(self, program: Program) -> str:
+        """生成整个程序的Python源代码"""
+        self.analyze(program)
+
+        for scope in list(self.functions.values()) + list(self.procedures.values()):
+            self.generate_routine(scope)
+
+        self.emit('def __main__():')
+        self.indent += 1
+        routine_globals = [s.python_name for s in list(self.functions.values()) + list(self.procedures.values())]
+        if routine_globals:
+            self.emit('global ' + ', '.join(routine_globals))
+        self.scope = None
+        self.generate_block(program.statements)
+        self.emit('pass')
+        self.indent -= 1
+
+        return '\n'.join(self.lines) + '\n'
+
+    def analyze(self, program: Program):
+        """静态分析：登记子程序、全局名称，拒绝语义无法静态确定的程序"""
+        collect_assigned_names(program.statements, self.global_names)
+        self.check_top_level(program.statements)
+
+        for stmt in program.statements:
+            if isinstance(stmt, ConstantStmt):
+                self.global_constants.add(stmt.identifier.upper())
+
+        # 常量名称不能同时作为变量
+        for stmt in self.iterate_statements(program.statements):
+            if isinstance(stmt, (DeclareStmt, AssignStmt, InputStmt, FileReadStmt, ForStmt)):
+                name = stmt.identifier if isinstance(stmt, DeclareStmt) else (
+                    stmt.variable if isinstance(stmt, ForStmt) else stmt.target.name)
+                if name.upper() in self.global_constants:
+                    raise UnsupportedConstruct(f"constant '{name}' is also used as a variable")
+
+        all_scopes = list(self.functions.values()) + list(self.procedures.values())
+        for scope in all_scopes:
+            self.analyze_routine(scope)
+
+        # 子程序的父作用域是全局作用域（词法作用域），非局部名称即全局变量
+        for scope in all_scopes:
+            for name in scope.free_writes:
+                if name not in self.global_names:
+                    raise UnsupportedConstruct(f"{scope.name} implicitly creates variable '{name}'")
+
+    def iterate_statements(self, statements: List[ASTNode]):
+        """深度优先遍历语句（不进入子程序体）"""
+        for stmt in statements:
+            yield stmt
+            if isinstance(stmt, (ForStmt, WhileStmt, RepeatStmt)):
+                yield from self.iterate_statements(stmt.body)
+            elif isinstance(stmt, IfStmt):
+                yield from self.iterate_statements(stmt.then_block)
+                yield from self.iterate_statements(stmt.else_block or [])
+            elif isinstance(stmt, CaseStmt):
+                yield from self.iterate_statements([b.statement for b in stmt.branches])
+                if stmt.otherwise:
+                    yield from self.iterate_statements([stmt.otherwise])
+
+    def check_top_level(self, statements: List[ASTNode]):
+        """登记顶层子程序；子程序只能定义在程序顶层"""
+        top_level = set(id(stmt) for stmt in statements)
+        for stmt in self.iterate_statements(statements):
+            if isinstance(stmt, (ProcedureDef, FunctionDef)):
+                if id(stmt) not in top_level:
+                    raise UnsupportedConstruct(f"nested definition of '{stmt.name}'")
+                table = self.functions if isinstance(stmt, FunctionDef) else self.procedures
+                key = stmt.name.upper()
+                if key in table:
+                    raise UnsupportedConstruct(f"'{stmt.name}' is defined more than once")
+                scope = RoutineScope(stmt, 'function' if isinstance(stmt, FunctionDef) else 'procedure')
+                if len(set(scope.params)) != len(scope.params):
+                    raise UnsupportedConstruct(f"duplicate parameter names in '{stmt.name}'")
+                if any(p.by_ref for p in stmt.parameters):
+                    raise UnsupportedConstruct(f"BYREF parameters in '{stmt.name}'")
+                table[key] = scope
+            elif isinstance(stmt, ReturnStmt):
+                raise UnsupportedConstruct("RETURN outside of a FUNCTION")
+
+    def analyze_routine(self, scope: RoutineScope):
+        """检查子程序体：局部名称必须在使用前确定定义"""
+        for stmt in self.iterate_statements(scope.definition.body):
+            if isinstance(stmt, (ConstantStmt, TypeDefStmt, ProcedureDef, FunctionDef)):
+                raise UnsupportedConstruct(f"{type(stmt).__name__} inside '{scope.name}'")
+            if isinstance(stmt, ReturnStmt) and scope.kind == 'procedure':
+                raise UnsupportedConstruct(f"RETURN inside PROCEDURE '{scope.name}'")
+        self.scope = scope
+        self.check_definite(scope.definition.body, set(scope.params))
+        self.scope = None
+
+    def check_definite(self, statements: List[ASTNode], defined: Set[str]) -> Set[str]:
+        """确定定义分析：返回语句序列之后确定已定义的局部名称"""
+        defined = set(defined)
+        for stmt in statements:
+            if isinstance(stmt, DeclareStmt):
+                self.check_type_spec_names(stmt.type_spec, defined)
+                defined.add(stmt.identifier.upper())
+            elif isinstance(stmt, AssignStmt):
+                self.check_expression_names(stmt.value, defined)
+                self.check_target_names(stmt.target, defined)
+            elif isinstance(stmt, (InputStmt, FileReadStmt)):
+                self.check_target_names(stmt.target, defined)
+            elif isinstance(stmt, OutputStmt):
+                for item in stmt.items:
+                    self.check_expression_names(item, defined)
+            elif isinstance(stmt, (ReturnStmt, FileWriteStmt)):
+                self.check_expression_names(stmt.value, defined)
+            elif isinstance(stmt, ProcedureCall):
+                for arg in stmt.arguments:
+                    self.check_expression_names(arg, defined)
+            elif isinstance(stmt, IfStmt):
+                self.check_expression_names(stmt.condition, defined)
+                then_defined = self.check_definite(stmt.then_block, defined)
+                else_defined = self.check_definite(stmt.else_block or [], defined)
+                defined = then_defined & else_defined
+            elif isinstance(stmt, CaseStmt):
+                self.check_name(stmt.identifier, defined, write=False)
+                branch_defined = []
+                for branch in stmt.branches:
+                    if isinstance(branch.condition, RangeCondition):
+                        self.check_expression_names(branch.condition.start, defined)
+                        self.check_expression_names(branch.condition.end, defined)
+                    else:
+                        self.check_expression_names(branch.condition, defined)
+                    branch_defined.append(self.check_definite([branch.statement], defined))
+                otherwise = [stmt.otherwise] if stmt.otherwise else []
+                branch_defined.append(self.check_definite(otherwise, defined))
+                defined = set.intersection(*branch_defined)
+            elif isinstance(stmt, ForStmt):
+                self.check_expression_names(stmt.start, defined)
+                self.check_expression_names(stmt.end, defined)
+                if stmt.step:
+                    self.check_expression_names(stmt.step, defined)
+                defined.add(stmt.variable.upper())
+                self.check_definite(stmt.body, defined)
+            elif isinstance(stmt, WhileStmt):
+                self.check_expression_names(stmt.condition, defined)
+                self.check_definite(stmt.body, defined)
+            elif isinstance(stmt, RepeatStmt):
+                defined = self.check_definite(stmt.body, defined)
+                self.check_expression_names(stmt.condition, defined)
+        return defined
+
+    def check_name(self, name: str, defined: Set[str], write: bool):
+        """检查名称的使用是否可静态解析"""
+        key = name.upper()
+        scope = self.scope
+        if key in scope.locals:
+            if key not in defined:
+                raise UnsupportedConstruct(f"local '{name}' in '{scope.name}' may be used before it is defined")
+        elif write:
+            scope.free_writes.add(key)
+        else:
+            scope.free_reads.add(key)
+
+    def check_target_names(self, target: IdentifierAccess, defined: Set[str]):
+        """检查赋值目标"""
+        if target.index1 is not None or target.field is not None:
+            self.check_name(target.name, defined, write=False)
+            for index in (target.index1, target.index2, *target.more_indices):
+                if index is not None:
+                    self.check_expression_names(index, defined)
+        else:
+            self.check_name(target.name, defined, write=True)
+
+    def check_type_spec_names(self, type_spec, defined: Set[str]):
+        """检查数组边界表达式"""
+        if isinstance(type_spec, ArrayType):
+            for lower, upper in type_spec.dimensions:
+                self.check_expression_names(lower, defined)
+                self.check_expression_names(upper, defined)
+
+    def check_expression_names(self, expr, defined: Set[str]):
+        """检查表达式中的名称"""
+        if isinstance(expr, (Identifier, IdentifierAccess)):
+            self.check_name(expr.name, defined, write=False)
+            if isinstance(expr, IdentifierAccess):
+                for index in (expr.index1, expr.index2, *expr.more_indices):
+                    if index is not None:
+                        self.check_expression_names(index, defined)
+        elif isinstance(expr, BinaryOp):
+            self.check_expression_names(expr.left, defined)
+            self.check_expression_names(expr.right, defined)
+        elif isinstance(expr, UnaryOp):
+            self.check_expression_names(expr.operand, defined)
+        elif isinstance(expr, FunctionCall):
+            for arg in expr.arguments:
+                self.check_expression_names(arg, defined)
+        elif isinstance(expr, CachedExpr):
+            self.check_expression_names(expr.expr, defined)
+
+    # ---------- 输出辅助 ----------
+
+    def emit(self, line: str):
+        """输出一行代码"""
+        self.lines.append('    ' * self.indent + line)
+
+    def temp(self) -> str:
+        """分配临时变量名"""
+        self.temp_counter += 1
+        return f'_t{self.temp_counter}'
+
+    def constant(self, value) -> str:
+        """登记字面量常量，返回其在常量池中的名称"""
+        key = (type(value).__name__, repr(value))
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return f'K{self.constant_index[key]}'
+
+    def is_local(self, name: str) -> bool:
+        """名称在当前子程序中是否为局部变量"""
+        return self.scope is not None and name.upper() in self.scope.locals
+
+    # ---------- 子程序 ----------
+
+    def generate_routine(self, scope: RoutineScope):
+        """生成子程序的def"""
+        self.scope = scope
+        params = ', '.join('v_' + p for p in scope.params)
+        self.emit(f'def _impl_{scope.python_name}({params}):')
+        self.indent += 1
+        self.generate_block(scope.definition.body)
+        if scope.kind == 'function':
+            self.emit(f'raise RuntimeError({("Function " + repr(scope.name) + " did not return a value")!r})')
+        else:
+            self.emit('pass')
+        self.indent -= 1
+        self.emit('')
+        self.scope = None
+
+    # ---------- 语句 ----------
+
+    def generate_block(self, statements: List[ASTNode]):
+        """生成语句块"""
+        for stmt in statements:
+            self.generate_statement(stmt)
+
+    def generate_statement(self, stmt: ASTNode):
+        """生成语句"""
+        if isinstance(stmt, DeclareStmt):
+            value = self.type_instance(stmt.type_spec)
+            if self.is_local(stmt.identifier):
+                self.emit(f'v_{stmt.identifier.upper()} = {value}')
+            else:
+                self.emit(f'define_variable({stmt.identifier!r}, {value})')
+        elif isinstance(stmt, ConstantStmt):
+            self.emit(f'define_constant({stmt.identifier!r}, {self.expression(stmt.value)})')
+        elif isinstance(stmt, TypeDefStmt):
+            self.emit(f'define_type(TYPES[{self.type_def_index(stmt)}])')
+        elif isinstance(stmt, AssignStmt):
+            value = self.temp()
+            self.emit(f'{value} = {self.expression(stmt.value)}')
+            self.generate_store(stmt.target, value, checked=not stmt.type_safe)
+        elif isinstance(stmt, InputStmt):
+            value = self.temp()
+            self.emit(f'{value} = read_input()')
+            self.generate_store(stmt.target, value)
+        elif isinstance(stmt, OutputStmt):
+            if len(stmt.items) == 1:
+                self.emit(f'print(to_output_string({self.expression(stmt.items[0])}))')
+            else:
+                items = ', '.join(f'to_output_string({self.expression(item)})' for item in stmt.items)
+                self.emit(f"print(' '.join(({items},)))")
+        elif isinstance(stmt, IfStmt):
+            self.emit(f'if {self.condition(stmt.condition)}:')
+            self.generate_suite(stmt.then_block)
+            if stmt.else_block:
+                self.emit('else:')
+                self.generate_suite(stmt.else_block)
+        elif isinstance(stmt, CaseStmt):
+            self.generate_case(stmt)
+        elif isinstance(stmt, ForStmt):
+            self.generate_cache_reset(stmt)
+            self.generate_for(stmt)
+        elif isinstance(stmt, WhileStmt):
+            self.generate_cache_reset(stmt)
+            self.emit('while True:')
+            self.indent += 1
+            if is_boolean_expression(stmt.condition):
+                # 比较和逻辑运算的结果必定为BOOLEAN，直接求真值
+                self.emit(f'if not {self.condition(stmt.condition)}:')
+            elif stmt.type_safe:
+                # 类型检查器已证明条件为BOOLEAN
+                self.emit(f'if not {self.expression(stmt.condition)}.value:')
+            else:
+                self.emit(f'if not while_test({self.expression(stmt.condition)}):')
+            self.emit('    break')
+            self.generate_block(stmt.body)
+            self.indent -= 1
+        elif isinstance(stmt, RepeatStmt):
+            self.generate_cache_reset(stmt)
+            self.emit('while True:')
+            self.indent += 1
+            self.generate_block(stmt.body)
+            if is_boolean_expression(stmt.condition):
+                self.emit(f'if {self.condition(stmt.condition)}:')
+            elif stmt.type_safe:
+                self.emit(f'if {self.expression(stmt.condition)}.value:')
+            else:
+                self.emit(f'if until_test({self.expression(stmt.condition)}):')
+            self.emit('    break')
+            self.indent -= 1
+        elif isinstance(stmt, (ProcedureDef, FunctionDef)):
+            table = self.functions if isinstance(stmt, FunctionDef) else self.procedures
+            python_name = table[stmt.name.upper()].python_name
+            if isinstance(stmt, FunctionDef) and stmt.pure:
+                # 纯函数：开启记忆化时包装为带缓存的函数
+                self.emit(f'{python_name} = memoize(_impl_{python_name})')
+            else:
+                self.emit(f'{python_name} = _impl_{python_name}')
+        elif isinstance(stmt, ProcedureCall):
+            self.generate_procedure_call(stmt)
+        elif isinstance(stmt, ReturnStmt):
+            self.emit(f'return {self.expression(stmt.value)}')
+        elif isinstance(stmt, FileOpenStmt):
+            self.emit(f'file_manager.open_file({stmt.file_id!r}, {stmt.mode!r})')
+        elif isinstance(stmt, FileReadStmt):
+            value = self.temp()
+            self.emit(f'{value} = StringType(file_manager.read_file({stmt.file_id!r}))')
+            self.generate_store(stmt.target, value)
+        elif isinstance(stmt, FileWriteStmt):
+            self.emit(f'file_manager.write_file({stmt.file_id!r}, to_output_string({self.expression(stmt.value)}))')
+        elif isinstance(stmt, FileCloseStmt):
+            self.emit(f'file_manager.close_file({stmt.file_id!r})')
+
+    def generate_cache_reset(self, stmt):
+        """进入循环时清空循环不变量的缓存"""
+        if stmt.invariants:
+            self.emit(' = '.join(f'cache_{slot}' for slot in stmt.invariants) + ' = UNCACHED')
+
+    def generate_suite(self, statements: List[ASTNode]):
+        """生成缩进的语句块"""
+        self.indent += 1
+        self.generate_block(statements)
+        self.emit('pass')
+        self.indent -= 1
+
+    def type_def_index(self, stmt: TypeDefStmt) -> int:
+        """TYPE定义放入常量池"""
+        self.constants.append(stmt)
+        return len(self.constants) - 1
+
+    def type_instance(self, type_spec) -> str:
+        """类型实例的构造表达式"""
+        if isinstance(type_spec, SimpleType):
+            return f'default_value({type_spec.type_name!r})'
+        elif isinstance(type_spec, ArrayType):
+            if type_spec.bounds is not None:
+                # 优化器已预先求值边界
+                bounds = ', '.join(f'({lower}, {upper})' for lower, upper in type_spec.bounds)
+            else:
+                bounds = ', '.join(f'({self.expression(lower)}, {self.expression(upper)})'
+                                   for lower, upper in type_spec.dimensions)
+            if isinstance(type_spec.element_type, SimpleType):
+                element_type = type_spec.element_type.type_name
+            else:
+                element_type = None
+            return f'make_array(({bounds},), {element_type!r})'
+        elif isinstance(type_spec, CustomType):
+            return f'make_record({type_spec.type_name!r})'
+        return 'None'
+
+    def generate_store(self, target: IdentifierAccess, value: str, checked: bool = True):
+        """生成写入（value为已求值的临时变量）；checked为False时简单变量的写入省略类型检查"""
+        name = target.name
+        if target.index1 is not None:
+            array = self.load_variable(name)
+            if target.more_indices:
+                indices = ', '.join(self.expression(index) for index in
+                                    (target.index1, target.index2, *target.more_indices))
+                self.emit(f'index_setn({array}, ({indices}), {value}, {name!r})')
+            elif target.index2 is not None:
+                self.emit(f'index_set2({array}, {self.expression(target.index1)}, '
+                          f'{self.expression(target.index2)}, {value}, {name!r})')
+            else:
+                self.emit(f'index_set({array}, {self.expression(target.index1)}, {value}, {name!r})')
+        elif target.field is not None:
+            self.emit(f'field_set({self.load_variable(name)}, {target.field!r}, {value}, {name!r})')
+        elif self.is_local(name):
+            local = 'v_' + name.upper()
+            if checked:
+                self.emit(f'if type({local}) is not type({value}) or type({value}) is str:')
+                self.emit(f'    check({local}, {value}, {name!r})')
+            self.emit(f'{local} = {value}')
+        else:
+            key = name.upper()
+            old = self.temp()
+            self.emit(f'{old} = G.get({key!r}, MISSING)')
+            self.emit(f'if {old} is not MISSING:')
+            if checked:
+                self.emit(f'    if type({old}) is not type({value}) or type({value}) is str:')
+                self.emit(f'        check({old}, {value}, {name!r})')
+            self.emit(f'    G[{key!r}] = {value}')
+            self.emit('else:')
+            self.emit(f'    store_global({name!r}, {value})')
+
+    def generate_case(self, stmt: CaseStmt):
+        """生成CASE：常量分支查跳转表后按序号二分选择，其余分支按顺序比较"""
+        subject = self.temp()
+        self.emit(f'{subject} = {self.load_variable(stmt.identifier)}')
+        table = stmt.table
+        if table is None:
+            self.generate_case_branches(subject, stmt.branches, stmt.otherwise)
+            return
+
+        index = self.temp()
+        self.emit(f'{index} = {self.constant(table)}.lookup({subject}, compare_values)')
+        self.emit(f'if {index} < {table.size}:')
+        self.indent += 1
+        self.generate_case_dispatch(index, stmt.branches, 0, table.size)
+        self.indent -= 1
+        rest = stmt.branches[table.size:]
+        if rest or stmt.otherwise:
+            self.emit('else:')
+            self.indent += 1
+            self.generate_case_branches(subject, rest, stmt.otherwise)
+            self.emit('pass')
+            self.indent -= 1
+
+    def generate_case_dispatch(self, index: str, branches: List[CaseBranch], low: int, high: int):
+        """按分支序号（在[low, high)中）二分生成嵌套的if"""
+        if high - low == 1:
+            self.generate_block([branches[low].statement])
+            self.emit('pass')
+            return
+        middle = (low + high) // 2
+        self.emit(f'if {index} < {middle}:')
+        self.indent += 1
+        self.generate_case_dispatch(index, branches, low, middle)
+        self.indent -= 1
+        self.emit('else:')
+        self.indent += 1
+        self.generate_case_dispatch(index, branches, middle, high)
+        self.indent -= 1
+
+    def generate_case_branches(self, subject: str, branches: List[CaseBranch], otherwise):
+        """按顺序比较各分支"""
+        keyword = 'if'
+        for branch in branches:
+            if isinstance(branch.condition, RangeCondition):
+                test = (f'case_range({subject}, {self.expression(branch.condition.start)}, '
+                        f'{self.expression(branch.condition.end)})')
+            else:
+                test = f'case_eq({subject}, {self.expression(branch.condition)})'
+            self.emit(f'{keyword} {test}:')
+            self.generate_suite([branch.statement])
+            keyword = 'elif'
+        if otherwise:
+            if branches:
+                self.emit('else:')
+                self.generate_suite([otherwise])
+            else:
+                self.generate_statement(otherwise)
+
+    def generate_for(self, stmt: ForStmt):
+        """生成FOR：步长为非零整数字面量时生成range循环"""
+        start, end, step = self.temp(), self.temp(), self.temp()
+        self.emit(f'{start} = {self.expression(stmt.start)}')
+        self.emit(f'{end} = {self.expression(stmt.end)}')
+        self.emit(f'{step} = {self.expression(stmt.step) if stmt.step else self.constant(pt.IntegerType(1))}')
+        if not stmt.type_safe:
+            self.emit(f'for_check({start}, {end}, {step})')
+
+        name = stmt.variable
+        key = name.upper()
+        local = self.is_local(name)
+        if local:
+            target = 'v_' + key
+            self.emit(f'{target} = IntegerType({start}.value)')
+        else:
+            target = f'G[{key!r}]'
+            self.emit(f'define_variable({name!r}, IntegerType({start}.value))')
+
+        step_value = self.literal_step(stmt.step)
+        counter, after = self.temp(), self.temp()
+        self.emit(f'{after} = {start}.value')
+        if step_value is not None:
+            limit = f'{end}.value + 1' if step_value > 0 else f'{end}.value - 1'
+            self.emit(f'for {counter} in range({start}.value, {limit}, {step_value}):')
+            self.indent += 1
+            self.emit(f'{target} = IntegerType({counter})')
+            self.generate_block(stmt.body)
+            self.emit(f'{after} = {counter} + {step_value}')
+            self.indent -= 1
+            self.emit(f'{target} = IntegerType({after})')
+        else:
+            # 步长在运行时才能确定（可能为0），按解释器的计数方式循环
+            self.emit(f'{counter} = {step}.value')
+            self.emit(f'while ({after} <= {end}.value) if {counter} > 0 else ({after} >= {end}.value):')
+            self.indent += 1
+            self.generate_block(stmt.body)
+            self.emit(f'{after} += {counter}')
+            self.emit(f'{target} = IntegerType({after})')
+            self.indent -= 1
+
+    def literal_step(self, step) -> Optional[int]:
+        """步长为整数字面量（可带负号）时返回其值"""
+        if step is None:
+            return 1
+        negative = False
+        if isinstance(step, UnaryOp) and step.operator == '-':
+            negative = True
+            step = step.operand
+        if isinstance(step, Literal) and step.type_hint == 'INTEGER' and step.value != 0:
+            return -step.value if negative else step.value
+        return None
+
+    def generate_procedure_call(self, stmt: ProcedureCall):
+        """生成CALL"""
+        scope = self.procedures.get(stmt.name.upper())
+        args = ', '.join(self.expression(arg) for arg in stmt.arguments)
+        if scope is None:
+            self.emit(f'undefined_procedure({stmt.name!r})')
+            return
+        if len(stmt.arguments) != len(scope.params):
+            raise UnsupportedConstruct(f"CALL {stmt.name} with {len(stmt.arguments)} arguments")
+        self.routine_names.setdefault(scope.python_name, ('procedure', stmt.name))
+        self.emit(f'{scope.python_name}({args})')
+
+    # ---------- 表达式 ----------
+
+    def load_variable(self, name: str) -> str:
+        """变量读取表达式"""
+        key = name.upper()
+        if self.is_local(name):
+            return 'v_' + key
+        if key in self.global_constants:
+            return f'(C[{key!r}] if {key!r} in C else undefined({name!r}))'
+        return f'(G[{key!r}] if {key!r} in G else load_global({name!r}))'
+
+    def expression(self, expr) -> str:
+        """生成表达式"""
+        if isinstance(expr, Literal):
+            return self.constant(self.literal_value(expr))
+        elif isinstance(expr, Identifier):
+            return self.load_variable(expr.name)
+        elif isinstance(expr, IdentifierAccess):
+            container = self.load_variable(expr.name)
+            if expr.index1 is not None:
+                if expr.more_indices:
+                    indices = ', '.join(self.expression(index) for index in
+                                        (expr.index1, expr.index2, *expr.more_indices))
+                    return f'index_getn({container}, ({indices}))'
+                if expr.index2 is not None:
+                    return (f'index_get2({container}, {self.expression(expr.index1)}, '
+                            f'{self.expression(expr.index2)})')
+                return f'index_get({container}, {self.expression(expr.index1)})'
+            elif expr.field is not None:
+                return f'{container}.get_field({expr.field!r})'
+            return container
+        elif isinstance(expr, BinaryOp):
+            if expr.operator in ('AND', 'OR'):
+                # 短路求值：生成Python的and/or
+                return f'(TRUE if {self.condition(expr)} else FALSE)'
+            helper = BINARY_HELPERS.get(expr.operator)
+            left = self.expression(expr.left)
+            right = self.expression(expr.right)
+            if helper is None:
+                return f'unknown_operator({left}, {right}, {expr.operator!r})'
+            return f'{helper}({left}, {right})'
+        elif isinstance(expr, UnaryOp):
+            helper = UNARY_HELPERS.get(expr.operator)
+            operand = self.expression(expr.operand)
+            if helper is None:
+                return f'unknown_unary_operator({operand}, {expr.operator!r})'
+            return f'{helper}({operand})'
+        elif isinstance(expr, FunctionCall):
+            return self.function_call(expr)
+        elif isinstance(expr, CachedExpr):
+            # 缓存槽位是所在def的局部变量，进入循环时重置为UNCACHED
+            slot = f'cache_{expr.slot}'
+            if expr.refresh:
+                return f'({slot} := {self.expression(expr.expr)})'
+            return f'({slot} if {slot} is not UNCACHED else ({slot} := {self.expression(expr.expr)}))'
+        raise UnsupportedConstruct(f"expression {type(expr).__name__}")
+
+    def condition(self, expr) -> str:
+        """生成Python bool表达式：AND/OR/NOT对应Python的and/or/not（短路求值），比较直接产生bool"""
+        if isinstance(expr, BinaryOp):
+            if expr.operator in ('AND', 'OR'):
+                return f'({self.condition(expr.left)} {expr.operator.lower()} {self.condition(expr.right)})'
+            helper = COMPARISON_TESTS.get(expr.operator)
+            if helper is not None:
+                return f'{helper}({self.expression(expr.left)}, {self.expression(expr.right)})'
+        elif isinstance(expr, UnaryOp) and expr.operator == 'NOT':
+            return f'(not {self.condition(expr.operand)})'
+        return f'truthy({self.expression(expr)})'
+
+    def literal_value(self, literal: Literal):
+        """构造字面量值（伪代码值不可变，可安全共享）"""
+        if literal.type_hint == 'INTEGER':
+            return pt.IntegerType(literal.value)
+        elif literal.type_hint == 'REAL':
+            return pt.RealType(literal.value)
+        elif literal.type_hint == 'STRING':
+            return pt.StringType(literal.value)
+        elif literal.type_hint == 'CHAR':
+            return pt.CharType(literal.value)
+        elif literal.type_hint == 'BOOLEAN':
+            return pt.BooleanType(literal.value)
+        return literal.value
+
+    def function_call(self, call: FunctionCall) -> str:
+        """生成函数调用"""
+        args = ', '.join(self.expression(arg) for arg in call.arguments)
+        if call.builtin is not None:
+            # 链接时已绑定的内置函数：直接调用，不再按名称查找
+            return f'call_linked({self.constant(call.builtin)}, {call.name!r}{", " if args else ""}{args})'
+        if call.name.upper() in BUILTIN_FUNCTIONS:
+            return f'call_builtin({call.name!r}, [{args}])'
+        scope = self.functions.get(call.name.upper())
+        if scope is None:
+            return f'undefined_function({call.name!r})'
+        if len(call.arguments) != len(scope.params):
+            raise UnsupportedConstruct(f"{call.name} called with {len(call.arguments)} arguments")
+        self.routine_names.setdefault(scope.python_name, ('function', call.name))
+        return f'{scope.python_name}({args})'
+
+
+# 运算符 -> 运行时辅助函数名
+BINARY_HELPERS = {
+    '+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '^': 'power', '&': 'concat',
+    '=': 'eq', '<>': 'ne', '<': 'lt', '>': 'gt', '<=': 'le', '>=': 'ge',
+}
+
+# 作为条件的比较运算符 -> 返回Python bool的运行时辅助函数名
+COMPARISON_TESTS = {
+    '=': 'test_eq', '<>': 'test_ne', '<': 'test_lt', '>': 'test_gt', '<=': 'test_le', '>=': 'test_ge',
+}
+
+
+def is_boolean_expression(expr) -> bool:
+    """表达式的结果是否必定为BOOLEAN（比较和逻辑运算）"""
+    if isinstance(expr, BinaryOp):
+        return expr.operator in COMPARISON_TESTS or expr.operator in ('AND', 'OR')
+    return isinstance(expr, UnaryOp) and expr.operator == 'NOT'
+
+UNARY_HELPERS = {'-': 'neg', '+': 'pos', 'NOT': 'not_'}
+
+
+# ==================== 运行时 ====================
+
+_MISSING = object()
+
+
+def build_runtime(interp: 'PythonInterpreter', constants: List[Any]) -> Dict[str, Any]:
+    """构造生成代码运行所需的命名空间（所有辅助函数复用解释器的语义）"""
+    IntegerType = pt.IntegerType
+    RealType = pt.RealType
+    StringType = pt.StringType
+    BooleanType = pt.BooleanType
+    ArrayType = pt.ArrayType
+    env = interp.global_env
+    check_type_compatibility = interp.check_type_compatibility
+    compare_values = interp.compare_values
+    is_truthy = interp.is_truthy
+
+    def undefined(name):
+        raise RuntimeError(f"Undefined variable '{name}'")
+
+    def load_global(name):
+        return env.get_variable(name)
+
+    def store_global(name, value):
+        # 与Interpreter.set_identifier_value的简单变量路径一致
+        try:
+            existing_value = env.get_variable(name)
+            check_type_compatibility(existing_value, value, name)
+        except RuntimeError:
+            pass
+        env.set_variable(name, value)
+
+    def check_index(index):
+        if not isinstance(index, IntegerType):
+            raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index).__name__}")
+        return index.value
+
+    def index_get(array, index1):
+        index1 = check_index(index1)
+        if isinstance(array, ArrayType):
+            return array.get1(index1)
+        return array.get(index1)
+
+    def index_get2(array, index1, index2):
+        index1 = check_index(index1)
+        if isinstance(array, ArrayType):
+            return array.get2(index1, check_index(index2))
+        return array.get(index1, check_index(index2))
+
+    def index_set(array, index1, value, name):
+        index1 = check_index(index1)
+        if isinstance(array, ArrayType) and array.set1(index1, value):
+            return
+        existing_value = array.get(index1)
+        if existing_value is not None and (type(existing_value) is not type(value) or type(value) is str):
+            check_type_compatibility(existing_value, value, f"{name}[{index1}]")
+        array.set(index1, value)
+
+    def index_set2(array, index1, index2, value, name):
+        index1 = check_index(index1)
+        index2 = check_index(index2)
+        if isinstance(array, ArrayType) and array.set2(index1, index2, value):
+            return
+        existing_value = array.get(index1, index2)
+        if existing_value is not None and (type(existing_value) is not type(value) or type(value) is str):
+            check_type_compatibility(existing_value, value, f"{name}[{index1}, {index2}]")
+        array.set(index1, index2, value)
+
+    def index_getn(array, indices):
+        return array.get(*[check_index(index) for index in indices])
+
+    def index_setn(array, indices, value, name):
+        indices = [check_index(index) for index in indices]
+        existing_value = array.get(*indices)
+        if existing_value is not None and (type(existing_value) is not type(value) or type(value) is str):
+            check_type_compatibility(existing_value, value, f"{name}[{', '.join(map(str, indices))}]")
+        array.set(*indices, value)
+
+    def field_set(record, field, value, name):
+        existing_value = record.get_field(field)
+        if existing_value is not None:
+            check_type_compatibility(existing_value, value, f"{name}.{field}")
+        record.set_field(field, value)
+
+    def make_arithmetic(function, helper):
+        def arithmetic(left, right):
+            left_type = type(left)
+            if left_type is type(right):
+                if left_type is IntegerType:
+                    return IntegerType(function(left.value, right.value))
+                if left_type is RealType:
+                    return RealType(function(left.value, right.value))
+            return helper(left, right)
+        return arithmetic
+
+    def make_compare(function, operator):
+        def compare(left, right):
+            left_type = type(left)
+            if left_type is type(right) and (left_type is IntegerType or left_type is StringType):
+                return BooleanType(function(left.value, right.value))
+            return BooleanType(compare_values(left, right, operator))
+        return compare
+
+    def make_test(function, operator):
+        def test(left, right):
+            left_type = type(left)
+            if left_type is type(right) and (left_type is IntegerType or left_type is StringType):
+                return function(left.value, right.value)
+            return compare_values(left, right, operator)
+        return test
+
+    def neg(operand):
+        if isinstance(operand, IntegerType):
+            return IntegerType(-operand.value)
+        elif isinstance(operand, RealType):
+            return RealType(-operand.value)
+        raise RuntimeError("Unknown unary operator: -")
+
+    def unknown_operator(left, right, operator):
+        raise RuntimeError(f"Unknown operator: {operator}")
+
+    def unknown_unary_operator(operand, operator):
+        raise RuntimeError(f"Unknown unary operator: {operator}")
+
+    def truthy(value):
+        if type(value) is BooleanType:
+            return value.value
+        return is_truthy(value)
+
+    def while_test(condition):
+        # 类型检查：WHILE条件必须是BOOLEAN类型
+        if not isinstance(condition, BooleanType):
+            raise TypeError(f"WHILE循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
+        return condition.value
+
+    def until_test(condition):
+        # 类型检查：REPEAT-UNTIL条件必须是BOOLEAN类型
+        if not isinstance(condition, BooleanType):
+            raise TypeError(f"REPEAT-UNTIL循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
+        return condition.value
+
+    def for_check(start, end, step):
+        # 类型检查：FOR循环只接受INTEGER类型
+        if not isinstance(start, IntegerType):
+            raise TypeError(f"FOR循环的起始值必须是INTEGER类型，而不是{type(start).__name__}")
+        if not isinstance(end, IntegerType):
+            raise TypeError(f"FOR循环的结束值必须是INTEGER类型，而不是{type(end).__name__}")
+        if not isinstance(step, IntegerType):
+            raise TypeError(f"FOR循环的步长必须是INTEGER类型，而不是{type(step).__name__}")
+
+    def case_eq(value, cond_value):
+        return compare_values(value, cond_value, '=')
+
+    def case_range(value, start, end):
+        return compare_values(value, start, '>=') and compare_values(value, end, '<=')
+
+    def read_input():
+        try:
+            user_input = input()
+        except EOFError:
+            raise RuntimeError("Unexpected end of input")
+        return interp.parse_input_value(user_input)
+
+    def default_value(type_name):
+        return interp.create_type_instance(SimpleType(type_name))
+
+    def make_array(bounds, element_type):
+        dimensions = []
+        for lower, upper in bounds:
+            # 转换为整数
+            if isinstance(lower, IntegerType):
+                lower = lower.value
+            if isinstance(upper, IntegerType):
+                upper = upper.value
+            dimensions.append((int(lower), int(upper)))
+        return pt.create_array(dimensions, element_type)
+
+    def make_record(type_name):
+        return interp.create_record_instance(env.get_type(type_name))
+
+    def call_builtin(name, args):
+        return call_builtin_function(name, args, interp.file_manager)
+
+    def call_linked(builtin, name, *args):
+        try:
+            return builtin(*args)
+        except TypeError as e:
+            raise builtin_call_error(name, e)
+
+    def undefined_function(name):
+        raise RuntimeError(f"Undefined function '{name}'")
+
+    def undefined_procedure(name):
+        raise RuntimeError(f"Undefined procedure '{name}'")
+
+    namespace = {
+        '__builtins__': __builtins__,
+        'G': env.variables,
+        'C': env.constants,
+        'MISSING': _MISSING,
+        'UNCACHED': UNCACHED,
+        'TYPES': constants,
+        'IntegerType': IntegerType,
+        'StringType': StringType,
+        'file_manager': interp.file_manager,
+        'define_variable': env.define_variable,
+        'define_constant': env.define_constant,
+        'define_type': lambda type_def: env.define_type(type_def.name, type_def),
+        'check': check_type_compatibility,
+        'to_output_string': interp.to_output_string,
+        'undefined': undefined,
+        'load_global': load_global,
+        'store_global': store_global,
+        'index_get': index_get,
+        'index_get2': index_get2,
+        'index_set': index_set,
+        'index_set2': index_set2,
+        'index_getn': index_getn,
+        'index_setn': index_setn,
+        'field_set': field_set,
+        'add': make_arithmetic(_operator.add, interp.add_values),
+        'sub': make_arithmetic(_operator.sub, interp.subtract_values),
+        'mul': make_arithmetic(_operator.mul, interp.multiply_values),
+        'div': interp.divide_values,
+        'power': interp.power_values,
+        'concat': interp.concat_values,
+        'eq': make_compare(_operator.eq, '='),
+        'ne': make_compare(_operator.ne, '<>'),
+        'lt': make_compare(_operator.lt, '<'),
+        'gt': make_compare(_operator.gt, '>'),
+        'le': make_compare(_operator.le, '<='),
+        'ge': make_compare(_operator.ge, '>='),
+        'test_eq': make_test(_operator.eq, '='),
+        'test_ne': make_test(_operator.ne, '<>'),
+        'test_lt': make_test(_operator.lt, '<'),
+        'test_gt': make_test(_operator.gt, '>'),
+        'test_le': make_test(_operator.le, '<='),
+        'test_ge': make_test(_operator.ge, '>='),
+        'TRUE': pt.TRUE,
+        'FALSE': pt.FALSE,
+        'neg': neg,
+        'pos': lambda operand: operand,
+        'not_': lambda operand: BooleanType(not is_truthy(operand)),
+        'unknown_operator': unknown_operator,
+        'unknown_unary_operator': unknown_unary_operator,
+        'truthy': truthy,
+        'while_test': while_test,
+        'until_test': until_test,
+        'for_check': for_check,
+        'case_eq': case_eq,
+        'case_range': case_range,
+        'compare_values': compare_values,
+        'read_input': read_input,
+        'default_value': default_value,
+        'make_array': make_array,
+        'make_record': make_record,
+        'call_builtin': call_builtin,
+        'call_linked': call_linked,
+        'memoize': interp.memo.wrap if interp.memo is not None else (lambda function: function),
+        'undefined_function': undefined_function,
+        'undefined_procedure': undefined_procedure,
+    }
+    for index, value in enumerate(constants):
+        namespace[f'K{index}'] = value
+    return namespace
+
+
+class PythonInterpreter(Interpreter):
+    """Python转译执行引擎 - 不支持的程序回退到树遍历解释器"""
+
+    def __init__(self, strict_mode: bool = False):
+        super().__init__(strict_mode=strict_mode)
+        self.source: Optional[str] = None           # 生成的Python源代码
+        self.fallback_reason: Optional[str] = None  # 回退到树遍历解释器的原因
+        self.compiled = None
+
+    def transpile(self, program: Program) -> bool:
+        """生成并编译Python代码；程序不受支持时返回False"""
+        transpiler = PythonTranspiler()
+        try:
+            self.source = transpiler.transpile(program)
+        except UnsupportedConstruct as e:
+            self.fallback_reason = str(e)
+            self.source = None
+            self.compiled = (program, None)
+            return False
+        self.fallback_reason = None
+        self.compiled = (program, (compile(self.source, '<pseudocode>', 'exec'), transpiler))
+        return True
+
+    def interpret(self, program: Program):
+        """转译并执行程序"""
+        if self.compiled is None or self.compiled[0] is not program:
+            self.transpile(program)
+        compiled = self.compiled[1]
+        if compiled is None:
+            # 回退到树遍历解释器
+            super().interpret(program)
+            return
+
+        code, transpiler = compiled
+        namespace = build_runtime(self, transpiler.constants)
+        try:
+            exec(code, namespace)
+            namespace['__main__']()
+        except NameError as e:
+            # 在定义之前调用子程序：与解释器一样报告未定义
+            routine = transpiler.routine_names.get(getattr(e, 'name', None))
+            if routine is None:
+                raise
+            kind, name = routine
+            raise RuntimeError(f"Undefined {kind} '{name}'") from None
+        finally:
+            # 确保所有文件被关闭
+            self.file_manager.close_all()
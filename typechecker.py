@@ -0,0 +1,576 @@
+"""
+静态类型检查器 - 在执行前根据DECLARE、CONSTANT、TYPE和FUNCTION ... RETURNS推断表达式类型
+1. 报告必定失败的类型错误（执行前给出诊断，不改变运行时行为）
+2. 为已证明类型安全的赋值、FOR、WHILE和REPEAT填写type_safe，执行引擎据此省略运行时类型检查
+
+静态类型表示值在运行时必定是对应的伪代码类型实例（IntegerType等），内置函数返回的Python原生值
+视为未知类型。推断从声明的类型出发，遇到可能破坏该类型的写入（例如把INTEGER赋给REAL变量、
+未知类型的值、经由BYREF参数的写入）就把该变量降级为未知，反复迭代直到没有变化
+"""
+from typing import Any, Dict, List, Optional
+from ast_nodes import *
+from builtin_functions import is_builtin_function
+
+
+# 返回伪代码类型实例的内置函数（其余内置函数返回Python原生值）
+BUILTIN_RESULT_TYPES = {
+    'LEFT': 'STRING',
+    'RIGHT': 'STRING',
+    'MID': 'STRING',
+    'SETDATE': 'DATE',
+}
+
+NUMERIC_TYPES = ('INTEGER', 'REAL')
+
+# INPUT读入的值：INTEGER、REAL、BOOLEAN或STRING之一
+INPUT_VALUE = 'INPUT'
+
+
+def base_type(type_name: str) -> str:
+    """与Interpreter.check_type_compatibility一致的类型名（所有记录都是RECORD）"""
+    return 'RECORD' if type_name.startswith('RECORD ') else type_name
+
+
+def is_assignable(declared: str, value: str) -> bool:
+    """declared类型的变量能否接受value类型的值"""
+    declared, value = base_type(declared), base_type(value)
+    return declared == value or (declared == 'REAL' and value == 'INTEGER')
+
+
+def iter_children(node):
+    """节点的直接子节点（不含分析阶段填写的字段）"""
+    for name in node.__dataclass_fields__:
+        if node.__dataclass_fields__[name].compare:
+            value = getattr(node, name)
+            if isinstance(value, (list, tuple)):
+                for item in value:
+                    if isinstance(item, tuple):
+                        yield from item
+                    else:
+                        yield item
+            elif value is not None:
+                yield value
+
+
+def scan_statement(stmt, names: set) -> bool:
+    """收集语句中引用的名称（大写），返回是否调用了用户子程序（不进入子程序定义）"""
+    calls = False
+    stack = [stmt]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, ASTNode) or isinstance(node, (ProcedureDef, FunctionDef)):
+            continue
+        if isinstance(node, (Identifier, IdentifierAccess)):
+            names.add(node.name.upper())
+        elif isinstance(node, ForStmt):
+            names.add(node.variable.upper())
+        elif isinstance(node, (CaseStmt, DeclareStmt, ConstantStmt)):
+            names.add(node.identifier.upper())
+        elif isinstance(node, ProcedureCall):
+            calls = True
+        elif isinstance(node, FunctionCall) and not is_builtin_function(node.name):
+            calls = True
+        stack.extend(iter_children(node))
+    return calls
+
+
+class TypeChecker:
+    """静态类型检查器"""
+
+    def __init__(self):
+        # 键 -> 静态类型（None为未知）
+        # ('G', 名称) 全局变量或常量；('L', Scope, 槽位) 子程序局部变量；
+        # ('F', 类型名, 字段名) 记录字段；('R', id(函数定义)) 函数返回值
+        self.facts: Dict[tuple, Optional[str]] = {}
+        self.routines: Dict[tuple, Any] = {}    # (PROCEDURE/FUNCTION, 名称) -> 唯一的定义
+        self.record_types: Dict[str, TypeDefStmt] = {}  # 唯一的TYPE定义
+        self.diagnostics: List[str] = []
+        self.proven = 0     # 省略的运行时检查数
+        self.total = 0      # 可省略检查的语句总数
+        self.reporting = False
+        self.changed = False
+        self.scopes: List[Any] = []
+        self.function: Optional[FunctionDef] = None
+
+    # ==================== 入口 ====================
+
+    def check(self, program: Program) -> 'TypeChecker':
+        """检查整个程序（原地填写type_safe）"""
+        self.collect_definitions(program)
+        self.seed_facts(program)
+
+        # 迭代到不动点：每一轮只会把类型降级为未知
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self.check_block(program.statements)
+
+        self.reporting = True
+        self.check_block(program.statements)
+        return self
+
+    # ==================== 收集定义 ====================
+
+    def collect_definitions(self, program: Program):
+        """登记只定义一次的子程序和TYPE（重复定义的名称不参与推断）"""
+        routines: Dict[tuple, list] = {}
+        types: Dict[str, list] = {}
+        stack = list(program.statements)
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, ASTNode):
+                continue
+            if isinstance(node, ProcedureDef):
+                routines.setdefault(('PROCEDURE', node.name.upper()), []).append(node)
+            elif isinstance(node, FunctionDef):
+                routines.setdefault(('FUNCTION', node.name.upper()), []).append(node)
+            elif isinstance(node, TypeDefStmt):
+                types.setdefault(node.name.upper(), []).append(node)
+            stack.extend(iter_children(node))
+
+        for key, definitions in routines.items():
+            if len(definitions) == 1 and not (key[0] == 'FUNCTION' and is_builtin_function(key[1])):
+                self.routines[key] = definitions[0]
+        for name, definitions in types.items():
+            if len(definitions) == 1:
+                self.record_types[name] = definitions[0]
+
+    def declared_type(self, type_spec) -> Optional[str]:
+        """类型说明对应的静态类型"""
+        if isinstance(type_spec, SimpleType):
+            return type_spec.type_name
+        if isinstance(type_spec, CustomType) and type_spec.type_name.upper() in self.record_types:
+            return 'RECORD ' + type_spec.type_name.upper()
+        return None
+
+    def seed_facts(self, program: Program):
+        """按声明建立初始类型"""
+        # 记录字段
+        for name, type_def in self.record_types.items():
+            field_names = [field.identifier for field in type_def.fields]
+            for field in type_def.fields:
+                if field_names.count(field.identifier) == 1 and isinstance(field.type_spec, SimpleType):
+                    self.facts[('F', name, field.identifier)] = field.type_spec.type_name
+
+        # 全局变量和常量（子程序内CONSTANT的名称按名称查找，与全局名称无法区分）
+        constant_counts: Dict[str, int] = {}
+        declared_names = set()
+        for node in self.walk_nodes(program.statements, into_routines=True):
+            if isinstance(node, ConstantStmt):
+                key = node.identifier.upper()
+                constant_counts[key] = constant_counts.get(key, 0) + 1
+            elif isinstance(node, DeclareStmt):
+                declared_names.add(node.identifier.upper())
+        self.seed_scope(program.statements, None, constant_counts, declared_names)
+
+        # 子程序中出现的名称：全局循环变量可能被按名称访问
+        routine_names = set()
+        for definition in self.walk_nodes(program.statements, into_routines=True):
+            if isinstance(definition, (ProcedureDef, FunctionDef)):
+                for stmt in definition.body:
+                    scan_statement(stmt, routine_names)
+        self.seed_loop_variables(program.statements, None,
+                                 declared_names | set(constant_counts) | routine_names)
+
+        # 子程序参数和局部变量
+        for (kind, _), definition in self.routines.items():
+            scope = definition.scope
+            parameter_names = [param.name.upper() for param in definition.parameters]
+            body_declares = {node.identifier.upper() for node in self.walk_nodes(definition.body)
+                             if isinstance(node, DeclareStmt)}
+            for i, param in enumerate(definition.parameters):
+                name = param.name.upper()
+                if param.by_ref or parameter_names.count(name) > 1 or name in body_declares:
+                    continue
+                param_type = self.declared_type(param.type_spec)
+                if param_type is not None and scope.slots.get(name) == i:
+                    self.facts[('L', scope, i)] = param_type
+            if kind == 'FUNCTION':
+                return_type = self.declared_type(definition.return_type)
+                if return_type is not None:
+                    self.facts[('R', id(definition))] = return_type
+
+        for definition in self.walk_nodes(program.statements, into_routines=True):
+            if isinstance(definition, (ProcedureDef, FunctionDef)):
+                parameter_names = {param.name.upper() for param in definition.parameters}
+                self.seed_scope(definition.body, definition.scope, {}, parameter_names)
+                self.seed_loop_variables(definition.body, definition.scope, parameter_names)
+
+    def seed_scope(self, statements: List[ASTNode], scope, constant_counts: Dict[str, int],
+                   excluded: set):
+        """顶层DECLARE/CONSTANT只执行一次：名称唯一，且之前的语句既不引用该名称也不调用子程序时，
+        之后对该名称的所有引用都看到声明的类型"""
+        declare_counts: Dict[str, int] = {}
+        for node in self.walk_nodes(statements):
+            if isinstance(node, DeclareStmt):
+                key = node.identifier.upper()
+                declare_counts[key] = declare_counts.get(key, 0) + 1
+
+        seen = set()
+        called = False
+        for stmt in statements:
+            if isinstance(stmt, (ProcedureDef, FunctionDef)):
+                continue
+            if not called:
+                name = getattr(stmt, 'identifier', '').upper()
+                if isinstance(stmt, DeclareStmt) and name not in seen and declare_counts[name] == 1:
+                    declared = self.declared_type(stmt.type_spec)
+                    if scope is None and name not in constant_counts and declared is not None:
+                        self.facts[('G', name)] = declared
+                    elif scope is not None and name not in excluded and declared is not None:
+                        self.facts[('L', scope, stmt.slot)] = declared
+                elif (isinstance(stmt, ConstantStmt) and scope is None and name not in seen
+                      and constant_counts.get(name) == 1 and name not in excluded):
+                    value_type = self.infer(stmt.value)
+                    if value_type is not None:
+                        self.facts[('G', name)] = value_type
+            called = scan_statement(stmt, seen) or called
+
+    def seed_loop_variables(self, statements: List[ASTNode], scope, excluded: set):
+        """未声明的FOR循环变量：所有引用都在同名FOR循环体内时，读到的必定是循环定义的INTEGER"""
+        loop_names = set()
+        outside = set()  # 在同名循环体之外被引用的名称
+
+        def visit(node, loops: frozenset):
+            if not isinstance(node, ASTNode) or isinstance(node, (ProcedureDef, FunctionDef)):
+                return
+            if isinstance(node, ForStmt):
+                name = node.variable.upper()
+                loop_names.add(name)
+                for part in (node.start, node.end, node.step):
+                    visit(part, loops)
+                for stmt in node.body:
+                    visit(stmt, loops | {name})
+                return
+            if isinstance(node, (Identifier, IdentifierAccess)):
+                name = node.name.upper()
+            elif isinstance(node, (CaseStmt, DeclareStmt, ConstantStmt)):
+                name = node.identifier.upper()
+            else:
+                name = None
+            if name is not None and name not in loops:
+                outside.add(name)
+            for child in iter_children(node):
+                visit(child, loops)
+
+        for stmt in statements:
+            visit(stmt, frozenset())
+
+        for name in loop_names - outside - excluded:
+            key = ('G', name) if scope is None else ('L', scope, scope.slots[name])
+            self.facts.setdefault(key, 'INTEGER')
+
+    def walk_nodes(self, statements: List[ASTNode], into_routines: bool = False):
+        """遍历语句块中的所有节点（默认不进入子程序定义）"""
+        stack = list(statements)
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, ASTNode):
+                continue
+            yield node
+            if into_routines or not isinstance(node, (ProcedureDef, FunctionDef)):
+                stack.extend(iter_children(node))
+
+    # ==================== 类型事实 ====================
+
+    def key(self, node, name: str) -> tuple:
+        """变量引用对应的键"""
+        if node.slot is not None:
+            return ('L', self.scopes[-1 - node.depth], node.slot)
+        return ('G', name.upper())
+
+    def demote(self, key: tuple):
+        """类型降级为未知"""
+        if self.facts.get(key) is not None:
+            self.facts[key] = None
+            self.changed = True
+
+    def update(self, key: tuple, value_type: Optional[str], checked: bool, name: str) -> bool:
+        """处理一次写入，返回运行时检查是否可以省略"""
+        declared = self.facts.get(key)
+        if declared is None:
+            return False
+        if value_type == declared:
+            return True
+        if value_type == INPUT_VALUE:
+            # INPUT的值经过检查后只能是与变量相同的类型；REAL变量还可能收到INTEGER
+            if declared == 'REAL':
+                self.demote(key)
+            return False
+        if checked and value_type is not None and not is_assignable(declared, value_type):
+            # 运行时必定抛出TypeError，变量保持原类型
+            self.report(f"类型不匹配：变量 '{name}' 声明为 {base_type(declared)} 类型，"
+                        f"不能赋值 {base_type(value_type)} 类型的值")
+            return False
+        self.demote(key)
+        return False
+
+    def write(self, target: IdentifierAccess, value_type: Optional[str], checked: bool = True) -> bool:
+        """处理对标识符的写入，返回运行时检查是否可以省略"""
+        if target.index1 is not None:
+            self.check_index(target.index1)
+            if target.index2 is not None:
+                self.check_index(target.index2)
+            for index in target.more_indices:
+                self.check_index(index)
+            return False
+
+        if target.field is not None:
+            name = f"{target.name}.{target.field}"
+            container = self.facts.get(self.key(target, target.name))
+            if container is not None and container.startswith('RECORD '):
+                return self.update(('F', container[7:], target.field), value_type, checked, name)
+            # 记录类型未知：所有同名字段都可能被写入
+            for key in list(self.facts):
+                if key[0] == 'F' and key[2] == target.field:
+                    self.update(key, value_type, checked, name)
+            return False
+
+        key = self.key(target, target.name)
+        safe = self.update(key, value_type, checked, target.name)
+        if key[0] == 'L' and self.facts.get(key) is None:
+            # 槽位可能尚未绑定，写入会沿作用域链落到外层的同名变量
+            self.write_outer(target, value_type, checked)
+        return safe
+
+    def write_outer(self, target: IdentifierAccess, value_type: Optional[str], checked: bool):
+        """未证明已绑定的局部变量写入：外层作用域和全局的同名变量都可能被修改"""
+        name = target.name.upper()
+        for scope in self.scopes[:len(self.scopes) - 1 - target.depth]:
+            slot = scope.slots.get(name)
+            if slot is not None:
+                self.update(('L', scope, slot), value_type, checked, target.name)
+        self.update(('G', name), value_type, checked, target.name)
+
+    def report(self, message: str):
+        """记录诊断（只在最后一轮记录）"""
+        if self.reporting and message not in self.diagnostics:
+            self.diagnostics.append(message)
+
+    def mark(self, stmt, safe: bool):
+        """填写type_safe（只在最后一轮填写）"""
+        if self.reporting:
+            stmt.type_safe = safe
+            self.total += 1
+            if safe:
+                self.proven += 1
+
+    # ==================== 语句 ====================
+
+    def check_block(self, statements: List[ASTNode]):
+        """检查语句块"""
+        for stmt in statements:
+            self.check_statement(stmt)
+
+    def check_statement(self, stmt: ASTNode):
+        """检查语句"""
+        if isinstance(stmt, DeclareStmt):
+            if isinstance(stmt.type_spec, ArrayType):
+                for lower, upper in stmt.type_spec.dimensions:
+                    self.infer(lower)
+                    self.infer(upper)
+        elif isinstance(stmt, ConstantStmt):
+            value_type = self.infer(stmt.value)
+            if not self.scopes:
+                key = ('G', stmt.identifier.upper())
+                if self.facts.get(key) is not None and self.facts[key] != value_type:
+                    self.demote(key)
+        elif isinstance(stmt, AssignStmt):
+            value_type = self.infer(stmt.value)
+            self.mark(stmt, self.write(stmt.target, value_type))
+        elif isinstance(stmt, InputStmt):
+            self.write(stmt.target, INPUT_VALUE)
+        elif isinstance(stmt, FileReadStmt):
+            self.write(stmt.target, 'STRING')
+        elif isinstance(stmt, (OutputStmt)):
+            for item in stmt.items:
+                self.infer(item)
+        elif isinstance(stmt, IfStmt):
+            self.infer(stmt.condition)
+            self.check_block(stmt.then_block)
+            if stmt.else_block:
+                self.check_block(stmt.else_block)
+        elif isinstance(stmt, CaseStmt):
+            for branch in stmt.branches:
+                if isinstance(branch.condition, RangeCondition):
+                    self.infer(branch.condition.start)
+                    self.infer(branch.condition.end)
+                else:
+                    self.infer(branch.condition)
+                self.check_statement(branch.statement)
+            if stmt.otherwise:
+                self.check_statement(stmt.otherwise)
+        elif isinstance(stmt, ForStmt):
+            self.check_for(stmt)
+        elif isinstance(stmt, WhileStmt):
+            self.mark(stmt, self.check_condition(stmt.condition, 'WHILE循环的条件'))
+            self.check_block(stmt.body)
+        elif isinstance(stmt, RepeatStmt):
+            self.check_block(stmt.body)
+            self.mark(stmt, self.check_condition(stmt.condition, 'REPEAT-UNTIL循环的条件'))
+        elif isinstance(stmt, (ProcedureDef, FunctionDef)):
+            self.check_routine(stmt)
+        elif isinstance(stmt, ProcedureCall):
+            self.check_call('PROCEDURE', stmt.name, stmt.arguments)
+        elif isinstance(stmt, ReturnStmt):
+            self.check_return(stmt)
+        elif isinstance(stmt, FileWriteStmt):
+            self.infer(stmt.value)
+
+    def check_for(self, stmt: ForStmt):
+        """FOR的起始值、结束值和步长都是INTEGER时省略检查"""
+        parts = [('起始值', self.infer(stmt.start)), ('结束值', self.infer(stmt.end))]
+        if stmt.step:
+            parts.append(('步长', self.infer(stmt.step)))
+        for label, value_type in parts:
+            if value_type is not None and value_type != 'INTEGER':
+                self.report(f"FOR循环的{label}必须是INTEGER类型，而不是{base_type(value_type)}")
+        self.mark(stmt, all(value_type == 'INTEGER' for _, value_type in parts))
+
+        # 循环变量直接定义为INTEGER（不经过赋值检查）
+        key = self.key(stmt, stmt.variable)
+        if self.facts.get(key) not in (None, 'INTEGER'):
+            self.demote(key)
+        self.check_block(stmt.body)
+
+    def check_condition(self, condition, label: str) -> bool:
+        """循环条件是BOOLEAN时省略检查"""
+        value_type = self.infer(condition)
+        if value_type is not None and value_type != 'BOOLEAN':
+            self.report(f"{label}必须是BOOLEAN类型，而不是{base_type(value_type)}")
+        return value_type == 'BOOLEAN'
+
+    def check_routine(self, definition):
+        """检查子程序体"""
+        enclosing_function = self.function
+        self.function = definition if isinstance(definition, FunctionDef) else None
+        self.scopes.append(definition.scope)
+        try:
+            self.check_block(definition.body)
+        finally:
+            self.scopes.pop()
+            self.function = enclosing_function
+
+    def check_return(self, stmt: ReturnStmt):
+        """RETURN的值与RETURNS声明比较，并决定函数调用结果的类型"""
+        value_type = self.infer(stmt.value)
+        function = self.function
+        if function is None:
+            return
+        declared = self.declared_type(function.return_type)
+        if declared is not None and value_type is not None and not is_assignable(declared, value_type):
+            self.report(f"函数 '{function.name}' 声明返回 {base_type(declared)} 类型，"
+                        f"不能返回 {base_type(value_type)} 类型的值")
+        key = ('R', id(function))
+        if self.facts.get(key) is not None and value_type != self.facts[key]:
+            self.demote(key)
+
+    def check_call(self, kind: str, name: str, arguments: List[Any]):
+        """检查调用点：实参类型决定形参类型，BYREF实参可能被修改"""
+        argument_types = [self.infer(arg) for arg in arguments]
+        definition = self.routines.get((kind, name.upper()))
+        if definition is None:
+            if kind == 'PROCEDURE':
+                # 无法确定被调用的过程，任何变量实参都可能是BYREF
+                for arg in arguments:
+                    if isinstance(arg, IdentifierAccess):
+                        self.write(arg, None)
+            return None
+
+        scope = definition.scope
+        if len(arguments) != len(definition.parameters):
+            # 参数个数不符时多出的形参保持未绑定
+            for i in range(len(definition.parameters)):
+                self.demote(('L', scope, i))
+        else:
+            for i, argument_type in enumerate(argument_types):
+                key = ('L', scope, i)
+                if self.facts.get(key) is not None and self.facts[key] != argument_type:
+                    self.demote(key)
+
+        if kind == 'PROCEDURE':
+            for param, arg in zip(definition.parameters, arguments):
+                if param.by_ref and isinstance(arg, IdentifierAccess):
+                    self.write(arg, None)
+        return definition
+
+    def check_index(self, expr):
+        """数组索引必须是INTEGER"""
+        value_type = self.infer(expr)
+        if value_type is not None and value_type != 'INTEGER':
+            self.report(f"数组索引必须是INTEGER类型，而不是{base_type(value_type)}")
+
+    # ==================== 表达式 ====================
+
+    def infer(self, expr) -> Optional[str]:
+        """推断表达式的静态类型（None为未知）"""
+        if isinstance(expr, Literal):
+            if expr.type_hint in ('INTEGER', 'REAL', 'STRING', 'CHAR', 'BOOLEAN'):
+                return expr.type_hint
+            return None
+        elif isinstance(expr, Identifier):
+            return self.facts.get(self.key(expr, expr.name))
+        elif isinstance(expr, IdentifierAccess):
+            if expr.index1 is not None:
+                self.check_index(expr.index1)
+                if expr.index2 is not None:
+                    self.check_index(expr.index2)
+                for index in expr.more_indices:
+                    self.check_index(index)
+                return None
+            container = self.facts.get(self.key(expr, expr.name))
+            if expr.field is not None:
+                if container is not None and container.startswith('RECORD '):
+                    return self.facts.get(('F', container[7:], expr.field))
+                return None
+            return container
+        elif isinstance(expr, BinaryOp):
+            return self.infer_binary_op(expr)
+        elif isinstance(expr, UnaryOp):
+            operand = self.infer(expr.operand)
+            if expr.operator == 'NOT':
+                return 'BOOLEAN'
+            if operand in NUMERIC_TYPES:
+                return operand
+            return None
+        elif isinstance(expr, FunctionCall):
+            if is_builtin_function(expr.name):
+                for arg in expr.arguments:
+                    self.infer(arg)
+                return BUILTIN_RESULT_TYPES.get(expr.name.upper())
+            definition = self.check_call('FUNCTION', expr.name, expr.arguments)
+            if definition is None:
+                return None
+            return self.facts.get(('R', id(definition)))
+        elif isinstance(expr, CachedExpr):
+            return self.infer(expr.expr)
+        return None
+
+    def infer_binary_op(self, op: BinaryOp) -> Optional[str]:
+        """推断二元运算的类型（与Interpreter中各运算方法的结果类型一致）"""
+        left = self.infer(op.left)
+        right = self.infer(op.right)
+        operator = op.operator
+
+        if operator in ('+', '-', '*', '/', '^'):
+            for operand in (left, right):
+                if operand is not None and operand not in NUMERIC_TYPES:
+                    self.report(f"运算符 '{operator}' 的操作数必须是数值类型，而不是{base_type(operand)}")
+            if left not in NUMERIC_TYPES or right not in NUMERIC_TYPES:
+                return None
+            if operator == '/':
+                return 'REAL'
+            if operator == '^':
+                # 负指数或复数结果无法静态确定
+                return None
+            return 'INTEGER' if left == right == 'INTEGER' else 'REAL'
+        if operator == '&':
+            return 'STRING'
+        if operator in ('=', '<>', '<', '>', '<=', '>=', 'AND', 'OR'):
+            return 'BOOLEAN'
+        return None
+
+
+def check_program(program: Program) -> TypeChecker:
+    """对程序执行静态类型检查，返回检查器（diagnostics为诊断信息）"""
+    return TypeChecker().check(program)
@@ -0,0 +1,383 @@
+"""
+无装箱执行模式 - 表达式求值期间INTEGER/REAL/STRING使用Python原生int/float/str，
+BOOLEAN使用共享的TRUE/FALSE单例，字面量在编译期构造一次。
+只在语句边界（赋值和类型检查、条件、参数、输出）才装箱为伪代码类型，
+中间结果不再为每次运算分配IntegerType/RealType/BooleanType对象
+"""
+import operator as _operator
+from typing import Any, Callable
+from ast_nodes import *
+from builtin_functions import BUILTIN_FUNCTIONS
+from closure_compiler import ClosureCompiler, ClosureInterpreter
+import pseudocode_types as pt
+
+IntegerType = pt.IntegerType
+RealType = pt.RealType
+StringType = pt.StringType
+CharType = pt.CharType
+BooleanType = pt.BooleanType
+TRUE = pt.TRUE
+FALSE = pt.FALSE
+
+
+def box(value):
+    """原生值 -> 伪代码类型（其他值原样返回）"""
+    value_type = type(value)
+    if value_type is int:
+        return IntegerType(value)
+    if value_type is float:
+        return RealType(value)
+    if value_type is str:
+        return StringType(value)
+    return value
+
+
+def unbox(value):
+    """伪代码类型 -> 原生值
+    CHAR保持为CharType；长度为1的Python字符串（数组默认值、内置函数结果）按CHAR处理，
+    与Interpreter.check_type_compatibility的约定一致"""
+    value_type = type(value)
+    if value_type is IntegerType or value_type is RealType or value_type is StringType:
+        return value.value
+    if value_type is str and len(value) == 1:
+        return CharType(value)
+    return value
+
+
+class UnboxedCompiler(ClosureCompiler):
+    """无装箱闭包编译器 - 表达式闭包返回原生值"""
+
+    def compile_value(self, expr) -> Callable[[], Any]:
+        """语句边界：返回伪代码类型的值"""
+        if isinstance(expr, Literal):
+            return ClosureCompiler.compile_literal(self, expr)
+        if isinstance(expr, Identifier):
+            # 变量中存放的已是伪代码类型，无需拆箱再装箱
+            return self.compile_variable_load(expr)
+        if isinstance(expr, IdentifierAccess) and expr.index1 is None and expr.field is None:
+            return self.compile_variable_load(expr)
+        if isinstance(expr, FunctionCall):
+            # 函数结果本来就是伪代码类型（或内置函数的原生结果），直接使用
+            return ClosureCompiler.compile_function_call(self, expr)
+        native_fn = self.compile_expression(expr)
+        if self.is_boolean_expression(expr):
+            # 比较和逻辑运算的结果是TRUE/FALSE单例，无需装箱
+            return native_fn
+        return lambda: box(native_fn())
+
+    @staticmethod
+    def is_boolean_expression(expr) -> bool:
+        """表达式的结果是否必定为TRUE/FALSE单例"""
+        if isinstance(expr, BinaryOp):
+            return expr.operator in ('=', '<>', '<', '>', '<=', '>=', 'AND', 'OR')
+        return isinstance(expr, UnaryOp) and expr.operator == 'NOT'
+
+    def compile_truthy(self, expr) -> Callable[[], bool]:
+        """编译逻辑运算的操作数，返回Python bool"""
+        is_truthy = self.interp.is_truthy
+        native_fn = self.compile_expression(expr)
+
+        def truthy():
+            value = native_fn()
+            if type(value) is BooleanType:
+                return value.value
+            return is_truthy(box(value))
+
+        return truthy
+
+    def compile_comparison(self, op: BinaryOp, function) -> Callable[[], bool]:
+        """编译作为条件的比较：操作数保持原生值，同类型的int、float或str直接比较"""
+        left_fn = self.compile_expression(op.left)
+        right_fn = self.compile_expression(op.right)
+        operator = op.operator
+        compare = self.interp.compare_values
+
+        def run_comparison():
+            left = left_fn()
+            right = right_fn()
+            left_type = type(left)
+            if left_type is type(right) and (left_type is int or left_type is str or left_type is float):
+                return function(left, right)
+            return compare(box(left), box(right), operator)
+
+        return run_comparison
+
+    def compile_index(self, expr) -> Callable[[], int]:
+        """编译数组索引（必须是INTEGER）"""
+        native_fn = self.compile_expression(expr)
+
+        def index():
+            value = native_fn()
+            if type(value) is not int:
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(box(value)).__name__}")
+            return value
+
+        return index
+
+    # ==================== 表达式 ====================
+
+    def compile_literal(self, literal: Literal):
+        """编译字面量（缓存原生值）"""
+        value = unbox(self.interp.evaluate_literal(literal))
+        if literal.type_hint == 'BOOLEAN':
+            value = TRUE if literal.value else FALSE
+        return lambda: value
+
+    def compile_identifier(self, expr):
+        """编译标识符（读取后拆箱）"""
+        load = self.compile_variable_load(expr)
+
+        def load_native():
+            value = load()
+            value_type = type(value)
+            if value_type is IntegerType or value_type is RealType or value_type is StringType:
+                return value.value
+            if value_type is str and len(value) == 1:
+                return CharType(value)
+            return value
+
+        return load_native
+
+    def compile_identifier_access(self, access: IdentifierAccess):
+        """编译标识符访问"""
+        if access.index1 is None and access.field is None:
+            return self.compile_identifier(access)
+
+        load_container = self.compile_variable_load(access)
+        ArrayType = pt.ArrayType
+        IntegerArrayType = pt.IntegerArrayType
+        RealArrayType = pt.RealArrayType
+
+        if access.field is not None:
+            field = access.field
+            return lambda: unbox(load_container().get_field(field))
+
+        index1_fn = self.compile_index(access.index1)
+
+        if access.more_indices:
+            index2_fn = self.compile_index(access.index2)
+            rest_fn = self.compile_more_indices(access.more_indices)
+
+            def load_nd():
+                array = load_container()
+                index1 = index1_fn()
+                return unbox(array.get(index1, index2_fn(), *rest_fn()))
+
+            return load_nd
+
+        if access.index2 is not None:
+            index2_fn = self.compile_index(access.index2)
+
+            def load_2d():
+                array = load_container()
+                index1 = index1_fn()
+                index2 = index2_fn()
+                array_type = type(array)
+                if array_type is IntegerArrayType or (array_type is RealArrayType and array.kinds is None):
+                    # 快速路径：类型化存储中本来就是原生值
+                    row = index1 - array.low1
+                    column = index2 - array.low2
+                    if 0 <= row < array.rows and 0 <= column < array.columns:
+                        return array.data[row * array.columns + column]
+                if isinstance(array, ArrayType):
+                    return unbox(array.get2(index1, index2))
+                return unbox(array.get(index1, index2))
+
+            return load_2d
+
+        def load_1d():
+            array = load_container()
+            index1 = index1_fn()
+            array_type = type(array)
+            if array_type is IntegerArrayType or (array_type is RealArrayType and array.kinds is None):
+                # 快速路径：类型化存储中本来就是原生值
+                offset = index1 - array.low1
+                if 0 <= offset < array.length:
+                    return array.data[offset]
+            if isinstance(array, ArrayType):
+                return unbox(array.get1(index1))
+            return unbox(array.get(index1))
+
+        return load_1d
+
+    def compile_binary_op(self, op: BinaryOp):
+        """编译二元运算（原生值快速路径，其余装箱后交给解释器的运算方法）"""
+        interp = self.interp
+        left_fn = self.compile_expression(op.left)
+        right_fn = self.compile_expression(op.right)
+        operator = op.operator
+
+        fast_arithmetic = {
+            '+': _operator.add,
+            '-': _operator.sub,
+            '*': _operator.mul,
+        }.get(operator)
+
+        if fast_arithmetic is not None:
+            slow_arithmetic = {
+                '+': interp.add_values,
+                '-': interp.subtract_values,
+                '*': interp.multiply_values,
+            }[operator]
+
+            def run_arithmetic():
+                left = left_fn()
+                right = right_fn()
+                # 快速路径：同为int或同为float（bool不参与）
+                left_type = type(left)
+                if left_type is type(right) and (left_type is int or left_type is float):
+                    return fast_arithmetic(left, right)
+                return unbox(slow_arithmetic(box(left), box(right)))
+
+            return run_arithmetic
+
+        if operator == '/':
+            divide_values = interp.divide_values
+
+            def run_divide():
+                left = left_fn()
+                right = right_fn()
+                left_type = type(left)
+                right_type = type(right)
+                if (left_type is int or left_type is float) and (right_type is int or right_type is float):
+                    if right == 0:
+                        raise RuntimeError("Division by zero")
+                    return left / right
+                return unbox(divide_values(box(left), box(right)))
+
+            return run_divide
+
+        if operator == '&':
+            concat_values = interp.concat_values
+            threshold = pt.STRING_BUILDER_THRESHOLD
+
+            def run_concat():
+                left = left_fn()
+                right = right_fn()
+                # 较长的结果交给concat_values生成StringBuilder（unbox后仍是StringBuilder）
+                if type(left) is str and type(right) is str and len(left) + len(right) < threshold:
+                    return left + right
+                return unbox(concat_values(box(left), box(right)))
+
+            return run_concat
+
+        if operator == '^':
+            power_values = interp.power_values
+            return lambda: unbox(power_values(box(left_fn()), box(right_fn())))
+
+        fast_compare = {
+            '=': _operator.eq,
+            '<>': _operator.ne,
+            '<': _operator.lt,
+            '>': _operator.gt,
+            '<=': _operator.le,
+            '>=': _operator.ge,
+        }.get(operator)
+
+        if fast_compare is not None:
+            compare = interp.compare_values
+
+            def run_compare():
+                left = left_fn()
+                right = right_fn()
+                # 快速路径：同类型的int、float或str直接比较
+                left_type = type(left)
+                if left_type is type(right) and (left_type is int or left_type is str or left_type is float):
+                    return TRUE if fast_compare(left, right) else FALSE
+                return TRUE if compare(box(left), box(right), operator) else FALSE
+
+            return run_compare
+
+        if operator in ('AND', 'OR'):
+            left_truthy = self.compile_truthy(op.left)
+            right_truthy = self.compile_truthy(op.right)
+            # 短路求值：左操作数已决定结果时不求值右操作数
+            if operator == 'AND':
+                def run_and():
+                    return TRUE if left_truthy() and right_truthy() else FALSE
+                return run_and
+
+            def run_or():
+                return TRUE if left_truthy() or right_truthy() else FALSE
+            return run_or
+
+        def run_unknown():
+            left_fn()
+            right_fn()
+            raise RuntimeError(f"Unknown operator: {operator}")
+
+        return run_unknown
+
+    def compile_unary_op(self, op: UnaryOp):
+        """编译一元运算"""
+        operator = op.operator
+
+        if operator == 'NOT':
+            truthy = self.compile_truthy(op.operand)
+            return lambda: FALSE if truthy() else TRUE
+
+        if operator == '-':
+            boxed_fn = self.compile_negated_value(op.operand)
+            if boxed_fn is not None:
+                def run_negate_boxed():
+                    operand = boxed_fn()
+                    if isinstance(operand, IntegerType) or isinstance(operand, RealType):
+                        return -operand.value
+                    raise RuntimeError(f"Unknown unary operator: {operator}")
+                return run_negate_boxed
+
+        operand_fn = self.compile_expression(op.operand)
+        if operator == '-':
+            def run_negate():
+                operand = operand_fn()
+                operand_type = type(operand)
+                if operand_type is int or operand_type is float:
+                    return -operand
+                raise RuntimeError(f"Unknown unary operator: {operator}")
+            return run_negate
+        elif operator == '+':
+            return operand_fn
+
+        def run_unknown():
+            operand_fn()
+            raise RuntimeError(f"Unknown unary operator: {operator}")
+
+        return run_unknown
+
+    def compile_negated_value(self, expr):
+        """取负的操作数可能是内置函数的原生结果（经变量或函数返回值传递）时，按伪代码类型编译，
+        与其他引擎一样只有INTEGER和REAL能取负；运算结果和字面量不会是原生结果，返回None"""
+        if isinstance(expr, CachedExpr) and isinstance(expr.expr, FunctionCall):
+            call = expr.expr
+            if call.builtin is not None or (call.definition is None and call.name.upper() in BUILTIN_FUNCTIONS):
+                # 内置函数的结果都不是INTEGER或REAL，缓存的原生值不会通过检查
+                return self.compile_expression(expr)
+            # 循环不变的纯用户函数调用：此处不经缓存，直接调用（其他出现处仍使用缓存）
+            expr = call
+        if isinstance(expr, (Identifier, IdentifierAccess, FunctionCall)):
+            if not isinstance(expr, IdentifierAccess) or (expr.index1 is None and expr.field is None):
+                return self.compile_value(expr)
+        return None
+
+    def compile_function_call(self, call: FunctionCall):
+        """编译函数调用（参数装箱，结果拆箱）"""
+        call_fn = ClosureCompiler.compile_function_call(self, call)
+        return lambda: unbox(call_fn())
+
+    EXPRESSION_COMPILERS = {
+        Literal: compile_literal,
+        Identifier: compile_identifier,
+        IdentifierAccess: compile_identifier_access,
+        BinaryOp: compile_binary_op,
+        UnaryOp: compile_unary_op,
+        FunctionCall: compile_function_call,
+        CachedExpr: ClosureCompiler.compile_cached,
+    }
+
+
+class UnboxedInterpreter(ClosureInterpreter):
+    """无装箱执行引擎 - 闭包编译，表达式内部使用原生值"""
+
+    def __init__(self, strict_mode: bool = False):
+        super().__init__(strict_mode=strict_mode)
+        self.compiler = UnboxedCompiler(self)
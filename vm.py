@@ -0,0 +1,873 @@
+"""
+栈式虚拟机 - 执行bytecode.py生成的线性指令流
+用显式的调用帧栈代替Python递归，支持按指令数暂停/恢复执行和指令计数分析
+"""
+import operator as _operator
+from typing import Any, Dict, List, Optional
+from ast_nodes import *
+from interpreter import Interpreter, ReturnValue, UNCACHED, COMPARISON_FUNCTIONS
+from environment import (Frame as EnvironmentFrame, UNBOUND, NameReference, SlotReference, ElementReference,
+                         FieldReference)
+import pseudocode_types as pt
+from builtin_functions import call_builtin_function, builtin_call_error
+import bytecode as bc
+
+
+class _Halt(Exception):
+    """内部信号：当前执行循环结束"""
+    pass
+
+
+class Frame:
+    """调用帧"""
+
+    def __init__(self, kind: str, instructions, pc: int, env, stack_base: int,
+                 definition=None, name: str = ''):
+        self.kind = kind                # 'program' / 'function' / 'procedure' / 'body'
+        self.instructions = instructions  # 调用者的指令（返回时恢复）
+        self.pc = pc                    # 调用者的返回地址
+        self.env = env                  # 调用者的作用域
+        self.stack_base = stack_base    # 进入时的操作数栈高度
+        self.definition = definition
+        self.name = name
+        self.memo_key = None            # 函数返回时保存结果的记忆化缓存键
+
+    def __repr__(self):
+        return f"Frame({self.kind}, {self.name})"
+
+
+class VirtualMachine(Interpreter):
+    """字节码虚拟机"""
+
+    def __init__(self, strict_mode: bool = False, profile: bool = False):
+        super().__init__(strict_mode=strict_mode)
+        self.profile = profile
+        self.instruction_counts: Dict[str, int] = {}
+        self.stack: List[Any] = []
+        self.frames: List[Frame] = []
+        self.instructions = []
+        self.pc = 0
+        self.finished = True
+        self.routines = []
+        # 子程序定义 -> 准备好的指令 {id(定义节点): (定义节点, 指令)}
+        self.routine_code: Dict[int, tuple] = {}
+        self.handlers = {
+            opcode: getattr(self, 'op_' + opcode.lower())
+            for opcode in dir(bc) if opcode.isupper() and isinstance(getattr(bc, opcode), str)
+            and hasattr(self, 'op_' + opcode.lower())
+        }
+
+    # ==================== 装载和运行 ====================
+
+    def compile(self, program: Program) -> bc.CodeObject:
+        """编译程序为代码对象"""
+        return bc.BytecodeCompiler().compile_program(program)
+
+    def prepare(self, code: bc.CodeObject) -> list:
+        """将(操作码, 参数)转换为(处理函数, 参数)，消除运行时的操作码查找"""
+        handlers = self.handlers
+        prepared = []
+        for opcode, arg in code.instructions:
+            if opcode not in handlers:
+                raise RuntimeError(f"Unknown opcode: {opcode}")
+            prepared.append(self.specialize(opcode, arg))
+        return prepared
+
+    def specialize(self, opcode: str, arg):
+        """为常见指令选择专用处理函数"""
+        if opcode == bc.LOAD_VAR:
+            return (self.op_load_var, (arg, arg.upper()))
+        if opcode == bc.BINARY_OP:
+            if arg in self.ARITHMETIC_OPERATORS:
+                return (self.op_binary_arithmetic, (self.ARITHMETIC_OPERATORS[arg],
+                                                    getattr(self, self.ARITHMETIC_HELPERS[arg])))
+            if arg in self.COMPARISON_OPERATORS:
+                return (self.op_binary_compare, (arg, self.COMPARISON_OPERATORS[arg]))
+        if opcode == bc.COMPARE_JUMP_IF_FALSE or opcode == bc.COMPARE_JUMP_IF_TRUE:
+            operator, target = arg
+            return (self.handlers[opcode], (operator, self.COMPARISON_OPERATORS[operator], target))
+        return (self.handlers[opcode], arg)
+
+    def load(self, code: bc.CodeObject):
+        """装载顶层代码对象，准备从头执行"""
+        self.routines = code.routines
+        self.instructions = self.prepare(code)
+        self.pc = 0
+        self.stack = []
+        self.frames = [Frame('program', None, 0, self.current_env, 0, name=code.name)]
+        self.finished = False
+
+    def interpret(self, program: Program):
+        """编译并执行程序"""
+        self.run_code(self.compile(program))
+
+    def run_code(self, code: bc.CodeObject):
+        """执行已编译的代码对象"""
+        try:
+            self.load(code)
+            self.resume()
+        finally:
+            # 确保所有文件被关闭
+            self.file_manager.close_all()
+
+    def resume(self, max_steps: Optional[int] = None) -> bool:
+        """继续执行；给定max_steps时最多执行这么多条指令后暂停。返回程序是否已结束"""
+        if self.finished:
+            return True
+        try:
+            if max_steps is None:
+                self.execute_loop()
+            elif self.execute_steps(max_steps):
+                return False
+        except _Halt:
+            pass
+        except BaseException:
+            # 出错时恢复到顶层作用域，丢弃执行状态
+            if self.frames:
+                self.current_env = self.frames[0].env
+            self.finished = True
+            raise
+        self.finished = True
+        return True
+
+    def execute_loop(self):
+        """主分派循环（通过_Halt退出）"""
+        if self.profile:
+            counts = self.instruction_counts
+            while True:
+                handler, arg = self.instructions[self.pc]
+                self.pc += 1
+                name = handler.__name__[3:].upper()
+                counts[name] = counts.get(name, 0) + 1
+                handler(arg)
+        while True:
+            handler, arg = self.instructions[self.pc]
+            self.pc += 1
+            handler(arg)
+
+    def execute_steps(self, max_steps: int) -> bool:
+        """执行至多max_steps条指令，返回是否因步数耗尽而暂停"""
+        for _ in range(max_steps):
+            handler, arg = self.instructions[self.pc]
+            self.pc += 1
+            handler(arg)
+        return True
+
+    def execute_statement(self, stmt: ASTNode):
+        """编译并执行单条语句（供REPL使用）"""
+        code = bc.BytecodeCompiler().compile_statements('<statement>', [stmt], bc.HALT)
+        self.load(code)
+        self.resume()
+
+    def execute_body(self, definition):
+        """在嵌套的执行循环中运行子程序体（供解释器的通用调用路径使用）"""
+        instructions = self.routine_instructions(definition)
+        self.frames.append(Frame('body', self.instructions, self.pc, self.current_env,
+                                 len(self.stack), definition=definition, name=definition.name))
+        self.instructions = instructions
+        self.pc = 0
+        try:
+            self.execute_loop()
+        except _Halt:
+            pass
+
+    def routine_instructions(self, definition) -> list:
+        """获取子程序定义对应的已准备指令"""
+        entry = self.routine_code.get(id(definition))
+        if entry is None or entry[0] is not definition:
+            code = bc.BytecodeCompiler().compile_statements(definition.name, definition.body, bc.END_ROUTINE)
+            entry = (definition, self.prepare(code))
+            self.routine_code[id(definition)] = entry
+        return entry[1]
+
+    # ==================== 栈操作 ====================
+
+    def op_load_const(self, value):
+        self.stack.append(value)
+
+    def op_load_var(self, arg):
+        name, key = arg
+        # 直接遍历作用域链（与Environment.get_variable的查找顺序一致）
+        env = self.current_env
+        while env is not None:
+            if key in env.constants:
+                self.stack.append(env.constants[key])
+                return
+            variables = env.variables
+            if key in variables:
+                self.stack.append(variables[key])
+                return
+            env = env.parent
+        raise RuntimeError(f"Undefined variable '{name}'")
+
+    def op_load_slot(self, arg):
+        name, depth, slot = arg
+        frame = self.current_env if depth == 0 else self.frame_at(depth)
+        value = frame.slots[slot]
+        if value is UNBOUND:
+            value = frame.parent.get_variable(name)
+        self.stack.append(value)
+
+    def op_load_ref(self, arg):
+        name, depth, slot = arg
+        frame = self.current_env if depth == 0 else self.frame_at(depth)
+        self.stack.append(frame.slots[slot].get())
+
+    def op_load_index(self, dims):
+        stack = self.stack
+        if dims == 1:
+            index1 = stack.pop()
+            array = stack.pop()
+            if not isinstance(index1, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+            index1 = index1.value
+            if isinstance(array, pt.ArrayType):
+                stack.append(array.get1(index1))
+            else:
+                stack.append(array.get(index1))
+        elif dims > 2:
+            indices = self.pop_indices(dims)
+            array = stack.pop()
+            stack.append(array.get(*indices))
+        else:
+            index2 = stack.pop()
+            index1 = stack.pop()
+            array = stack.pop()
+            if not isinstance(index1, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+            if not isinstance(index2, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
+            if isinstance(array, pt.ArrayType):
+                stack.append(array.get2(index1.value, index2.value))
+            else:
+                stack.append(array.get(index1.value, index2.value))
+
+    def pop_indices(self, dims) -> list:
+        """弹出三维及以上数组的索引（按求值顺序检查类型），返回Python整数列表"""
+        stack = self.stack
+        indices = stack[-dims:]
+        del stack[-dims:]
+        for i, index in enumerate(indices):
+            if not isinstance(index, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index).__name__}")
+            indices[i] = index.value
+        return indices
+
+    def op_load_field(self, field):
+        record = self.stack.pop()
+        self.stack.append(record.get_field(field))
+
+    def op_store_var(self, name):
+        value = self.stack.pop()
+        # 类型检查：只有在变量已存在时才检查类型
+        try:
+            existing_value = self.current_env.get_variable(name)
+            if type(existing_value) is not type(value) or type(value) is str:
+                self.check_type_compatibility(existing_value, value, name)
+        except RuntimeError:
+            # 变量不存在，允许在非严格模式下创建
+            pass
+        self.current_env.set_variable(name, value)
+
+    def op_store_slot(self, arg):
+        name, depth, slot = arg
+        value = self.stack.pop()
+        frame = self.current_env if depth == 0 else self.frame_at(depth)
+        slots = frame.slots
+        existing_value = slots[slot]
+        if existing_value is UNBOUND:
+            # 尚未在本帧定义：按名称走通用路径（外层变量、常量或隐式声明）
+            try:
+                self.check_type_compatibility(frame.get_slot(slot, name), value, name)
+            except RuntimeError:
+                pass
+            frame.set_slot(slot, name, value)
+            return
+        if type(existing_value) is not type(value) or type(value) is str:
+            self.check_type_compatibility(existing_value, value, name)
+        slots[slot] = value
+
+    def op_store_ref(self, arg):
+        name, depth, slot = arg
+        value = self.stack.pop()
+        frame = self.current_env if depth == 0 else self.frame_at(depth)
+        reference = frame.slots[slot]
+        existing_value = reference.get()
+        if existing_value is not None and (type(existing_value) is not type(value) or type(value) is str):
+            self.check_type_compatibility(existing_value, value, name)
+        reference.set(value)
+
+    def op_ref_var(self, name):
+        self.stack.append(NameReference(self.current_env, name))
+
+    def op_ref_slot(self, arg):
+        name, depth, slot = arg
+        frame = self.current_env if depth == 0 else self.frame_at(depth)
+        self.stack.append(SlotReference(frame, slot, name))
+
+    def op_ref_param(self, arg):
+        name, depth, slot = arg
+        frame = self.current_env if depth == 0 else self.frame_at(depth)
+        self.stack.append(frame.slots[slot])
+
+    def op_ref_index(self, dims):
+        stack = self.stack
+        indices = self.pop_indices(dims)
+        array = stack.pop()
+        stack.append(ElementReference(array, tuple(indices)))
+
+    def op_ref_field(self, field):
+        self.stack.append(FieldReference(self.stack.pop(), field))
+
+    def op_store_var_unchecked(self, name):
+        self.current_env.set_variable(name, self.stack.pop())
+
+    def op_store_slot_unchecked(self, arg):
+        name, depth, slot = arg
+        value = self.stack.pop()
+        frame = self.current_env if depth == 0 else self.frame_at(depth)
+        slots = frame.slots
+        if slots[slot] is UNBOUND:
+            frame.set_slot(slot, name, value)
+        else:
+            slots[slot] = value
+
+    def op_store_index(self, arg):
+        name, dims = arg
+        stack = self.stack
+        if dims == 1:
+            index1 = stack.pop()
+            array = stack.pop()
+            value = stack.pop()
+            if not isinstance(index1, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+            index1 = index1.value
+            if isinstance(array, pt.ArrayType) and array.set1(index1, value):
+                # 快速路径：无需类型检查即可存入
+                return
+            existing_value = array.get(index1)
+            if existing_value is not None and (type(existing_value) is not type(value) or type(value) is str):
+                self.check_type_compatibility(existing_value, value, f"{name}[{index1}]")
+            array.set(index1, value)
+        elif dims > 2:
+            indices = self.pop_indices(dims)
+            array = stack.pop()
+            value = stack.pop()
+            existing_value = array.get(*indices)
+            if existing_value is not None:
+                self.check_type_compatibility(existing_value, value, f"{name}[{', '.join(map(str, indices))}]")
+            array.set(*indices, value)
+        else:
+            index2 = stack.pop()
+            index1 = stack.pop()
+            array = stack.pop()
+            value = stack.pop()
+            if not isinstance(index1, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index1).__name__}")
+            if not isinstance(index2, pt.IntegerType):
+                raise TypeError(f"数组索引必须是INTEGER类型，而不是{type(index2).__name__}")
+            index1 = index1.value
+            index2 = index2.value
+            if isinstance(array, pt.ArrayType) and array.set2(index1, index2, value):
+                return
+            existing_value = array.get(index1, index2)
+            if existing_value is not None:
+                self.check_type_compatibility(existing_value, value, f"{name}[{index1}, {index2}]")
+            array.set(index1, index2, value)
+
+    def op_store_field(self, arg):
+        name, field = arg
+        record = self.stack.pop()
+        value = self.stack.pop()
+        existing_value = record.get_field(field)
+        if existing_value is not None:
+            self.check_type_compatibility(existing_value, value, f"{name}.{field}")
+        record.set_field(field, value)
+
+    def op_dup(self, arg):
+        self.stack.append(self.stack[-1])
+
+    def op_pop(self, arg):
+        self.stack.pop()
+
+    # ==================== 运算 ====================
+
+    ARITHMETIC_OPERATORS = {'+': _operator.add, '-': _operator.sub, '*': _operator.mul}
+    ARITHMETIC_HELPERS = {'+': 'add_values', '-': 'subtract_values', '*': 'multiply_values'}
+    COMPARISON_OPERATORS = COMPARISON_FUNCTIONS
+
+    def op_binary_arithmetic(self, arg):
+        """+ - * 专用处理：同为INTEGER或同为REAL时直接计算"""
+        function, helper = arg
+        stack = self.stack
+        right = stack.pop()
+        left = stack[-1]
+        left_type = type(left)
+        if left_type is type(right):
+            if left_type is pt.IntegerType:
+                stack[-1] = pt.IntegerType(function(left.value, right.value))
+                return
+            if left_type is pt.RealType:
+                stack[-1] = pt.RealType(function(left.value, right.value))
+                return
+        stack[-1] = helper(left, right)
+
+    def op_binary_compare(self, arg):
+        """比较运算专用处理：INTEGER与INTEGER、STRING与STRING直接比较"""
+        operator, function = arg
+        stack = self.stack
+        right = stack.pop()
+        left = stack[-1]
+        left_type = type(left)
+        if left_type is type(right) and (left_type is pt.IntegerType or left_type is pt.StringType):
+            stack[-1] = pt.BooleanType(function(left.value, right.value))
+        else:
+            stack[-1] = pt.BooleanType(self.compare_values(left, right, operator))
+
+    def op_binary_op(self, operator):
+        stack = self.stack
+        right = stack.pop()
+        left = stack.pop()
+
+        if operator == '+':
+            stack.append(self.add_values(left, right))
+        elif operator == '-':
+            stack.append(self.subtract_values(left, right))
+        elif operator == '*':
+            stack.append(self.multiply_values(left, right))
+        elif operator == '/':
+            stack.append(self.divide_values(left, right))
+        elif operator == '^':
+            stack.append(self.power_values(left, right))
+        elif operator == '&':
+            stack.append(self.concat_values(left, right))
+        elif operator in ('=', '<>', '<', '>', '<=', '>='):
+            stack.append(pt.BooleanType(self.compare_values(left, right, operator)))
+        else:
+            raise RuntimeError(f"Unknown operator: {operator}")
+
+    def op_unary_op(self, operator):
+        operand = self.stack.pop()
+
+        if operator == '-':
+            if isinstance(operand, pt.IntegerType):
+                self.stack.append(pt.IntegerType(-operand.value))
+                return
+            elif isinstance(operand, pt.RealType):
+                self.stack.append(pt.RealType(-operand.value))
+                return
+        elif operator == '+':
+            self.stack.append(operand)
+            return
+        elif operator == 'NOT':
+            self.stack.append(pt.BooleanType(not self.is_truthy(operand)))
+            return
+
+        raise RuntimeError(f"Unknown unary operator: {operator}")
+
+    # ==================== 跳转 ====================
+
+    def op_jump(self, target):
+        self.pc = target
+
+    def op_pop_jump_if_false(self, target):
+        if not self.is_truthy(self.stack.pop()):
+            self.pc = target
+
+    def op_pop_jump_if_not(self, target):
+        if not self.stack.pop():
+            self.pc = target
+
+    def op_pop_jump_if_true(self, target):
+        if self.is_truthy(self.stack.pop()):
+            self.pc = target
+
+    def op_jump_if_false_or_pop(self, target):
+        stack = self.stack
+        if self.is_truthy(stack[-1]):
+            stack.pop()
+        else:
+            stack[-1] = pt.BooleanType(False)
+            self.pc = target
+
+    def op_jump_if_true_or_pop(self, target):
+        stack = self.stack
+        if self.is_truthy(stack[-1]):
+            stack[-1] = pt.BooleanType(True)
+            self.pc = target
+        else:
+            stack.pop()
+
+    def op_to_boolean(self, arg):
+        self.stack[-1] = pt.BooleanType(self.is_truthy(self.stack[-1]))
+
+    def op_compare_jump_if_false(self, arg):
+        """比较与条件跳转合并：INTEGER与INTEGER、STRING与STRING直接比较"""
+        operator, function, target = arg
+        stack = self.stack
+        right = stack.pop()
+        left = stack.pop()
+        left_type = type(left)
+        if left_type is type(right) and (left_type is pt.IntegerType or left_type is pt.StringType):
+            if not function(left.value, right.value):
+                self.pc = target
+        elif not self.compare_values(left, right, operator):
+            self.pc = target
+
+    def op_compare_jump_if_true(self, arg):
+        operator, function, target = arg
+        stack = self.stack
+        right = stack.pop()
+        left = stack.pop()
+        left_type = type(left)
+        if left_type is type(right) and (left_type is pt.IntegerType or left_type is pt.StringType):
+            if function(left.value, right.value):
+                self.pc = target
+        elif self.compare_values(left, right, operator):
+            self.pc = target
+
+    def op_while_test(self, target):
+        condition = self.stack.pop()
+        # 类型检查：WHILE条件必须是BOOLEAN类型
+        if not isinstance(condition, pt.BooleanType):
+            raise TypeError(f"WHILE循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
+        if not condition.value:
+            self.pc = target
+
+    def op_until_test(self, target):
+        condition = self.stack.pop()
+        # 类型检查：REPEAT-UNTIL条件必须是BOOLEAN类型
+        if not isinstance(condition, pt.BooleanType):
+            raise TypeError(f"REPEAT-UNTIL循环的条件必须是BOOLEAN类型，而不是{type(condition).__name__}")
+        if not condition.value:
+            self.pc = target
+
+    def op_pop_jump_if_false_value(self, target):
+        if not self.stack.pop().value:
+            self.pc = target
+
+    def op_load_cached(self, arg):
+        slot, target = arg
+        value = self.cache.get(slot, UNCACHED)
+        if value is not UNCACHED:
+            self.stack.append(value)
+            self.pc = target
+
+    def op_store_cached(self, slot):
+        self.cache[slot] = self.stack[-1]
+
+    def op_clear_cache(self, slots):
+        cache = self.cache
+        for slot in slots:
+            cache.pop(slot, None)
+
+    def op_for_init(self, arg):
+        variable, slot, type_safe = arg
+        stack = self.stack
+        step = stack.pop()
+        end = stack.pop()
+        start = stack.pop()
+
+        # 类型检查：FOR循环只接受INTEGER类型（类型检查器已证明时省略）
+        if not type_safe:
+            if not isinstance(start, pt.IntegerType):
+                raise TypeError(f"FOR循环的起始值必须是INTEGER类型，而不是{type(start).__name__}")
+            if not isinstance(end, pt.IntegerType):
+                raise TypeError(f"FOR循环的结束值必须是INTEGER类型，而不是{type(end).__name__}")
+            if not isinstance(step, pt.IntegerType):
+                raise TypeError(f"FOR循环的步长必须是INTEGER类型，而不是{type(step).__name__}")
+
+        env = self.current_env
+        if slot is not None:
+            # 循环状态: [计数器, 结束值, 步长, 循环变量所在的容器, 变量键或槽位]
+            env.slots[slot] = pt.IntegerType(start.value)
+            stack.append([start.value, end.value, step.value, env.slots, slot])
+        else:
+            env.define_variable(variable, pt.IntegerType(start.value))
+            stack.append([start.value, end.value, step.value, env.variables, variable.upper()])
+
+    def op_for_test(self, target):
+        state = self.stack[-1]
+        counter, end, step = state[0], state[1], state[2]
+        if (counter <= end) if step > 0 else (counter >= end):
+            return
+        self.stack.pop()
+        self.pc = target
+
+    def op_for_step(self, target):
+        state = self.stack[-1]
+        state[0] += state[2]
+        state[3][state[4]] = pt.IntegerType(state[0])
+        self.pc = target
+
+    def op_case_eq(self, arg):
+        stack = self.stack
+        cond_value = stack.pop()
+        value = stack.pop()
+        stack.append(self.compare_values(value, cond_value, '='))
+
+    def op_case_range(self, arg):
+        stack = self.stack
+        end = stack.pop()
+        start = stack.pop()
+        value = stack.pop()
+        stack.append(self.compare_values(value, start, '>=') and self.compare_values(value, end, '<='))
+
+    def op_case_table(self, arg):
+        table, targets = arg
+        stack = self.stack
+        index = table.lookup(stack[-1], self.compare_values)
+        if index < table.size:
+            stack.pop()
+            self.pc = targets[index]
+
+    # ==================== 声明和定义 ====================
+
+    def op_declare(self, arg):
+        name, type_name = arg
+        self.current_env.define_variable(name, self.create_type_instance(SimpleType(type_name)))
+
+    def op_declare_array(self, arg):
+        name, dims, element_type = arg
+        stack = self.stack
+        values = stack[len(stack) - 2 * dims:]
+        del stack[len(stack) - 2 * dims:]
+
+        dimensions = []
+        for i in range(dims):
+            lower = values[2 * i]
+            upper = values[2 * i + 1]
+            # 转换为整数
+            if isinstance(lower, pt.IntegerType):
+                lower = lower.value
+            if isinstance(upper, pt.IntegerType):
+                upper = upper.value
+            dimensions.append((int(lower), int(upper)))
+
+        self.current_env.define_variable(name, pt.create_array(dimensions, element_type))
+
+    def op_declare_array_const(self, arg):
+        name, bounds, element_type = arg
+        self.current_env.define_variable(name, pt.create_array(list(bounds), element_type))
+
+    def op_declare_record(self, arg):
+        name, type_name = arg
+        type_def = self.current_env.get_type(type_name)
+        self.current_env.define_variable(name, self.create_record_instance(type_def))
+
+    def op_define_constant(self, name):
+        self.current_env.define_constant(name, self.stack.pop())
+
+    def op_define_type(self, type_def):
+        self.current_env.define_type(type_def.name, type_def)
+
+    def op_define_procedure(self, index):
+        definition = self.register_routine(index)
+        self.current_env.define_procedure(definition.name, definition)
+
+    def op_define_function(self, index):
+        definition = self.register_routine(index)
+        self.current_env.define_function(definition.name, definition)
+
+    def register_routine(self, index: int):
+        """登记子程序的已编译指令"""
+        definition, code = self.routines[index]
+        entry = self.routine_code.get(id(definition))
+        if entry is None or entry[0] is not definition:
+            self.routine_code[id(definition)] = (definition, self.prepare(code))
+        return definition
+
+    # ==================== 调用 ====================
+
+    def op_call_builtin(self, arg):
+        name, argc = arg
+        stack = self.stack
+        if argc:
+            arg_values = stack[-argc:]
+            del stack[-argc:]
+        else:
+            arg_values = []
+        stack.append(call_builtin_function(name, arg_values, self.file_manager))
+
+    def op_call_linked_builtin(self, arg):
+        builtin, name, argc = arg
+        stack = self.stack
+        if argc:
+            arg_values = stack[-argc:]
+            del stack[-argc:]
+        else:
+            arg_values = []
+        try:
+            stack.append(builtin(*arg_values))
+        except TypeError as e:
+            raise builtin_call_error(name, e)
+
+    def op_load_function(self, name):
+        self.stack.append(self.current_env.resolve_function(name))
+
+    def op_load_linked_function(self, definition):
+        self.stack.append((definition, self.global_env))
+
+    def op_load_procedure(self, name):
+        self.stack.append(self.current_env.resolve_procedure(name))
+
+    def op_load_linked_procedure(self, definition):
+        self.stack.append((definition, self.global_env))
+
+    def op_call_function(self, argc):
+        stack = self.stack
+        if argc:
+            arg_values = stack[-argc:]
+            del stack[-argc:]
+        else:
+            arg_values = []
+        func_def, defining_env = stack.pop()
+
+        # 开启记忆化时，纯函数命中缓存则直接压入结果，否则在返回时保存结果
+        key = None
+        memo = self.memo
+        if memo is not None and func_def.pure:
+            key = memo.key(func_def, arg_values)
+            if key is not None:
+                value = memo.get(key, UNCACHED)
+                if value is not UNCACHED:
+                    stack.append(value)
+                    return
+
+        # 创建新的调用帧（父作用域为定义所在的作用域）并绑定参数
+        env = EnvironmentFrame(defining_env, func_def.scope)
+        for i in range(min(len(func_def.parameters), len(arg_values))):
+            env.slots[i] = arg_values[i]
+
+        self.enter('function', func_def, env)
+        self.frames[-1].memo_key = key
+
+    def op_call_procedure(self, arguments):
+        stack = self.stack
+        argc = len(arguments)
+        if argc:
+            arg_values = stack[-argc:]
+            del stack[-argc:]
+        else:
+            arg_values = []
+        proc_def, defining_env = stack.pop()
+
+        # 创建新的调用帧（父作用域为定义所在的作用域），在调用者作用域中绑定参数
+        env = EnvironmentFrame(defining_env, proc_def.scope)
+        self.bind_procedure_parameters(env, proc_def, arguments, arg_values)
+        self.enter('procedure', proc_def, env)
+
+    def op_tail_call_function(self, argc):
+        # RETURN f(...)：被调用函数的返回值就是当前函数的返回值，进入后丢弃当前函数帧，
+        # 被调用函数返回时直接回到当前函数的调用者（记忆化的调用需要在返回时保存结果，不做尾调用）
+        frame = self.frames[-1]
+        if frame.kind != 'function' or frame.memo_key is not None:
+            self.op_call_function(argc)
+            return
+        depth = len(self.frames)
+        self.op_call_function(argc)
+        if len(self.frames) > depth:
+            self.replace_frame(frame)
+
+    def op_tail_call_procedure(self, arguments):
+        # 过程体的最后一个调用：进入被调用过程后丢弃当前过程帧
+        # （BYREF参数是指向实参的引用，结束时没有要写回的值）
+        frame = self.frames[-1]
+        if frame.kind != 'procedure':
+            self.op_call_procedure(arguments)
+            return
+        self.op_call_procedure(arguments)
+        self.replace_frame(frame)
+
+    def replace_frame(self, frame: Frame):
+        """用刚压入的被调用者帧替换其下方的调用者帧frame（尾调用）：返回地址和作用域取自frame，
+        frame留在操作数栈上的值（如FOR循环状态）一并丢弃"""
+        callee = self.frames.pop()
+        callee.instructions = frame.instructions
+        callee.pc = frame.pc
+        callee.env = frame.env
+        del self.stack[frame.stack_base:callee.stack_base]
+        callee.stack_base = frame.stack_base
+        self.frames[-1] = callee
+
+    def enter(self, kind: str, definition, env):
+        """压入调用帧并跳转到子程序体"""
+        self.frames.append(Frame(kind, self.instructions, self.pc, self.current_env, len(self.stack),
+                                 definition, definition.name))
+        self.current_env = env
+        self.instructions = self.routine_instructions(definition)
+        self.pc = 0
+
+    def leave(self) -> Frame:
+        """弹出调用帧并恢复调用者状态"""
+        frame = self.frames.pop()
+        self.current_env = frame.env
+        self.instructions = frame.instructions
+        self.pc = frame.pc
+        del self.stack[frame.stack_base:]
+        return frame
+
+    def op_return_value(self, arg):
+        value = self.stack.pop()
+        # 向外展开调用帧，直到遇到函数帧（过程帧直接丢弃）
+        while True:
+            frame = self.frames[-1]
+            if frame.kind == 'function':
+                self.leave()
+                if frame.memo_key is not None:
+                    self.memo.put(frame.memo_key, value)
+                self.stack.append(value)
+                return
+            if frame.kind == 'procedure':
+                self.leave()
+                continue
+            if frame.kind == 'body':
+                # 嵌套执行：按解释器语义抛出ReturnValue
+                self.leave()
+                raise ReturnValue(value)
+            raise ReturnValue(value)
+
+    def op_end_routine(self, arg):
+        frame = self.frames[-1]
+        if frame.kind == 'function':
+            self.leave()
+            raise RuntimeError(f"Function '{frame.name}' did not return a value")
+        if frame.kind == 'procedure':
+            self.leave()
+            return
+        # 嵌套执行的子程序体结束
+        self.leave()
+        raise _Halt()
+
+    # ==================== 输入输出 ====================
+
+    def op_input(self, arg):
+        try:
+            user_input = input()
+        except EOFError:
+            raise RuntimeError("Unexpected end of input")
+        self.stack.append(self.parse_input_value(user_input))
+
+    def op_output(self, count):
+        stack = self.stack
+        values = stack[len(stack) - count:]
+        del stack[len(stack) - count:]
+        print(' '.join([self.to_output_string(value) for value in values]))
+
+    def op_file_open(self, arg):
+        file_id, mode = arg
+        self.file_manager.open_file(file_id, mode)
+
+    def op_file_read(self, file_id):
+        content = self.file_manager.read_file(file_id)
+        self.stack.append(pt.StringType(content))
+
+    def op_file_write(self, file_id):
+        content = self.to_output_string(self.stack.pop())
+        self.file_manager.write_file(file_id, content)
+
+    def op_file_close(self, file_id):
+        self.file_manager.close_file(file_id)
+
+    def op_halt(self, arg):
+        raise _Halt()
@@ -10,13 +10,19 @@ from flask_cors import CORS
 import traceback
 import hashlib
 import secrets
+import threading
+from collections import OrderedDict
 
 # 添加父目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from lexer import Lexer, preprocess_pseudocode
+from lexer import Lexer
 from parser import Parser
-from interpreter import Interpreter
+from engines import ENGINES, DEFAULT_ENGINE, create_interpreter
+from typechecker import check_program
+from incremental import IncrementalParser
+from ast_cache import ASTCache
+import pseudocode_types as pt
 
 app = Flask(__name__, static_folder='web', static_url_path='')
 app.secret_key = secrets.token_hex(32)  # 生成随机密钥用于session
@@ -26,6 +32,22 @@ CORS(app, supports_credentials=True)  # 允许跨域请求并支持credentials
 users_db = {}  # {username: {password_hash, ...}}
 files_db = {}  # {username: {file_id: {name, content, updated_at}}}
 
+# 每次运行的数组存储上限（字节），超出时以MemoryError结束程序，避免一个程序耗尽服务器内存
+ARRAY_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# 开启记忆化（memoize）时每次运行缓存的纯函数结果数上限
+MEMO_SIZE_LIMIT = 100_000
+
+# 语法树缓存：同一段代码（如课堂上的示例和模板）重复提交时跳过前端处理
+AST_CACHE_SIZE = 256
+ast_cache = ASTCache(AST_CACHE_SIZE)
+
+# 编辑器检查语法时每个文档的增量语法分析器 {document: IncrementalParser}，最近使用的在最后
+documents = OrderedDict()
+MAX_DOCUMENTS = 64
+# 请求在多个线程中处理：文档表和增量语法分析器的缓存状态都只在持有这个锁时修改
+documents_lock = threading.Lock()
+
 # 生成唯一文件ID
 def generate_file_id():
     import time
@@ -62,6 +84,10 @@ def run_code():
         code = data.get('code', '')
         debug = data.get('debug', False)
         strict = data.get('strict', False)
+        engine = data.get('engine', DEFAULT_ENGINE)
+        optimize = data.get('optimize', True)
+        memoize = data.get('memoize', False)
+        memo_size = int(data.get('memo_size', MEMO_SIZE_LIMIT))
 
         if not code:
             return jsonify({
@@ -69,29 +95,41 @@ def run_code():
                 'error': '代码为空'
             })
 
-        # 预处理代码
-        code = preprocess_pseudocode(code)
+        if engine not in ENGINES:
+            return jsonify({
+                'status': 'error',
+                'error': f'未知的执行引擎: {engine}'
+            })
+
+        if memo_size < 1:
+            return jsonify({
+                'status': 'error',
+                'error': f'memo_size必须至少为1: {memo_size}'
+            })
+        memo_size = min(memo_size, MEMO_SIZE_LIMIT)
 
-        # 词法分析
-        lexer = Lexer()
-        tokens = lexer.tokenize(code)
+        # 词法分析、语法分析、优化和类型检查（同一源代码只处理一次，之后从语法树缓存中取出）
+        front_end = ast_cache.get(code, optimize)
+        ast = front_end.ast
 
         debug_info = []
         if debug:
+            tokens = Lexer().tokenize(code)
             debug_info.append('=== Token流 ===')
             for token in tokens[:20]:  # 限制显示前20个token
                 debug_info.append(str(token))
             if len(tokens) > 20:
                 debug_info.append(f'... 还有 {len(tokens) - 20} 个tokens')
 
-        # 语法分析
-        parser = Parser(tokens)
-        ast = parser.parse()
-
-        if debug:
             debug_info.append('\n=== AST ===')
             debug_info.append(f'语句数: {len(ast.statements)}')
             debug_info.append(f'严格模式: {"开启" if strict else "关闭"}')
+            debug_info.append(f'执行引擎: {engine}')
+            debug_info.append(f'类型检查: {front_end.proven}/{front_end.total} 处运行时检查已省略')
+            if front_end.changes is not None:
+                debug_info.append('\n=== 优化 ===')
+                debug_info.extend(front_end.changes)
+                debug_info.append(front_end.summary)
 
         # 捕获输出
         from io import StringIO
@@ -102,8 +140,9 @@ def run_code():
         sys.stdout = output_buffer
 
         try:
-            # 解释执行
-            interpreter = Interpreter(strict_mode=strict)
+            # 解释执行（数组存储记入新的内存账）
+            memory = pt.start_memory_account(ARRAY_MEMORY_LIMIT)
+            interpreter = create_interpreter(engine, strict_mode=strict, memoize=memoize, memo_size=memo_size)
             interpreter.interpret(ast)
 
             # 恢复stdout
@@ -112,10 +151,15 @@ def run_code():
             # 获取输出
             output = output_buffer.getvalue()
             output_lines = output.strip().split('\n') if output.strip() else ['(无输出)']
+            if debug:
+                debug_info.append(f'数组内存: 峰值 {memory.peak} 字节')
 
             return jsonify({
                 'status': 'success',
                 'output': output_lines,
+                'diagnostics': front_end.diagnostics,
+                'array_memory': memory.peak,
+                'memo': interpreter.memo.stats() if interpreter.memo is not None else None,
                 'debug_info': '\n'.join(debug_info) if debug else None
             })
 
@@ -132,6 +176,7 @@ def run_code():
                 'status': 'error',
                 'error': error_msg,
                 'output': output.strip().split('\n') if output.strip() else None,
+                'diagnostics': front_end.diagnostics,
                 'traceback': traceback.format_exc() if debug else None
             })
 
@@ -149,6 +194,45 @@ def run_code():
         })
 
 
+@app.route('/api/check', methods=['POST'])
+def check_code():
+    """检查伪代码语法的API端点（编辑器输入时调用，不执行程序）
+
+    请求中的document标识编辑器中的文档：同一文档的后续检查只重新分析修改过的顶层语句。
+    types为true时同时返回静态类型检查的诊断信息。
+    """
+    data = request.json
+    code = data.get('code', '')
+    document = data.get('document')
+    types = data.get('types', False)
+
+    try:
+        if document is None:
+            ast = Parser(Lexer().tokenize(code)).parse()
+            diagnostics = check_program(ast).diagnostics if types else None
+        else:
+            document = str(document)
+            # 类型检查也会在语句上记录结果，而这些语句会被同一文档的下一次检查复用
+            with documents_lock:
+                incremental = documents.pop(document, None) or IncrementalParser()
+                documents[document] = incremental
+                while len(documents) > MAX_DOCUMENTS:
+                    documents.popitem(last=False)
+                ast = incremental.update(code)
+                diagnostics = check_program(ast).diagnostics if types else None
+    except SyntaxError as e:
+        return jsonify({
+            'status': 'error',
+            'error': f'语法错误: {str(e)}'
+        })
+
+    return jsonify({
+        'status': 'success',
+        'statements': len(ast.statements),
+        'diagnostics': diagnostics
+    })
+
+
 @app.route('/api/examples', methods=['GET'])
 def get_examples():
     """获取示例代码列表"""
@@ -196,7 +280,8 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'version': '1.0.0',
-        'interpreter': 'A-level CS Pseudocode'
+        'interpreter': 'A-level CS Pseudocode',
+        'ast_cache': ast_cache.stats()
     })
 
 